@@ -71,6 +71,9 @@ def create_app(config_name=None):
     # Initialize extensions
     _init_extensions(app)
 
+    # Register configured storage providers
+    _init_storage_registry(app)
+
     # Register blueprints
     _register_blueprints(app)
 
@@ -83,6 +86,10 @@ def create_app(config_name=None):
             _init_scheduler(app)
         except Exception as e:
             app.logger.warning(f"Scheduler initialization skipped: {str(e)}")
+        try:
+            _init_verification_runner(app)
+        except Exception as e:
+            app.logger.warning(f"Verification runner initialization skipped: {str(e)}")
 
     # Register template context processors
     _register_context_processors(app)
@@ -190,6 +197,15 @@ def _init_extensions(app):
     app.logger.info("Extensions initialized successfully")
 
 
+def _init_storage_registry(app):
+    """Register STORAGE_PROVIDERS with the shared storage registry (misconfigurations fail startup)"""
+    from app.storage.registry import get_storage_registry, register_configured_providers
+
+    provider_ids = register_configured_providers(get_storage_registry(), app.config.get("STORAGE_PROVIDERS") or [])
+    if provider_ids:
+        app.logger.info(f"Storage providers registered: {', '.join(provider_ids)}")
+
+
 def _register_blueprints(app):
     """Register Flask blueprints"""
     # Authentication blueprint
@@ -365,6 +381,27 @@ def _init_scheduler(app):
     atexit.register(lambda: scheduler.shutdown(wait=False))
 
 
+def _init_verification_runner(app):
+    """Start the worker pool that executes verifications queued through the API"""
+    from app.services.verification_runner import VerificationRunner
+
+    runner = VerificationRunner(
+        app,
+        max_workers=app.config.get("VERIFICATION_RUNNER_WORKERS", 2),
+        poll_interval=app.config.get("VERIFICATION_RUNNER_POLL_SECONDS", 5),
+        progress_interval=app.config.get("VERIFICATION_PROGRESS_INTERVAL", 1.0),
+        heartbeat_timeout=app.config.get("VERIFICATION_HEARTBEAT_TIMEOUT", 60),
+        sample_confidence=app.config.get("RESTORE_SAMPLE_CONFIDENCE", 0.95),
+        sample_error_rate=app.config.get("RESTORE_SAMPLE_ERROR_RATE", 0.01),
+    )
+    app.verification_runner = runner
+    runner.start()
+
+    import atexit
+
+    atexit.register(runner.stop, 5)
+
+
 def _register_scheduled_tasks(app):
     """Register scheduled tasks"""
     try:
@@ -374,6 +411,8 @@ def _register_scheduled_tasks(app):
             check_verification_reminders,
             cleanup_old_logs,
             generate_daily_report,
+            prune_expired_backups,
+            scrub_backup_copies,
         )
 
         # Get scheduler from app
@@ -416,6 +455,27 @@ def _register_scheduled_tasks(app):
             id="cleanup_old_logs", func=cleanup_old_logs, trigger="cron", hour=3, minute=0, replace_existing=True, args=[app]
         )
 
+        # Expire backups past their retention period every day at 4:00 AM
+        scheduler.add_job(
+            id="prune_expired_backups",
+            func=prune_expired_backups,
+            trigger="cron",
+            hour=4,
+            minute=0,
+            replace_existing=True,
+            args=[app],
+        )
+
+        # Scrub the share of stored backup data that is due, in small paced increments
+        scheduler.add_job(
+            id="scrub_backup_copies",
+            func=scrub_backup_copies,
+            trigger="interval",
+            minutes=app.config.get("SCRUB_INTERVAL_MINUTES", 10),
+            replace_existing=True,
+            args=[app],
+        )
+
         # Generate daily report at 8:00 AM
         scheduler.add_job(
             id="generate_daily_report",
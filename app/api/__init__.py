@@ -11,6 +11,7 @@ api_bp = Blueprint("api", __name__, url_prefix="/api")
 # Import routes after blueprint creation to avoid circular imports
 # Import v1 API routes
 from app.api import alerts, backup, dashboard, jobs, media, reports, verification
+from app.api.v1 import storage_api, verification_api
 
 # Register error handlers
 from app.api.errors import register_error_handlers
@@ -5,7 +5,7 @@ Endpoint for PowerShell scripts to update backup status
 import logging
 from datetime import datetime
 
-from flask import jsonify, request
+from flask import current_app, jsonify, request
 
 from app.api import api_bp
 from app.api.errors import error_response, validation_error_response
@@ -30,6 +30,9 @@ def update_backup_status():
         "execution_result": "success",
         "backup_size_bytes": 1073741824,
         "duration_seconds": 300,
+        "files_copied": 120,
+        "files_skipped": 98000,
+        "dedup_ratio": 0.93,
         "error_message": null,
         "source_system": "powershell"
     }
@@ -79,6 +82,9 @@ def update_backup_status():
             error_message=data.get("error_message"),
             backup_size_bytes=data.get("backup_size_bytes"),
             duration_seconds=data.get("duration_seconds"),
+            files_copied=data.get("files_copied"),
+            files_skipped=data.get("files_skipped"),
+            dedup_ratio=data.get("dedup_ratio"),
             source_system=data.get("source_system", "powershell"),
         )
 
@@ -126,7 +132,10 @@ def update_copy_status():
         "copy_id": 1,
         "status": "success",
         "last_backup_date": "2025-10-30T03:00:00Z",
-        "last_backup_size": 1073741824
+        "last_backup_size": 1073741824,
+        "dedup_ratio": 0.93,
+        "compression_ratio": 2.4,
+        "compression_cpu_seconds": 182.5
     }
 
     Returns:
@@ -164,6 +173,17 @@ def update_copy_status():
                 return validation_error_response({"last_backup_size": "Must be a non-negative number"})
             copy.last_backup_size = int(data["last_backup_size"])
 
+        if "dedup_ratio" in data:
+            if not isinstance(data["dedup_ratio"], (int, float)) or not 0 <= data["dedup_ratio"] <= 1:
+                return validation_error_response({"dedup_ratio": "Must be a number between 0 and 1"})
+            copy.dedup_ratio = float(data["dedup_ratio"])
+
+        for field in ("compression_ratio", "compression_cpu_seconds"):
+            if field in data:
+                if not isinstance(data[field], (int, float)) or data[field] < 0:
+                    return validation_error_response({field: "Must be a non-negative number"})
+                setattr(copy, field, float(data[field]))
+
         copy.updated_at = datetime.utcnow()
         db.session.commit()
 
@@ -221,3 +241,92 @@ def get_last_execution(job_id):
     except Exception as e:
         logger.error(f"Error getting last execution: {str(e)}", exc_info=True)
         return error_response(500, "Failed to get last execution", "QUERY_FAILED")
+
+
+@api_bp.route("/backup/io-targets", methods=["GET"])
+@api_token_required
+def get_io_targets():
+    """
+    Get I/O scheduler limits and statistics per storage target
+
+    Returns:
+        200: Per-target limits and statistics
+    """
+    from app.core.io_scheduler import get_io_scheduler
+
+    return jsonify({"targets": get_io_scheduler().get_stats()}), 200
+
+
+@api_bp.route("/backup/io-targets", methods=["PUT"])
+@api_token_required
+def configure_io_target():
+    """
+    Configure bandwidth and concurrency limits for a storage target
+
+    Limits take effect immediately, including for streams already running.
+
+    Expected JSON payload:
+    {
+        "target": "/mnt/nas01",
+        "bandwidth_bytes_per_sec": 209715200,  // optional, null = unlimited
+        "max_streams": 2,                      // optional, null = unlimited
+        "burst_bytes": 16777216                // optional
+    }
+
+    Returns:
+        200: Limits updated
+        400: Invalid request
+    """
+    from app.core.io_scheduler import get_io_scheduler
+
+    data = request.get_json(silent=True)
+    if not data or not data.get("target"):
+        return validation_error_response({"target": "Required field"})
+
+    try:
+        scheduler = get_io_scheduler()
+        scheduler.configure_target(
+            data["target"],
+            bandwidth_bytes_per_sec=data.get("bandwidth_bytes_per_sec"),
+            max_streams=data.get("max_streams"),
+            burst_bytes=data.get("burst_bytes"),
+        )
+    except (TypeError, ValueError) as e:
+        return error_response(400, str(e), "INVALID_LIMITS")
+
+    target = scheduler.target_for(data["target"])
+    logger.info(f"I/O target limits updated: {target}")
+
+    return jsonify({"target": target, "limits": scheduler.get_stats()[target]}), 200
+
+
+@api_bp.route("/backup/retention/prune", methods=["POST"])
+@api_token_required
+def prune_expired_backups():
+    """
+    Expire point-in-time backups older than their job's retention period
+
+    Expected JSON payload (optional):
+    {
+        "dry_run": true    // default true: only report reclaimable bytes per target
+    }
+
+    RETENTION_DRY_RUN in the configuration forces a dry run.
+
+    Returns:
+        200: Retention report (expired backups, reclaimable bytes per target, deletions)
+    """
+    from app.services.retention_service import RetentionService
+    from app.storage.registry import get_storage_registry
+
+    data = request.get_json(silent=True) or {}
+    dry_run = data.get("dry_run", True)
+    if not isinstance(dry_run, bool):
+        return validation_error_response({"dry_run": "Must be a boolean"})
+    dry_run = dry_run or current_app.config.get("RETENTION_DRY_RUN", False)
+
+    service = RetentionService.from_config(current_app.config, storage_registry=get_storage_registry())
+    report = service.prune(dry_run=dry_run)
+    logger.info(f"Retention {'dry run' if dry_run else 'pruning'} requested via API")
+
+    return jsonify(report), 200
@@ -54,6 +54,18 @@ def validate_job_data(data, is_update=False):
         if data["schedule_type"] not in valid_schedules:
             errors["schedule_type"] = f'Must be one of: {", ".join(valid_schedules)}'
 
+    # Validate backup_mode (applies to directory sources; file sources are always copied in full)
+    if "backup_mode" in data:
+        valid_backup_modes = ["full", "incremental", "differential"]
+        if data["backup_mode"] not in valid_backup_modes:
+            errors["backup_mode"] = f'Must be one of: {", ".join(valid_backup_modes)}'
+
+    # Validate io_mode
+    if "io_mode" in data:
+        valid_io_modes = ["auto", "buffered", "cache_friendly", "direct"]
+        if data["io_mode"] not in valid_io_modes:
+            errors["io_mode"] = f'Must be one of: {", ".join(valid_io_modes)}'
+
     # Validate retention_days
     if "retention_days" in data:
         try:
@@ -147,6 +159,8 @@ def list_jobs():
                     "target_path": job.target_path,
                     "backup_tool": job.backup_tool,
                     "schedule_type": job.schedule_type,
+                    "backup_mode": job.backup_mode,
+                    "io_mode": job.io_mode,
                     "retention_days": job.retention_days,
                     "owner_id": job.owner_id,
                     "owner_name": job.owner.full_name if job.owner else None,
@@ -218,6 +232,9 @@ def get_job(job_id):
                     "is_compressed": copy.is_compressed,
                     "last_backup_date": copy.last_backup_date.isoformat() + "Z" if copy.last_backup_date else None,
                     "last_backup_size": copy.last_backup_size,
+                    "dedup_ratio": copy.dedup_ratio,
+                    "compression_ratio": copy.compression_ratio,
+                    "compression_cpu_seconds": copy.compression_cpu_seconds,
                     "status": copy.status,
                     "offline_media_id": copy.offline_media_id,
                     "created_at": copy.created_at.isoformat() + "Z",
@@ -234,6 +251,9 @@ def get_job(job_id):
                     "execution_result": execution.execution_result,
                     "backup_size_bytes": execution.backup_size_bytes,
                     "duration_seconds": execution.duration_seconds,
+                    "files_copied": execution.files_copied,
+                    "files_skipped": execution.files_skipped,
+                    "dedup_ratio": execution.dedup_ratio,
                     "error_message": execution.error_message,
                 }
             )
@@ -251,6 +271,8 @@ def get_job(job_id):
                     "target_path": job.target_path,
                     "backup_tool": job.backup_tool,
                     "schedule_type": job.schedule_type,
+                    "backup_mode": job.backup_mode,
+                    "io_mode": job.io_mode,
                     "retention_days": job.retention_days,
                     "owner_id": job.owner_id,
                     "owner": {
@@ -303,6 +325,7 @@ def create_job():
         "target_path": "C:\\Databases",
         "backup_tool": "veeam",
         "schedule_type": "daily",
+        "backup_mode": "incremental",
         "retention_days": 30,
         "owner_id": 1,
         "description": "Daily backup of production database"
@@ -328,6 +351,8 @@ def create_job():
             target_path=data.get("target_path"),
             backup_tool=data["backup_tool"],
             schedule_type=data["schedule_type"],
+            backup_mode=data.get("backup_mode", "full"),
+            io_mode=data.get("io_mode", "auto"),
             retention_days=data["retention_days"],
             owner_id=data.get("owner_id"),
             description=data.get("description"),
@@ -389,6 +414,10 @@ def update_job(job_id):
             job.backup_tool = data["backup_tool"]
         if "schedule_type" in data:
             job.schedule_type = data["schedule_type"]
+        if "backup_mode" in data:
+            job.backup_mode = data["backup_mode"]
+        if "io_mode" in data:
+            job.io_mode = data["io_mode"]
         if "retention_days" in data:
             job.retention_days = int(data["retention_days"])
         if "owner_id" in data:
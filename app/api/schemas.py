@@ -5,7 +5,7 @@ Provides type-safe data validation for REST API endpoints
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 
-from pydantic import BaseModel, ConfigDict, Field, field_validator
+from pydantic import AliasChoices, BaseModel, ConfigDict, Field, field_validator
 
 # ============================================================================
 # Base Response Models
@@ -141,6 +141,9 @@ class BackupExecutionResponse(BaseModel):
     error_message: Optional[str]
     backup_size_bytes: Optional[int]
     duration_seconds: Optional[int]
+    files_copied: Optional[int] = None
+    files_skipped: Optional[int] = None
+    dedup_ratio: Optional[float] = None
     source_system: Optional[str]
 
     model_config = ConfigDict(from_attributes=True)
@@ -260,21 +263,27 @@ class VerificationStartRequest(BaseModel):
 
 
 class VerificationStatusResponse(BaseModel):
-    """Response model for verification status"""
+    """Response model for verification status (built from a VerificationRun)"""
 
     id: int
-    backup_id: int
+    backup_id: int = Field(validation_alias=AliasChoices("backup_id", "backup_copy_id"))
     test_type: str
-    test_status: str
-    test_result: Optional[str]
-    started_at: datetime
+    scope: str
+    test_status: str = Field(validation_alias=AliasChoices("test_status", "status"))
+    test_result: Optional[str] = Field(default=None, validation_alias=AliasChoices("test_result", "result"))
+    created_at: datetime
+    started_at: Optional[datetime]
     completed_at: Optional[datetime]
-    duration_seconds: Optional[int]
-    files_tested: Optional[int]
-    files_passed: Optional[int]
-    files_failed: Optional[int]
+    files_total: int
+    files_done: int
+    files_failed: int
+    bytes_total: int
+    bytes_done: int
+    percent_complete: float
+    eta_seconds: Optional[float]
+    current_file: Optional[str]
     error_message: Optional[str]
-    tester_id: Optional[int]
+    requested_by: int
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -7,13 +7,15 @@ Endpoints:
 - GET    /api/v1/storage/providers/{id}  - Get provider details
 - POST   /api/v1/storage/test            - Test storage connection
 - GET    /api/v1/storage/{id}/space      - Get storage space information
-- GET    /api/v1/storage/{id}/backups    - List backups on storage
+- GET    /api/v1/storage/{id}/backups    - List backups on storage (file listing as NDJSON or cursor pages on request)
 """
+import json
 import logging
 import os
 from datetime import datetime
+from itertools import chain
 
-from flask import jsonify, request
+from flask import Response, jsonify, request, stream_with_context
 from pydantic import ValidationError
 
 from app.api import api_bp
@@ -28,6 +30,7 @@ from app.api.schemas import (
     StorageTestResponse,
 )
 from app.models import BackupCopy, db
+from app.storage.providers.local_storage import LocalStorageProvider
 
 logger = logging.getLogger(__name__)
 
@@ -317,16 +320,35 @@ def list_storage_backups(current_user, storage_id):
     """
     List backups on specific storage
 
+    By default a JSON page of the backup copies stored at the same location is returned
+    (unchanged contract). The files on the storage itself can be listed on request; they are
+    read lazily with os.scandir, so large targets are never held in memory:
+
+    - ``Accept: application/x-ndjson``: the whole file listing is streamed, one file per line.
+      If the storage fails mid-stream the response is aborted (the chunked body is never
+      terminated) instead of ending normally; resume with ``cursor`` set to the last path read.
+    - ``limit`` (and ``cursor``): a single JSON page of files with a ``next_cursor``.
+
     Path Parameters:
         storage_id (int): Storage ID
 
     Query Parameters:
         page (int): Page number (default: 1)
         page_size (int): Items per page (default: 20, max: 100)
+        path (str): File listing only - directory below the storage location (default: root)
+        pattern (str): File listing only - file name glob (default: *)
+        recursive (bool): File listing only - include files in subdirectories (default: true)
+        cursor (str): File listing only - resume after this path
+        limit (int): File listing only - page size (max: 1000)
 
     Returns:
-        200: List of backups on storage
+        200: Paginated backup copies ({"id", "job_id", "copy_type", "media_type", "storage_path",
+             "backup_size_bytes", "last_backup_date", "status", "created_at"});
+             file listings hold {"path", "size", "mtime", "is_dir"} per file, plus "error" on
+             entries that could not be read (an unreadable subdirectory is listed once, without its contents)
+        400: Invalid parameters
         404: Storage not found
+        500: The listed directory could not be read
     """
     try:
         # Get storage location from BackupCopy
@@ -335,38 +357,42 @@ def list_storage_backups(current_user, storage_id):
         if not storage_ref:
             return error_response(404, "Storage not found", "NOT_FOUND")
 
-        storage_path = storage_ref.storage_location
+        stream = request.accept_mimetypes.best_match(["application/json", "application/x-ndjson"])
+        if stream == "application/x-ndjson" or "limit" in request.args:
+            return _list_storage_files(storage_id, storage_ref.storage_path or "", stream == "application/x-ndjson")
 
         # Get pagination parameters
         page = request.args.get("page", 1, type=int)
         page_size = min(request.args.get("page_size", 20, type=int), 100)
 
-        # Query backups on this storage
-        query = BackupCopy.query.filter_by(storage_location=storage_path)
-
-        # Order by creation date (descending)
+        # Query backups on this storage, newest first
+        query = BackupCopy.query.filter_by(storage_path=storage_ref.storage_path)
         query = query.order_by(db.desc(BackupCopy.created_at))
-
-        # Paginate
         pagination = query.paginate(page=page, per_page=page_size, error_out=False)
 
-        # Convert to response format
         backups = []
         for backup in pagination.items:
-            backup_data = {
-                "id": backup.id,
-                "job_id": backup.job_id,
-                "copy_type": backup.copy_type,
-                "location_type": backup.location_type,
-                "storage_location": backup.storage_location,
-                "backup_size_bytes": backup.backup_size_bytes,
-                "created_at": backup.created_at.isoformat() if backup.created_at else None,
-                "verified_at": backup.verified_at.isoformat() if backup.verified_at else None,
-            }
-            backups.append(backup_data)
+            backups.append(
+                {
+                    "id": backup.id,
+                    "job_id": backup.job_id,
+                    "copy_type": backup.copy_type,
+                    "media_type": backup.media_type,
+                    "storage_path": backup.storage_path,
+                    "backup_size_bytes": backup.last_backup_size,
+                    "last_backup_date": backup.last_backup_date.isoformat() if backup.last_backup_date else None,
+                    "status": backup.status,
+                    "created_at": backup.created_at.isoformat() if backup.created_at else None,
+                }
+            )
 
         response = PaginatedResponse(
-            success=True, data=backups, total=pagination.total, page=page, page_size=page_size, total_pages=pagination.pages
+            success=True,
+            data=backups,
+            total=pagination.total,
+            page=page,
+            page_size=page_size,
+            total_pages=pagination.pages,
         )
 
         return jsonify(response.model_dump()), 200
@@ -374,3 +400,55 @@ def list_storage_backups(current_user, storage_id):
     except Exception as e:
         logger.error(f"Error listing backups for storage {storage_id}: {e}", exc_info=True)
         return error_response(500, "Failed to list storage backups", "INTERNAL_ERROR")
+
+
+def _list_storage_files(storage_id: int, storage_path: str, stream: bool):
+    """File listing of a storage location: NDJSON stream or one JSON page with a resume cursor."""
+    # A copy's storage_path may point at the backup file itself; list its directory then
+    if os.path.isfile(storage_path):
+        storage_path = os.path.dirname(storage_path)
+    if not os.path.isdir(storage_path):
+        return error_response(404, "Storage location is not accessible", "NOT_FOUND")
+
+    sub_path = request.args.get("path", "")
+    if os.path.isabs(sub_path) or ".." in sub_path.replace("\\", "/").split("/"):
+        return error_response(400, "Invalid path", "VALIDATION_ERROR")
+    pattern = request.args.get("pattern", "*")
+    recursive = request.args.get("recursive", "true").lower() in ("1", "true", "yes")
+    cursor = request.args.get("cursor") or None
+
+    provider = LocalStorageProvider(f"storage-{storage_id}", storage_path)
+
+    if not stream:
+        limit = request.args.get("limit", type=int)
+        if limit is None or limit <= 0:
+            return error_response(400, "limit must be a positive integer", "VALIDATION_ERROR")
+        page = provider.list_page(sub_path, pattern, cursor, min(limit, 1000), recursive)
+        response = APIResponse(
+            success=True,
+            data={"files": [entry.to_dict() for entry in page.entries], "next_cursor": page.next_cursor},
+        )
+        return jsonify(response.model_dump()), 200
+
+    # Read the first entry before the 200 is sent, so errors opening the listing get an error status
+    entries = provider.iter_files(sub_path, pattern, cursor, recursive)
+    first = next(entries, None)
+
+    def generate():
+        lines = []
+        try:
+            for entry in chain([first] if first is not None else [], entries):
+                lines.append(json.dumps(entry.to_dict()))
+                if len(lines) >= 1000:
+                    yield "\n".join(lines) + "\n"
+                    lines = []
+        except Exception as e:
+            # The status line is already sent: abort the response rather than end it like a complete listing
+            logger.error(f"Error streaming backups for storage {storage_id}: {e}", exc_info=True)
+            if lines:
+                yield "\n".join(lines) + "\n"
+            raise
+        if lines:
+            yield "\n".join(lines) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
@@ -3,15 +3,16 @@ Verification Management REST API (v1)
 Provides RESTful endpoints for backup verification testing
 
 Endpoints:
-- POST   /api/v1/verify/{backup_id}        - Start verification test
-- GET    /api/v1/verify/{backup_id}/status - Get verification status
-- GET    /api/v1/verify/{backup_id}/result - Get verification result
-- GET    /api/v1/verify                    - List recent verifications
+- POST   /api/v1/verify/{backup_id}              - Queue verification (runs on the verification runner)
+- GET    /api/v1/verify/{backup_id}/status       - Get verification status and progress
+- GET    /api/v1/verify/{backup_id}/result       - Get verification result
+- GET    /api/v1/verify                          - List recent verifications
+- POST   /api/v1/verify/{verification_id}/cancel - Cancel a queued or running verification
 """
 import logging
 from datetime import datetime
 
-from flask import jsonify, request
+from flask import current_app, jsonify, request
 from pydantic import ValidationError
 from sqlalchemy import desc
 
@@ -21,11 +22,10 @@ from app.api.errors import error_response, validation_error_response
 from app.api.schemas import (
     APIResponse,
     PaginatedResponse,
-    VerificationResultResponse,
     VerificationStartRequest,
     VerificationStatusResponse,
 )
-from app.models import BackupCopy, BackupJob, VerificationTest, db
+from app.models import BackupCopy, BackupJob, VerificationRun, db
 
 logger = logging.getLogger(__name__)
 
@@ -52,11 +52,15 @@ def start_verification(current_user, backup_id):
         "notify_on_completion": true
     }
 
+    The verification is queued and executed by the verification runner's
+    worker pool; poll /status for progress.
+
     Returns:
-        202: Verification test started
+        202: Verification test queued
         400: Invalid request data
         403: Access denied
         404: Backup not found
+        409: A verification of this backup is already queued or running
     """
     try:
         # Get backup copy
@@ -77,36 +81,44 @@ def start_verification(current_user, backup_id):
         data = request.get_json() or {}
         verification_data = VerificationStartRequest(**data)
 
-        # Create verification test record
-        verification = VerificationTest(
-            backup_id=backup_id,
+        active = VerificationRun.query.filter(
+            VerificationRun.backup_copy_id == backup_id, VerificationRun.status.in_(("pending", "running"))
+        ).first()
+        if active:
+            return error_response(409, f"Verification {active.id} is already {active.status}", "CONFLICT")
+
+        # Queue the verification; the row is the runner's persistent work item
+        verification = VerificationRun(
+            backup_copy_id=backup_id,
             test_type=verification_data.test_type,
-            test_status="pending",
-            started_at=datetime.utcnow(),
-            tester_id=current_user.id,
+            scope=verification_data.scope,
+            requested_by=current_user.id,
         )
 
         db.session.add(verification)
         db.session.commit()
 
+        runner = getattr(current_app, "verification_runner", None)
+        if runner is not None:
+            runner.notify()
+
         logger.info(
-            f"Verification test started: Backup {backup_id}, "
+            f"Verification test queued: Backup {backup_id}, "
             f"Type: {verification_data.test_type}, "
             f"Scope: {verification_data.scope}, "
             f"By: {current_user.username}"
         )
 
-        # TODO: Trigger actual verification process (async task)
-
         response = APIResponse(
             success=True,
-            message="Verification test started",
+            message="Verification test queued",
             data={
                 "verification_id": verification.id,
                 "backup_id": backup_id,
                 "test_type": verification_data.test_type,
+                "scope": verification_data.scope,
                 "test_status": "pending",
-                "started_at": verification.started_at.isoformat(),
+                "queued_at": verification.created_at.isoformat(),
                 "started_by": current_user.username,
             },
         )
@@ -127,6 +139,8 @@ def get_verification_status(current_user, backup_id):
     """
     Get current verification status for a backup
 
+    Reads only the progress row the runner updates; ETA is derived from the byte rate.
+
     Path Parameters:
         backup_id (int): Backup copy ID
 
@@ -151,7 +165,9 @@ def get_verification_status(current_user, backup_id):
 
         # Get most recent verification test
         verification = (
-            VerificationTest.query.filter_by(backup_id=backup_id).order_by(desc(VerificationTest.started_at)).first()
+            VerificationRun.query.filter_by(backup_copy_id=backup_id)
+            .order_by(desc(VerificationRun.created_at), desc(VerificationRun.id))
+            .first()
         )
 
         if not verification:
@@ -197,11 +213,11 @@ def get_verification_result(current_user, backup_id):
         if not current_user.is_admin() and backup_job.owner_id != current_user.id:
             return error_response(403, "Access denied", "FORBIDDEN")
 
-        # Get most recent completed verification test
+        # Get most recent finished verification test
         verification = (
-            VerificationTest.query.filter_by(backup_id=backup_id)
-            .filter(VerificationTest.test_status == "completed")
-            .order_by(desc(VerificationTest.completed_at))
+            VerificationRun.query.filter_by(backup_copy_id=backup_id)
+            .filter(VerificationRun.status.in_(("completed", "failed")))
+            .order_by(desc(VerificationRun.completed_at))
             .first()
         )
 
@@ -209,23 +225,31 @@ def get_verification_result(current_user, backup_id):
             return error_response(404, "No completed verification tests found", "NOT_FOUND")
 
         # Calculate success rate
+        passed_files = verification.files_done - verification.files_failed
         success_rate = None
-        if verification.files_tested and verification.files_tested > 0:
-            success_rate = (verification.files_passed / verification.files_tested) * 100
+        if verification.files_done > 0:
+            success_rate = (passed_files / verification.files_done) * 100
+
+        duration_seconds = None
+        if verification.started_at and verification.completed_at:
+            duration_seconds = int((verification.completed_at - verification.started_at).total_seconds())
 
         # Build result response
         result_data = {
             "backup_id": backup_id,
-            "backup_name": backup_job.name,
+            "backup_name": backup_job.job_name,
             "test_type": verification.test_type,
-            "test_status": verification.test_status,
-            "test_result": verification.test_result,
-            "success_rate": round(success_rate, 2) if success_rate else None,
-            "total_files": verification.files_tested,
-            "passed_files": verification.files_passed,
+            "scope": verification.scope,
+            "test_status": verification.status,
+            "test_result": verification.result,
+            "success_rate": round(success_rate, 2) if success_rate is not None else None,
+            "total_files": verification.files_done,
+            "passed_files": passed_files,
             "failed_files": verification.files_failed,
-            "duration_seconds": verification.duration_seconds,
-            "completed_at": verification.completed_at,
+            "bytes_verified": verification.bytes_done,
+            "issues": verification.error_message.splitlines() if verification.error_message else [],
+            "duration_seconds": duration_seconds,
+            "completed_at": verification.completed_at.isoformat(),
         }
 
         response = APIResponse(success=True, data=result_data)
@@ -247,7 +271,7 @@ def list_verifications(current_user):
         page (int): Page number (default: 1)
         page_size (int): Items per page (default: 20, max: 100)
         test_type (str): Filter by test type
-        test_status (str): Filter by status (pending, running, completed, failed)
+        test_status (str): Filter by status (pending, running, completed, failed, cancelled)
         backup_id (int): Filter by backup ID
 
     Returns:
@@ -259,25 +283,25 @@ def list_verifications(current_user):
         page_size = min(request.args.get("page_size", 20, type=int), 100)
 
         # Build query
-        query = VerificationTest.query
+        query = VerificationRun.query
 
         # Apply filters
         if request.args.get("test_type"):
             query = query.filter_by(test_type=request.args.get("test_type"))
 
         if request.args.get("test_status"):
-            query = query.filter_by(test_status=request.args.get("test_status"))
+            query = query.filter_by(status=request.args.get("test_status"))
 
         if request.args.get("backup_id"):
-            query = query.filter_by(backup_id=request.args.get("backup_id", type=int))
+            query = query.filter_by(backup_copy_id=request.args.get("backup_id", type=int))
 
         # Filter by user access (non-admin users can only see their own backups)
         if not current_user.is_admin():
             # Join with BackupCopy and BackupJob to filter by owner
             query = query.join(BackupCopy).join(BackupJob).filter(BackupJob.owner_id == current_user.id)
 
-        # Order by started date (descending)
-        query = query.order_by(desc(VerificationTest.started_at))
+        # Order by queued date (descending)
+        query = query.order_by(desc(VerificationRun.created_at), desc(VerificationRun.id))
 
         # Paginate
         pagination = query.paginate(page=page, per_page=page_size, error_out=False)
@@ -306,55 +330,66 @@ def list_verifications(current_user):
 @role_required("admin", "operator")
 def cancel_verification(current_user, verification_id):
     """
-    Cancel a running verification test
+    Cancel a queued or running verification test
+
+    A queued test is cancelled immediately; a running one is flagged and the
+    worker stops at its next progress check (mid-file).
 
     Path Parameters:
         verification_id (int): Verification test ID
 
     Returns:
         200: Verification cancelled
+        202: Cancellation requested (running test stops shortly)
         400: Cannot cancel (not running)
         403: Access denied
         404: Verification not found
     """
     try:
         # Get verification test
-        verification = VerificationTest.query.get(verification_id)
+        verification = VerificationRun.query.get(verification_id)
 
         if not verification:
             return error_response(404, "Verification test not found", "NOT_FOUND")
 
         # Check if user has access
-        backup_copy = BackupCopy.query.get(verification.backup_id)
+        backup_copy = BackupCopy.query.get(verification.backup_copy_id)
         if backup_copy:
             backup_job = BackupJob.query.get(backup_copy.job_id)
             if backup_job and not current_user.is_admin() and backup_job.owner_id != current_user.id:
                 return error_response(403, "Access denied", "FORBIDDEN")
 
         # Check if verification can be cancelled
-        if verification.test_status not in ("pending", "running"):
-            return error_response(400, f"Cannot cancel verification with status: {verification.test_status}", "INVALID_STATE")
-
-        # Update status
-        verification.test_status = "cancelled"
-        verification.completed_at = datetime.utcnow()
-        verification.test_result = "cancelled"
+        if verification.status not in ("pending", "running"):
+            return error_response(400, f"Cannot cancel verification with status: {verification.status}", "INVALID_STATE")
+
+        # A queued test is cancelled outright unless a worker claimed it in the meantime
+        now = datetime.utcnow()
+        cancelled = VerificationRun.query.filter_by(id=verification_id, status="pending").update(
+            {"status": "cancelled", "result": "cancelled", "cancel_requested": True, "completed_at": now},
+            synchronize_session=False,
+        )
+        if not cancelled:
+            VerificationRun.query.filter_by(id=verification_id).update(
+                {"cancel_requested": True}, synchronize_session=False
+            )
         db.session.commit()
 
-        logger.info(f"Verification test cancelled: ID {verification_id} by {current_user.username}")
+        logger.info(f"Verification test cancel requested: ID {verification_id} by {current_user.username}")
 
         response = APIResponse(
             success=True,
-            message="Verification test cancelled",
+            message="Verification test cancelled" if cancelled else "Verification test cancellation requested",
             data={
                 "verification_id": verification_id,
-                "test_status": "cancelled",
+                "test_status": "cancelled" if cancelled else "running",
+                "cancel_requested": True,
                 "cancelled_by": current_user.username,
-                "cancelled_at": verification.completed_at.isoformat(),
+                "cancelled_at": now.isoformat(),
             },
         )
 
-        return jsonify(response.model_dump()), 200
+        return jsonify(response.model_dump()), 200 if cancelled else 202
 
     except Exception as e:
         logger.error(f"Error cancelling verification {verification_id}: {e}", exc_info=True)
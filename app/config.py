@@ -2,6 +2,7 @@
 Configuration module for Backup Management System
 Supports cross-platform (Linux development / Windows production)
 """
+import json
 import os
 from datetime import timedelta
 from pathlib import Path
@@ -79,6 +80,43 @@ class Config:
     # Verification Test Schedule
     VERIFICATION_REMINDER_DAYS = 7
 
+    # Checksum cache keyed by (device, inode, size, mtime_ns, algorithm); None disables it
+    CHECKSUM_CACHE_PATH = BASE_DIR / "data" / "checksum_cache.db"
+    CHECKSUM_CACHE_MAX_ENTRIES = 1_000_000
+
+    # Restore test sampling: verify enough files to detect this share of bad files with this confidence
+    RESTORE_SAMPLE_CONFIDENCE = 0.95
+    RESTORE_SAMPLE_ERROR_RATE = 0.01
+    # "virtual" verifies restores by streaming hash; "copy" writes them to a temporary directory
+    RESTORE_VERIFICATION_MODE = "virtual"
+
+    # Verifications requested through /api/v1/verify run on this many worker threads;
+    # progress is written (and cancellation checked) every VERIFICATION_PROGRESS_INTERVAL seconds
+    VERIFICATION_RUNNER_WORKERS = 2
+    VERIFICATION_RUNNER_POLL_SECONDS = 5
+    VERIFICATION_PROGRESS_INTERVAL = 1.0
+    # Running verifications whose runner sent no heartbeat for this long are requeued
+    VERIFICATION_HEARTBEAT_TIMEOUT = 60
+
+    # Retention pruning (BackupJob.retention_days; expires tree runs and dedup recipes inside each copy)
+    RETENTION_DRY_RUN = os.environ.get("RETENTION_DRY_RUN", "false").lower() == "true"
+    RETENTION_BATCH_SIZE = 500
+    RETENTION_MAX_WORKERS = 8
+    RETENTION_DELETES_PER_SECOND = 50
+    # Dedup packs whose unreferenced share reaches this ratio are rewritten after recipes expire
+    RETENTION_COMPACT_GARBAGE_RATIO = 0.25
+
+    # Storage providers registered at startup (app.storage.registry.register_configured_providers), e.g.
+    # [{"id": "nas", "type": "local", "prefix": "/mnt/nas", "options": {"base_path": "/mnt/nas"}}]
+    STORAGE_PROVIDERS = json.loads(os.environ.get("STORAGE_PROVIDERS", "[]"))
+
+    # Bit-rot scrubbing: every stored byte is re-read once per period against its Merkle manifest;
+    # SCRUB_STATE_PATH (the resumable cursor) set to None disables it
+    SCRUB_STATE_PATH = BASE_DIR / "data" / "scrub_state.json"
+    SCRUB_PERIOD_DAYS = 30
+    SCRUB_BYTES_PER_SECOND = 50 * 1024 * 1024
+    SCRUB_INTERVAL_MINUTES = 10
+
     # Reports
     REPORT_OUTPUT_DIR = BASE_DIR / "reports"
     REPORT_RETENTION_DAYS = 90
@@ -146,6 +184,10 @@ class TestingConfig(Config):
     # Fast password hashing for tests
     BCRYPT_LOG_ROUNDS = 4
 
+    # Tests must not share cached digests through the data directory
+    CHECKSUM_CACHE_PATH = None
+    SCRUB_STATE_PATH = None
+
 
 # Configuration dictionary
 config = {
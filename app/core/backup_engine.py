@@ -8,9 +8,11 @@ import hashlib
 import logging
 import os
 import shutil
+import sqlite3
+from contextlib import ExitStack
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Callable, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from app.core.exceptions import (
     BackupEngineError,
@@ -20,6 +22,19 @@ from app.core.exceptions import (
     RetryExhaustedError,
     VerificationFailedError,
 )
+from app.core.cache_io import IO_MODES, CacheFriendlyCopier
+from app.core.compression import BlockCompressor, default_codec
+from app.core.copy_pipeline import PipelinedCopier
+from app.core.fanout import FanoutCopier
+from app.core.fast_copy import KernelCopier, SourceChecksumCache
+from app.core.io_scheduler import PRIORITY_NORMAL, get_io_scheduler
+from app.core.manifest import BACKUP_MODES, BackupManifest, manifest_path_for, run_path
+from app.core.resumable import PARTIAL_SUFFIX, ResumableCopier, checkpoint_state
+from app.core.sparse import SparseCopier, is_sparse
+from app.core.tree_copy import TreeCopier
+from app.storage.chunk_store import ChunkStore, job_recipe_prefix, parse_dedup_destination
+from app.storage.registry import CopyPlan, StorageRoute
+from app.verification.merkle import MerkleManifest, merkle_path_for
 
 # ログ設定
 logger = logging.getLogger(__name__)
@@ -41,7 +56,7 @@ class BackupEngine:
         """
         Args:
             db_session: SQLAlchemyセッション
-            storage_registry: ストレージレジストリ（Agent-02提供）
+            storage_registry: ストレージレジストリ（StorageRegistry、送信先プロバイダーの機能でコピー戦略を選択）
             verification_service: 検証サービス（Agent-03提供）
         """
         self.db = db_session
@@ -57,15 +72,70 @@ class BackupEngine:
         # リトライ間隔（秒）
         self.retry_intervals = [1, 5, 15]  # Exponential backoff
 
+        # パイプラインコピー（reader/hasher/writerを並行実行するリングバッファ）
+        self.pipeline = PipelinedCopier(buffer_size=8 * 1024 * 1024, ring_size=4)
+
+        # カーネル内高速パス（reflink → copy_file_range → sendfile → パイプライン）
+        self.kernel_fast_path = True
+        self.kernel_copier = KernelCopier(fallback=self.pipeline)
+        # reflink 非対応と分かっている送信先用（チェックサムキャッシュは共有）
+        self.kernel_copier_no_reflink = KernelCopier(
+            fallback=self.pipeline, checksum_cache=self.kernel_copier.checksum_cache, reflink=False
+        )
+
+        # ファンアウトコピー（複数送信先へ1回の読み取りで同時書き込み）
+        self.fanout_enabled = True
+        self.fanout_max_lag_bytes = 256 * 1024 * 1024  # 送信先間の許容遅延
+
+        # ディレクトリツリーコピー（ファイル単位の並列ワーカー）
+        self.tree_max_workers = 8
+        self.tree_read_ahead = 1024  # 大きい順に並べ替える先読みファイル数
+
+        # 圧縮（BackupCopy.is_compressed の送信先へ適用するブロック並列圧縮）
+        self.compression_codec = default_codec()
+        self.compression_level: Optional[int] = None  # Noneはコーデック既定値
+        self.compression_block_size = 4 * 1024 * 1024
+        # ジョブ種別ごとの (コーデック, レベル) 上書き（例: {"database": ("lzma", 6)}）
+        self.compression_profiles: Dict[str, Tuple[str, Optional[int]]] = {}
+
+        # 再開可能コピー（閾値以上のファイルはチェックポイントを残し、再試行・再起動時に続きから再開）
+        self.resumable_threshold = 1024 * 1024 * 1024  # 1GB
+        self.resumable = ResumableCopier(block_size=8 * 1024 * 1024, checkpoint_interval=256 * 1024 * 1024)
+
+        # ページキャッシュを汚さないI/O（io_mode="auto" では閾値以上のファイルに適用）
+        self.cache_friendly_threshold = 8 * 1024 * 1024 * 1024  # 8GB
+        self.cache_friendly_sync_interval = 64 * 1024 * 1024
+
+        # スパースファイル（VMディスクイメージ等）はホールを読み書きせずにコピー
+        self.sparse_enabled = True
+
+        # 送信先ターゲット単位の帯域・同時ストリーム数制御（ストレージプロバイダーと共有）
+        self.io_scheduler = get_io_scheduler()
+
+        # コピー完了時に <storage_path>.merkle.db から書き換えたファイルの項目を外す
+        # （コピー先は再読み込みせず、スクラバーが帯域制限付きで新規・書き換えファイルをハッシュする）
+        self.merkle_manifests = True
+
         logger.info("BackupEngine initialized", extra={"agent": "agent-01-core", "buffer_size": self.buffer_size})
 
-    def execute_backup(self, job_id: int, progress_callback: Optional[Callable] = None) -> Dict[str, Any]:
+    def execute_backup(
+        self,
+        job_id: int,
+        progress_callback: Optional[Callable] = None,
+        mode: Optional[str] = None,
+        priority: int = PRIORITY_NORMAL,
+        io_mode: Optional[str] = None,
+    ) -> Dict[str, Any]:
         """
         バックアップジョブを実行
 
         Args:
             job_id: バックアップジョブID
             progress_callback: 進捗コールバック関数
+            mode: バックアップモード（full/incremental/differential、省略時はジョブ設定）。
+                ディレクトリソースのみ有効
+            priority: I/Oスケジューラーでの優先度（JobPriority）
+            io_mode: I/Oモード（auto/buffered/cache_friendly/direct、省略時はジョブ設定）
 
         Returns:
             実行結果の辞書
@@ -91,36 +161,125 @@ class BackupEngine:
             if not source_path.exists():
                 raise CopyOperationError(str(source_path), "N/A", "Source path does not exist")
 
+            mode = mode or job.backup_mode or "full"
+            if mode not in BACKUP_MODES:
+                raise BackupEngineError(f"Unknown backup mode: {mode}", {"job_id": job_id})
+
+            io_mode = io_mode or job.io_mode or "auto"
+            if io_mode not in IO_MODES:
+                raise BackupEngineError(f"Unknown I/O mode: {io_mode}", {"job_id": job_id})
+
             # バックアップ実行
             result = {
                 "job_id": job_id,
                 "status": "success",
+                "mode": mode,
                 "start_time": start_time.isoformat(),
                 "copies_created": [],
                 "total_bytes": 0,
+                "files_copied": 0,
+                "files_skipped": 0,
+                "dedup_ratio": None,
                 "errors": [],
             }
 
             # 送信先パスリスト（将来的にはAgent-02のStorageRegistryから取得）
-            destinations = job.destination_paths.split(",") if job.destination_paths else []
+            destinations = [d.strip() for d in job.destination_paths.split(",") if d.strip()] if job.destination_paths else []
 
-            for dest_path in destinations:
+            # "dedup:<ストアパス>" 指定の送信先は重複排除チャンクストアへ書き込む
+            file_destinations = [d for d in destinations if parse_dedup_destination(d) is None]
+            dedup_destinations = [d for d in destinations if parse_dedup_destination(d) is not None]
+
+            # is_compressed のBackupCopyに対応する送信先はブロック圧縮コンテナとして書き込む
+            compressed_paths = {copy.storage_path for copy in job.copies if copy.is_compressed and copy.storage_path}
+            compressor = self.get_compressor(job.job_type) if compressed_paths else None
+            plain_destinations = [d for d in file_destinations if d not in compressed_paths]
+            compressed_destinations = [d for d in file_destinations if d in compressed_paths]
+
+            if source_path.is_dir():
+                copy_results = self._copy_tree_to_destinations(
+                    str(source_path), plain_destinations, progress_callback, mode, priority=priority, io_mode=io_mode
+                )
+                copy_results.update(
+                    self._copy_tree_to_destinations(
+                        str(source_path), compressed_destinations, progress_callback, mode, compressor, priority
+                    )
+                )
+            else:
+                copy_results = self._copy_to_destinations(
+                    str(source_path), plain_destinations, progress_callback, priority, io_mode
+                )
+                for dest in compressed_destinations:
+                    try:
+                        copy_results[dest] = self.copy_file(
+                            str(source_path), dest, progress_callback, compressor, priority
+                        )
+                    except CopyOperationError as e:
+                        copy_results[dest] = e
+
+            recipe_name = f"{job_recipe_prefix(job_id)}{start_time.strftime('%Y%m%dT%H%M%S%f')}"
+            for dest in dedup_destinations:
                 try:
-                    copy_result = self.copy_file(str(source_path), dest_path.strip(), progress_callback)
-
-                    result["copies_created"].append(
-                        {
-                            "destination": dest_path.strip(),
-                            "size_bytes": copy_result["bytes_copied"],
-                            "checksum": copy_result["checksum"],
-                        }
+                    copy_results[dest] = self.copy_file_deduplicated(
+                        str(source_path), parse_dedup_destination(dest), recipe_name, progress_callback, priority
                     )
+                except CopyOperationError as e:
+                    copy_results[dest] = e
 
-                    result["total_bytes"] += copy_result["bytes_copied"]
+            dedup_logical = dedup_stored = 0
 
-                except CopyOperationError as e:
-                    logger.error(f"Copy failed to {dest_path}", extra={"error": str(e), "job_id": job_id})
-                    result["errors"].append(e.to_dict())
+            for dest_path in destinations:
+                copy_result = copy_results[dest_path]
+
+                if isinstance(copy_result, CopyOperationError):
+                    logger.error(f"Copy failed to {dest_path}", extra={"error": str(copy_result), "job_id": job_id})
+                    result["errors"].append(copy_result.to_dict())
+                    continue
+
+                copy_entry = {
+                    "destination": dest_path,
+                    "size_bytes": copy_result["bytes_copied"],
+                    "checksum": copy_result["checksum"],
+                }
+
+                # ツリーコピーはファイル単位のマニフェストと失敗ファイルを持つ
+                if "manifest" in copy_result:
+                    copy_entry["files_copied"] = copy_result["files_copied"]
+                    copy_entry["files_skipped"] = copy_result["files_skipped"]
+                    copy_entry["manifest"] = copy_result["manifest"]
+                    copy_entry["manifest_path"] = copy_result["manifest_path"]
+                    result["files_copied"] += copy_result["files_copied"]
+                    result["files_skipped"] += copy_result["files_skipped"]
+                    for file_error in copy_result["errors"]:
+                        result["errors"].append(
+                            CopyOperationError(
+                                str(source_path / file_error["path"]), dest_path, file_error["error"]
+                            ).to_dict()
+                        )
+
+                if "compressed_bytes" in copy_result:
+                    copy_entry["compressed_bytes"] = copy_result["compressed_bytes"]
+                    copy_entry["compression_ratio"] = copy_result["compression_ratio"]
+                    copy_entry["compression_cpu_seconds"] = copy_result["cpu_seconds"]
+
+                if "physical_bytes" in copy_result:
+                    copy_entry["logical_bytes"] = copy_result["bytes_copied"]
+                    copy_entry["physical_bytes"] = copy_result["physical_bytes"]
+
+                if "stored_bytes" in copy_result:
+                    copy_entry["stored_bytes"] = copy_result["stored_bytes"]
+                    copy_entry["dedup_ratio"] = copy_result["dedup_ratio"]
+                    copy_entry["recipe"] = copy_result["name"]
+                    dedup_logical += copy_result["bytes_copied"]
+                    dedup_stored += copy_result["stored_bytes"]
+                elif self.merkle_manifests and "provider_id" not in copy_result:
+                    self._discard_stale_merkle_entries(dest_path)
+
+                result["copies_created"].append(copy_entry)
+                result["total_bytes"] += copy_result["bytes_copied"]
+
+            if dedup_logical:
+                result["dedup_ratio"] = round(1 - dedup_stored / dedup_logical, 4)
 
             # エラーがあれば部分失敗
             if result["errors"]:
@@ -146,7 +305,15 @@ class BackupEngine:
             logger.error(f"Backup execution failed", extra={"job_id": job_id, "error": str(e)})
             raise BackupEngineError(f"Backup execution failed: {str(e)}", {"job_id": job_id})
 
-    def copy_file(self, source: str, destination: str, progress_callback: Optional[Callable] = None) -> Dict[str, Any]:
+    def copy_file(
+        self,
+        source: str,
+        destination: str,
+        progress_callback: Optional[Callable] = None,
+        compressor: Optional[BlockCompressor] = None,
+        priority: int = PRIORITY_NORMAL,
+        io_mode: str = "auto",
+    ) -> Dict[str, Any]:
         """
         ファイルをコピー（進捗追跡、チェックサム計算付き）
 
@@ -154,9 +321,18 @@ class BackupEngine:
             source: ソースファイルパス
             destination: 送信先ファイルパス
             progress_callback: 進捗コールバック(bytes_copied, total_bytes)
+            compressor: 指定時はブロック圧縮コンテナとして書き込む
+            priority: I/Oスケジューラーでの優先度（JobPriority、リストアは高優先度で割り込める）
+            io_mode: I/Oモード（auto/buffered/cache_friendly/direct）
 
         Returns:
-            コピー結果辞書 {"bytes_copied": int, "checksum": str, "duration": float}
+            コピー結果辞書 {"bytes_copied": int, "checksum": str, "duration": float,
+                            "strategy": 使用したコピー戦略, "throughput_mb_s": float,
+                            "stages"/"bottleneck": パイプライン使用時のステージ別スループット,
+                            "compressed_bytes"/"compression_ratio"/"cpu_seconds": 圧縮時のみ,
+                            "resumed_from": 再開可能コピー時の再開オフセット,
+                            "logical_bytes"/"physical_bytes": スパースファイルの論理/実書き込みバイト数,
+                            "provider_id": レジストリのプロバイダーへ委譲した場合のみ}
 
         Raises:
             CopyOperationError: コピー失敗
@@ -171,59 +347,445 @@ class BackupEngine:
         if not source_path.exists():
             raise CopyOperationError(source, destination, "Source file does not exist")
 
+        # ストレージレジストリ登録済みの送信先はプロバイダーの機能に応じてコピー戦略を選ぶ
+        plan, dest_route = self._plan_copy(source, destination)
+        if plan is not None and plan.delegate:
+            return self._copy_via_provider(
+                source, destination, dest_route.provider_id, dest_route.relative_path, progress_callback, priority
+            )
+
         # ソースファイルサイズ取得
         source_size = source_path.stat().st_size
 
         # 送信先の空き容量チェック
-        dest_parent = dest_path.parent
-        dest_parent.mkdir(parents=True, exist_ok=True)
+        self._check_destination_space(dest_path, source_size)
 
-        stat = os.statvfs(str(dest_parent))
-        available_bytes = stat.f_bavail * stat.f_frsize
-
-        if available_bytes < source_size * 1.1:  # 10%のマージン
-            raise InsufficientStorageError(int(source_size * 1.1), available_bytes, str(dest_parent))
+        # 大きいファイル、または前回のチェックポイントが残っている場合は再開可能コピー
+        # （スパースファイルは実データのみ転送するためホール保持コピーを優先する）
+        use_resumable = (
+            compressor is None
+            and not (self.sparse_enabled and (plan is None or plan.sparse) and is_sparse(str(source_path)))
+            and (source_size >= self.resumable_threshold or checkpoint_state(str(dest_path)) is not None)
+        )
+        partial_path = str(dest_path) + PARTIAL_SUFFIX
 
         # リトライ付きコピー
         for attempt in range(self.max_retries):
             try:
-                start_time = datetime.now()
+                with self.io_scheduler.stream(str(dest_path), priority) as io_stream:
+                    if use_resumable:
+                        # チェックポイントから続きを書き込み、完了時にアトミックにリネーム
+                        result = self.resumable.copy(
+                            str(source_path),
+                            str(dest_path),
+                            io_stream.wrap(progress_callback),
+                            drop_cache=self._bypasses_cache(io_mode, source_size),
+                        )
+                    else:
+                        # カーネル内高速パス、利用不可ならパイプライン（読み取り・ハッシュ・書き込みの並行実行）、
+                        # 大容量ファイルはページキャッシュを汚さないコピー
+                        copier = self._file_copier(io_mode, compressor, plan)
+                        # 一時ファイルへ書き込んでからアトミックにリネーム（中途半端なファイルを残さない）
+                        result = copier.copy(str(source_path), partial_path, io_stream.wrap(progress_callback))
+                        os.replace(partial_path, str(dest_path))
+                bytes_copied = result["bytes_copied"]
+                duration = result["duration"]
+
+                logger.info(
+                    f"Copy completed",
+                    extra={
+                        "source": source,
+                        "destination": destination,
+                        "bytes": bytes_copied,
+                        "duration": duration,
+                        "checksum": result["checksum"],
+                        "strategy": result.get("strategy", "buffered"),
+                    },
+                )
+
+                return result
+
+            except (IOError, OSError) as e:
+                logger.warning(f"Copy attempt {attempt + 1} failed", extra={"source": source, "error": str(e)})
+
+                if attempt == self.max_retries - 1:
+                    # 再開可能コピーのチェックポイントは次回実行での再開のため残す
+                    if not use_resumable and os.path.exists(partial_path):
+                        os.remove(partial_path)
+                    raise CopyOperationError(source, destination, f"Failed after {self.max_retries} attempts: {str(e)}")
+
+                # リトライ前に一時停止
+                import time
+
+                time.sleep(self.retry_intervals[attempt])
+
+    def _copy_to_destinations(
+        self,
+        source: str,
+        destinations: List[str],
+        progress_callback: Optional[Callable] = None,
+        priority: int = PRIORITY_NORMAL,
+        io_mode: str = "auto",
+    ) -> Dict[str, Any]:
+        """
+        ソースを全送信先へコピー
+
+        送信先が2つ以上でファンアウトが有効な場合は1回の読み取りで全送信先へ同時に書き込み、
+        ファンアウトで失敗した送信先のみ通常のリトライ付きコピーでやり直す（チェックポイントから再開）。
+        前回のチェックポイントが残っている送信先はファンアウトせず再開可能コピーで続きから書き込む。
+        プロバイダーへ委譲する送信先（オブジェクトストレージ・テープ等）はファンアウトに含めず copy_file で書き込む。
+        ページキャッシュを汚さないI/Oを適用するファイルはファンアウトの読み書きでキャッシュを解放し
+        （O_DIRECT 指定時も fadvise による解放で代替）、スパースファイルはファンアウトせず送信先ごとにコピーする。
+
+        Args:
+            source: ソースファイルパス
+            destinations: 送信先ファイルパスのリスト
+            progress_callback: 進捗コールバック(bytes_copied, total_bytes)
+
+        Returns:
+            送信先パス -> コピー結果辞書 または CopyOperationError
+
+        Raises:
+            InsufficientStorageError: 容量不足
+        """
+        results: Dict[str, Any] = {}
+        pending = list(destinations)
+        fanout_destinations = [
+            dest for dest in destinations if not self._delegates(source, dest) and checkpoint_state(dest) is None
+        ]
+
+        use_fanout = self.fanout_enabled and len(fanout_destinations) > 1
+        drop_cache = False
+        if use_fanout and Path(source).is_file():
+            drop_cache = self._bypasses_cache(io_mode, Path(source).stat().st_size)
+            use_fanout = not (self.sparse_enabled and is_sparse(source))
+
+        if use_fanout:
+            try:
+                fanout_results = self.copy_file_fanout(
+                    source, fanout_destinations, progress_callback, priority, drop_cache=drop_cache
+                )
+            except CopyOperationError as e:
+                logger.warning("Fan-out copy failed, falling back to sequential copy", extra={"error": str(e)})
+                fanout_results = {}
+
+            pending = []
+            for dest in destinations:
+                dest_result = fanout_results.get(dest)
+                if dest_result and not dest_result["error"]:
+                    results[dest] = dest_result
+                else:
+                    pending.append(dest)
+
+        for dest in pending:
+            try:
+                results[dest] = self.copy_file(source, dest, progress_callback, priority=priority, io_mode=io_mode)
+            except CopyOperationError as e:
+                results[dest] = e
+
+        return results
+
+    def _copy_tree_to_destinations(
+        self,
+        source: str,
+        destinations: List[str],
+        progress_callback: Optional[Callable] = None,
+        mode: str = "full",
+        compressor: Optional[BlockCompressor] = None,
+        priority: int = PRIORITY_NORMAL,
+        io_mode: str = "auto",
+    ) -> Dict[str, Any]:
+        """
+        ディレクトリツリーを全送信先へコピー（マニフェストは送信先ごと）
 
-                # チェックサム計算しながらコピー
-                sha256_hash = hashlib.sha256()
-                bytes_copied = 0
+        Returns:
+            送信先パス -> ツリーコピー結果辞書 または CopyOperationError
+        """
+        results: Dict[str, Any] = {}
 
-                with open(source_path, "rb") as src_file:
-                    with open(dest_path, "wb") as dest_file:
-                        while True:
-                            chunk = src_file.read(self.buffer_size)
-                            if not chunk:
-                                break
+        for dest in destinations:
+            try:
+                results[dest] = self.copy_tree(source, dest, progress_callback, mode, compressor, priority, io_mode)
+            except CopyOperationError as e:
+                results[dest] = e
+
+        return results
+
+    def copy_tree(
+        self,
+        source: str,
+        destination: str,
+        progress_callback: Optional[Callable] = None,
+        mode: str = "full",
+        compressor: Optional[BlockCompressor] = None,
+        priority: int = PRIORITY_NORMAL,
+        io_mode: str = "auto",
+    ) -> Dict[str, Any]:
+        """
+        ディレクトリツリーをファイル単位の並列ワーカーでコピー
+
+        各実行は <destination>/run-<実行ID> にデータを書き込む。増分/差分モードでは送信先の隣の
+        <destination>.manifest.db と (size, mtime_ns, inode) を比較し、変更されたファイルのみ
+        実行ディレクトリへコピーする。未変更ファイルはデータを持つ以前の実行を参照する
+        （BackupManifest.locate で任意の実行時点をリストアできる）。
+
+        Args:
+            source: ソースディレクトリ
+            destination: 送信先ディレクトリ
+            progress_callback: 進捗コールバック(bytes_copied, total_bytes)
+            mode: バックアップモード（full/incremental/differential）
+            compressor: 指定時は各ファイルをブロック圧縮コンテナとして書き込む
+            priority: I/Oスケジューラーでの優先度（ファイルごとにストリームを確保）
+            io_mode: I/Oモード（auto/buffered/cache_friendly/direct）
+
+        Returns:
+            {"bytes_copied": int, "files_copied": int, "files_skipped": int, "checksum": ツリー全体のチェックサム,
+             "duration": float, "manifest": [...], "manifest_path": str, "run_id": int, "base_run_id": Optional[int],
+             "run_path": 実行ディレクトリ, "errors": [{"path", "error"}]}
 
-                            dest_file.write(chunk)
-                            sha256_hash.update(chunk)
-                            bytes_copied += len(chunk)
+        Raises:
+            CopyOperationError: ソースがディレクトリでない、または送信先を作成できない
+        """
+        if not Path(source).is_dir():
+            raise CopyOperationError(source, destination, "Source directory does not exist")
 
-                            # 進捗コールバック
-                            if progress_callback:
-                                progress_callback(bytes_copied, source_size)
+        plan, _ = self._plan_copy(source, destination)
+        if plan is not None and plan.delegate:
+            raise CopyOperationError(source, destination, "Tree copies require a filesystem destination")
+        file_copier = self._file_copier(io_mode, compressor, plan)
 
-                end_time = datetime.now()
-                duration = (end_time - start_time).total_seconds()
+        copier = TreeCopier(
+            self.io_scheduler.throttled(file_copier, priority),
+            max_workers=self.tree_max_workers,
+            read_ahead=self.tree_read_ahead,
+        )
 
-                result = {"bytes_copied": bytes_copied, "checksum": sha256_hash.hexdigest(), "duration": duration}
+        manifest_path = manifest_path_for(destination)
+
+        try:
+            Path(manifest_path).parent.mkdir(parents=True, exist_ok=True)
+            with BackupManifest(manifest_path) as manifest:
+                base_run_id = manifest.baseline_run(mode)
+                run_id = manifest.begin_run(mode, base_run_id)
+                run_dir = run_path(destination, run_id)
+
+                def baseline(path: str) -> Optional[Dict[str, Any]]:
+                    previous = manifest.lookup(base_run_id, path)
+                    if previous is not None:
+                        previous["stored_path"] = os.path.join(run_path(destination, previous["stored_run_id"]), path)
+                    return previous
+
+                try:
+                    result = copier.copy(source, run_dir, progress_callback, baseline=baseline if base_run_id else None)
+                    manifest.record_run(run_id, result["manifest"])
+                except BaseException:
+                    manifest.abandon_run(destination, run_id)
+                    raise
+        except (IOError, OSError, sqlite3.Error) as e:
+            raise CopyOperationError(source, destination, f"Tree copy failed: {str(e)}")
+
+        result["mode"] = mode
+        result["run_id"] = run_id
+        result["base_run_id"] = base_run_id
+        result["run_path"] = run_dir
+        result["manifest_path"] = manifest_path
+        return result
+
+    def get_compressor(self, job_type: Optional[str] = None) -> BlockCompressor:
+        """
+        ジョブ種別に応じた圧縮ステージを取得
+
+        Args:
+            job_type: ジョブ種別（compression_profiles に定義があればそのコーデック/レベルを使用）
+
+        Returns:
+            BlockCompressor
+        """
+        codec, level = self.compression_profiles.get(job_type, (self.compression_codec, self.compression_level))
+        return BlockCompressor(codec=codec, level=level, block_size=self.compression_block_size)
+
+    def copy_file_deduplicated(
+        self,
+        source: str,
+        store_root: str,
+        recipe_name: str,
+        progress_callback: Optional[Callable] = None,
+        priority: int = PRIORITY_NORMAL,
+    ) -> Dict[str, Any]:
+        """
+        ファイルを重複排除チャンクストアへ書き込み
+
+        Args:
+            source: ソースファイルパス
+            store_root: チャンクストアのルートディレクトリ
+            recipe_name: レシピ名（バックアップ識別子）
+            progress_callback: 進捗コールバック(bytes_processed, total_bytes)
+            priority: I/Oスケジューラーでの優先度
+
+        Returns:
+            {"bytes_copied": 論理バイト数, "stored_bytes": 新規格納バイト数, "dedup_ratio": float,
+             "checksum": str, "name": レシピ名, ...}
+
+        Raises:
+            CopyOperationError: ソースがファイルでない、または書き込み失敗
+            InsufficientStorageError: 容量不足
+        """
+        destination = f"{store_root}:{recipe_name}"
+        source_path = Path(source)
+
+        if not source_path.is_file():
+            raise CopyOperationError(source, destination, "Deduplicated copies require a file source")
+
+        # 最悪ケース（重複なし）を想定して容量確認
+        self._check_destination_space(Path(store_root) / "index.db", source_path.stat().st_size)
+
+        try:
+            # 進捗は論理バイト数のため帯域は課金せず、同時ストリーム数のみ制御する
+            with self.io_scheduler.stream(store_root, priority), ChunkStore(store_root) as store:
+                return store.write(source, recipe_name, progress_callback)
+        except (IOError, OSError, ValueError, sqlite3.Error) as e:
+            raise CopyOperationError(source, destination, f"Deduplicated write failed: {str(e)}")
+
+    def copy_file_fanout(
+        self,
+        source: str,
+        destinations: List[str],
+        progress_callback: Optional[Callable] = None,
+        priority: int = PRIORITY_NORMAL,
+        drop_cache: bool = False,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        ソースを1回だけ読み取り、複数の送信先へ同時にコピー
+
+        Args:
+            source: ソースファイルパス
+            destinations: 送信先ファイルパスのリスト
+            progress_callback: 進捗コールバック(bytes_read, total_bytes)
+            priority: I/Oスケジューラーでの優先度（送信先ターゲットごとにストリームを確保）
+            drop_cache: 読み書き済み範囲のページキャッシュを解放する（大容量ファイル向け）
+
+        Returns:
+            送信先パス -> {"bytes_copied": int, "checksum": str, "duration": float, "error": Optional[str]}
+            各送信先は一時ファイル経由でアトミックに配置され、失敗した送信先にはチェックポイントが残る
+
+        Raises:
+            CopyOperationError: ソース読み取り失敗
+            InsufficientStorageError: 容量不足
+        """
+        source_path = Path(source)
+
+        if not source_path.exists():
+            raise CopyOperationError(source, ", ".join(destinations), "Source file does not exist")
+
+        source_size = source_path.stat().st_size
+
+        for dest in destinations:
+            self._check_destination_space(Path(dest), source_size)
+
+        copier = FanoutCopier(
+            chunk_size=self.buffer_size, max_lag_bytes=self.fanout_max_lag_bytes, resumable=self.resumable
+        )
+
+        try:
+            with ExitStack() as streams:
+                # 送信先ターゲットごとに1ストリーム（デッドロック回避のためターゲット名順に確保）
+                targets = sorted({self.io_scheduler.target_for(dest) for dest in destinations})
+                for target in targets:
+                    io_stream = streams.enter_context(self.io_scheduler.stream(target, priority))
+                    progress_callback = io_stream.wrap(progress_callback)
+                fanout_result = copier.copy(source, destinations, progress_callback, drop_cache=drop_cache)
+        except (IOError, OSError) as e:
+            raise CopyOperationError(source, ", ".join(destinations), f"Fan-out read failed: {str(e)}")
+
+        return fanout_result["destinations"]
+
+    def _file_copier(
+        self, io_mode: str = "auto", compressor: Optional[BlockCompressor] = None, plan: Optional[CopyPlan] = None
+    ):
+        """
+        I/Oモードに応じたファイルコピー実装
+
+        auto は cache_friendly_threshold 以上のファイルのみページキャッシュを汚さないコピーにし、
+        それ未満はカーネル内高速パス（またはパイプライン）を使う。圧縮時は圧縮器を使う。
+        スパースファイルはいずれのモードでもホール保持コピーにする。
+        plan（ストレージレジストリのコピー戦略）があれば送信先が非対応の reflink・ホール保持を省く。
+        """
+        if compressor is not None:
+            return compressor
+
+        copier = self.pipeline
+        if self.kernel_fast_path:
+            copier = self.kernel_copier if plan is None or plan.reflink else self.kernel_copier_no_reflink
+        if io_mode == "auto":
+            copier = CacheFriendlyCopier(
+                fallback=copier, threshold=self.cache_friendly_threshold, sync_interval=self.cache_friendly_sync_interval
+            )
+        elif io_mode != "buffered":
+            copier = CacheFriendlyCopier(direct=io_mode == "direct", sync_interval=self.cache_friendly_sync_interval)
+
+        if self.sparse_enabled and (plan is None or plan.sparse):
+            copier = SparseCopier(fallback=copier)
+        return copier
+
+    def _delegates(self, source: str, destination: str) -> bool:
+        """送信先がプロバイダーへの委譲（パスで直接書き込めない）か"""
+        plan, _ = self._plan_copy(source, destination)
+        return plan is not None and plan.delegate
+
+    def _plan_copy(self, source: str, destination: str) -> Tuple[Optional[CopyPlan], Optional[StorageRoute]]:
+        """ストレージレジストリからコピー戦略を取得（レジストリ未設定なら (None, None)）"""
+        if self.storage_registry is None:
+            return None, None
+        return self.storage_registry.plan(source, destination)
+
+    def _copy_via_provider(
+        self,
+        source: str,
+        destination: str,
+        provider_id: str,
+        relative_path: str,
+        progress_callback: Optional[Callable],
+        priority: int,
+    ) -> Dict[str, Any]:
+        """
+        パスで直接書き込めない送信先（オブジェクトストレージ等）へプロバイダーの接続プール経由でコピー
+
+        Raises:
+            CopyOperationError: リトライ後もコピー失敗
+        """
+        for attempt in range(self.max_retries):
+            try:
+                with self.io_scheduler.stream(destination, priority) as io_stream:
+                    with self.storage_registry.acquire(provider_id) as provider:
+                        copy_result = provider.copy_file(source, relative_path, io_stream.wrap(progress_callback))
+                        if not copy_result.success:
+                            raise IOError(copy_result.error_message or "Provider copy failed")
+
+                duration = copy_result.duration_seconds
+                result = {
+                    "bytes_copied": copy_result.bytes_copied,
+                    "checksum": copy_result.checksum,
+                    "duration": duration,
+                    "strategy": copy_result.strategy or "provider",
+                    "throughput_mb_s": copy_result.throughput_mb_s
+                    if copy_result.throughput_mb_s is not None
+                    else (round(copy_result.bytes_copied / (1024 * 1024) / duration, 2) if duration > 0 else 0.0),
+                    "provider_id": provider_id,
+                }
+                if copy_result.physical_bytes is not None:
+                    result["logical_bytes"] = copy_result.logical_bytes
+                    result["physical_bytes"] = copy_result.physical_bytes
 
                 logger.info(
                     f"Copy completed",
                     extra={
                         "source": source,
                         "destination": destination,
-                        "bytes": bytes_copied,
-                        "duration": duration,
-                        "checksum": result["checksum"],
+                        "provider_id": provider_id,
+                        "bytes": result["bytes_copied"],
+                        "strategy": result["strategy"],
                     },
                 )
-
                 return result
 
             except (IOError, OSError) as e:
@@ -232,11 +794,51 @@ class BackupEngine:
                 if attempt == self.max_retries - 1:
                     raise CopyOperationError(source, destination, f"Failed after {self.max_retries} attempts: {str(e)}")
 
-                # リトライ前に一時停止
                 import time
 
                 time.sleep(self.retry_intervals[attempt])
 
+    def _discard_stale_merkle_entries(self, destination: str) -> None:
+        """
+        コピー先のMerkleマニフェストから書き換えたファイルの項目を外す（サイズとmtimeの比較のみ）
+
+        外した項目はスクラバーが次のパスで帯域制限付きでハッシュする。失敗してもバックアップ自体は成功扱い。
+        """
+        manifest_path = merkle_path_for(destination)
+        if not os.path.exists(manifest_path):
+            return
+        try:
+            with MerkleManifest(manifest_path) as manifest:
+                manifest.discard_changed(destination)
+        except Exception as e:
+            logger.warning(f"Failed to update Merkle manifest of {destination}: {e}")
+
+    def _bypasses_cache(self, io_mode: str, size: int) -> bool:
+        """このサイズのファイルにページキャッシュを汚さないI/Oを適用するか"""
+        if io_mode == "auto":
+            return size >= self.cache_friendly_threshold
+        return io_mode != "buffered"
+
+    def _check_destination_space(self, dest_path: Path, source_size: int) -> None:
+        """
+        送信先ディレクトリを作成し、空き容量を確認
+
+        Args:
+            dest_path: 送信先ファイルパス
+            source_size: ソースファイルサイズ
+
+        Raises:
+            InsufficientStorageError: 容量不足
+        """
+        dest_parent = dest_path.parent
+        dest_parent.mkdir(parents=True, exist_ok=True)
+
+        stat = os.statvfs(str(dest_parent))
+        available_bytes = stat.f_bavail * stat.f_frsize
+
+        if available_bytes < source_size * 1.1:  # 10%のマージン
+            raise InsufficientStorageError(int(source_size * 1.1), available_bytes, str(dest_parent))
+
     def verify_copy(self, original_path: str, copy_path: str) -> bool:
         """
         コピーの整合性を検証
@@ -270,8 +872,8 @@ class BackupEngine:
                 0, "size_mismatch", f"Size mismatch: original {original_size} bytes, copy {copy_size} bytes"
             )
 
-        # チェックサム比較
-        original_hash = self._calculate_checksum(original_path)
+        # チェックサム比較（オリジナルはコピー時に計算済みならキャッシュを使い、コピーは必ず読み直す）
+        original_hash = self._source_checksum(original_path)
         copy_hash = self._calculate_checksum(copy_path)
 
         if original_hash != copy_hash:
@@ -281,6 +883,14 @@ class BackupEngine:
 
         return True
 
+    def _source_checksum(self, file_path: str) -> str:
+        """オリジナルのSHA-256（カーネルコピー時に計算済みならソースチェックサムキャッシュから取得）"""
+        key = SourceChecksumCache.make_key(os.stat(file_path), "sha256")
+        cached = self.kernel_copier.checksum_cache.get(key)
+        if cached is not None:
+            return cached
+        return self._calculate_checksum(file_path)
+
     def _calculate_checksum(self, file_path: str, algorithm: str = "sha256") -> str:
         """
         ファイルのチェックサムを計算
@@ -314,6 +924,23 @@ class BackupEngine:
             "buffer_size": self.buffer_size,
             "max_retries": self.max_retries,
             "retry_intervals": self.retry_intervals,
+            "pipeline": self.pipeline.get_stats(),
+            "kernel_fast_path": self.kernel_fast_path,
+            "copy_strategies": {
+                strategy: count + self.kernel_copier_no_reflink.strategy_counts[strategy]
+                for strategy, count in self.kernel_copier.strategy_counts.items()
+            },
+            "fanout_enabled": self.fanout_enabled,
+            "fanout_max_lag_bytes": self.fanout_max_lag_bytes,
+            "tree_max_workers": self.tree_max_workers,
+            "compression_codec": self.compression_codec,
+            "compression_profiles": dict(self.compression_profiles),
+            "resumable_threshold": self.resumable_threshold,
+            "resumable_block_size": self.resumable.block_size,
+            "cache_friendly_threshold": self.cache_friendly_threshold,
+            "sparse_enabled": self.sparse_enabled,
+            "io_targets": self.io_scheduler.get_stats(),
+            "storage_providers": self.storage_registry.get_stats() if self.storage_registry is not None else {},
             "agent": "agent-01-core",
             "version": "1.0.0",
         }
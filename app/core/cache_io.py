@@ -0,0 +1,224 @@
+"""
+Page-Cache-Friendly Copy
+ページキャッシュを汚さない大容量ファイルコピー
+
+- ソースを posix_fadvise(SEQUENTIAL) で開き、読み終えた範囲を DONTNEED で解放
+- 送信先は sync_interval ごとに fdatasync し、書き込み済み範囲を DONTNEED で解放
+- direct=True ではページ境界に揃えた mmap バッファで O_DIRECT 読み書きを行う
+  （ファイル末尾の半端なブロックや O_DIRECT 非対応のファイルシステムでは通常I/Oに切り替える）
+
+バックアップサーバー上の Flask アプリやデータベースのキャッシュを追い出さないためのモードで、
+閾値未満のファイルは fallback（通常はカーネル内高速パス）でコピーする。
+"""
+
+import errno
+import hashlib
+import logging
+import mmap
+import os
+import time
+from typing import Any, Callable, Dict, Optional
+
+from app.core.copy_pipeline import _pwrite_full
+
+try:
+    import fcntl
+except ImportError:  # Windows（O_DIRECT も存在しないため未使用）
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# I/Oモード（BackupJob.io_mode）
+IO_MODES = ("auto", "buffered", "cache_friendly", "direct")
+
+# O_DIRECT のバッファ・オフセット・長さの境界（一般的な論理ブロックサイズの上限）
+DIRECT_ALIGNMENT = 4096
+
+_O_DIRECT = getattr(os, "O_DIRECT", 0)
+_HAS_FADVISE = hasattr(os, "posix_fadvise")
+
+
+def advise_sequential(fd: int) -> None:
+    """順次読み取りを通知（先読みを増やす、非対応環境では何もしない）"""
+    if _HAS_FADVISE:
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        except OSError:
+            pass
+
+
+def drop_cache(fd: int, offset: int, length: int) -> None:
+    """範囲のページキャッシュを解放（書き込み範囲は事前に fdatasync が必要）"""
+    if _HAS_FADVISE and length > 0:
+        try:
+            os.posix_fadvise(fd, offset, length, os.POSIX_FADV_DONTNEED)
+        except OSError:
+            pass
+
+
+class CacheFriendlyCopier:
+    """
+    ページキャッシュを汚さないコピー
+
+    copy(source, destination, progress_callback) は他のファイルコピー実装と同じ形の結果を返す。
+    """
+
+    def __init__(
+        self,
+        fallback=None,
+        threshold: int = 0,
+        direct: bool = False,
+        block_size: int = 8 * 1024 * 1024,
+        sync_interval: int = 64 * 1024 * 1024,
+        hash_algorithm: str = "sha256",
+    ):
+        """
+        Args:
+            fallback: threshold 未満のファイルに使うコピー実装（Noneは常にこのコピー）
+            threshold: このサイズ以上のファイルのみキャッシュ非汚染コピーにする
+            direct: O_DIRECT を使用する
+            block_size: 読み書きの単位（DIRECT_ALIGNMENT の倍数に切り上げ）
+            sync_interval: fdatasync と DONTNEED の間隔（バイト）
+            hash_algorithm: ハッシュアルゴリズム（hashlib名）
+        """
+        if block_size <= 0 or sync_interval <= 0:
+            raise ValueError("block_size and sync_interval must be positive")
+
+        self.fallback = fallback
+        self.threshold = threshold
+        self.direct = direct and bool(_O_DIRECT)
+        self.block_size = -(-block_size // DIRECT_ALIGNMENT) * DIRECT_ALIGNMENT
+        self.sync_interval = sync_interval
+        self.hash_algorithm = hash_algorithm
+
+    def copy(self, source: str, destination: str, progress_callback: Optional[Callable] = None) -> Dict[str, Any]:
+        """
+        ファイルをページキャッシュを汚さずにコピー
+
+        Args:
+            source: ソースファイルパス
+            destination: 送信先ファイルパス
+            progress_callback: 進捗コールバック(bytes_copied, total_bytes)
+
+        Returns:
+            {"bytes_copied": int, "checksum": str, "duration": float, "strategy": "cache_friendly"|"direct",
+             "throughput_mb_s": float}
+
+        Raises:
+            IOError/OSError: コピー失敗
+        """
+        size = os.path.getsize(source)
+        if self.fallback is not None and size < self.threshold:
+            return self.fallback.copy(source, destination, progress_callback)
+
+        start = time.monotonic()
+        hash_obj = hashlib.new(self.hash_algorithm)
+
+        src_fd, src_direct = _open(source, os.O_RDONLY, self.direct)
+        try:
+            dst_fd, dst_direct = _open(destination, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, self.direct)
+        except OSError:
+            os.close(src_fd)
+            raise
+        strategy = "direct" if src_direct or dst_direct else "cache_friendly"
+
+        # O_DIRECT はページ境界に揃ったバッファが必要（匿名mmapはページ境界に揃う）
+        buffer = mmap.mmap(-1, self.block_size)
+        view = memoryview(buffer)
+
+        try:
+            advise_sequential(src_fd)
+
+            offset = 0
+            synced = 0
+            while True:
+                n, src_direct = _read_block(src_fd, view, offset, src_direct)
+                if n == 0:
+                    break
+
+                block = view[:n]
+                hash_obj.update(block)
+
+                # 末尾の半端なブロックは O_DIRECT の境界条件を満たさないため通常I/Oで書く
+                if dst_direct and n % DIRECT_ALIGNMENT:
+                    dst_direct = _clear_direct(dst_fd)
+                _pwrite_full(dst_fd, block, offset)
+                offset += n
+
+                if offset - synced >= self.sync_interval:
+                    self._release(src_fd, dst_fd, synced, offset - synced)
+                    synced = offset
+
+                if progress_callback:
+                    progress_callback(offset, size)
+
+            os.fdatasync(dst_fd)
+            self._release(src_fd, dst_fd, synced, offset - synced, sync=False)
+        finally:
+            os.close(dst_fd)
+            os.close(src_fd)
+
+        duration = time.monotonic() - start
+
+        logger.debug(
+            "Cache-friendly copy completed",
+            extra={"source": source, "strategy": strategy, "bytes": offset},
+        )
+
+        return {
+            "bytes_copied": offset,
+            "checksum": hash_obj.hexdigest(),
+            "duration": duration,
+            "strategy": strategy,
+            "throughput_mb_s": round(offset / (1024 * 1024) / duration, 2) if duration > 0 else 0.0,
+        }
+
+    def _release(self, src_fd: int, dst_fd: int, offset: int, length: int, sync: bool = True) -> None:
+        """書き込み範囲を永続化してから読み書き両方のキャッシュを解放"""
+        if sync:
+            os.fdatasync(dst_fd)
+        drop_cache(dst_fd, offset, length)
+        drop_cache(src_fd, offset, length)
+
+
+def _open(path: str, flags: int, direct: bool):
+    """O_DIRECT で開き、非対応のファイルシステム（tmpfs等）では通常I/Oで開き直す"""
+    if direct:
+        try:
+            return os.open(path, flags | _O_DIRECT, 0o644), True
+        except OSError as e:
+            if e.errno != errno.EINVAL:
+                raise
+            logger.debug("O_DIRECT not supported, using buffered I/O", extra={"path": path})
+    return os.open(path, flags, 0o644), False
+
+
+def _clear_direct(fd: int) -> bool:
+    """ファイル記述子から O_DIRECT を外す"""
+    flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+    fcntl.fcntl(fd, fcntl.F_SETFL, flags & ~_O_DIRECT)
+    return False
+
+
+def _read_block(fd: int, view: memoryview, offset: int, direct: bool):
+    """
+    オフセットからバッファが埋まるかEOFまで読み取る
+
+    Returns:
+        (読み取りバイト数, O_DIRECT継続可否)
+    """
+    filled = 0
+    size = len(view)
+    while filled < size:
+        try:
+            n = os.preadv(fd, [view[filled:]], offset + filled)
+        except OSError as e:
+            # 境界に揃わない短い読み取りの後は O_DIRECT を外して続行
+            if not direct or e.errno != errno.EINVAL:
+                raise
+            direct = _clear_direct(fd)
+            continue
+        if n == 0:
+            break
+        filled += n
+    return filled, direct
@@ -0,0 +1,387 @@
+"""
+Block Compression
+ブロック単位の並列圧縮ステージとブロックインデックス付きコンテナ
+
+- 入力を独立したブロックに分割し、スレッドプールで並列圧縮（zlib/lzma/zstd はGILを解放する）
+- 書き込みはブロック順序を保持し、実行中のブロック数を制限してメモリ使用量を抑える
+- 圧縮しても小さくならないブロックは非圧縮で格納
+- 末尾のブロックインデックスにより、リストア時に任意のブロックへシークできる
+
+コンテナ形式（リトルエンディアン）:
+    ヘッダー  : magic "BKCZ", version, codec, level, reserved, block_size, reserved
+    ブロック  : 圧縮データを連続して格納
+    インデックス: ブロックごとに (圧縮データ位置, 圧縮長, 元の長さ, CRC32, 格納方式)
+    フッター  : インデックス位置, ブロック数, 元データサイズ, 元データSHA-256, magic "BKCI"
+"""
+
+import hashlib
+import logging
+import lzma
+import os
+import struct
+import threading
+import time
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"BKCZ"
+INDEX_MAGIC = b"BKCI"
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct("<4sBBbBII")
+_INDEX_ENTRY = struct.Struct("<QIIIB")
+_FOOTER = struct.Struct("<QQQ32s4s")
+
+# ブロックの格納方式
+_BLOCK_COMPRESSED = 0
+_BLOCK_STORED = 1
+
+
+class CompressionError(Exception):
+    """コンテナ形式の不正またはブロックの整合性エラー"""
+
+
+class _Codec:
+    """圧縮コーデック（ブロック単位・スレッドセーフな関数のみ）"""
+
+    def __init__(self, codec_id: int, name: str, default_level: int, compress, decompress):
+        self.codec_id = codec_id
+        self.name = name
+        self.default_level = default_level
+        self.compress = compress
+        self.decompress = decompress
+
+
+def _zstd_compress(data, level: int) -> bytes:
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+
+def _zstd_decompress(data, raw_length: int) -> bytes:
+    return zstandard.ZstdDecompressor().decompress(data, max_output_size=raw_length)
+
+
+CODECS: Dict[str, _Codec] = {
+    "zlib": _Codec(1, "zlib", 6, lambda data, level: zlib.compress(data, level), lambda data, n: zlib.decompress(data)),
+    "lzma": _Codec(
+        2,
+        "lzma",
+        6,
+        lambda data, level: lzma.compress(data, preset=level),
+        lambda data, n: lzma.decompress(data),
+    ),
+}
+if zstandard is not None:
+    CODECS["zstd"] = _Codec(3, "zstd", 3, _zstd_compress, _zstd_decompress)
+
+_CODECS_BY_ID = {codec.codec_id: codec for codec in CODECS.values()}
+
+_DECODE_ERRORS = (zlib.error, lzma.LZMAError) + ((zstandard.ZstdError,) if zstandard is not None else ())
+
+
+def available_codecs() -> List[str]:
+    """利用可能なコーデック名（zstdは zstandard パッケージがある場合のみ）"""
+    return list(CODECS)
+
+
+def default_codec() -> str:
+    """既定のコーデック（zstdが利用可能ならzstd、なければzlib）"""
+    return "zstd" if "zstd" in CODECS else "zlib"
+
+
+class BlockCompressor:
+    """
+    並列ブロック圧縮コピー
+
+    copy(source, destination, progress_callback) はファイルコピー実装と同じ形の結果を返すため、
+    BackupEngine や TreeCopier のファイルコピー実装として差し替えて使用できる。
+    """
+
+    def __init__(
+        self,
+        codec: str = "zlib",
+        level: Optional[int] = None,
+        block_size: int = 4 * 1024 * 1024,
+        workers: Optional[int] = None,
+    ):
+        """
+        Args:
+            codec: コーデック名（zlib/lzma/zstd）
+            level: 圧縮レベル（省略時はコーデックの既定値）
+            block_size: ブロックサイズ（バイト）
+            workers: 圧縮スレッド数（省略時はCPU数）
+        """
+        if codec not in CODECS:
+            raise ValueError(f"Unsupported compression codec: {codec} (available: {', '.join(CODECS)})")
+        if block_size <= 0:
+            raise ValueError("block_size must be positive")
+
+        self.codec = CODECS[codec]
+        self.level = self.codec.default_level if level is None else level
+        self.block_size = block_size
+        self.workers = workers or os.cpu_count() or 1
+
+    def copy(self, source: str, destination: str, progress_callback: Optional[Callable] = None) -> Dict[str, Any]:
+        """
+        ソースをブロック圧縮コンテナとして書き込む
+
+        Args:
+            source: ソースファイルパス
+            destination: コンテナファイルパス
+            progress_callback: 進捗コールバック(bytes_processed, total_bytes)
+
+        Returns:
+            {"bytes_copied": 元データのバイト数, "checksum": 元データのSHA-256, "duration": float,
+             "compressed_bytes": int, "compression_ratio": 元サイズ/圧縮後サイズ,
+             "cpu_seconds": 圧縮に要したCPU時間, "codec": str, "level": int, "blocks": int}
+
+        Raises:
+            IOError/OSError: 読み取り・書き込み失敗
+        """
+        start = time.monotonic()
+        total = os.path.getsize(source)
+        file_hash = hashlib.sha256()
+        cpu_seconds = [0.0]
+        cpu_lock = threading.Lock()
+        index: List[bytes] = []
+        raw_size = 0
+
+        def compress_block(data: bytes):
+            t0 = time.thread_time()
+            compressed = self.codec.compress(data, self.level)
+            mode = _BLOCK_COMPRESSED
+            if len(compressed) >= len(data):
+                compressed, mode = data, _BLOCK_STORED
+            elapsed = time.thread_time() - t0
+            with cpu_lock:
+                cpu_seconds[0] += elapsed
+            return compressed, mode, len(data), zlib.crc32(data)
+
+        # 1ブロックに収まるファイル（ツリーコピーの小ファイル等）はスレッドプールを起動しない
+        workers = self.workers if total > self.block_size else 0
+
+        with open(source, "rb") as src, open(destination, "wb") as dst, ThreadPoolExecutor(
+            max_workers=max(workers, 1), thread_name_prefix="compress"
+        ) as executor:
+            dst.write(_HEADER.pack(MAGIC, FORMAT_VERSION, self.codec.codec_id, self.level, 0, self.block_size, 0))
+            in_flight = []
+
+            def drain_one():
+                compressed, mode, raw_length, crc = in_flight.pop(0).result()
+                index.append(_INDEX_ENTRY.pack(dst.tell(), len(compressed), raw_length, crc, mode))
+                dst.write(compressed)
+
+            while True:
+                block = src.read(self.block_size)
+                if not block:
+                    break
+
+                file_hash.update(block)
+                raw_size += len(block)
+                if workers:
+                    in_flight.append(executor.submit(compress_block, block))
+                else:
+                    future: Future = Future()
+                    future.set_result(compress_block(block))
+                    in_flight.append(future)
+
+                # ブロック順に書き出し、実行中ブロックを workers * 2 個までに制限
+                while in_flight and (len(in_flight) >= workers * 2 or in_flight[0].done()):
+                    drain_one()
+
+                if progress_callback:
+                    progress_callback(raw_size, total)
+
+            while in_flight:
+                drain_one()
+
+            index_offset = dst.tell()
+            for entry in index:
+                dst.write(entry)
+            dst.write(_FOOTER.pack(index_offset, len(index), raw_size, file_hash.digest(), INDEX_MAGIC))
+            compressed_bytes = dst.tell()
+
+        duration = time.monotonic() - start
+        ratio = round(raw_size / compressed_bytes, 3) if raw_size and compressed_bytes else 1.0
+
+        logger.info(
+            "Compressed copy completed",
+            extra={
+                "source": source,
+                "codec": self.codec.name,
+                "level": self.level,
+                "bytes": raw_size,
+                "compressed_bytes": compressed_bytes,
+                "cpu_seconds": cpu_seconds[0],
+            },
+        )
+
+        return {
+            "bytes_copied": raw_size,
+            "checksum": file_hash.hexdigest(),
+            "duration": duration,
+            "compressed_bytes": compressed_bytes,
+            "compression_ratio": ratio,
+            "cpu_seconds": round(cpu_seconds[0], 6),
+            "codec": self.codec.name,
+            "level": self.level,
+            "blocks": len(index),
+        }
+
+
+class CompressedFileReader:
+    """
+    ブロック圧縮コンテナの読み取り
+
+    インデックスを読み込み、任意のオフセットを含むブロックのみを展開して返す。
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: コンテナファイルパス
+
+        Raises:
+            CompressionError: コンテナ形式が不正、またはコーデックが利用できない
+        """
+        self.path = path
+        self._file = open(path, "rb")
+
+        try:
+            header = self._file.read(_HEADER.size)
+            if len(header) != _HEADER.size:
+                raise CompressionError(f"Truncated container header: {path}")
+            magic, version, codec_id, self.level, _, self.block_size, _ = _HEADER.unpack(header)
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise CompressionError(f"Not a block-compressed container: {path}")
+            if codec_id not in _CODECS_BY_ID:
+                raise CompressionError(f"Codec id {codec_id} is not available (is zstandard installed?)")
+            self.codec = _CODECS_BY_ID[codec_id]
+
+            self._file.seek(-_FOOTER.size, os.SEEK_END)
+            index_offset, count, self.raw_size, self.sha256, magic = _FOOTER.unpack(self._file.read(_FOOTER.size))
+            if magic != INDEX_MAGIC:
+                raise CompressionError(f"Container index missing or truncated: {path}")
+
+            self._file.seek(index_offset)
+            raw_index = self._file.read(count * _INDEX_ENTRY.size)
+            self.index = list(_INDEX_ENTRY.iter_unpack(raw_index))
+        except Exception:
+            self._file.close()
+            raise
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "CompressedFileReader":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    @property
+    def block_count(self) -> int:
+        return len(self.index)
+
+    def read_block(self, number: int) -> bytes:
+        """
+        ブロックを展開して返す（CRC32を検証）
+
+        Raises:
+            CompressionError: CRC不一致
+        """
+        offset, length, raw_length, crc, mode = self.index[number]
+        data = os.pread(self._file.fileno(), length, offset)
+        return self._decode(number, data, raw_length, crc, mode)
+
+    def read(self, offset: int, length: int) -> bytes:
+        """
+        元データの任意範囲を読み取る（該当ブロックのみ展開）
+
+        Args:
+            offset: 元データ上のオフセット
+            length: 読み取り長
+
+        Returns:
+            元データの該当範囲
+        """
+        end = min(offset + length, self.raw_size)
+        if offset >= end:
+            return b""
+
+        first = offset // self.block_size
+        last = (end - 1) // self.block_size
+        data = b"".join(self.read_block(number) for number in range(first, last + 1))
+        skip = offset - first * self.block_size
+        return data[skip : skip + (end - offset)]
+
+    def iter_blocks(self, workers: Optional[int] = None) -> Iterator[bytes]:
+        """
+        全ブロックを順に展開（スレッドプールで先行展開）
+
+        Yields:
+            展開済みブロック
+        """
+        workers = workers or os.cpu_count() or 1
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="decompress") as executor:
+            in_flight = []
+            for number in range(self.block_count):
+                in_flight.append(executor.submit(self.read_block, number))
+                if len(in_flight) >= workers * 2:
+                    yield in_flight.pop(0).result()
+            while in_flight:
+                yield in_flight.pop(0).result()
+
+    def decompress_to(self, destination: str, progress_callback: Optional[Callable] = None) -> Dict[str, Any]:
+        """
+        コンテナを展開してファイルへ書き込み、元データのSHA-256を検証
+
+        Returns:
+            {"bytes_restored": int, "checksum": str, "duration": float}
+
+        Raises:
+            CompressionError: ブロックまたは全体のハッシュ不一致
+        """
+        start = time.monotonic()
+        file_hash = hashlib.sha256()
+        restored = 0
+
+        with open(destination, "wb") as dst:
+            for block in self.iter_blocks():
+                dst.write(block)
+                file_hash.update(block)
+                restored += len(block)
+                if progress_callback:
+                    progress_callback(restored, self.raw_size)
+
+        if file_hash.digest() != self.sha256:
+            raise CompressionError(f"Decompressed data does not match the stored checksum: {self.path}")
+
+        return {"bytes_restored": restored, "checksum": file_hash.hexdigest(), "duration": time.monotonic() - start}
+
+    def _decode(self, number: int, data: bytes, raw_length: int, crc: int, mode: int) -> bytes:
+        try:
+            raw = data if mode == _BLOCK_STORED else self.codec.decompress(data, raw_length)
+        except _DECODE_ERRORS as e:
+            raise CompressionError(f"Block {number} cannot be decompressed: {e}")
+
+        if len(raw) != raw_length or zlib.crc32(raw) != crc:
+            raise CompressionError(f"Block {number} failed CRC check")
+        return raw
+
+
+def is_compressed_container(path: str) -> bool:
+    """ファイルがブロック圧縮コンテナか（ヘッダーのmagicで判定）"""
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
@@ -0,0 +1,292 @@
+"""
+Pipelined Copy Engine
+読み取り・ハッシュ計算・書き込みを別スレッドで並行実行するコピーパイプライン
+
+事前確保したbytearrayのリングバッファを readinto/memoryview で使い回し、
+チャンクごとのメモリ確保を行わずにディスク読み取り・ハッシュ計算・ディスク書き込みを重ね合わせる。
+"""
+
+import hashlib
+import logging
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# ステージ間の終了通知
+_EOF = None
+
+STAGES = ("reader", "hasher", "writer")
+
+
+@dataclass
+class StageCounter:
+    """パイプラインステージの処理量カウンター"""
+
+    bytes_processed: int = 0
+    busy_seconds: float = 0.0
+
+    @property
+    def throughput_mb_s(self) -> float:
+        """ステージ単体のスループット（MB/s、待ち時間を除く）"""
+        if self.busy_seconds <= 0:
+            return 0.0
+        return self.bytes_processed / (1024 * 1024) / self.busy_seconds
+
+    def add(self, other: "StageCounter") -> None:
+        self.bytes_processed += other.bytes_processed
+        self.busy_seconds += other.busy_seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "bytes": self.bytes_processed,
+            "busy_seconds": round(self.busy_seconds, 6),
+            "throughput_mb_s": round(self.throughput_mb_s, 2),
+        }
+
+
+def _stage_report(counters: Dict[str, StageCounter]) -> Dict[str, Any]:
+    """ステージカウンターを結果辞書に変換（最も時間を要したステージをボトルネックとする）"""
+    bottleneck = max(counters, key=lambda name: counters[name].busy_seconds)
+    return {"stages": {name: counter.to_dict() for name, counter in counters.items()}, "bottleneck": bottleneck}
+
+
+class PipelinedCopier:
+    """
+    パイプラインコピーエンジン
+
+    reader → hasher → writer の3ステージをキューで接続し、
+    ring_size 個の事前確保バッファを循環させる。
+    バッファサイズ以下の小さなファイルはスレッドを起動せずにインラインでコピーする。
+    """
+
+    def __init__(self, buffer_size: int = 8 * 1024 * 1024, ring_size: int = 4, hash_algorithm: str = "sha256"):
+        """
+        Args:
+            buffer_size: リングバッファ1本あたりのサイズ（バイト）
+            ring_size: リングバッファの本数（2以上）
+            hash_algorithm: ハッシュアルゴリズム（hashlib名）
+        """
+        if buffer_size <= 0:
+            raise ValueError("buffer_size must be positive")
+        if ring_size < 2:
+            raise ValueError("ring_size must be at least 2")
+
+        self.buffer_size = buffer_size
+        self.ring_size = ring_size
+        self.hash_algorithm = hash_algorithm
+
+        # 累積ステージカウンター
+        self._totals = {name: StageCounter() for name in STAGES}
+        self._totals_lock = threading.Lock()
+        self._copies = 0
+
+    def copy(self, source: str, destination: str, progress_callback: Optional[Callable] = None) -> Dict[str, Any]:
+        """
+        ファイルをパイプラインでコピー
+
+        Args:
+            source: ソースファイルパス
+            destination: 送信先ファイルパス
+            progress_callback: 進捗コールバック(bytes_copied, total_bytes)
+
+        Returns:
+            {"bytes_copied": int, "checksum": str, "duration": float,
+             "stages": {stage: {"bytes", "busy_seconds", "throughput_mb_s"}}, "bottleneck": str}
+
+        Raises:
+            IOError/OSError: 読み取りまたは書き込み失敗
+        """
+        start = time.monotonic()
+        counters = {name: StageCounter() for name in STAGES}
+        hash_obj = hashlib.new(self.hash_algorithm)
+
+        with open(source, "rb", buffering=0) as src, open(destination, "wb", buffering=0) as dst:
+            total = _file_size(src)
+
+            if total <= self.buffer_size:
+                bytes_copied = self._copy_inline(src, dst, hash_obj, counters, total)
+                if progress_callback:
+                    progress_callback(bytes_copied, total)
+            else:
+                bytes_copied = self._copy_pipelined(src, dst, hash_obj, counters, total, progress_callback)
+
+        duration = time.monotonic() - start
+        self._accumulate(counters)
+
+        result = {"bytes_copied": bytes_copied, "checksum": hash_obj.hexdigest(), "duration": duration}
+        result.update(_stage_report(counters))
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        累積ステージ統計を取得
+
+        Returns:
+            {"copies": int, "stages": {...}, "bottleneck": str}
+        """
+        with self._totals_lock:
+            report = _stage_report(self._totals)
+            report["copies"] = self._copies
+        return report
+
+    def _accumulate(self, counters: Dict[str, StageCounter]) -> None:
+        with self._totals_lock:
+            for name, counter in counters.items():
+                self._totals[name].add(counter)
+            self._copies += 1
+
+    def _copy_inline(self, src, dst, hash_obj, counters: Dict[str, StageCounter], total: int) -> int:
+        """1バッファに収まるファイルを単一スレッドでコピー（バッファはファイルサイズ分のみ確保）"""
+        view = memoryview(bytearray(max(total, 64 * 1024)))
+        bytes_copied = 0
+
+        while True:
+            t0 = time.monotonic()
+            n = _read_full(src, view)
+            t1 = time.monotonic()
+            counters["reader"].busy_seconds += t1 - t0
+            if n == 0:
+                break
+
+            hash_obj.update(view[:n])
+            t2 = time.monotonic()
+            _write_full(dst, view[:n])
+            t3 = time.monotonic()
+
+            for name in STAGES:
+                counters[name].bytes_processed += n
+            counters["hasher"].busy_seconds += t2 - t1
+            counters["writer"].busy_seconds += t3 - t2
+            bytes_copied += n
+
+        return bytes_copied
+
+    def _copy_pipelined(
+        self, src, dst, hash_obj, counters: Dict[str, StageCounter], total: int, progress_callback: Optional[Callable]
+    ) -> int:
+        """リングバッファを循環させる3ステージパイプライン（writerは呼び出しスレッドで実行）"""
+        views = [memoryview(bytearray(self.buffer_size)) for _ in range(self.ring_size)]
+
+        free_q: "queue.Queue" = queue.Queue()
+        hash_q: "queue.Queue" = queue.Queue()
+        write_q: "queue.Queue" = queue.Queue()
+        for index in range(self.ring_size):
+            free_q.put(index)
+
+        abort = threading.Event()
+        errors = []
+
+        def reader():
+            counter = counters["reader"]
+            try:
+                while not abort.is_set():
+                    index = free_q.get()
+                    t0 = time.monotonic()
+                    n = _read_full(src, views[index])
+                    counter.busy_seconds += time.monotonic() - t0
+                    if n == 0:
+                        free_q.put(index)
+                        break
+                    counter.bytes_processed += n
+                    hash_q.put((index, n))
+            except Exception as e:  # noqa: BLE001 - 呼び出し側で再送出
+                errors.append(e)
+                abort.set()
+            finally:
+                hash_q.put(_EOF)
+
+        def hasher():
+            counter = counters["hasher"]
+            while True:
+                item = hash_q.get()
+                if item is _EOF:
+                    write_q.put(_EOF)
+                    return
+                index, n = item
+                if not abort.is_set():
+                    t0 = time.monotonic()
+                    hash_obj.update(views[index][:n])
+                    counter.busy_seconds += time.monotonic() - t0
+                    counter.bytes_processed += n
+                write_q.put(item)
+
+        threads = [
+            threading.Thread(target=reader, name="copy-pipeline-reader", daemon=True),
+            threading.Thread(target=hasher, name="copy-pipeline-hasher", daemon=True),
+        ]
+        for thread in threads:
+            thread.start()
+
+        counter = counters["writer"]
+        bytes_written = 0
+
+        # writer: 失敗後もバッファを返却し続け、上流ステージを終了させる
+        while True:
+            item = write_q.get()
+            if item is _EOF:
+                break
+            index, n = item
+            if not abort.is_set():
+                try:
+                    t0 = time.monotonic()
+                    _write_full(dst, views[index][:n])
+                    counter.busy_seconds += time.monotonic() - t0
+                    counter.bytes_processed += n
+                    bytes_written += n
+
+                    if progress_callback:
+                        progress_callback(bytes_written, total)
+                except Exception as e:  # noqa: BLE001 - 呼び出し側で再送出
+                    errors.append(e)
+                    abort.set()
+            free_q.put(index)
+
+        for thread in threads:
+            thread.join()
+
+        if errors:
+            raise errors[0]
+
+        return bytes_written
+
+
+def _file_size(fileobj) -> int:
+    return os.fstat(fileobj.fileno()).st_size
+
+
+def _read_full(src, view: memoryview) -> int:
+    """バッファが埋まるかEOFまで readinto を繰り返す"""
+    filled = 0
+    size = len(view)
+    while filled < size:
+        n = src.readinto(view[filled:])
+        if not n:
+            break
+        filled += n
+    return filled
+
+
+def _pwrite_full(fd: int, data: memoryview, offset: int) -> None:
+    """部分書き込みを考慮してオフセット位置へ全バイトを書き込む（os.pwrite）"""
+    written = 0
+    while written < len(data):
+        n = os.pwrite(fd, data[written:], offset + written)
+        if n == 0:
+            raise IOError("Write returned no progress")
+        written += n
+
+
+def _write_full(dst, view: memoryview) -> None:
+    """部分書き込みを考慮して全バイトを書き込む"""
+    written = 0
+    size = len(view)
+    while written < size:
+        n = dst.write(view[written:])
+        if n is None or n == 0:
+            raise IOError("Write returned no progress")
+        written += n
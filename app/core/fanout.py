@@ -0,0 +1,217 @@
+"""
+Fan-out Copy
+1回のソース読み取りで複数の送信先へ同時書き込みを行うコピー機構
+3-2-1-1-0ルールの複数コピー作成時にソースI/Oとハッシュ計算を1回に削減する
+
+各送信先は <destination>.partial へチェックポイント付きで書き込み、完了時にアトミックに配置する。
+中断された送信先は ResumableCopier で続きから再開できる。
+drop_cache 指定時はソースを読み終えた範囲、送信先をチェックポイントでfsyncした範囲の
+ページキャッシュを解放する（大容量ファイルでもファンアウトを維持したままキャッシュを汚さない）。
+"""
+
+import hashlib
+import logging
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.cache_io import advise_sequential, drop_cache as drop_page_cache
+from app.core.resumable import CheckpointWriter, ResumableCopier
+
+logger = logging.getLogger(__name__)
+
+# 書き込みスレッドへの終了通知
+_EOF = object()
+
+
+class _DestinationWriter(threading.Thread):
+    """送信先ごとの書き込みスレッド（有界キューからチャンクを受け取る）"""
+
+    def __init__(self, destination: str, max_queued_chunks: int, open_writer: Callable[[str], CheckpointWriter]):
+        super().__init__(name=f"fanout-writer:{destination}", daemon=True)
+        self.destination = destination
+        self.open_writer = open_writer
+        self.queue: "queue.Queue" = queue.Queue(maxsize=max_queued_chunks)
+        self.bytes_written = 0
+        self.error: Optional[str] = None
+        self.duration = 0.0
+
+    @property
+    def failed(self) -> bool:
+        return self.error is not None
+
+    def run(self) -> None:
+        start = time.monotonic()
+        writer = None
+
+        # どの例外でも error を設定して _EOF までキューを空にし続ける（読み取り側を put で止めない）
+        try:
+            writer = self.open_writer(self.destination)
+        except Exception as e:
+            self.error = str(e)
+            logger.warning("Fan-out open failed", extra={"destination": self.destination, "error": str(e)})
+
+        while True:
+            chunk = self.queue.get()
+            if isinstance(chunk, tuple) and chunk[0] is _EOF:
+                total = chunk[1]
+                break
+
+            # 失敗済みの送信先はキューを空にし続け、読み取り側をブロックしない
+            if self.failed:
+                continue
+
+            try:
+                writer.write(chunk)
+                self.bytes_written += len(chunk)
+            except Exception as e:
+                self.error = str(e)
+                logger.warning("Fan-out write failed", extra={"destination": self.destination, "error": str(e)})
+
+        if writer is not None:
+            # 読み取りが完了し全データを書き込めた場合のみ配置する（それ以外は再開用に残す）
+            if self.error is None and total is not None and self.bytes_written != total:
+                self.error = f"Short write: {self.bytes_written} of {total} bytes"
+            try:
+                if self.error is None and total is not None:
+                    writer.commit()
+                else:
+                    writer.abort()
+            except Exception as e:
+                self.error = self.error or str(e)
+
+        self.duration = time.monotonic() - start
+
+
+class FanoutCopier:
+    """
+    マルチ送信先ファンアウトコピー
+
+    - ソースは1回だけ読み取り、SHA-256も1回だけ計算する
+    - 送信先ごとに書き込みスレッドと有界キューを持つ
+    - 遅い送信先はキューが満杯になると読み取りを待たせる（バックプレッシャー）
+    - 速い送信先は最も遅い送信先に対し最大 max_lag_bytes まで先行できる
+    - 送信先は一時ファイルとチェックポイント経由で書き込む（resumable の設定を使用）
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = 64 * 1024 * 1024,
+        max_lag_bytes: int = 256 * 1024 * 1024,
+        resumable: Optional[ResumableCopier] = None,
+    ):
+        """
+        Args:
+            chunk_size: 読み取りチャンクサイズ（バイト）
+            max_lag_bytes: 最速と最遅の送信先間で許容する遅延量（バイト）
+            resumable: チェックポイントのブロックサイズ・間隔（中断時に再開する ResumableCopier と揃える）
+        """
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+
+        self.chunk_size = chunk_size
+        self.max_lag_bytes = max_lag_bytes
+        self.resumable = resumable or ResumableCopier()
+
+    @property
+    def max_queued_chunks(self) -> int:
+        """送信先ごとのキュー長（チャンク数）"""
+        return max(1, self.max_lag_bytes // self.chunk_size)
+
+    def copy(
+        self,
+        source: str,
+        destinations: List[str],
+        progress_callback: Optional[Callable] = None,
+        drop_cache: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        ソースを複数送信先へ同時コピー
+
+        Args:
+            source: ソースファイルパス
+            destinations: 送信先ファイルパスのリスト
+            progress_callback: 進捗コールバック(bytes_read, total_bytes)
+            drop_cache: 読み書き済み範囲のページキャッシュを解放する
+
+        Returns:
+            {"bytes_read": int, "checksum": str, "duration": float,
+             "destinations": {destination: {"strategy", "bytes_copied", "checksum", "duration", "error"}}}
+            失敗した送信先には一時ファイルとチェックポイントが残る
+
+        Raises:
+            IOError/OSError: ソース読み取り失敗
+        """
+        start = time.monotonic()
+        source_size = Path(source).stat().st_size
+
+        def open_writer(destination: str) -> CheckpointWriter:
+            return self.resumable.checkpoint_writer(source, destination, drop_cache=drop_cache)
+
+        writers = [_DestinationWriter(dest, self.max_queued_chunks, open_writer) for dest in destinations]
+        for writer in writers:
+            writer.start()
+
+        sha256_hash = hashlib.sha256()
+        bytes_read = 0
+        completed = False
+
+        try:
+            with open(source, "rb") as src_file:
+                if drop_cache:
+                    advise_sequential(src_file.fileno())
+
+                while True:
+                    chunk = src_file.read(self.chunk_size)
+                    if not chunk:
+                        break
+
+                    sha256_hash.update(chunk)
+                    bytes_read += len(chunk)
+                    if drop_cache:
+                        drop_page_cache(src_file.fileno(), bytes_read - len(chunk), len(chunk))
+
+                    # 同一のbytesオブジェクトを全送信先で共有（コピーしない）
+                    for writer in writers:
+                        if not writer.failed:
+                            writer.queue.put(chunk)
+
+                    if progress_callback:
+                        progress_callback(bytes_read, source_size)
+            completed = True
+        finally:
+            # 読み取りに失敗した場合は送信先を配置しない
+            for writer in writers:
+                writer.queue.put((_EOF, bytes_read if completed else None))
+            for writer in writers:
+                writer.join()
+
+        checksum = sha256_hash.hexdigest()
+        results = {}
+
+        for writer in writers:
+            error = writer.error
+            results[writer.destination] = {
+                "strategy": "cache_friendly" if drop_cache else "fanout",
+                "bytes_copied": writer.bytes_written,
+                "checksum": checksum if error is None else "",
+                "duration": writer.duration,
+                "error": error,
+            }
+
+        duration = time.monotonic() - start
+
+        logger.info(
+            "Fan-out copy completed",
+            extra={
+                "source": source,
+                "destinations": len(destinations),
+                "failed": sum(1 for r in results.values() if r["error"]),
+                "bytes": bytes_read,
+                "duration": duration,
+            },
+        )
+
+        return {"bytes_read": bytes_read, "checksum": checksum, "duration": duration, "destinations": results}
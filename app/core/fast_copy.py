@@ -0,0 +1,330 @@
+"""
+Kernel-side Fast Copy
+ローカルファイルシステム間コピーのカーネル内高速パス
+
+フォールバックチェーン:
+1. ioctl(FICLONE) によるreflink（btrfs/XFS等のCoWファイルシステム）
+2. os.copy_file_range（カーネル内コピー、サーバーサイドコピー対応FSではオフロード）
+3. os.sendfile（カーネル内コピー）
+4. バッファ経由のパイプラインコピー（従来方式）
+
+カーネル内パスではデータがPythonを経由しないため、チェックサムは
+mmapによる別パスのハッシュ計算、またはソース未変更時のチェックサムキャッシュから取得する。
+"""
+
+import errno
+import hashlib
+import logging
+import mmap
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from enum import Enum
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# linux/fs.h: _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+
+# この errno の場合は次の戦略へフォールバックする（データ未転送扱い）
+_UNSUPPORTED_ERRNOS = {
+    errno.EXDEV,
+    errno.ENOSYS,
+    errno.EOPNOTSUPP,
+    errno.EINVAL,
+    errno.ENOTTY,
+    errno.EBADF,
+    errno.EPERM,
+}
+
+
+class CopyStrategy(Enum):
+    """コピー戦略（優先順）"""
+
+    REFLINK = "reflink"
+    COPY_FILE_RANGE = "copy_file_range"
+    SENDFILE = "sendfile"
+    BUFFERED = "buffered"
+
+
+class _StrategyUnsupported(Exception):
+    """戦略がこのファイル/ファイルシステムで利用できない"""
+
+
+class SourceChecksumCache:
+    """
+    ソースファイルのチェックサムキャッシュ（プロセス内LRU）
+
+    キーは (st_dev, st_ino, st_size, st_mtime_ns, algorithm)。
+    ソースが変更されるとキーが変わるため古いエントリは自然に無効化される。
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(st: os.stat_result, algorithm: str) -> Tuple:
+        return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, algorithm)
+
+    def get(self, key: Tuple) -> Optional[str]:
+        with self._lock:
+            checksum = self._entries.get(key)
+            if checksum is not None:
+                self._entries.move_to_end(key)
+            return checksum
+
+    def put(self, key: Tuple, checksum: str) -> None:
+        with self._lock:
+            self._entries[key] = checksum
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+def mmap_checksum(path: str, algorithm: str = "sha256", chunk_size: int = 8 * 1024 * 1024) -> str:
+    """
+    mmapでファイルをマップしてチェックサムを計算
+
+    Args:
+        path: ファイルパス
+        algorithm: ハッシュアルゴリズム（hashlib名）
+        chunk_size: hash.update に渡すスライスサイズ
+
+    Returns:
+        チェックサム（16進数文字列）
+    """
+    hash_obj = hashlib.new(algorithm)
+
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return hash_obj.hexdigest()
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if hasattr(mapped, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+
+            view = memoryview(mapped)
+            try:
+                for offset in range(0, size, chunk_size):
+                    hash_obj.update(view[offset : offset + chunk_size])
+            finally:
+                view.release()
+
+    return hash_obj.hexdigest()
+
+
+def probe_reflink(directory: str) -> bool:
+    """ディレクトリのファイルシステムが reflink（FICLONE）に対応しているか（一時ファイルで試行）"""
+    if not sys.platform.startswith("linux"):
+        return False
+
+    import fcntl
+
+    try:
+        with tempfile.TemporaryFile(dir=directory) as src, tempfile.TemporaryFile(dir=directory) as dst:
+            src.write(b"\0")
+            src.flush()
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        return True
+    except OSError:
+        return False
+
+
+def reflink_or_copy(source: str, destination: str) -> str:
+    """
+    reflink（CoWクローン）でファイルを複製し、非対応なら shutil.copy2 でコピー
+
+    reflink はデータブロックを共有するため、同一ファイルシステム上では
+    サイズに関係なく一瞬で完了し、空き容量もほぼ消費しない。
+
+    Returns:
+        使用した戦略（"reflink" または "buffered"）
+    """
+    if sys.platform.startswith("linux"):
+        import fcntl
+
+        with open(source, "rb") as src, open(destination, "wb") as dst:
+            try:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+                cloned = True
+            except OSError:
+                cloned = False
+
+        if cloned:
+            shutil.copystat(source, destination)
+            return CopyStrategy.REFLINK.value
+
+    shutil.copy2(source, destination)
+    return CopyStrategy.BUFFERED.value
+
+
+class KernelCopier:
+    """
+    カーネル内高速コピー
+
+    reflink → copy_file_range → sendfile → バッファコピー の順に試行し、
+    最初に成功した戦略と実効スループットを結果に記録する。
+    """
+
+    def __init__(
+        self,
+        fallback=None,
+        chunk_size: int = 64 * 1024 * 1024,
+        checksum_cache: Optional[SourceChecksumCache] = None,
+        hash_algorithm: str = "sha256",
+        reflink: bool = True,
+    ):
+        """
+        Args:
+            fallback: バッファコピー実装（copy(source, destination, progress_callback) を持つオブジェクト）
+            chunk_size: copy_file_range/sendfile 1回あたりの転送量（進捗通知の単位）
+            checksum_cache: ソースチェックサムキャッシュ
+            hash_algorithm: ハッシュアルゴリズム（hashlib名）
+            reflink: reflink を試行する（送信先が非対応と分かっている場合は False）
+        """
+        self.fallback = fallback
+        self.chunk_size = chunk_size
+        self.checksum_cache = checksum_cache if checksum_cache is not None else SourceChecksumCache()
+        self.hash_algorithm = hash_algorithm
+        self.strategy_counts = {strategy.value: 0 for strategy in CopyStrategy}
+        self._counts_lock = threading.Lock()
+
+        self._kernel_strategies = []
+        if reflink and sys.platform.startswith("linux"):
+            self._kernel_strategies.append((CopyStrategy.REFLINK, self._reflink))
+        if hasattr(os, "copy_file_range"):
+            self._kernel_strategies.append((CopyStrategy.COPY_FILE_RANGE, self._copy_file_range))
+        if hasattr(os, "sendfile") and sys.platform.startswith("linux"):
+            self._kernel_strategies.append((CopyStrategy.SENDFILE, self._sendfile))
+
+    @property
+    def available_strategies(self) -> list:
+        """このプラットフォームで試行される戦略"""
+        strategies = [strategy.value for strategy, _ in self._kernel_strategies]
+        if self.fallback is not None:
+            strategies.append(CopyStrategy.BUFFERED.value)
+        return strategies
+
+    def copy(self, source: str, destination: str, progress_callback: Optional[Callable] = None) -> Dict[str, Any]:
+        """
+        ファイルを最速の利用可能な戦略でコピー
+
+        Args:
+            source: ソースファイルパス
+            destination: 送信先ファイルパス
+            progress_callback: 進捗コールバック(bytes_copied, total_bytes)
+
+        Returns:
+            {"bytes_copied": int, "checksum": str, "duration": float, "strategy": str,
+             "throughput_mb_s": float, "checksum_source": "cache"|"mmap"|"inline"}
+
+        Raises:
+            IOError/OSError: コピー失敗
+        """
+        start = time.monotonic()
+
+        with open(source, "rb") as src, open(destination, "wb") as dst:
+            src_stat = os.fstat(src.fileno())
+            size = src_stat.st_size
+
+            for strategy, func in self._kernel_strategies:
+                try:
+                    func(src.fileno(), dst.fileno(), size, progress_callback)
+                except _StrategyUnsupported as e:
+                    logger.debug(f"Copy strategy {strategy.value} unavailable: {e}", extra={"source": source})
+                    os.lseek(src.fileno(), 0, os.SEEK_SET)
+                    os.lseek(dst.fileno(), 0, os.SEEK_SET)
+                    os.ftruncate(dst.fileno(), 0)
+                    continue
+
+                copy_seconds = time.monotonic() - start
+                result = {"bytes_copied": size, "strategy": strategy.value}
+                break
+            else:
+                result = None
+
+        if result is None:
+            if self.fallback is None:
+                raise OSError(errno.ENOTSUP, "No kernel copy strategy available and no fallback configured")
+
+            result = self.fallback.copy(source, destination, progress_callback)
+            result["strategy"] = CopyStrategy.BUFFERED.value
+            result["checksum_source"] = "inline"
+            copy_seconds = time.monotonic() - start
+            self.checksum_cache.put(SourceChecksumCache.make_key(src_stat, self.hash_algorithm), result["checksum"])
+        else:
+            result["checksum"], result["checksum_source"] = self._source_checksum(source, src_stat)
+
+        with self._counts_lock:
+            self.strategy_counts[result["strategy"]] += 1
+
+        result["duration"] = time.monotonic() - start
+        result["throughput_mb_s"] = round(result["bytes_copied"] / (1024 * 1024) / copy_seconds, 2) if copy_seconds > 0 else 0.0
+
+        logger.debug(
+            "Kernel copy completed",
+            extra={"source": source, "strategy": result["strategy"], "throughput_mb_s": result["throughput_mb_s"]},
+        )
+
+        return result
+
+    def _source_checksum(self, source: str, src_stat: os.stat_result) -> Tuple[str, str]:
+        """ソースのチェックサムをキャッシュまたはmmapパスで取得"""
+        key = SourceChecksumCache.make_key(src_stat, self.hash_algorithm)
+        cached = self.checksum_cache.get(key)
+        if cached is not None:
+            return cached, "cache"
+
+        checksum = mmap_checksum(source, self.hash_algorithm)
+
+        # ハッシュ計算中にソースが変更された場合はキャッシュしない
+        current = os.stat(source)
+        if SourceChecksumCache.make_key(current, self.hash_algorithm) == key:
+            self.checksum_cache.put(key, checksum)
+
+        return checksum, "mmap"
+
+    def _reflink(self, src_fd: int, dst_fd: int, size: int, progress_callback: Optional[Callable]) -> None:
+        import fcntl
+
+        try:
+            fcntl.ioctl(dst_fd, FICLONE, src_fd)
+        except OSError as e:
+            raise _StrategyUnsupported(str(e))
+
+        if progress_callback:
+            progress_callback(size, size)
+
+    def _copy_file_range(self, src_fd: int, dst_fd: int, size: int, progress_callback: Optional[Callable]) -> None:
+        self._kernel_loop(lambda count: os.copy_file_range(src_fd, dst_fd, count), size, progress_callback)
+
+    def _sendfile(self, src_fd: int, dst_fd: int, size: int, progress_callback: Optional[Callable]) -> None:
+        self._kernel_loop(lambda count: os.sendfile(dst_fd, src_fd, None, count), size, progress_callback)
+
+    def _kernel_loop(self, transfer: Callable[[int], int], size: int, progress_callback: Optional[Callable]) -> None:
+        """カーネル内転送をチャンク単位で繰り返す（初回で未対応なら _StrategyUnsupported）"""
+        copied = 0
+
+        while copied < size:
+            try:
+                n = transfer(min(self.chunk_size, size - copied))
+            except OSError as e:
+                if copied == 0 and e.errno in _UNSUPPORTED_ERRNOS:
+                    raise _StrategyUnsupported(str(e))
+                raise
+
+            if n == 0:
+                # 一部の仮想/ネットワークFSはデータがあっても0を返す
+                raise _StrategyUnsupported(f"transfer stalled at {copied} of {size} bytes")
+
+            copied += n
+            if progress_callback:
+                progress_callback(copied, size)
@@ -0,0 +1,374 @@
+"""
+I/O Scheduler
+ストレージターゲット単位の帯域制御と同時ストリーム数制限
+
+- ターゲットごとのトークンバケットで書き込み帯域を制限（バイト/秒）
+- ターゲットごとの最大同時ストリーム数
+- JobPriority に基づく優先度クラス:
+  - 空きトークン・空きスロットは優先度の高い待機者から割り当てる
+  - 上限に達したターゲットでは、高優先度ストリームが低優先度ストリームを一時停止させて割り込む
+    （停止はチャンク境界で行われ、高優先度ストリームの終了後に再開する）
+
+制限は configure_target() で実行中に変更でき、実行中のストリームにも次のチャンクから反映される。
+BackupEngine とストレージプロバイダーは get_io_scheduler() の共有インスタンスを使用する。
+"""
+
+import itertools
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 優先度は app.scheduler.job_queue.JobPriority の値（小さいほど高優先度）。
+# スケジューラーパッケージ（psutil依存）を読み込まないよう整数で扱う
+PRIORITY_NORMAL = 3  # JobPriority.NORMAL
+# リストア（ChunkStore・テープ・S3のリストア、検証の仮想リストア）はバックアップに割り込める
+PRIORITY_RESTORE = 2  # JobPriority.HIGH
+# スクラブ・パックのコンパクションなどの保守I/O
+PRIORITY_BACKGROUND = 5  # JobPriority.BACKGROUND
+
+# 帯域制限時の既定バースト（1回のチャンク報告でこれを超える分は前借りせず切り捨てる）
+DEFAULT_BURST_BYTES = 16 * 1024 * 1024
+
+
+class _Target:
+    """ターゲットの制限・状態・統計（IOScheduler のロック下で操作する）"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.bandwidth: Optional[float] = None  # バイト/秒（Noneは無制限）
+        self.burst: float = DEFAULT_BURST_BYTES
+        self.max_streams: Optional[int] = None  # Noneは無制限
+
+        self.tokens = 0.0
+        self.refilled_at = time.monotonic()
+
+        self.active: List["IOStream"] = []
+        self.waiting: Dict[int, int] = {}  # 優先度 -> 待機中のストリーム/消費要求数
+
+        self.bytes_total = 0
+        self.streams_total = 0
+        self.preemptions = 0
+        self.throttle_seconds = 0.0
+        self.suspended_seconds = 0.0
+
+    def refill(self) -> None:
+        now = time.monotonic()
+        if self.bandwidth is not None:
+            self.tokens = min(self.burst, self.tokens + (now - self.refilled_at) * self.bandwidth)
+        self.refilled_at = now
+
+    def higher_priority_waiting(self, priority: int) -> bool:
+        return any(count and waiting < priority for waiting, count in self.waiting.items())
+
+    def rebalance(self) -> None:
+        """優先度順に上位 max_streams 本を実行、残りを一時停止にする"""
+        ranked = sorted(self.active, key=lambda s: (s.priority, s.seq))
+        limit = len(ranked) if self.max_streams is None else self.max_streams
+        for index, stream in enumerate(ranked):
+            stream.suspended = index >= limit
+
+
+class IOStream:
+    """
+    ターゲットへの1本の転送ストリーム
+
+    throttle(nbytes) を転送チャンクごとに呼び出すと、帯域と優先度に応じてブロックする。
+    """
+
+    def __init__(self, scheduler: "IOScheduler", target: _Target, priority: int, seq: int):
+        self._scheduler = scheduler
+        self.target = target
+        self.priority = priority
+        self.seq = seq
+        self.suspended = False
+        self.bytes_transferred = 0
+
+    def throttle(self, nbytes: int) -> float:
+        """
+        nbytes の転送に必要なトークンを消費（不足時・一時停止中は待機）
+
+        Returns:
+            待機した秒数
+        """
+        return self._scheduler._consume(self, nbytes)
+
+    def wrap(self, progress_callback: Optional[Callable] = None) -> Callable:
+        """進捗コールバック(bytes_copied, total_bytes)の差分で throttle するコールバックを返す"""
+        last = [0]
+
+        def callback(bytes_copied: int, total_bytes: int) -> None:
+            delta = bytes_copied - last[0]
+            last[0] = bytes_copied
+            if delta > 0:
+                self.throttle(delta)
+            if progress_callback:
+                progress_callback(bytes_copied, total_bytes)
+
+        return callback
+
+
+class ThrottledCopier:
+    """
+    ファイルコピー実装のアダプター（送信先ターゲットのストリームを確保してからコピー）
+
+    copy(source, destination, progress_callback) を持つ任意の実装をラップする。
+    """
+
+    def __init__(self, copier, scheduler: "IOScheduler", priority: int = PRIORITY_NORMAL):
+        self.copier = copier
+        self.scheduler = scheduler
+        self.priority = int(priority)
+
+    def copy(self, source: str, destination: str, progress_callback: Optional[Callable] = None) -> Dict[str, Any]:
+        with self.scheduler.stream(destination, self.priority) as io_stream:
+            return self.copier.copy(source, destination, io_stream.wrap(progress_callback))
+
+
+class IOScheduler:
+    """ストレージターゲット共有のI/Oスケジューラー"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._targets: Dict[str, _Target] = {}
+        self._configured: List[str] = []  # 設定済みターゲット（長い順）
+        self._mount_cache: Dict[str, str] = {}
+        self._seq = itertools.count()
+
+    def configure_target(
+        self,
+        target: str,
+        bandwidth_bytes_per_sec: Optional[float] = None,
+        max_streams: Optional[int] = None,
+        burst_bytes: Optional[int] = None,
+    ) -> None:
+        """
+        ターゲットの制限を設定（実行中でも変更可能）
+
+        Args:
+            target: ターゲットのパス（このパス配下への書き込みに適用）
+            bandwidth_bytes_per_sec: 帯域上限（Noneは無制限）
+            max_streams: 最大同時ストリーム数（Noneは無制限）
+            burst_bytes: トークンバケットの容量（省略時は DEFAULT_BURST_BYTES）
+        """
+        if bandwidth_bytes_per_sec is not None and bandwidth_bytes_per_sec <= 0:
+            raise ValueError("bandwidth_bytes_per_sec must be positive")
+        if max_streams is not None and max_streams < 1:
+            raise ValueError("max_streams must be at least 1")
+
+        name = os.path.normpath(os.path.abspath(target))
+
+        with self._cond:
+            state = self._get_target(name)
+            state.refill()
+            state.bandwidth = float(bandwidth_bytes_per_sec) if bandwidth_bytes_per_sec is not None else None
+            state.burst = float(burst_bytes or DEFAULT_BURST_BYTES)
+            state.tokens = min(state.tokens, state.burst)
+            state.max_streams = max_streams
+            state.rebalance()
+
+            if name not in self._configured:
+                self._configured.append(name)
+                self._configured.sort(key=len, reverse=True)
+            self._cond.notify_all()
+
+        logger.info(
+            "I/O target configured",
+            extra={"target": name, "bandwidth": bandwidth_bytes_per_sec, "max_streams": max_streams},
+        )
+
+    def remove_target(self, target: str) -> None:
+        """ターゲットの制限を解除（統計は保持）"""
+        name = os.path.normpath(os.path.abspath(target))
+        with self._cond:
+            if name in self._configured:
+                self._configured.remove(name)
+            state = self._targets.get(name)
+            if state is not None:
+                state.bandwidth = None
+                state.max_streams = None
+                state.rebalance()
+            self._cond.notify_all()
+
+    def target_for(self, path: str) -> str:
+        """
+        パスが属するターゲット名
+
+        設定済みターゲットのうち最長一致するもの、なければパスのマウントポイント
+        """
+        path = os.path.normpath(os.path.abspath(path))
+
+        with self._lock:
+            for name in self._configured:
+                if path == name or path.startswith(name.rstrip(os.sep) + os.sep):
+                    return name
+
+        return self._mount_point(path)
+
+    @contextmanager
+    def stream(self, path: str, priority: int = PRIORITY_NORMAL) -> Iterator[IOStream]:
+        """
+        path のターゲットへのストリームを確保
+
+        空きスロットがなく、実行中のストリームがすべて同等以上の優先度の場合は待機する。
+        低優先度のストリームが実行中であれば、それを一時停止させて即座に開始する。
+        """
+        priority = int(priority)
+        name = self.target_for(path)
+
+        with self._cond:
+            state = self._get_target(name)
+            io_stream = IOStream(self, state, priority, next(self._seq))
+            state.waiting[priority] = state.waiting.get(priority, 0) + 1
+            try:
+                while not self._admissible(state, priority):
+                    self._cond.wait()
+            finally:
+                state.waiting[priority] -= 1
+
+            if state.max_streams is not None and len(state.active) >= state.max_streams:
+                state.preemptions += 1
+                logger.info("I/O stream preempting lower priority stream", extra={"target": name, "priority": priority})
+
+            state.active.append(io_stream)
+            state.streams_total += 1
+            state.rebalance()
+            self._cond.notify_all()
+
+        try:
+            yield io_stream
+        finally:
+            with self._cond:
+                state.active.remove(io_stream)
+                state.rebalance()
+                self._cond.notify_all()
+
+    def throttled(self, copier, priority: int = PRIORITY_NORMAL) -> ThrottledCopier:
+        """ファイルコピー実装をスケジューラー経由にラップ"""
+        return ThrottledCopier(copier, self, priority)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        ターゲット別の制限と統計
+
+        Returns:
+            ターゲット名 -> {"bandwidth_bytes_per_sec", "max_streams", "active_streams", "suspended_streams",
+                             "waiting_streams", "bytes_total", "streams_total", "preemptions",
+                             "throttle_seconds", "suspended_seconds"}
+        """
+        with self._lock:
+            return {
+                name: {
+                    "bandwidth_bytes_per_sec": state.bandwidth,
+                    "max_streams": state.max_streams,
+                    "active_streams": sum(1 for s in state.active if not s.suspended),
+                    "suspended_streams": sum(1 for s in state.active if s.suspended),
+                    "waiting_streams": sum(state.waiting.values()),
+                    "bytes_total": state.bytes_total,
+                    "streams_total": state.streams_total,
+                    "preemptions": state.preemptions,
+                    "throttle_seconds": round(state.throttle_seconds, 3),
+                    "suspended_seconds": round(state.suspended_seconds, 3),
+                }
+                for name, state in self._targets.items()
+            }
+
+    def _admissible(self, state: _Target, priority: int) -> bool:
+        if state.higher_priority_waiting(priority):
+            return False
+        if state.max_streams is None or len(state.active) < state.max_streams:
+            return True
+        # 上限到達時は、低優先度のストリームが実行中なら割り込む
+        return any(s.priority > priority and not s.suspended for s in state.active)
+
+    def _consume(self, io_stream: IOStream, nbytes: int) -> float:
+        state = io_stream.target
+        waited = 0.0
+
+        with self._cond:
+            # 割り込まれている間は停止
+            if io_stream.suspended:
+                started = time.monotonic()
+                while io_stream.suspended:
+                    self._cond.wait()
+                suspended = time.monotonic() - started
+                state.suspended_seconds += suspended
+                waited += suspended
+
+            priority = io_stream.priority
+            state.waiting[priority] = state.waiting.get(priority, 0) + 1
+            try:
+                started = time.monotonic()
+                while True:
+                    if state.bandwidth is None:
+                        break
+
+                    state.refill()
+                    # バーストを超える報告（reflink等の一括報告）はバースト分のみ課金する
+                    cost = min(nbytes, state.burst)
+                    blocked = state.higher_priority_waiting(priority)
+
+                    if not blocked and state.tokens >= cost:
+                        state.tokens -= cost
+                        break
+
+                    if blocked:
+                        self._cond.wait(0.05)
+                    else:
+                        self._cond.wait((cost - state.tokens) / state.bandwidth)
+
+                throttled = time.monotonic() - started
+                state.throttle_seconds += throttled
+                waited += throttled
+            finally:
+                state.waiting[priority] -= 1
+                self._cond.notify_all()
+
+            state.bytes_total += nbytes
+            io_stream.bytes_transferred += nbytes
+
+        return waited
+
+    def _get_target(self, name: str) -> _Target:
+        state = self._targets.get(name)
+        if state is None:
+            state = self._targets[name] = _Target(name)
+        return state
+
+    def _mount_point(self, path: str) -> str:
+        """パス（未作成でも可）のマウントポイント"""
+        directory = os.path.dirname(path) if not os.path.isdir(path) else path
+
+        cached = self._mount_cache.get(directory)
+        if cached is not None:
+            return cached
+
+        current = directory
+        while not os.path.exists(current):
+            current = os.path.dirname(current)
+        while not os.path.ismount(current):
+            parent = os.path.dirname(current)
+            if parent == current:
+                break
+            current = parent
+
+        self._mount_cache[directory] = current
+        return current
+
+
+_scheduler: Optional[IOScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_io_scheduler() -> IOScheduler:
+    """プロセス共有のI/Oスケジューラーを取得"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = IOScheduler()
+        return _scheduler
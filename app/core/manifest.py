@@ -0,0 +1,297 @@
+"""
+Backup Manifest Store
+ディレクトリツリーバックアップのファイルマニフェスト（SQLite）
+
+マニフェストはコピー先の隣に <destination>.manifest.db として保存し、
+増分/差分バックアップで前回実行との比較（size, mtime_ns, inode）に使用する。
+
+各実行はコピー先配下の実行ディレクトリ <destination>/run-<実行ID> にデータを書き込む。
+
+- full: 全ファイルを実行ディレクトリへコピー
+- incremental: 直前の実行と比較し、変更ファイルのみコピー
+- differential: 直前のフル実行と比較し、変更ファイルのみコピー
+
+未変更ファイルはデータを再コピーせず、データを書き込んだ実行ID（stored_run_id）を
+参照として新しいマニフェストへ引き継ぐ。実行ごとのマニフェストは保持されるため、
+どの実行IDもその時点の状態としてリストアできる（locate 参照）。
+"""
+
+import logging
+import os
+import shutil
+import sqlite3
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+BACKUP_MODES = ("full", "incremental", "differential")
+
+MANIFEST_SUFFIX = ".manifest.db"
+
+RUN_DIR_PREFIX = "run-"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    mode TEXT NOT NULL,
+    base_run_id INTEGER,
+    started_at TEXT NOT NULL,
+    completed_at TEXT,
+    files_copied INTEGER NOT NULL DEFAULT 0,
+    files_skipped INTEGER NOT NULL DEFAULT 0,
+    bytes_copied INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS entries (
+    run_id INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    checksum TEXT NOT NULL,
+    stored_run_id INTEGER NOT NULL,
+    PRIMARY KEY (run_id, path)
+) WITHOUT ROWID;
+"""
+
+
+def manifest_path_for(destination: str) -> str:
+    """コピー先ディレクトリに対応するマニフェストファイルのパス"""
+    return os.path.normpath(destination) + MANIFEST_SUFFIX
+
+
+def run_path(destination: str, run_id: int) -> str:
+    """実行IDのデータを格納する実行ディレクトリのパス"""
+    return os.path.join(destination, f"{RUN_DIR_PREFIX}{run_id:06d}")
+
+
+class BackupManifest:
+    """
+    SQLiteマニフェストストア
+
+    完了した実行のマニフェストはすべて保持する（古い実行の削除は保持期間の管理で行う）。
+    完了していない実行（中断・失敗）は比較対象にしない。
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Args:
+            db_path: マニフェストファイルパス
+        """
+        self.db_path = db_path
+        self._conn = sqlite3.connect(db_path)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "BackupManifest":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def baseline_run(self, mode: str) -> Optional[int]:
+        """
+        比較対象となる実行IDを取得
+
+        Args:
+            mode: バックアップモード
+
+        Returns:
+            incremental は直前の実行、differential は直前のフル実行のID（該当なし/full はNone）
+        """
+        if mode not in BACKUP_MODES:
+            raise ValueError(f"Unknown backup mode: {mode}")
+
+        if mode == "incremental":
+            row = self._conn.execute("SELECT MAX(id) AS id FROM runs WHERE completed_at IS NOT NULL").fetchone()
+        elif mode == "differential":
+            row = self._conn.execute(
+                "SELECT MAX(id) AS id FROM runs WHERE mode = 'full' AND completed_at IS NOT NULL"
+            ).fetchone()
+        else:
+            return None
+
+        return row["id"]
+
+    def lookup(self, run_id: int, path: str) -> Optional[Dict[str, Any]]:
+        """
+        実行のマニフェストからファイルエントリを取得
+
+        Returns:
+            {"size", "mtime_ns", "inode", "checksum", "stored_run_id"} または None
+        """
+        row = self._conn.execute(
+            "SELECT size, mtime_ns, inode, checksum, stored_run_id FROM entries WHERE run_id = ? AND path = ?",
+            (run_id, path),
+        ).fetchone()
+        return dict(row) if row else None
+
+    def entries(self, run_id: int) -> List[Dict[str, Any]]:
+        """実行のマニフェストエントリ一覧（パス順）"""
+        rows = self._conn.execute(
+            "SELECT path, size, mtime_ns, inode, checksum, stored_run_id FROM entries WHERE run_id = ? ORDER BY path",
+            (run_id,),
+        )
+        return [dict(row) for row in rows]
+
+    def locate(self, destination: str, run_id: int) -> List[Dict[str, Any]]:
+        """
+        実行時点の全ファイルと、そのデータを格納している実行ディレクトリ上のパス
+
+        Args:
+            destination: コピー先ディレクトリ
+            run_id: リストアする実行ID
+
+        Returns:
+            [{"path", "size", "checksum", "stored_run_id", "stored_path"}]（パス順）
+        """
+        return [
+            {
+                "path": entry["path"],
+                "size": entry["size"],
+                "checksum": entry["checksum"],
+                "stored_run_id": entry["stored_run_id"],
+                "stored_path": os.path.join(run_path(destination, entry["stored_run_id"]), entry["path"]),
+            }
+            for entry in self.entries(run_id)
+        ]
+
+    def stored_checksums(self) -> Dict[str, str]:
+        """
+        実行ディレクトリに格納されたファイルごとの元データのチェックサム
+
+        Returns:
+            コピー先からの相対パス（"run-<実行ID>/<パス>"、POSIX形式） -> SHA-256
+        """
+        rows = self._conn.execute("SELECT run_id, path, checksum FROM entries WHERE stored_run_id = run_id")
+        return {
+            f"{RUN_DIR_PREFIX}{row['run_id']:06d}/{row['path'].replace(os.sep, '/')}": row["checksum"] for row in rows
+        }
+
+    def begin_run(self, mode: str, base_run_id: Optional[int]) -> int:
+        """
+        実行を開始（実行ディレクトリ名に使う実行IDを確定する）
+
+        Args:
+            mode: バックアップモード
+            base_run_id: 比較対象の実行ID
+
+        Returns:
+            新しい実行ID
+        """
+        with self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO runs (mode, base_run_id, started_at) VALUES (?, ?, ?)",
+                (mode, base_run_id, datetime.utcnow().isoformat()),
+            )
+        return cursor.lastrowid
+
+    def abandon_run(self, destination: str, run_id: int) -> None:
+        """失敗した実行の記録と実行ディレクトリを削除"""
+        self._forget_run(run_id)
+        shutil.rmtree(run_path(destination, run_id), ignore_errors=True)
+
+    def expired_runs(self, cutoff: datetime) -> List[Dict[str, Any]]:
+        """
+        保持期間を過ぎて削除できる実行
+
+        cutoff より前に完了した実行と、cutoff より前に開始して完了しなかった実行が対象。
+        最新の完了実行と最新のフル実行（次回の比較対象）、および保持する実行が
+        データを参照している実行（stored_run_id）は削除しない。
+
+        Args:
+            cutoff: この時刻より前の実行が期限切れ（UTC）
+
+        Returns:
+            [{"id", "mode", "started_at", "completed_at", "bytes_copied"}]（実行ID順）
+        """
+        cutoff_text = cutoff.isoformat()
+        rows = [dict(row) for row in self._conn.execute("SELECT * FROM runs ORDER BY id")]
+        completed = [row for row in rows if row["completed_at"] is not None]
+
+        kept = {row["id"] for row in completed if row["completed_at"] >= cutoff_text}
+        kept.update(row["id"] for row in rows if row["completed_at"] is None and row["started_at"] >= cutoff_text)
+        if completed:
+            kept.add(completed[-1]["id"])
+        fulls = [row for row in completed if row["mode"] == "full"]
+        if fulls:
+            kept.add(fulls[-1]["id"])
+
+        referenced = set()
+        for run_id in kept:
+            rows_of_run = self._conn.execute("SELECT DISTINCT stored_run_id FROM entries WHERE run_id = ?", (run_id,))
+            referenced.update(row["stored_run_id"] for row in rows_of_run)
+
+        return [
+            {key: row[key] for key in ("id", "mode", "started_at", "completed_at", "bytes_copied")}
+            for row in rows
+            if row["id"] not in kept and row["id"] not in referenced
+        ]
+
+    def delete_run(self, destination: str, run_id: int) -> None:
+        """
+        保持期間を過ぎた実行を削除（記録を先に消してから実行ディレクトリを削除）
+
+        Raises:
+            OSError: 実行ディレクトリを削除できない（記録は削除済みのため再びリストア対象にはならない）
+        """
+        self._forget_run(run_id)
+        directory = run_path(destination, run_id)
+        if os.path.isdir(directory):
+            shutil.rmtree(directory)
+
+    def _forget_run(self, run_id: int) -> None:
+        with self._conn:
+            self._conn.execute("DELETE FROM entries WHERE run_id = ?", (run_id,))
+            self._conn.execute("DELETE FROM runs WHERE id = ?", (run_id,))
+
+    def record_run(self, run_id: int, manifest: List[Dict[str, Any]]) -> int:
+        """
+        実行結果のマニフェストを1トランザクションで保存し、実行を完了にする
+
+        Args:
+            run_id: begin_run で開始した実行ID
+            manifest: TreeCopierのマニフェスト（引き継ぎエントリは "stored_run_id" を持つ）
+
+        Returns:
+            実行ID
+        """
+        files_skipped = sum(1 for item in manifest if item.get("carried"))
+        bytes_copied = sum(item["size"] for item in manifest if not item.get("carried"))
+
+        with self._conn:
+            row = self._conn.execute("SELECT mode FROM runs WHERE id = ?", (run_id,)).fetchone()
+            mode = row["mode"]
+            self._conn.execute(
+                "UPDATE runs SET completed_at = ?, files_copied = ?, files_skipped = ?, bytes_copied = ? WHERE id = ?",
+                (datetime.utcnow().isoformat(), len(manifest) - files_skipped, files_skipped, bytes_copied, run_id),
+            )
+
+            self._conn.executemany(
+                "INSERT INTO entries (run_id, path, size, mtime_ns, inode, checksum, stored_run_id) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (
+                        run_id,
+                        item["path"],
+                        item["size"],
+                        item["mtime_ns"],
+                        item["inode"],
+                        item["checksum"],
+                        item["stored_run_id"] if item.get("carried") else run_id,
+                    )
+                    for item in manifest
+                ),
+            )
+
+        logger.info(
+            "Manifest recorded",
+            extra={"manifest": self.db_path, "run_id": run_id, "mode": mode, "files_skipped": files_skipped},
+        )
+
+        return run_id
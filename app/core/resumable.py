@@ -0,0 +1,438 @@
+"""
+Resumable Copy
+チェックポイントによる再開可能なファイルコピー
+
+- コピー中は <destination>.partial に書き込み、完了時に os.replace でアトミックに配置する
+- <destination>.ckpt にソースの識別情報とブロックごとのハッシュを追記する
+  （データをfsyncしてからハッシュ行を追記するため、記録済みブロックは必ず書き込み済み）
+- 再試行・プロセス再起動時は、書き込み済みの最終ブロックのみ検証して続きから再開する
+
+hashlibのハッシュ状態は保存できないため、ファイル全体のSHA-256は再開時にソースの
+書き込み済み範囲を読み直して再構築する（送信先への再書き込みは発生しない）。
+ソースの読み直し中にブロックハッシュの不一致を検出した場合は、そのブロックから再コピーする。
+
+CheckpointWriter は同じ形式で書き込むストリーム側の実装（ファンアウトコピーの送信先ごとに使用）で、
+中断した書き込みは ResumableCopier.copy で再開できる。
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.cache_io import advise_sequential, drop_cache as drop_page_cache
+from app.core.copy_pipeline import _pwrite_full, _read_full
+
+logger = logging.getLogger(__name__)
+
+PARTIAL_SUFFIX = ".partial"
+CHECKPOINT_SUFFIX = ".ckpt"
+
+_CHECKPOINT_VERSION = 1
+_BLOCK_HASH = "blake2b-128"
+
+
+def _block_digest(data) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class ResumableCopier:
+    """
+    再開可能なブロックコピー
+
+    copy(source, destination, progress_callback) は他のファイルコピー実装と同じ形の結果を返す。
+    """
+
+    def __init__(
+        self,
+        block_size: int = 8 * 1024 * 1024,
+        checkpoint_interval: int = 256 * 1024 * 1024,
+        hash_algorithm: str = "sha256",
+    ):
+        """
+        Args:
+            block_size: ブロックサイズ（ハッシュ記録と再開の単位）
+            checkpoint_interval: チェックポイント間隔（バイト、block_size の倍数に切り上げ）
+            hash_algorithm: ファイル全体のハッシュアルゴリズム（hashlib名）
+        """
+        if block_size <= 0:
+            raise ValueError("block_size must be positive")
+
+        self.block_size = block_size
+        self.checkpoint_blocks = max(1, -(-checkpoint_interval // block_size))
+        self.hash_algorithm = hash_algorithm
+
+    def copy(
+        self,
+        source: str,
+        destination: str,
+        progress_callback: Optional[Callable] = None,
+        drop_cache: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        ファイルをチェックポイント付きでコピー（既存のチェックポイントがあれば再開）
+
+        Args:
+            source: ソースファイルパス
+            destination: 送信先ファイルパス
+            progress_callback: 進捗コールバック(bytes_copied, total_bytes)
+            drop_cache: チェックポイントごとに書き込み済み範囲のページキャッシュを解放する
+
+        Returns:
+            {"bytes_copied": int, "checksum": str, "duration": float, "strategy": "resumable",
+             "resumed_from": 再開したオフセット, "throughput_mb_s": float}
+
+        Raises:
+            IOError/OSError: コピー失敗（チェックポイントは残り、次回の呼び出しで再開する）
+        """
+        start = time.monotonic()
+        partial = destination + PARTIAL_SUFFIX
+        checkpoint = destination + CHECKPOINT_SUFFIX
+
+        src_stat = os.stat(source)
+        header = self._header(source, src_stat)
+
+        file_hash = hashlib.new(self.hash_algorithm)
+        block_hashes = self._resume(source, partial, checkpoint, header, file_hash)
+        resumed_from = len(block_hashes) * self.block_size
+        total = src_stat.st_size
+
+        buffer = bytearray(self.block_size)
+        view = memoryview(buffer)
+        unrecorded: List[str] = []
+
+        fd = os.open(partial, os.O_WRONLY | os.O_CREAT, 0o644)
+        try:
+            with open(source, "rb", buffering=0) as src, open(checkpoint, "a", encoding="utf-8") as ckpt:
+                src.seek(resumed_from)
+                offset = resumed_from
+                dropped = resumed_from
+                if drop_cache:
+                    advise_sequential(src.fileno())
+
+                while True:
+                    n = _read_full(src, view)
+                    if n == 0:
+                        break
+
+                    block = view[:n]
+                    file_hash.update(block)
+                    _pwrite_full(fd, block, offset)
+                    offset += n
+
+                    # 末尾の半端なブロックはチェックポイントに記録しない（完了時に確定する）
+                    if n == self.block_size:
+                        unrecorded.append(_block_digest(block))
+                        if len(unrecorded) >= self.checkpoint_blocks:
+                            self._write_checkpoint(fd, ckpt, unrecorded)
+                            unrecorded = []
+                            # fsync済みの範囲はキャッシュから解放できる
+                            if drop_cache:
+                                drop_page_cache(fd, dropped, offset - dropped)
+                                drop_page_cache(src.fileno(), dropped, offset - dropped)
+                                dropped = offset
+
+                    if progress_callback:
+                        progress_callback(offset, total)
+
+                if offset != total:
+                    raise IOError(f"Source size changed during copy: expected {total}, read {offset}")
+
+            os.fsync(fd)
+            if drop_cache:
+                drop_page_cache(fd, dropped, offset - dropped)
+        finally:
+            os.close(fd)
+
+        os.replace(partial, destination)
+        _fsync_directory(os.path.dirname(os.path.abspath(destination)))
+        os.remove(checkpoint)
+
+        duration = time.monotonic() - start
+        copied = total - resumed_from
+
+        if resumed_from:
+            logger.info(
+                "Resumed copy completed",
+                extra={"source": source, "destination": destination, "resumed_from": resumed_from},
+            )
+
+        return {
+            "bytes_copied": total,
+            "checksum": file_hash.hexdigest(),
+            "duration": duration,
+            "strategy": "resumable",
+            "resumed_from": resumed_from,
+            "throughput_mb_s": round(copied / (1024 * 1024) / duration, 2) if duration > 0 else 0.0,
+        }
+
+    def checkpoint_writer(self, source: str, destination: str, drop_cache: bool = False) -> "CheckpointWriter":
+        """
+        source を destination へストリームで書き込むための CheckpointWriter（送信先を新規に書き始める）
+
+        Args:
+            drop_cache: チェックポイントごとに書き込み済み範囲のページキャッシュを解放する
+
+        Raises:
+            IOError/OSError: 一時ファイルまたはチェックポイントを作成できない
+        """
+        header = self._header(source, os.stat(source))
+        return CheckpointWriter(destination, header, self.block_size, self.checkpoint_blocks, drop_cache)
+
+    def _header(self, source: str, src_stat: os.stat_result) -> Dict[str, Any]:
+        """チェックポイントのヘッダー（ソースの識別情報とブロック設定。不一致なら再開しない）"""
+        return {
+            "version": _CHECKPOINT_VERSION,
+            "source": os.path.abspath(source),
+            "source_size": src_stat.st_size,
+            "source_mtime_ns": src_stat.st_mtime_ns,
+            "block_size": self.block_size,
+            "block_hash": _BLOCK_HASH,
+        }
+
+    def _write_checkpoint(self, fd: int, ckpt, hashes: List[str]) -> None:
+        """データをfsyncしてからブロックハッシュを追記・fsync"""
+        os.fsync(fd)
+        ckpt.write("".join(f"{digest}\n" for digest in hashes))
+        ckpt.flush()
+        os.fsync(ckpt.fileno())
+
+    def _resume(self, source: str, partial: str, checkpoint: str, header: Dict[str, Any], file_hash) -> List[str]:
+        """
+        チェックポイントから再開可能なブロック列を求め、file_hash をその範囲まで進める
+
+        Returns:
+            検証済みのブロックハッシュ（再開しない場合は空）
+        """
+        recorded = self._load_checkpoint(checkpoint, header)
+
+        if recorded:
+            try:
+                partial_size = os.path.getsize(partial)
+            except OSError:
+                partial_size = 0
+
+            recorded = recorded[: partial_size // self.block_size]
+            recorded = recorded[: self._verified_prefix(partial, recorded)]
+            recorded = recorded[: self._rehash_source_prefix(source, recorded, file_hash)]
+
+        # 未記録の書き込みを切り捨て、チェックポイントを検証済みの内容で書き直す
+        with open(partial, "ab") as f:
+            f.truncate(len(recorded) * self.block_size)
+        with open(checkpoint, "w", encoding="utf-8") as f:
+            f.write(json.dumps(header) + "\n")
+            f.write("".join(f"{digest}\n" for digest in recorded))
+            f.flush()
+            os.fsync(f.fileno())
+
+        if recorded:
+            logger.info(
+                "Resuming copy from checkpoint",
+                extra={"source": source, "partial": partial, "offset": len(recorded) * self.block_size},
+            )
+
+        return recorded
+
+    def _load_checkpoint(self, checkpoint: str, header: Dict[str, Any]) -> List[str]:
+        """ソースと設定が一致するチェックポイントのブロックハッシュを読み込む"""
+        try:
+            with open(checkpoint, "r", encoding="utf-8") as f:
+                saved = json.loads(f.readline())
+                lines = f.read().split("\n")
+        except (OSError, ValueError):
+            return []
+
+        if saved != header:
+            logger.info("Discarding stale checkpoint", extra={"checkpoint": checkpoint})
+            return []
+
+        hashes = []
+        for line in lines:
+            # 書き込み途中で中断された最終行は無視する
+            if len(line) != 32:
+                break
+            hashes.append(line)
+        return hashes
+
+    def _verified_prefix(self, partial: str, recorded: List[str]) -> int:
+        """
+        書き込み済みデータの検証済みブロック数
+
+        最終ブロックのみ読み直して照合し、一致しない場合に限り全ブロックを検証する。
+        """
+        if not recorded:
+            return 0
+
+        with open(partial, "rb") as f:
+            last = len(recorded) - 1
+            f.seek(last * self.block_size)
+            if _block_digest(f.read(self.block_size)) == recorded[last]:
+                return len(recorded)
+
+            logger.warning("Checkpoint tail mismatch, verifying partial copy", extra={"partial": partial})
+            f.seek(0)
+            for index, digest in enumerate(recorded):
+                if _block_digest(f.read(self.block_size)) != digest:
+                    return index
+        return len(recorded)
+
+    def _rehash_source_prefix(self, source: str, recorded: List[str], file_hash) -> int:
+        """ソースの書き込み済み範囲を読み直してファイルハッシュを再構築（一致したブロック数を返す）"""
+        buffer = bytearray(self.block_size)
+        view = memoryview(buffer)
+
+        with open(source, "rb", buffering=0) as src:
+            for index, digest in enumerate(recorded):
+                n = _read_full(src, view)
+                block = view[:n]
+                if n != self.block_size or _block_digest(block) != digest:
+                    return index
+                file_hash.update(block)
+
+        return len(recorded)
+
+
+class CheckpointWriter:
+    """
+    順に渡されるデータを <destination>.partial へ書き込み、ブロックハッシュのチェックポイントを記録する
+
+    commit() で fsync してからアトミックに配置する。abort() は一時ファイルとチェックポイントを残し、
+    ResumableCopier.copy が記録済みブロックの続きから再開できるようにする。
+    """
+
+    def __init__(
+        self,
+        destination: str,
+        header: Dict[str, Any],
+        block_size: int,
+        checkpoint_blocks: int,
+        drop_cache: bool = False,
+    ):
+        """
+        Args:
+            destination: 送信先ファイルパス
+            header: チェックポイントのヘッダー（ResumableCopier._header）
+            block_size: ブロックサイズ
+            checkpoint_blocks: チェックポイント間隔（ブロック数）
+            drop_cache: チェックポイント（fsync）ごとに書き込み済み範囲のページキャッシュを解放する
+        """
+        self.destination = destination
+        self.partial = destination + PARTIAL_SUFFIX
+        self.checkpoint = destination + CHECKPOINT_SUFFIX
+        self.block_size = block_size
+        self.checkpoint_blocks = checkpoint_blocks
+        self.drop_cache = drop_cache
+        self.offset = 0
+        self._dropped = 0
+
+        self._block_hash = hashlib.blake2b(digest_size=16)
+        self._block_fill = 0
+        self._unrecorded: List[str] = []
+
+        self._fd = os.open(self.partial, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            self._ckpt = open(self.checkpoint, "w", encoding="utf-8")
+            self._ckpt.write(json.dumps(header) + "\n")
+            self._ckpt.flush()
+            os.fsync(self._ckpt.fileno())
+        except (IOError, OSError):
+            os.close(self._fd)
+            raise
+
+    def write(self, data) -> None:
+        """データを追記し、埋まったブロックのハッシュを記録（checkpoint_blocks ごとにチェックポイント）"""
+        view = memoryview(data)
+        _pwrite_full(self._fd, view, self.offset)
+        self.offset += len(view)
+
+        pos = 0
+        while pos < len(view):
+            take = min(len(view) - pos, self.block_size - self._block_fill)
+            self._block_hash.update(view[pos : pos + take])
+            self._block_fill += take
+            pos += take
+            if self._block_fill == self.block_size:
+                self._unrecorded.append(self._block_hash.hexdigest())
+                self._block_hash = hashlib.blake2b(digest_size=16)
+                self._block_fill = 0
+                if len(self._unrecorded) >= self.checkpoint_blocks:
+                    self.flush_checkpoint()
+
+    def flush_checkpoint(self) -> None:
+        """データをfsyncしてから未記録のブロックハッシュを追記・fsync"""
+        os.fsync(self._fd)
+        self._release()
+        if self._unrecorded:
+            self._ckpt.write("".join(f"{digest}\n" for digest in self._unrecorded))
+            self._ckpt.flush()
+            os.fsync(self._ckpt.fileno())
+            self._unrecorded = []
+
+    def commit(self) -> None:
+        """fsyncして送信先へアトミックに配置し、チェックポイントを削除"""
+        try:
+            os.fsync(self._fd)
+            self._release()
+        finally:
+            self._close()
+        os.replace(self.partial, self.destination)
+        _fsync_directory(os.path.dirname(os.path.abspath(self.destination)))
+        os.remove(self.checkpoint)
+
+    def abort(self) -> None:
+        """書き込み済みブロックを記録して閉じる（一時ファイルとチェックポイントは再開用に残す）"""
+        try:
+            self.flush_checkpoint()
+        except (IOError, OSError) as e:
+            logger.warning("Failed to record checkpoint", extra={"partial": self.partial, "error": str(e)})
+        finally:
+            self._close()
+
+    def _release(self) -> None:
+        """fsync済みの範囲をページキャッシュから解放"""
+        if self.drop_cache:
+            drop_page_cache(self._fd, self._dropped, self.offset - self._dropped)
+            self._dropped = self.offset
+
+    def _close(self) -> None:
+        try:
+            self._ckpt.close()
+        finally:
+            os.close(self._fd)
+
+
+def checkpoint_state(destination: str) -> Optional[Tuple[int, str]]:
+    """
+    送信先のチェックポイント状態（再開可能なバイト数, チェックポイントパス）
+
+    Returns:
+        チェックポイントがなければNone
+    """
+    checkpoint = destination + CHECKPOINT_SUFFIX
+    if not os.path.exists(checkpoint):
+        return None
+
+    try:
+        with open(checkpoint, "r", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            blocks = sum(1 for line in f if len(line.rstrip("\n")) == 32)
+    except (OSError, ValueError):
+        return None
+
+    return blocks * header.get("block_size", 0), checkpoint
+
+
+def _fsync_directory(path: str) -> None:
+    """リネームを永続化するためディレクトリをfsync（非対応プラットフォームでは無視）"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
@@ -0,0 +1,199 @@
+"""
+Sparse File Copy
+スパースファイル（シンプロビジョニングのVMディスクイメージ等）のホール保持コピー
+
+- SEEK_DATA/SEEK_HOLE でデータ範囲のみを読み取り・書き込み、ホールは送信先でもホールのまま残す
+  （送信先は空のファイルから作成するため、ホール部分は書き込まずに ftruncate で論理サイズを確定する）
+- データ範囲内のゼロブロックも書き込まずにホールにする
+- チェックサムはホール部分にゼロを与えて計算するため、密な読み取りと同じ値になる
+
+ホールを持たないファイルや SEEK_DATA 非対応の環境では fallback でコピーする。
+"""
+
+import errno
+import hashlib
+import logging
+import os
+import tempfile
+import time
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from app.core.copy_pipeline import _pwrite_full
+
+logger = logging.getLogger(__name__)
+
+_SEEK_DATA = getattr(os, "SEEK_DATA", None)
+_SEEK_HOLE = getattr(os, "SEEK_HOLE", None)
+
+
+class _SeekDataUnsupported(Exception):
+    """ファイルシステムが SEEK_DATA/SEEK_HOLE に対応していない"""
+
+
+def is_sparse(path: str) -> bool:
+    """割り当て済みブロックが論理サイズより少ない（ホールを持つ可能性がある）か"""
+    if _SEEK_DATA is None:
+        return False
+    try:
+        st = os.stat(path)
+    except OSError:
+        return False
+    # st_blocks は512バイト単位（Windowsでは存在しない）
+    blocks = getattr(st, "st_blocks", None)
+    return blocks is not None and blocks * 512 < st.st_size
+
+
+def probe_sparse(directory: str) -> bool:
+    """ディレクトリのファイルシステムがホールを保持できるか（一時ファイルを拡張して割り当てを確認）"""
+    if _SEEK_DATA is None:
+        return False
+    try:
+        with tempfile.TemporaryFile(dir=directory) as f:
+            os.ftruncate(f.fileno(), 1024 * 1024)
+            blocks = getattr(os.fstat(f.fileno()), "st_blocks", None)
+        return blocks is not None and blocks * 512 < 1024 * 1024
+    except OSError:
+        return False
+
+
+def data_extents(fd: int, size: int) -> Iterator[Tuple[int, int]]:
+    """
+    データ範囲 (offset, length) を順に返す
+
+    Raises:
+        _SeekDataUnsupported: SEEK_DATA 非対応
+    """
+    offset = 0
+    while offset < size:
+        try:
+            start = os.lseek(fd, offset, _SEEK_DATA)
+        except OSError as e:
+            if e.errno == errno.ENXIO:  # 以降はすべてホール
+                return
+            if e.errno == errno.EINVAL and offset == 0:
+                raise _SeekDataUnsupported(str(e))
+            raise
+        end = min(os.lseek(fd, start, _SEEK_HOLE), size)
+        if end > start:
+            yield start, end - start
+        offset = end
+
+
+class SparseCopier:
+    """
+    ホールを保持するファイルコピー
+
+    copy(source, destination, progress_callback) は他のファイルコピー実装と同じ形の結果を返す。
+    """
+
+    def __init__(self, fallback=None, block_size: int = 8 * 1024 * 1024, hash_algorithm: str = "sha256"):
+        """
+        Args:
+            fallback: ホールのないファイルに使うコピー実装
+            block_size: データ範囲の読み書き単位（ゼロブロック判定の単位）
+            hash_algorithm: ハッシュアルゴリズム（hashlib名）
+        """
+        self.fallback = fallback
+        self.block_size = block_size
+        self.hash_algorithm = hash_algorithm
+        self._zeros = bytes(block_size)
+
+    def copy(self, source: str, destination: str, progress_callback: Optional[Callable] = None) -> Dict[str, Any]:
+        """
+        ファイルをホールを保持してコピー
+
+        Args:
+            source: ソースファイルパス
+            destination: 送信先ファイルパス
+            progress_callback: 進捗コールバック(論理オフセット, 論理サイズ)
+
+        Returns:
+            {"bytes_copied": 論理バイト数, "physical_bytes": 書き込んだバイト数, "logical_bytes": int,
+             "checksum": str, "duration": float, "strategy": "sparse", "throughput_mb_s": float}
+
+        Raises:
+            IOError/OSError: コピー失敗
+        """
+        if self.fallback is not None and not is_sparse(source):
+            return self.fallback.copy(source, destination, progress_callback)
+
+        try:
+            return self._copy_sparse(source, destination, progress_callback)
+        except _SeekDataUnsupported as e:
+            if self.fallback is None:
+                raise OSError(errno.ENOTSUP, f"SEEK_DATA not supported: {e}")
+            logger.debug("SEEK_DATA unsupported, using dense copy", extra={"source": source})
+            return self.fallback.copy(source, destination, progress_callback)
+
+    def _copy_sparse(self, source: str, destination: str, progress_callback: Optional[Callable]) -> Dict[str, Any]:
+        start = time.monotonic()
+        hash_obj = hashlib.new(self.hash_algorithm)
+        buffer = bytearray(self.block_size)
+        view = memoryview(buffer)
+        physical = 0
+
+        with open(source, "rb", buffering=0) as src, open(destination, "wb", buffering=0) as dst:
+            src_fd, dst_fd = src.fileno(), dst.fileno()
+            size = os.fstat(src_fd).st_size
+            hashed_to = 0
+
+            for extent_start, extent_length in data_extents(src_fd, size):
+                # 前のデータ範囲からのホールはゼロとしてハッシュする
+                self._hash_zeros(hash_obj, extent_start - hashed_to)
+
+                offset = extent_start
+                extent_end = extent_start + extent_length
+                while offset < extent_end:
+                    n = os.preadv(src_fd, [view[: min(self.block_size, extent_end - offset)]], offset)
+                    if n == 0:
+                        raise IOError(f"Source truncated during copy at offset {offset}")
+
+                    block = view[:n]
+                    hash_obj.update(block)
+                    if not self._is_zero(buffer, n):
+                        _pwrite_full(dst_fd, block, offset)
+                        physical += n
+                    offset += n
+
+                    if progress_callback:
+                        progress_callback(offset, size)
+
+                hashed_to = extent_end
+
+            self._hash_zeros(hash_obj, size - hashed_to)
+            # 末尾のホールを含めて論理サイズを確定
+            os.ftruncate(dst_fd, size)
+            os.fsync(dst_fd)
+
+        if progress_callback:
+            progress_callback(size, size)
+
+        duration = time.monotonic() - start
+
+        logger.debug(
+            "Sparse copy completed",
+            extra={"source": source, "logical_bytes": size, "physical_bytes": physical},
+        )
+
+        return {
+            "bytes_copied": size,
+            "logical_bytes": size,
+            "physical_bytes": physical,
+            "checksum": hash_obj.hexdigest(),
+            "duration": duration,
+            "strategy": "sparse",
+            "throughput_mb_s": round(size / (1024 * 1024) / duration, 2) if duration > 0 else 0.0,
+        }
+
+    def _is_zero(self, buffer: bytearray, n: int) -> bool:
+        # bytearray と bytes の比較は memcmp で行われる（memoryview 同士の比較は要素ごとで遅い）
+        if n == self.block_size:
+            return buffer == self._zeros
+        return buffer[:n] == self._zeros[:n]
+
+    def _hash_zeros(self, hash_obj, length: int) -> None:
+        zeros = memoryview(self._zeros)
+        while length > 0:
+            n = min(length, self.block_size)
+            hash_obj.update(zeros[:n])
+            length -= n
@@ -0,0 +1,294 @@
+"""
+Directory Tree Copy
+ディレクトリツリーのバックアップ（ファイル単位の並列ワーカープール）
+
+- os.scandir によるストリーミング走査（全ファイル一覧をメモリに展開しない）
+- 有界スレッドプールでファイル単位に並列コピー
+- 先読みウィンドウ内で大きいファイルから優先的に投入し、末尾の待ち時間を短縮
+- ファイルごとのマニフェスト（path, size, mtime, checksum）を生成
+- ベースラインのマニフェストと (size, mtime_ns, inode) が一致するファイルはコピー・ハッシュ計算を省略
+"""
+
+import hashlib
+import heapq
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TreeEntry:
+    """走査で見つかった通常ファイル"""
+
+    path: str
+    rel_path: str
+    size: int
+    mtime: float
+    mtime_ns: int
+    inode: int
+
+
+def iter_tree(root: str) -> Iterator[TreeEntry]:
+    """
+    ディレクトリツリーを os.scandir でストリーミング走査
+
+    シンボリックリンクは辿らず、通常ファイル以外（リンク、デバイス、ソケット等）はスキップする。
+    読み取りできないディレクトリは警告を記録して続行する。
+
+    Args:
+        root: ルートディレクトリ
+
+    Yields:
+        TreeEntry
+    """
+    stack = [root]
+
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            st = entry.stat(follow_symlinks=False)
+                            yield TreeEntry(
+                                path=entry.path,
+                                rel_path=os.path.relpath(entry.path, root),
+                                size=st.st_size,
+                                mtime=st.st_mtime,
+                                mtime_ns=st.st_mtime_ns,
+                                inode=st.st_ino,
+                            )
+                        else:
+                            logger.debug("Skipping non-regular file", extra={"path": entry.path})
+                    except OSError as e:
+                        logger.warning("Failed to stat entry", extra={"path": entry.path, "error": str(e)})
+        except OSError as e:
+            logger.warning("Failed to scan directory", extra={"path": directory, "error": str(e)})
+
+
+def tree_checksum(manifest: List[Dict[str, Any]]) -> str:
+    """
+    マニフェスト全体のチェックサム（相対パス順に path と checksum を連結したSHA-256）
+
+    Args:
+        manifest: マニフェストエントリのリスト
+
+    Returns:
+        チェックサム（16進数文字列）
+    """
+    hash_obj = hashlib.sha256()
+    for item in sorted(manifest, key=lambda m: m["path"]):
+        hash_obj.update(f"{item['path']}\0{item['checksum']}\n".encode("utf-8"))
+    return hash_obj.hexdigest()
+
+
+class TreeCopier:
+    """
+    ディレクトリツリーの並列コピー
+
+    走査ジェネレーターから最大 read_ahead 件を先読みしてサイズ順のヒープに積み、
+    最大のファイルから順に max_workers 個のワーカーへ投入する。
+    実行中・待機中のタスクは max_workers * 2 件に制限する（メモリ使用量の上限）。
+    """
+
+    def __init__(self, file_copier, max_workers: int = 8, read_ahead: int = 1024):
+        """
+        Args:
+            file_copier: ファイルコピー実装（copy(source, destination, progress_callback) を持つオブジェクト）
+            max_workers: 並列コピー数
+            read_ahead: 大きい順に並べ替える先読みウィンドウ（ファイル数）
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+
+        self.file_copier = file_copier
+        self.max_workers = max_workers
+        self.read_ahead = max(1, read_ahead)
+
+    def copy(
+        self,
+        source_dir: str,
+        dest_dir: str,
+        progress_callback: Optional[Callable] = None,
+        baseline: Optional[Callable[[str], Optional[Dict[str, Any]]]] = None,
+    ) -> Dict[str, Any]:
+        """
+        ディレクトリツリーをコピー
+
+        Args:
+            source_dir: ソースディレクトリ
+            dest_dir: 送信先ディレクトリ
+            progress_callback: 進捗コールバック(bytes_copied, total_bytes)
+                total_bytes は走査済みのコピー対象ファイルの合計（走査完了まで増加する）
+            baseline: 相対パス -> 前回エントリ {"size", "mtime_ns", "inode", "checksum", "stored_run_id"} の参照関数。
+                一致し格納先（エントリの "stored_path"、なければ送信先）に既存のファイルはコピーせず
+                マニフェストへ引き継ぐ
+
+        Returns:
+            {"bytes_copied": int, "files_copied": int, "files_skipped": int, "bytes_skipped": int,
+             "checksum": str, "duration": float,
+             "manifest": [{"path", "size", "mtime", "mtime_ns", "inode", "checksum", "carried"}],
+             "errors": [{"path", "error"}]}
+        """
+        start = time.monotonic()
+        os.makedirs(dest_dir, exist_ok=True)
+
+        manifest: List[Dict[str, Any]] = []
+        errors: List[Dict[str, str]] = []
+        created_dirs = {os.path.abspath(dest_dir)}
+        lock = threading.Lock()
+        progress = {"copied": 0, "discovered": 0}
+        skipped = {"files": 0, "bytes": 0}
+        # 圧縮コピー実装の場合の圧縮後バイト数とCPU時間
+        compression = {"compressed_bytes": 0, "cpu_seconds": 0.0}
+        # スパースファイルの実書き込みバイト数（ホールを除く）
+        sparse = {"files": 0, "physical_bytes": 0}
+
+        def report(delta_copied: int = 0, delta_discovered: int = 0) -> None:
+            with lock:
+                progress["copied"] += delta_copied
+                progress["discovered"] += delta_discovered
+                copied, discovered = progress["copied"], progress["discovered"]
+            if progress_callback and delta_copied:
+                progress_callback(copied, discovered)
+
+        def copy_one(entry: TreeEntry) -> None:
+            destination = os.path.join(dest_dir, entry.rel_path)
+            parent = os.path.dirname(destination)
+
+            try:
+                if parent not in created_dirs:
+                    os.makedirs(parent, exist_ok=True)
+                    with lock:
+                        created_dirs.add(parent)
+
+                result = self.file_copier.copy(entry.path, destination)
+            except Exception as e:
+                # 圧縮エラー等も含め、1ファイルの失敗でツリー全体を中断しない
+                logger.warning("Tree copy failed for file", extra={"path": entry.path, "error": str(e)})
+                with lock:
+                    errors.append({"path": entry.rel_path, "error": str(e)})
+                return
+
+            item = _manifest_item(entry, result["checksum"])
+            item["size"] = result["bytes_copied"]
+            with lock:
+                manifest.append(item)
+                for key in compression:
+                    compression[key] += result.get(key, 0)
+                sparse["files"] += "physical_bytes" in result
+                sparse["physical_bytes"] += result.get("physical_bytes", result["bytes_copied"])
+            report(delta_copied=result["bytes_copied"])
+
+        walker = iter_tree(source_dir)
+        heap: list = []
+        sequence = 0
+        exhausted = False
+        in_flight = set()
+        max_in_flight = self.max_workers * 2
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="tree-copy") as executor:
+            while True:
+                # 先読みウィンドウを補充（サイズ降順ヒープ）
+                while not exhausted and len(heap) < self.read_ahead:
+                    entry = next(walker, None)
+                    if entry is None:
+                        exhausted = True
+                        break
+
+                    carried = self._carry_forward(entry, dest_dir, baseline) if baseline else None
+                    if carried is not None:
+                        with lock:
+                            manifest.append(carried)
+                        skipped["files"] += 1
+                        skipped["bytes"] += entry.size
+                        continue
+
+                    heapq.heappush(heap, (-entry.size, sequence, entry))
+                    sequence += 1
+                    report(delta_discovered=entry.size)
+
+                while heap and len(in_flight) < max_in_flight:
+                    _, _, entry = heapq.heappop(heap)
+                    in_flight.add(executor.submit(copy_one, entry))
+
+                if not in_flight:
+                    break
+
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+
+        duration = time.monotonic() - start
+        bytes_copied = progress["copied"]
+
+        logger.info(
+            "Tree copy completed",
+            extra={
+                "source": source_dir,
+                "destination": dest_dir,
+                "files": len(manifest) - skipped["files"],
+                "skipped": skipped["files"],
+                "failed": len(errors),
+                "bytes": bytes_copied,
+                "duration": duration,
+            },
+        )
+
+        result = {
+            "bytes_copied": bytes_copied,
+            "files_copied": len(manifest) - skipped["files"],
+            "files_skipped": skipped["files"],
+            "bytes_skipped": skipped["bytes"],
+            "checksum": tree_checksum(manifest),
+            "duration": duration,
+            "manifest": sorted(manifest, key=lambda m: m["path"]),
+            "errors": errors,
+        }
+        if compression["compressed_bytes"]:
+            result["compressed_bytes"] = compression["compressed_bytes"]
+            result["compression_ratio"] = round(bytes_copied / compression["compressed_bytes"], 3)
+            result["cpu_seconds"] = round(compression["cpu_seconds"], 6)
+        if sparse["files"]:
+            result["sparse_files"] = sparse["files"]
+            result["physical_bytes"] = sparse["physical_bytes"]
+        return result
+
+    @staticmethod
+    def _carry_forward(entry: TreeEntry, dest_dir: str, baseline: Callable) -> Optional[Dict[str, Any]]:
+        """前回エントリと一致し格納先にファイルが残っていれば引き継ぎ用マニフェスト項目を返す"""
+        previous = baseline(entry.rel_path)
+        if previous is None:
+            return None
+
+        if (previous["size"], previous["mtime_ns"], previous["inode"]) != (entry.size, entry.mtime_ns, entry.inode):
+            return None
+
+        if not os.path.exists(previous.get("stored_path") or os.path.join(dest_dir, entry.rel_path)):
+            return None
+
+        item = _manifest_item(entry, previous["checksum"])
+        item["carried"] = True
+        item["stored_run_id"] = previous["stored_run_id"]
+        return item
+
+
+def _manifest_item(entry: TreeEntry, checksum: str) -> Dict[str, Any]:
+    return {
+        "path": entry.rel_path,
+        "size": entry.size,
+        "mtime": entry.mtime,
+        "mtime_ns": entry.mtime_ns,
+        "inode": entry.inode,
+        "checksum": checksum,
+        "carried": False,
+    }
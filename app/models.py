@@ -11,6 +11,7 @@ Tables:
 - media_lending: Media lending records
 - verification_tests: Verification test execution records
 - verification_schedule: Verification test scheduling
+- verification_runs: Queued/running API verification requests and their progress
 - backup_executions: Backup execution history
 - compliance_status: 3-2-1-1-0 rule compliance status cache
 - alerts: Alert management
@@ -117,6 +118,8 @@ class BackupJob(db.Model):
     target_path = db.Column(db.String(500))
     backup_tool = db.Column(db.String(50), nullable=False)  # veeam/wsb/aomei/custom
     schedule_type = db.Column(db.String(20), nullable=False)  # daily/weekly/monthly/manual
+    backup_mode = db.Column(db.String(20), default="full", nullable=False)  # full/incremental/differential
+    io_mode = db.Column(db.String(20), default="auto", nullable=False)  # auto/buffered/cache_friendly/direct
     retention_days = db.Column(db.Integer, nullable=False)
     owner_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
     description = db.Column(db.Text)
@@ -163,6 +166,9 @@ class BackupCopy(db.Model):
     is_compressed = db.Column(db.Boolean, default=False, nullable=False)
     last_backup_date = db.Column(db.DateTime)
     last_backup_size = db.Column(db.BigInteger)  # bytes
+    dedup_ratio = db.Column(db.Float)  # 0.0-1.0: fraction of logical bytes not written (dedup store copies)
+    compression_ratio = db.Column(db.Float)  # original size / compressed size (is_compressed copies)
+    compression_cpu_seconds = db.Column(db.Float)  # CPU time spent compressing the last backup
     status = db.Column(db.String(20), default="unknown", nullable=False)  # success/failed/warning/unknown
     offline_media_id = db.Column(db.Integer, db.ForeignKey("offline_media.id"), index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
@@ -317,6 +323,67 @@ class VerificationSchedule(db.Model):
         return f"<VerificationSchedule job_id={self.job_id} frequency={self.test_frequency}>"
 
 
+class VerificationRun(db.Model):
+    """
+    Verification requested through the API and executed by the verification runner
+    Status: pending, running, completed, failed, cancelled
+    Pending rows are the runner's persistent queue; progress columns are updated while running
+    """
+
+    __tablename__ = "verification_runs"
+    # The runner claims the oldest pending run
+    __table_args__ = (db.Index("ix_verification_runs_status_created", "status", "created_at"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    backup_copy_id = db.Column(db.Integer, db.ForeignKey("backup_copies.id"), nullable=False, index=True)
+    test_type = db.Column(db.String(20), nullable=False)  # checksum/restore/read/integrity
+    scope = db.Column(db.String(20), default="full", nullable=False)  # full/sample/quick
+    status = db.Column(db.String(20), default="pending", nullable=False)
+    cancel_requested = db.Column(db.Boolean, default=False, nullable=False)
+    requested_by = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    files_total = db.Column(db.Integer, default=0, nullable=False)
+    files_done = db.Column(db.Integer, default=0, nullable=False)
+    files_failed = db.Column(db.Integer, default=0, nullable=False)
+    bytes_total = db.Column(db.BigInteger, default=0, nullable=False)
+    bytes_done = db.Column(db.BigInteger, default=0, nullable=False)
+    current_file = db.Column(db.String(500))
+    result = db.Column(db.String(20))  # success/warning/failed/cancelled (warning: files without a reference)
+    error_message = db.Column(db.Text)
+    verification_test_id = db.Column(db.Integer, db.ForeignKey("verification_tests.id"))
+    # Runner that claimed the run and when it last reported being alive; stale running rows are requeued
+    owner = db.Column(db.String(100))
+    heartbeat_at = db.Column(db.DateTime)
+    started_at = db.Column(db.DateTime)
+    completed_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    # Relationships
+    backup_copy = db.relationship("BackupCopy")
+    requester = db.relationship("User")
+    verification_test = db.relationship("VerificationTest")
+
+    @property
+    def percent_complete(self):
+        """Progress by bytes (by files when nothing is read), 0-100"""
+        if self.bytes_total:
+            return round(100.0 * self.bytes_done / self.bytes_total, 1)
+        if self.files_total:
+            return round(100.0 * self.files_done / self.files_total, 1)
+        return 100.0 if self.status == "completed" else 0.0
+
+    @property
+    def eta_seconds(self):
+        """Estimated seconds left, from the byte rate since the run started"""
+        if self.status != "running" or not self.started_at or not self.bytes_done or not self.bytes_total:
+            return None
+        elapsed = (datetime.utcnow() - self.started_at).total_seconds()
+        return round(elapsed * (self.bytes_total - self.bytes_done) / self.bytes_done, 1)
+
+    def __repr__(self):
+        return f"<VerificationRun copy_id={self.backup_copy_id} type={self.test_type} status={self.status}>"
+
+
 class BackupExecution(db.Model):
     """
     Backup execution history
@@ -332,6 +399,9 @@ class BackupExecution(db.Model):
     error_message = db.Column(db.Text)
     backup_size_bytes = db.Column(db.BigInteger)
     duration_seconds = db.Column(db.Integer)
+    files_copied = db.Column(db.Integer)  # incremental/differential: changed files copied
+    files_skipped = db.Column(db.Integer)  # incremental/differential: unchanged files carried forward
+    dedup_ratio = db.Column(db.Float)  # 0.0-1.0: fraction of logical bytes not written (dedup store copies)
     source_system = db.Column(db.String(100))  # powershell/manual/scheduled
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
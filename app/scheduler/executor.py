@@ -27,6 +27,8 @@ from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import psutil
 
+from .job_queue import QueuedJob
+
 logger = logging.getLogger(__name__)
 
 
@@ -350,6 +352,7 @@ class JobExecutor:
         job_data: Optional[Dict] = None,
         limits: Optional[ResourceLimits] = None,
         wait: bool = False,
+        priority: Optional[int] = None,
     ) -> Optional[ExecutionResult]:
         """
         Execute a single job
@@ -360,12 +363,16 @@ class JobExecutor:
             job_data: Data to pass to callback
             limits: Resource limits
             wait: Wait for completion if True
+            priority: JobPriority of the job, passed to the callback as ``priority``
+                (BackupEngine.execute_backup uses it as its I/O scheduler priority)
 
         Returns:
             ExecutionResult if wait=True, None otherwise
         """
         limits = limits or ResourceLimits()
         job_data = job_data or {}
+        if priority is not None:
+            job_data = {**job_data, "priority": int(priority)}
 
         # Check if resources available
         if not self.resource_manager.can_allocate(limits):
@@ -395,6 +402,25 @@ class JobExecutor:
         future.add_done_callback(lambda f: self._job_completed(job_id, f))
         return None
 
+    def execute_queued(
+        self, queued_job: QueuedJob, callback: Callable, limits: Optional[ResourceLimits] = None, wait: bool = False
+    ) -> Optional[ExecutionResult]:
+        """
+        Execute a job taken from a JobQueue with its data and priority
+
+        Args:
+            queued_job: Job returned by JobQueue.get_next_job()
+            callback: Function to execute
+            limits: Resource limits
+            wait: Wait for completion if True
+
+        Returns:
+            ExecutionResult if wait=True, None otherwise
+        """
+        return self.execute_job(
+            queued_job.job_id, callback, queued_job.job_data, limits, wait=wait, priority=queued_job.priority
+        )
+
     def _execute_with_isolation(
         self, job_id: int, callback: Callable, job_data: Dict, limits: ResourceLimits
     ) -> ExecutionResult:
@@ -8,6 +8,8 @@ Tasks:
 3. check_verification_reminders: Send verification test reminders
 4. cleanup_old_logs: Remove old log files and audit records
 5. generate_daily_report: Generate daily compliance report
+6. prune_expired_backups: Expire point-in-time backups past their job's retention period
+7. scrub_backup_copies: Re-read stored copies against their Merkle manifests to detect bit rot
 """
 import logging
 from datetime import datetime, timedelta
@@ -389,3 +391,59 @@ def generate_daily_report(app):
 
         except Exception as e:
             logger.error(f"Error in daily report generation: {e}", exc_info=True)
+
+
+def prune_expired_backups(app):
+    """
+    Expire point-in-time backups older than their job's retention period
+    Executed: Daily at 4:00 AM
+
+    Args:
+        app: Flask application instance
+    """
+    with app.app_context():
+        from app.services.retention_service import RetentionService
+        from app.storage.registry import get_storage_registry
+
+        try:
+            logger.info("Starting retention pruning")
+
+            service = RetentionService.from_config(app.config, storage_registry=get_storage_registry())
+            report = service.prune(dry_run=app.config.get("RETENTION_DRY_RUN", False))
+
+            for failure in report["failed"]:
+                backup = failure["backup"] or "copy"
+                logger.warning(f"Retention could not expire {backup} of copy {failure['copy_id']}: {failure['error']}")
+
+        except Exception as e:
+            logger.error(f"Error in retention pruning: {e}", exc_info=True)
+
+
+def scrub_backup_copies(app):
+    """
+    Verify the share of stored backup data due in this scrub period
+    Executed: Every SCRUB_INTERVAL_MINUTES minutes
+
+    Args:
+        app: Flask application instance
+    """
+    with app.app_context():
+        from app.services.scrub_service import ScrubService
+
+        try:
+            state_path = app.config.get("SCRUB_STATE_PATH")
+            if not state_path:
+                return
+
+            service = ScrubService(
+                state_path=state_path,
+                period_days=app.config.get("SCRUB_PERIOD_DAYS", 30),
+                bytes_per_second=app.config.get("SCRUB_BYTES_PER_SECOND"),
+            )
+            report = service.run()
+
+            for error in report["media_errors"]:
+                logger.warning(f"Scrub found corrupted blocks in copy {error['copy_id']}: {error['path']}")
+
+        except Exception as e:
+            logger.error(f"Error in backup scrubbing: {e}", exc_info=True)
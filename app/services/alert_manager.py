@@ -39,6 +39,7 @@ class AlertType(Enum):
     VERIFICATION_REMINDER = "verification_reminder"
     MEDIA_ROTATION_REMINDER = "media_rotation_reminder"
     MEDIA_OVERDUE_RETURN = "media_overdue_return"
+    MEDIA_ERROR = "media_error"
     SYSTEM_ERROR = "system_error"
 
 
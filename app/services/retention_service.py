@@ -0,0 +1,299 @@
+"""
+Retention Service
+Expires point-in-time backups older than their job's retention period
+
+A BackupCopy row is a backup target that every run updates in place, so neither
+the row nor the target is ever deleted. What expires are the restore points kept
+inside the target:
+
+- Tree copies: completed runs recorded in ``<destination>.manifest.db`` and their
+  ``run-NNNNNN`` directories (whose files are also dropped from the copy's Merkle manifest)
+- Deduplicated copies (``dedup:<root>``): the job's recipes in the chunk store, after which
+  packs that are mostly unreferenced are compacted (the rest stays as unreferenced bytes)
+- Single files and objects on storage providers are overwritten in place and hold
+  one restore point, so there is nothing to expire
+
+The newest restore point of every copy is always kept, as are tree runs whose
+data is still referenced by a kept run. Copies are walked in id order (keyset
+pagination) and handled in parallel, with deletions limited to ``deletes_per_second``.
+dry_run reports reclaimable bytes per storage target without deleting anything.
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from app.core.io_scheduler import get_io_scheduler
+from app.core.manifest import BackupManifest, manifest_path_for, run_path
+from app.models import BackupCopy, BackupJob, db
+from app.storage.chunk_store import ChunkStore, job_recipe_prefix, parse_dedup_destination
+from app.verification.merkle import MerkleManifest, merkle_path_for
+
+logger = logging.getLogger(__name__)
+
+
+class _RateLimiter:
+    """Spaces calls evenly so at most ``rate`` happen per second (shared by worker threads)."""
+
+    def __init__(self, rate: Optional[float]):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+class RetentionService:
+    """
+    Applies BackupJob.retention_days to the restore points stored in backup copies.
+    """
+
+    def __init__(
+        self,
+        storage_registry=None,
+        batch_size: int = 500,
+        max_workers: int = 8,
+        deletes_per_second: Optional[float] = 50.0,
+        compact_garbage_ratio: float = 0.25,
+    ):
+        """
+        Initialize retention service.
+
+        Args:
+            storage_registry: StorageRegistry resolving copies stored on registered providers
+            batch_size: Copies loaded per query
+            max_workers: Copies processed in parallel
+            deletes_per_second: Maximum restore point deletions per second (None = unlimited)
+            compact_garbage_ratio: Unreferenced share at which a dedup pack is rewritten after recipes expire
+        """
+        if batch_size <= 0 or max_workers <= 0:
+            raise ValueError("batch_size and max_workers must be positive")
+
+        self.storage_registry = storage_registry
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.deletes_per_second = deletes_per_second
+        self.compact_garbage_ratio = compact_garbage_ratio
+
+    @classmethod
+    def from_config(cls, config, storage_registry=None) -> "RetentionService":
+        """Build the service from the RETENTION_* settings of an application config."""
+        return cls(
+            storage_registry=storage_registry,
+            batch_size=config.get("RETENTION_BATCH_SIZE", 500),
+            max_workers=config.get("RETENTION_MAX_WORKERS", 8),
+            deletes_per_second=config.get("RETENTION_DELETES_PER_SECOND", 50),
+            compact_garbage_ratio=config.get("RETENTION_COMPACT_GARBAGE_RATIO", 0.25),
+        )
+
+    def copies_query(self):
+        """
+        Build the query selecting the copies of all jobs that have a retention period.
+
+        Returns:
+            Query of (copy id, job id, storage path, retention days) ordered by copy id
+        """
+        return (
+            db.session.query(BackupCopy.id, BackupCopy.job_id, BackupCopy.storage_path, BackupJob.retention_days)
+            .join(BackupJob, BackupCopy.job_id == BackupJob.id)
+            .filter(BackupJob.retention_days > 0, BackupCopy.storage_path.isnot(None))
+            .order_by(BackupCopy.id)
+        )
+
+    def prune(self, dry_run: bool = False, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Delete expired restore points of all copies.
+
+        Args:
+            dry_run: Only report what would be deleted
+            now: Reference time (default: utcnow)
+
+        Returns:
+            {"dry_run", "copies_checked", "expired_backups", "reclaimable_bytes", "deleted_backups",
+             "deleted_bytes", "unreferenced_bytes", "failed": [{"copy_id", "storage_path", "backup", "error"}],
+             "targets": {target: {"backups", "bytes"}}, "duration_seconds"}
+
+            deleted_bytes is space freed on disk: deleted tree runs plus dedup packs removed by compaction.
+            unreferenced_bytes is dedup data no longer referenced but left in packs below the compaction ratio.
+        """
+        start = time.monotonic()
+        now = now or datetime.utcnow()
+        report: Dict[str, Any] = {
+            "dry_run": dry_run,
+            "copies_checked": 0,
+            "expired_backups": 0,
+            "reclaimable_bytes": 0,
+            "deleted_backups": 0,
+            "deleted_bytes": 0,
+            "unreferenced_bytes": 0,
+            "failed": [],
+            "targets": {},
+        }
+
+        limiter = _RateLimiter(self.deletes_per_second)
+        query = self.copies_query()
+        last_id = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="retention") as pool:
+            while True:
+                # Keyset pagination: one short query per batch, no offset scans
+                batch = query.filter(BackupCopy.id > last_id).limit(self.batch_size).all()
+                if not batch:
+                    break
+                last_id = batch[-1].id
+
+                work = [
+                    (copy_id, job_id, path, now - timedelta(days=days)) for copy_id, job_id, path, days in batch
+                ]
+                outcomes = pool.map(lambda item: self._expire_copy(*item, dry_run, limiter), work)
+                for (copy_id, _, path, _), outcome in zip(work, outcomes):
+                    self._account(copy_id, path, outcome, report)
+
+        report["duration_seconds"] = round(time.monotonic() - start, 3)
+        logger.info(
+            f"Retention {'dry run' if dry_run else 'pruning'} completed: "
+            f"{report['copies_checked']} copies, {report['expired_backups']} expired backups, "
+            f"{report['reclaimable_bytes']} reclaimable bytes, {report['deleted_backups']} deleted, "
+            f"{len(report['failed'])} failed"
+        )
+        return report
+
+    @staticmethod
+    def _account(copy_id: int, path: str, outcome: Dict[str, Any], report: Dict[str, Any]) -> None:
+        report["copies_checked"] += 1
+        target = report["targets"].setdefault(outcome["target"], {"backups": 0, "bytes": 0})
+        compaction = outcome.get("compaction")
+        for backup in outcome["expired"]:
+            target["backups"] += 1
+            target["bytes"] += backup["bytes"]
+            report["expired_backups"] += 1
+            report["reclaimable_bytes"] += backup["bytes"]
+            if backup.get("deleted"):
+                report["deleted_backups"] += 1
+                if compaction is None:
+                    report["deleted_bytes"] += backup["bytes"]
+            elif backup.get("error"):
+                report["failed"].append(
+                    {"copy_id": copy_id, "storage_path": path, "backup": backup["name"], "error": backup["error"]}
+                )
+        if compaction is not None:
+            # Deleted recipes only drop index entries; their space is freed when packs are compacted
+            report["deleted_bytes"] += compaction["bytes_reclaimed"]
+            report["unreferenced_bytes"] += compaction["unreferenced_bytes"]
+        if outcome.get("error"):
+            report["failed"].append(
+                {"copy_id": copy_id, "storage_path": path, "backup": None, "error": outcome["error"]}
+            )
+
+    def _expire_copy(
+        self, copy_id: int, job_id: int, path: str, cutoff: datetime, dry_run: bool, limiter: _RateLimiter
+    ) -> Dict[str, Any]:
+        """
+        Expire the restore points of one copy that are older than ``cutoff``.
+
+        Returns:
+            {"target", "expired": [{"name", "bytes", "deleted", "error"}], "error"} plus, for dedup stores
+            that were pruned, "compaction" ({"packs_compacted", "bytes_reclaimed", "unreferenced_bytes"})
+        """
+        outcome: Dict[str, Any] = {"target": "unknown", "expired": [], "error": None}
+        try:
+            store_root = parse_dedup_destination(path)
+            if store_root is not None:
+                outcome["target"] = self._target_for(store_root)
+                self._expire_recipes(store_root, job_id, cutoff, dry_run, limiter, outcome)
+                return outcome
+
+            outcome["target"] = self._target_for(path)
+            route = self.storage_registry.resolve(path) if self.storage_registry is not None else None
+            if route is not None and not route.capabilities.posix_path:
+                # Provider copies are written in place: their only restore point is the current one
+                return outcome
+            if "://" in path:
+                raise LookupError("No storage provider is registered for this path")
+
+            if os.path.exists(manifest_path_for(path)):
+                outcome["expired"] = self._expire_runs(path, cutoff, dry_run, limiter)
+        except Exception as e:
+            logger.warning(f"Retention could not process backup copy {copy_id} at {path}: {e}")
+            outcome["error"] = str(e)
+        return outcome
+
+    def _expire_runs(self, destination: str, cutoff: datetime, dry_run: bool, limiter: _RateLimiter) -> List[dict]:
+        """Expire tree runs recorded in the destination's manifest (newest and referenced runs are kept)."""
+        expired = []
+        with BackupManifest(manifest_path_for(destination)) as manifest:
+            runs = manifest.expired_runs(cutoff)
+            for run in runs:
+                backup = {"name": f"run {run['id']}", "bytes": run["bytes_copied"], "deleted": False, "error": None}
+                expired.append(backup)
+                if dry_run:
+                    continue
+                limiter.wait()
+                try:
+                    manifest.delete_run(destination, run["id"])
+                    backup["deleted"] = True
+                except OSError as e:
+                    logger.warning(f"Failed to delete expired run {run['id']} of {destination}: {e}")
+                    backup["error"] = str(e)
+
+        deleted_runs = [run_path(destination, run["id"]) for run, backup in zip(runs, expired) if backup["deleted"]]
+        if deleted_runs and os.path.exists(merkle_path_for(destination)):
+            with MerkleManifest(merkle_path_for(destination)) as merkle:
+                for path in deleted_runs:
+                    merkle.remove(os.path.relpath(path, destination))
+        return expired
+
+    def _expire_recipes(
+        self,
+        store_root: str,
+        job_id: int,
+        cutoff: datetime,
+        dry_run: bool,
+        limiter: _RateLimiter,
+        outcome: Dict[str, Any],
+    ) -> None:
+        """
+        Expire the job's recipes in a deduplicating chunk store (its newest recipe is kept).
+
+        Fills outcome["expired"] as recipes are deleted, so a failing compaction still reports them.
+        """
+        if not os.path.exists(os.path.join(store_root, "index.db")):
+            raise FileNotFoundError(f"Deduplication store not found: {store_root}")
+
+        expired = outcome["expired"]
+        with ChunkStore(store_root) as store:
+            recipes = store.list_recipes(job_recipe_prefix(job_id))
+            for recipe in recipes[:-1]:
+                if recipe["created_at"] >= cutoff.isoformat():
+                    continue
+                backup = {"name": recipe["name"], "bytes": recipe["stored_bytes"], "deleted": False, "error": None}
+                expired.append(backup)
+                if dry_run:
+                    continue
+                limiter.wait()
+                try:
+                    backup["deleted"] = store.delete_recipe(recipe["name"])
+                except Exception as e:
+                    logger.warning(f"Failed to delete expired recipe {recipe['name']} in {store_root}: {e}")
+                    backup["error"] = str(e)
+
+            if any(backup["deleted"] for backup in expired):
+                outcome["compaction"] = store.compact(self.compact_garbage_ratio)
+
+    def _target_for(self, path: str) -> str:
+        """Storage target a path is accounted against (registry provider, else I/O scheduler target)."""
+        if self.storage_registry is not None:
+            route = self.storage_registry.resolve(path)
+            if route is not None:
+                return route.provider_id
+        return get_io_scheduler().target_for(path)
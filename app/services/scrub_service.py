@@ -0,0 +1,411 @@
+"""
+Scrub Service
+Continuously re-reads stored backup copies to detect bit rot
+
+- Every byte of every copy is read once per ``period_days``. Each run scrubs the
+  work that is due by now, so the load is spread evenly over the period
+  instead of rehashing everything at once
+- Reads are paced to ``bytes_per_second`` and reported to the I/O scheduler at
+  background priority, so backups writing to the same target take precedence
+- Blocks are compared with the copy's Merkle manifest (<storage_path>.merkle.db).
+  Copies without one get a manifest on their first scrub, built a file at a time
+  under the same budget, pacing and cursor as verification
+- The backup engine does not re-read what it wrote: it drops the manifest entries
+  of the files it rewrote, and each pass hashes the files a copy's manifest does
+  not cover yet (new runs, rewritten files) before verifying the rest
+- Files whose size or mtime no longer match the manifest were rewritten outside a
+  backup; they are reported as stale instead of raising media errors
+- The cursor (copy, file, offset) is persisted after every step, so a restart
+  resumes where the previous run stopped
+- Corrupted or missing files raise MEDIA_ERROR alerts
+"""
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.core.io_scheduler import PRIORITY_BACKGROUND, get_io_scheduler
+from app.models import BackupCopy
+from app.verification.merkle import MerkleManifest, merkle_path_for
+
+logger = logging.getLogger(__name__)
+
+
+class _Pacer:
+    """Sleeps so that reported bytes never exceed ``rate`` bytes per second on average."""
+
+    def __init__(self, rate: Optional[float]):
+        self.rate = rate
+        self._next = time.monotonic()
+
+    def wait(self, nbytes: int) -> None:
+        if not self.rate:
+            return
+        now = time.monotonic()
+        self._next = max(self._next, now) + nbytes / self.rate
+        delay = self._next - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class ScrubService:
+    """
+    Incremental scrubber for all BackupCopy storage paths.
+
+    Only copies whose storage path is a local file or directory are scrubbed;
+    object-store and tape copies are verified by their providers.
+    """
+
+    def __init__(
+        self,
+        state_path: str,
+        period_days: float = 30,
+        bytes_per_second: Optional[float] = 50 * 1024 * 1024,
+        step_bytes: int = 64 * 1024 * 1024,
+        alert_manager=None,
+    ):
+        """
+        Initialize scrub service.
+
+        Args:
+            state_path: JSON file holding the cursor and pass progress
+            period_days: Time in which every stored byte is read once
+            bytes_per_second: Maximum read rate (None = unlimited)
+            step_bytes: Bytes verified between cursor saves
+            alert_manager: AlertManager used for MEDIA_ERROR alerts (default: new instance)
+        """
+        if period_days <= 0 or step_bytes <= 0:
+            raise ValueError("period_days and step_bytes must be positive")
+
+        self.state_path = str(state_path)
+        self.period_seconds = period_days * 86400
+        self.bytes_per_second = bytes_per_second
+        self.step_bytes = step_bytes
+        self._alert_manager = alert_manager
+
+    # ------------------------------------------------------------------ state
+
+    def load_state(self) -> Dict[str, Any]:
+        """Persisted cursor and pass progress (a fresh state when none is stored)."""
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"Scrub state {self.state_path} unreadable, starting a new pass: {e}")
+        return {"pass_started_at": None, "copy_id": 0, "path": None, "offset": 0, "bytes_this_pass": 0, "passes": 0}
+
+    def _save_state(self, state: Dict[str, Any]) -> None:
+        """Write the state atomically so a crash never leaves a truncated cursor."""
+        Path(self.state_path).parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+
+    # -------------------------------------------------------------------- run
+
+    def run(self, now: Optional[datetime] = None, max_bytes: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Scrub the bytes that are due since the current pass started.
+
+        Args:
+            now: Reference time (default: utcnow)
+            max_bytes: Bytes to scrub in this run (default: the amount due by the schedule)
+
+        Returns:
+            {"bytes_scrubbed", "files_scrubbed", "media_errors": [{"copy_id", "path", "blocks", "offsets"}],
+             "missing": [{"copy_id", "path"}], "stale": [{"copy_id", "path"}], "manifests_created",
+             "pass_completed", "pass_progress", "duration_seconds"}
+        """
+        start = time.monotonic()
+        now = now or datetime.utcnow()
+        state = self.load_state()
+        report: Dict[str, Any] = {
+            "bytes_scrubbed": 0,
+            "files_scrubbed": 0,
+            "media_errors": [],
+            "missing": [],
+            "stale": [],
+            "manifests_created": 0,
+            "pass_completed": False,
+        }
+
+        copies = self._scrubbable_copies()
+        total_bytes = sum(size for _, _, size in copies)
+
+        if state["pass_started_at"] is None:
+            state["pass_started_at"] = now.isoformat()
+            self._save_state(state)
+
+        if max_bytes is None:
+            elapsed = (now - datetime.fromisoformat(state["pass_started_at"])).total_seconds()
+            due = total_bytes * min(1.0, elapsed / self.period_seconds)
+            max_bytes = int(due) - state["bytes_this_pass"]
+
+        if max_bytes > 0:
+            self._scrub(copies, state, max_bytes, report)
+
+        if state["copy_id"] is None:
+            # Every copy was scrubbed: start the next pass on the next run
+            state.update(pass_started_at=now.isoformat(), copy_id=0, path=None, offset=0, bytes_this_pass=0)
+            state["passes"] += 1
+            report["pass_completed"] = True
+            self._save_state(state)
+
+        report["pass_progress"] = round(state["bytes_this_pass"] / total_bytes, 4) if total_bytes else 1.0
+        report["duration_seconds"] = round(time.monotonic() - start, 3)
+        logger.info(
+            f"Scrub run completed: {report['bytes_scrubbed']} bytes in {report['files_scrubbed']} files, "
+            f"{len(report['media_errors'])} media errors, pass progress {report['pass_progress']:.1%}"
+        )
+        return report
+
+    def _scrubbable_copies(self) -> List[tuple]:
+        """(copy id, storage path, size) of copies stored on local paths or with a manifest, ordered by id."""
+        copies = []
+        for copy_id, storage_path, size in (
+            BackupCopy.query.with_entities(BackupCopy.id, BackupCopy.storage_path, BackupCopy.last_backup_size)
+            .filter(BackupCopy.storage_path.isnot(None))
+            .order_by(BackupCopy.id)
+        ):
+            manifest_path = merkle_path_for(storage_path)
+            if not os.path.exists(storage_path) and not os.path.exists(manifest_path):
+                # Not a local path (or never written): nothing to scrub
+                continue
+            if os.path.exists(manifest_path):
+                with MerkleManifest(manifest_path) as manifest:
+                    # A manifest emptied by a rewrite covers nothing yet
+                    size = manifest.total_size() or size
+            copies.append((copy_id, storage_path, size or 0))
+        return copies
+
+    def _scrub(self, copies: List[tuple], state: Dict[str, Any], budget: int, report: Dict[str, Any]) -> None:
+        """Advance the cursor by up to ``budget`` bytes; sets state["copy_id"] to None when the pass is done."""
+        pacer = _Pacer(self.bytes_per_second)
+        scheduler = get_io_scheduler()
+
+        for copy_id, storage_path, size in copies:
+            if copy_id < state["copy_id"]:
+                continue
+            if budget <= 0:
+                return
+            if copy_id > state["copy_id"]:
+                state.update(copy_id=copy_id, path=None, offset=0, hashing=False)
+
+            if not os.path.exists(storage_path):
+                # The manifest outlived the data: the whole copy is gone
+                report["missing"].append({"copy_id": copy_id, "path": storage_path})
+                self._alert(copy_id, "Backup copy missing", f"{storage_path} no longer exists.")
+                state.update(copy_id=copy_id + 1, path=None, offset=0, bytes_this_pass=state["bytes_this_pass"] + size)
+                self._save_state(state)
+                continue
+
+            manifest_path = merkle_path_for(storage_path)
+            if not os.path.exists(manifest_path):
+                # First scrub of this copy: hashing it establishes the reference
+                budget = self._build_manifest(copy_id, storage_path, state, budget, report, pacer, scheduler)
+                if state["copy_id"] == copy_id:
+                    # Budget exhausted before the manifest was complete
+                    return
+                continue
+
+            with MerkleManifest(manifest_path) as manifest, scheduler.stream(storage_path, PRIORITY_BACKGROUND) as io:
+                hashed = set()
+                if state["path"] is None or state.get("hashing"):
+                    # Files written by backups since the last pass become the reference before verification
+                    state["hashing"] = True
+                    budget, hashed, complete = self._hash_files(
+                        manifest, storage_path, state, budget, report, pacer, io
+                    )
+                    if not complete:
+                        return
+                    state.update(path=None, offset=0, hashing=False)
+
+                for relative_path in manifest.paths():
+                    if relative_path in hashed:
+                        continue
+                    if state["path"] is not None and relative_path < state["path"]:
+                        continue
+                    if budget <= 0:
+                        return
+                    if relative_path != state["path"]:
+                        state.update(path=relative_path, offset=0)
+
+                    budget, finished = self._scrub_file(
+                        copy_id, storage_path, manifest, relative_path, state, budget, report, pacer, io
+                    )
+                    if not finished:
+                        return
+
+            state.update(copy_id=copy_id + 1, path=None, offset=0)
+            self._save_state(state)
+
+        state["copy_id"] = None
+
+    def _build_manifest(self, copy_id, storage_path, state, budget, report, pacer, scheduler) -> int:
+        """
+        Hash the copy into <manifest>.partial a file at a time and move it into place once complete.
+
+        Files already in the partial manifest are skipped, so a build interrupted by the
+        budget or a restart resumes where it stopped. Returns the remaining budget; the
+        cursor moves to the next copy only when the manifest is complete.
+        """
+        manifest_path = merkle_path_for(storage_path)
+        partial_path = f"{manifest_path}.partial"
+
+        with MerkleManifest(partial_path) as manifest, scheduler.stream(storage_path, PRIORITY_BACKGROUND) as io:
+            budget, _, complete = self._hash_files(manifest, storage_path, state, budget, report, pacer, io)
+            if not complete:
+                return budget
+
+        if os.path.exists(manifest_path):
+            # The backup engine wrote a manifest meanwhile; it is at least as recent
+            os.remove(partial_path)
+        else:
+            os.replace(partial_path, manifest_path)
+            report["manifests_created"] += 1
+        state.update(copy_id=copy_id + 1, path=None, offset=0)
+        self._save_state(state)
+        return budget
+
+    def _hash_files(self, manifest, storage_path, state, budget, report, pacer, io) -> tuple:
+        """
+        Hash the files of the copy that the manifest does not cover yet, a file at a time.
+
+        Returns (remaining budget, paths hashed, whether the manifest now covers every file);
+        the backup root is updated once it does.
+        """
+
+        def paced(nbytes: int) -> None:
+            io.throttle(nbytes)
+            pacer.wait(nbytes)
+
+        hashed = set()
+        for relative_path in manifest.unhashed_files(storage_path):
+            if budget <= 0:
+                return budget, hashed, False
+            state.update(path=relative_path, offset=0)
+            try:
+                tree = manifest.add_file(
+                    storage_path,
+                    relative_path,
+                    block_size=manifest.block_size,
+                    algorithm=manifest.algorithm,
+                    progress_callback=paced,
+                )
+            except FileNotFoundError:
+                # Removed while the copy was walked
+                continue
+            hashed.add(relative_path)
+            state["bytes_this_pass"] += tree.size
+            report["bytes_scrubbed"] += tree.size
+            budget -= tree.size
+            self._save_state(state)
+        manifest.update_root()
+        return budget, hashed, True
+
+    def _scrub_file(self, copy_id, storage_path, manifest, relative_path, state, budget, report, pacer, io) -> tuple:
+        """Verify one file from the cursor offset in steps; returns (remaining budget, file finished)."""
+        tree = manifest.file_tree(relative_path)
+        file_path = storage_path if os.path.isfile(storage_path) else os.path.join(storage_path, relative_path)
+        step = max(1, self.step_bytes // tree.block_size) * tree.block_size
+        corrupted: List[int] = []
+        started_at = state["offset"]
+
+        def missing() -> tuple:
+            report["missing"].append({"copy_id": copy_id, "path": relative_path})
+            self._alert(copy_id, f"Backup file missing: {relative_path}", f"{file_path} no longer exists.")
+            return skip()
+
+        def skip() -> tuple:
+            state["bytes_this_pass"] += tree.size - state["offset"]
+            state["offset"] = tree.size
+            self._save_state(state)
+            return budget, True
+
+        try:
+            if not self._matches_manifest(manifest, relative_path, file_path):
+                self._stale(manifest, copy_id, relative_path, file_path, report)
+                return skip()
+        except FileNotFoundError:
+            return missing()
+
+        while state["offset"] < tree.size and budget > 0:
+            length = min(step, tree.size - state["offset"])
+            try:
+                corrupted.extend(tree.verify_range(file_path, state["offset"], length))
+            except FileNotFoundError:
+                return missing()
+
+            io.throttle(length)
+            pacer.wait(length)
+            state["offset"] += length
+            state["bytes_this_pass"] += length
+            report["bytes_scrubbed"] += length
+            budget -= length
+            self._save_state(state)
+
+        finished = state["offset"] >= tree.size
+        if finished and (started_at < tree.size or tree.size == 0):
+            report["files_scrubbed"] += 1
+
+        if corrupted:
+            try:
+                rewritten = not self._matches_manifest(manifest, relative_path, file_path)
+            except FileNotFoundError:
+                rewritten = True
+            if rewritten:
+                # Rewritten while it was being scrubbed: the blocks differ, but nothing rotted
+                self._stale(manifest, copy_id, relative_path, file_path, report)
+                return budget, finished
+
+            offsets = [index * tree.block_size for index in corrupted]
+            report["media_errors"].append(
+                {"copy_id": copy_id, "path": relative_path, "blocks": corrupted, "offsets": offsets}
+            )
+            self._alert(
+                copy_id,
+                f"Media error in backup copy: {relative_path}",
+                f"{len(corrupted)} corrupted block(s) of {tree.block_size} bytes in {file_path} "
+                f"at offsets {offsets[:20]}. The stored data no longer matches its Merkle manifest.",
+            )
+        return budget, finished
+
+    @staticmethod
+    def _matches_manifest(manifest: MerkleManifest, relative_path: str, file_path: str) -> bool:
+        """Whether the file still has the size and mtime it had when the manifest was written."""
+        size, mtime_ns = manifest.file_identity(relative_path)
+        st = os.stat(file_path)
+        # Manifests written before mtimes were recorded can only be checked by size
+        return st.st_size == size and (mtime_ns is None or st.st_mtime_ns == mtime_ns)
+
+    @staticmethod
+    def _stale(
+        manifest: MerkleManifest, copy_id: int, relative_path: str, file_path: str, report: Dict[str, Any]
+    ) -> None:
+        """Report a file rewritten after its manifest entry and drop the entry so the next pass hashes it anew."""
+        logger.warning(f"Skipping scrub of {file_path}: rewritten since its Merkle manifest entry was written")
+        report["stale"].append({"copy_id": copy_id, "path": relative_path})
+        manifest.discard(relative_path)
+
+    def _alert(self, copy_id: int, title: str, message: str) -> None:
+        from app.services.alert_manager import AlertManager, AlertSeverity, AlertType
+
+        logger.error(f"{title}: {message}")
+        try:
+            copy = BackupCopy.query.get(copy_id)
+            alert_manager = self._alert_manager or AlertManager()
+            alert_manager.create_alert(
+                alert_type=AlertType.MEDIA_ERROR,
+                severity=AlertSeverity.CRITICAL,
+                title=title[:200],
+                message=message,
+                job_id=copy.job_id if copy else None,
+            )
+        except Exception as e:
+            logger.error(f"Failed to create media error alert: {e}", exc_info=True)
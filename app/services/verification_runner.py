@@ -0,0 +1,421 @@
+"""
+Verification Runner
+Executes API-requested verifications on a worker pool outside the request threads
+
+- Requests are rows in verification_runs; pending rows are the persistent queue,
+  so queued runs survive restarts
+- Workers claim a run with a conditional UPDATE that records the runner as its
+  owner, so several processes can share one queue without running anything twice
+- Runners refresh the heartbeat of the runs they own; running rows whose heartbeat
+  is older than ``heartbeat_timeout`` (their process died) are queued again
+- Progress (files, bytes, current file) is written at most every
+  ``progress_interval`` seconds; the status endpoint only reads that row
+- Cancellation is cooperative: workers check the run's cancel flag while
+  hashing and stop in the middle of a file
+- Files are compared with the copy's Merkle manifest, else with the source checksum
+  in the tree copy's run manifest; files without either are read but reported as
+  unverified (a "warning" result), never as passed or failed
+"""
+import hashlib
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.core.manifest import BackupManifest, manifest_path_for
+from app.models import BackupCopy, VerificationRun, VerificationTest, db
+from app.verification.interfaces import ChecksumAlgorithm
+from app.verification.merkle import DEFAULT_BLOCK_SIZE, MerkleManifest, MerkleTree, merkle_path_for
+from app.verification.sampling import (
+    DEFAULT_CONFIDENCE,
+    DEFAULT_TOLERATED_ERROR_RATE,
+    required_sample_size,
+    stratified_sample,
+    stratify,
+)
+
+logger = logging.getLogger(__name__)
+
+# Issues stored in VerificationRun.error_message
+MAX_REPORTED_ISSUES = 50
+
+
+class VerificationCancelled(Exception):
+    """The run was cancelled while it was being verified"""
+
+
+class _ClaimLost(Exception):
+    """The run was requeued and claimed by another runner while it was being verified"""
+
+
+class _Progress:
+    """Accumulates progress of one run and flushes it to the database at most every ``interval`` seconds."""
+
+    def __init__(self, run: VerificationRun, interval: float, owner: str):
+        self.run = run
+        self.interval = interval
+        self.owner = owner
+        self._last_flush = time.monotonic()
+
+    def advance(self, nbytes: int) -> None:
+        self.run.bytes_done += nbytes
+        if time.monotonic() - self._last_flush >= self.interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """Persist progress and the heartbeat; raise VerificationCancelled when a cancel was requested."""
+        self._last_flush = time.monotonic()
+        with db.session.no_autoflush:
+            query = db.session.query(VerificationRun.owner, VerificationRun.cancel_requested)
+            owner, cancelled = query.filter_by(id=self.run.id).one()
+        if owner != self.owner:
+            raise _ClaimLost()
+        self.run.heartbeat_at = datetime.utcnow()
+        db.session.commit()
+        if cancelled:
+            raise VerificationCancelled()
+
+
+class VerificationRunner:
+    """
+    Worker pool for queued verification runs.
+
+    Each worker runs in its own thread with its own application context and
+    database session; web request threads only insert and read rows.
+    """
+
+    def __init__(
+        self,
+        app,
+        max_workers: int = 2,
+        poll_interval: float = 5.0,
+        progress_interval: float = 1.0,
+        heartbeat_timeout: float = 60.0,
+        sample_confidence: float = DEFAULT_CONFIDENCE,
+        sample_error_rate: float = DEFAULT_TOLERATED_ERROR_RATE,
+    ):
+        """
+        Initialize verification runner.
+
+        Args:
+            app: Flask application (workers push its app context)
+            max_workers: Number of worker threads
+            poll_interval: Seconds between queue polls when idle (runs queued by other processes)
+            progress_interval: Seconds between progress writes and cancel checks
+            heartbeat_timeout: Seconds without a heartbeat after which a running run is requeued
+            sample_confidence: Confidence level "sample" scope runs are sized for
+            sample_error_rate: Share of bad files a "sample" scope run must detect
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        if heartbeat_timeout <= progress_interval:
+            raise ValueError("heartbeat_timeout must be longer than progress_interval")
+
+        self.app = app
+        self.max_workers = max_workers
+        self.poll_interval = poll_interval
+        self.progress_interval = progress_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.sample_confidence = sample_confidence
+        self.sample_error_rate = sample_error_rate
+
+        self._wakeup = threading.Condition()
+        self._pending_signals = 0
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+        # Identifies this runner as the owner of the runs it claims
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    # ------------------------------------------------------------ lifecycle
+
+    def start(self) -> None:
+        """Requeue runs whose runner stopped and start the worker and heartbeat threads."""
+        if self._threads:
+            return
+
+        with self.app.app_context():
+            requeued = self.requeue_interrupted()
+        if requeued:
+            logger.info(f"Requeued {requeued} interrupted verification runs")
+
+        self._stopping.clear()
+        for i in range(self.max_workers):
+            thread = threading.Thread(target=self._worker, name=f"verification-runner-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._heartbeat, name="verification-runner-heartbeat", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        logger.info(f"Verification runner started with {self.max_workers} workers")
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the workers after their current run (a running verification is not interrupted)."""
+        self._stopping.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def notify(self) -> None:
+        """Wake an idle worker after a run was queued."""
+        with self._wakeup:
+            self._pending_signals += 1
+            self._wakeup.notify()
+
+    def requeue_interrupted(self) -> int:
+        """Put running runs whose heartbeat is older than heartbeat_timeout back into the queue; returns how many."""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.heartbeat_timeout)
+        count = (
+            VerificationRun.query.filter_by(status="running")
+            .filter(db.or_(VerificationRun.heartbeat_at.is_(None), VerificationRun.heartbeat_at < cutoff))
+            .update(
+                {
+                    "status": "pending",
+                    "owner": None,
+                    "heartbeat_at": None,
+                    "started_at": None,
+                    "files_done": 0,
+                    "files_failed": 0,
+                    "bytes_done": 0,
+                },
+                synchronize_session=False,
+            )
+        )
+        db.session.commit()
+        return count
+
+    def beat(self) -> None:
+        """Refresh the heartbeat of the runs this runner owns and requeue runs of runners that stopped."""
+        VerificationRun.query.filter_by(status="running", owner=self.owner).update(
+            {"heartbeat_at": datetime.utcnow()}, synchronize_session=False
+        )
+        db.session.commit()
+        requeued = self.requeue_interrupted()
+        if requeued:
+            logger.warning(f"Requeued {requeued} verification runs without a heartbeat")
+            self.notify()
+
+    def _heartbeat(self) -> None:
+        # Several beats per timeout, so one slow database round trip does not make a live run look stale
+        while not self._stopping.wait(self.heartbeat_timeout / 3):
+            try:
+                with self.app.app_context():
+                    self.beat()
+            except Exception as e:
+                logger.error(f"Verification runner heartbeat error: {e}", exc_info=True)
+
+    def _worker(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                with self.app.app_context():
+                    ran = self.run_next()
+            except Exception as e:
+                logger.error(f"Verification runner worker error: {e}", exc_info=True)
+                ran = False
+
+            if not ran:
+                with self._wakeup:
+                    if not self._pending_signals and not self._stopping.is_set():
+                        self._wakeup.wait(self.poll_interval)
+                    self._pending_signals = max(0, self._pending_signals - 1)
+
+    # ------------------------------------------------------------ execution
+
+    def run_pending(self) -> int:
+        """Execute queued runs in the calling thread until the queue is empty; returns how many ran."""
+        count = 0
+        while self.run_next():
+            count += 1
+        return count
+
+    def run_next(self) -> bool:
+        """Claim and execute the oldest pending run; False when the queue is empty."""
+        run = self._claim()
+        if run is None:
+            return False
+
+        self._execute(run)
+        return True
+
+    def _claim(self) -> Optional[VerificationRun]:
+        """Atomically move the oldest pending run to "running"."""
+        candidates = (
+            db.session.query(VerificationRun.id)
+            .filter_by(status="pending")
+            .order_by(VerificationRun.created_at, VerificationRun.id)
+            .limit(self.max_workers + 1)
+            .all()
+        )
+        for (run_id,) in candidates:
+            now = datetime.utcnow()
+            claimed = VerificationRun.query.filter_by(id=run_id, status="pending").update(
+                {"status": "running", "owner": self.owner, "heartbeat_at": now, "started_at": now},
+                synchronize_session=False,
+            )
+            db.session.commit()
+            if claimed:
+                return VerificationRun.query.get(run_id)
+        return None
+
+    def _execute(self, run: VerificationRun) -> None:
+        logger.info(f"Verification run {run.id} started: copy {run.backup_copy_id}, {run.test_type}/{run.scope}")
+        issues: List[str] = []
+
+        try:
+            issues, unverified = self._verify(run)
+            run.status = "completed"
+            run.result = "failed" if issues else "warning" if unverified else "success"
+            issues.extend(unverified)
+        except VerificationCancelled:
+            db.session.rollback()
+            run.status = "cancelled"
+            run.result = "cancelled"
+        except _ClaimLost:
+            # Another runner owns the run now; leave its row alone
+            db.session.rollback()
+            logger.warning(f"Verification run {run.id} was requeued while running; abandoning it")
+            return
+        except Exception as e:
+            logger.error(f"Verification run {run.id} failed: {e}", exc_info=True)
+            db.session.rollback()
+            run.status = "failed"
+            run.result = "failed"
+            issues = [f"{type(e).__name__}: {e}"]
+
+        run.completed_at = datetime.utcnow()
+        run.current_file = None
+        if issues:
+            run.error_message = "\n".join(issues[:MAX_REPORTED_ISSUES])
+        if run.status != "cancelled":
+            run.verification_test_id = self._record_test(run).id
+        db.session.commit()
+
+        logger.info(f"Verification run {run.id} finished: {run.status} ({run.files_done}/{run.files_total} files)")
+
+    def _verify(self, run: VerificationRun) -> Tuple[List[str], List[str]]:
+        """Verify the run's backup copy; returns (issues found, files that had no reference to compare with)."""
+        backup_copy = BackupCopy.query.get(run.backup_copy_id)
+        if backup_copy is None or not backup_copy.storage_path:
+            raise FileNotFoundError(f"Backup copy {run.backup_copy_id} has no storage path")
+
+        source = Path(backup_copy.storage_path)
+        if not source.exists():
+            raise FileNotFoundError(f"Backup source not found: {source}")
+
+        files = self._files_of(source)
+        if run.scope == "sample" and source.is_dir():
+            sample_size = required_sample_size(len(files), self.sample_confidence, self.sample_error_rate)
+            sampled = set(stratified_sample(stratify([(path, size) for _, path, size in files], source), sample_size))
+            files = [entry for entry in files if entry[1] in sampled]
+
+        manifest_path = merkle_path_for(source)
+        manifest = MerkleManifest(manifest_path) if os.path.exists(manifest_path) else None
+        compare = run.test_type != "read"
+        checksums = self._recorded_checksums(source) if compare else {}
+        quick = run.scope == "quick"
+
+        run.files_total = len(files)
+        run.bytes_total = 0 if quick else sum(size for _, _, size in files)
+        progress = _Progress(run, self.progress_interval, self.owner)
+        progress.flush()
+
+        issues: List[str] = []
+        unverified: List[str] = []
+        try:
+            block_size = manifest.block_size if manifest else DEFAULT_BLOCK_SIZE
+            algorithm = manifest.algorithm if manifest else ChecksumAlgorithm.SHA256
+
+            for relative_path, path, size in files:
+                run.current_file = relative_path
+                reference = manifest.file_tree(relative_path) if compare and manifest else None
+                # Written since the Merkle manifest was last refreshed: fall back to the recorded source checksum
+                checksum = checksums.get(relative_path) if reference is None else None
+
+                issue = None
+                if quick:
+                    # Quick scope: presence and size only, nothing is read
+                    if reference and reference.size != size:
+                        issue = f"size {size} != {reference.size}"
+                elif reference is None and checksum is not None:
+                    if self._sha256(path, progress.advance) != checksum:
+                        issue = "does not match the source checksum"
+                else:
+                    tree = MerkleTree.from_file(path, block_size, algorithm, progress_callback=progress.advance)
+                    if reference and reference.root != tree.root:
+                        issue = f"blocks {reference.diff(tree)[:10]} differ"
+
+                run.files_done += 1
+                if issue:
+                    run.files_failed += 1
+                    issues.append(f"{relative_path}: {issue}")
+                elif compare and reference is None and (quick or checksum is None):
+                    unverified.append(f"{relative_path}: no reference checksum (not verified)")
+                progress.advance(0)
+
+            if manifest and compare and run.scope != "sample":
+                present = {relative_path for relative_path, _, _ in files}
+                missing = [path for path in manifest.paths() if path not in present]
+                run.files_failed += len(missing)
+                issues.extend(f"{path}: missing from backup" for path in missing)
+        finally:
+            if manifest:
+                manifest.close()
+
+        progress.flush()
+        return issues, unverified
+
+    @staticmethod
+    def _recorded_checksums(source: Path) -> Dict[str, str]:
+        """Source checksums of the files stored in a tree copy's runs ({} without a run manifest)."""
+        path = manifest_path_for(str(source))
+        if source.is_file() or not os.path.exists(path):
+            return {}
+        with BackupManifest(path) as manifest:
+            return manifest.stored_checksums()
+
+    @staticmethod
+    def _sha256(path: Path, progress_callback, chunk_size: int = DEFAULT_BLOCK_SIZE) -> str:
+        """SHA-256 of a file; progress_callback gets the byte count of every chunk (and may cancel)."""
+        file_hash = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                file_hash.update(chunk)
+                progress_callback(len(chunk))
+        return file_hash.hexdigest()
+
+    @staticmethod
+    def _files_of(source: Path) -> List[Tuple[str, Path, int]]:
+        """(manifest key, path, size) of every file of a copy, sorted by key."""
+        if source.is_file():
+            return [(source.name, source, source.stat().st_size)]
+        files = [(path.relative_to(source).as_posix(), path) for path in source.rglob("*") if path.is_file()]
+        return [(key, path, path.stat().st_size) for key, path in sorted(files)]
+
+    @staticmethod
+    def _record_test(run: VerificationRun) -> VerificationTest:
+        """Record the finished run as a verification test of the copy's job (for compliance reporting)."""
+        if run.test_type == "restore":
+            test_type = "full_restore" if run.scope == "full" else "partial"
+        else:
+            test_type = "integrity"
+
+        duration = (run.completed_at - run.started_at).total_seconds() if run.started_at else None
+        test = VerificationTest(
+            job_id=run.backup_copy.job_id,
+            test_type=test_type,
+            test_date=run.completed_at,
+            tester_id=run.requested_by,
+            test_result=run.result,
+            duration_seconds=int(duration) if duration is not None else None,
+            issues_found=run.error_message,
+            notes=f"API verification run {run.id} ({run.test_type}, scope {run.scope})",
+        )
+        db.session.add(test)
+        db.session.flush()
+        return test
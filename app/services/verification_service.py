@@ -5,20 +5,30 @@ This service provides comprehensive backup verification and restore testing
 capabilities including:
 - Full restore tests (complete backup restoration)
 - Partial restore tests (selective file restoration)
+- Virtual restores (streaming hash instead of copying into a temp directory)
 - Integrity checks (checksum validation)
 - Automated verification scheduling
 - Test result recording and analysis
 """
 
 import asyncio
+import hashlib
 import logging
+import os
 import shutil
 import tempfile
+import time
 from datetime import datetime, timedelta
 from enum import Enum
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 
+from flask import current_app, has_app_context
+
+from app.core.compression import CompressedFileReader, CompressionError, is_compressed_container
+from app.core.fast_copy import reflink_or_copy
+from app.core.io_scheduler import PRIORITY_RESTORE, get_io_scheduler
+from app.core.manifest import BackupManifest, manifest_path_for
 from app.models import (
     BackupCopy,
     BackupJob,
@@ -27,11 +37,24 @@ from app.models import (
     VerificationTest,
     db,
 )
-from app.verification import ChecksumService, FileValidator
+from app.storage.chunk_store import ChunkIntegrityError, ChunkStore, job_recipe_prefix, parse_dedup_destination
+from app.verification import ChecksumService, FileValidator, PersistentChecksumCache
 from app.verification.interfaces import ChecksumAlgorithm, VerificationStatus
+from app.verification.merkle import DEFAULT_BLOCK_SIZE, MerkleManifest, MerkleTree, merkle_path_for
+from app.verification.sampling import (
+    DEFAULT_CONFIDENCE,
+    DEFAULT_TOLERATED_ERROR_RATE,
+    achieved_confidence,
+    required_sample_size,
+    stratified_sample,
+    stratify,
+)
 
 logger = logging.getLogger(__name__)
 
+# virtual: stream-hash restored files in memory; copy: write them to a restore directory
+RESTORE_MODES = ("virtual", "copy")
+
 
 class VerificationType(Enum):
     """Verification test types"""
@@ -68,6 +91,11 @@ class VerificationService:
         checksum_service: Optional[ChecksumService] = None,
         file_validator: Optional[FileValidator] = None,
         test_root_dir: Optional[Path] = None,
+        create_merkle_manifests: bool = True,
+        merkle_block_size: int = DEFAULT_BLOCK_SIZE,
+        sample_confidence: float = DEFAULT_CONFIDENCE,
+        sample_error_rate: float = DEFAULT_TOLERATED_ERROR_RATE,
+        restore_mode: str = "virtual",
     ):
         """
         Initialize verification service.
@@ -76,10 +104,25 @@ class VerificationService:
             checksum_service: Checksum calculation service
             file_validator: File validation service
             test_root_dir: Root directory for test restorations
+            create_merkle_manifests: Store a Merkle manifest next to copies that have none
+                during integrity checks, so later checks can localise corruption
+            merkle_block_size: Block size of newly created Merkle manifests
+            sample_confidence: Confidence level restore test samples are sized for
+            sample_error_rate: Share of bad files a restore test sample must detect
+            restore_mode: "virtual" to verify restores by streaming hash without writing files,
+                "copy" to restore into test_root_dir (an explicit restore target always copies)
         """
+        if restore_mode not in RESTORE_MODES:
+            raise ValueError(f"Unknown restore mode: {restore_mode} (expected one of {RESTORE_MODES})")
+
         self.checksum_service = checksum_service or ChecksumService(default_algorithm=ChecksumAlgorithm.SHA256)
         self.file_validator = file_validator or FileValidator(checksum_service=self.checksum_service)
         self.test_root_dir = test_root_dir or Path(tempfile.gettempdir()) / "backup_verification_tests"
+        self.create_merkle_manifests = create_merkle_manifests
+        self.merkle_block_size = merkle_block_size
+        self.sample_confidence = sample_confidence
+        self.sample_error_rate = sample_error_rate
+        self.restore_mode = restore_mode
 
         # Ensure test directory exists
         self.test_root_dir.mkdir(parents=True, exist_ok=True)
@@ -193,27 +236,37 @@ class VerificationService:
         Returns:
             Tuple of (result, details)
         """
+        virtual = self.restore_mode == "virtual" and not restore_target
         details = {
             "test_type": "full_restore",
             "job_name": job.job_name,
             "timestamp": datetime.utcnow().isoformat(),
             "copies_tested": [],
+            "restore_mode": "virtual" if virtual else "copy",
         }
 
         # Use test directory if no target specified
-        if not restore_target:
-            test_dir = self.test_root_dir / f"full_restore_{job.id}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}"
-            restore_target = str(test_dir)
-            details["cleanup_required"] = True
-        else:
+        if virtual:
+            restore_path = None
             details["cleanup_required"] = False
+        else:
+            if not restore_target:
+                timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+                test_dir = self.test_root_dir / f"full_restore_{job.id}_{timestamp}"
+                restore_target = str(test_dir)
+                details["cleanup_required"] = True
+            else:
+                details["cleanup_required"] = False
 
-        restore_path = Path(restore_target)
-        restore_path.mkdir(parents=True, exist_ok=True)
+            restore_path = Path(restore_target)
+            restore_path.mkdir(parents=True, exist_ok=True)
 
         overall_result = TestResult.SUCCESS
         total_files_restored = 0
         total_files_verified = 0
+        bytes_restored = 0
+        restore_seconds = 0.0
+        strategies: Dict[str, int] = {}
         errors = []
 
         # Test primary backup copy
@@ -225,15 +278,42 @@ class VerificationService:
         try:
             # Simulate full restoration
             source_path = Path(primary_copy.storage_path) if primary_copy.storage_path else None
+            store_root = parse_dedup_destination(primary_copy.storage_path or "")
 
-            if not source_path or not source_path.exists():
+            if store_root is not None and not virtual:
+                return TestResult.FAILED, {**details, "error": "Deduplicated copies are restore-tested virtually"}
+            if store_root is None and (not source_path or not source_path.exists()):
                 logger.error(f"Backup source path not found: {source_path}")
                 return TestResult.FAILED, {**details, "error": f"Backup source not found: {source_path}"}
 
+            if virtual:
+                # Every file is restored once in memory and checked against its recorded reference
+                if store_root is not None:
+                    restore = self._virtual_restore_recipe(store_root, job.id)
+                else:
+                    if source_path.is_file():
+                        files = [source_path]
+                    else:
+                        files = sorted(f for f in source_path.rglob("*") if f.is_file())
+                    restore = self._virtual_restore(source_path, files, check_missing=True)
+                total_files_restored = restore["files_restored"]
+                total_files_verified = restore["files_verified"]
+                bytes_restored = restore["bytes_restored"]
+                restore_seconds = restore["seconds"]
+                errors.extend(restore["errors"])
+                details["reference"] = restore["reference"]
+
+                if errors:
+                    overall_result = TestResult.WARNING if total_files_verified > 0 else TestResult.FAILED
+
             # Copy backup files to restore target
-            if source_path.is_file():
+            elif source_path.is_file():
                 # Single file backup
-                shutil.copy2(source_path, restore_path / source_path.name)
+                started = time.monotonic()
+                strategy = reflink_or_copy(source_path, restore_path / source_path.name)
+                restore_seconds = time.monotonic() - started
+                strategies[strategy] = 1
+                bytes_restored = source_path.stat().st_size
                 total_files_restored = 1
 
                 # Verify restored file
@@ -249,6 +329,7 @@ class VerificationService:
             elif source_path.is_dir():
                 # Directory backup - copy all files
                 restored_files = []
+                started = time.monotonic()
                 for file_path in source_path.rglob("*"):
                     if file_path.is_file():
                         relative_path = file_path.relative_to(source_path)
@@ -256,24 +337,32 @@ class VerificationService:
                         target_file.parent.mkdir(parents=True, exist_ok=True)
 
                         try:
-                            shutil.copy2(file_path, target_file)
+                            strategy = reflink_or_copy(file_path, target_file)
+                            strategies[strategy] = strategies.get(strategy, 0) + 1
+                            bytes_restored += target_file.stat().st_size
                             restored_files.append((file_path, target_file))
                             total_files_restored += 1
                         except Exception as e:
                             logger.error(f"Failed to restore {file_path}: {e}")
                             errors.append(f"Restore failed for {relative_path}: {str(e)}")
+                restore_seconds = time.monotonic() - started
 
-                # Verify restored files (sample or all if small)
-                files_to_verify = restored_files if len(restored_files) <= 100 else restored_files[:100]
+                # Verify a stratified random sample sized for the target confidence
+                targets = dict(restored_files)
+                sample, sampling = self._select_sample(source_path, list(targets))
 
-                for source_file, target_file in files_to_verify:
-                    verification_result = self._verify_restored_file(source_file, target_file, ChecksumAlgorithm.SHA256)
+                for source_file in sample:
+                    verification_result = self._verify_restored_file(
+                        source_file, targets[source_file], ChecksumAlgorithm.SHA256
+                    )
                     if verification_result["status"] == VerificationStatus.SUCCESS:
                         total_files_verified += 1
                     else:
                         errors.append(f"Verification failed for {source_file.name}")
 
-                if total_files_verified < len(files_to_verify):
+                details["sampling"] = self._sampling_result(sampling, len(sample) - total_files_verified)
+
+                if total_files_verified < len(sample):
                     overall_result = TestResult.WARNING if total_files_verified > 0 else TestResult.FAILED
 
             details["copies_tested"].append(
@@ -301,6 +390,9 @@ class VerificationService:
 
         details["total_files_restored"] = total_files_restored
         details["total_files_verified"] = total_files_verified
+        details.update(self._restore_throughput(bytes_restored, restore_seconds))
+        if strategies:
+            details["restore_strategies"] = strategies
         details["errors"] = errors
         details["verification_rate"] = (total_files_verified / total_files_restored * 100) if total_files_restored > 0 else 0.0
 
@@ -325,22 +417,29 @@ class VerificationService:
         Returns:
             Tuple of (result, details)
         """
+        virtual = self.restore_mode == "virtual" and not restore_target
         details = {
             "test_type": "partial",
             "job_name": job.job_name,
             "timestamp": datetime.utcnow().isoformat(),
+            "restore_mode": "virtual" if virtual else "copy",
         }
 
         # Use test directory if no target specified
-        if not restore_target:
-            test_dir = self.test_root_dir / f"partial_restore_{job.id}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}"
-            restore_target = str(test_dir)
-            details["cleanup_required"] = True
-        else:
+        if virtual:
+            restore_path = None
             details["cleanup_required"] = False
+        else:
+            if not restore_target:
+                timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+                test_dir = self.test_root_dir / f"partial_restore_{job.id}_{timestamp}"
+                restore_target = str(test_dir)
+                details["cleanup_required"] = True
+            else:
+                details["cleanup_required"] = False
 
-        restore_path = Path(restore_target)
-        restore_path.mkdir(parents=True, exist_ok=True)
+            restore_path = Path(restore_target)
+            restore_path.mkdir(parents=True, exist_ok=True)
 
         # Get primary backup copy
         primary_copy = next((c for c in backup_copies if c.copy_type == "primary"), None)
@@ -348,56 +447,78 @@ class VerificationService:
             return TestResult.FAILED, {**details, "error": "No valid primary backup copy found"}
 
         source_path = Path(primary_copy.storage_path)
-        if not source_path.exists():
+        store_root = parse_dedup_destination(primary_copy.storage_path)
+        if store_root is not None and not virtual:
+            return TestResult.FAILED, {**details, "error": "Deduplicated copies are restore-tested virtually"}
+        if store_root is None and not source_path.exists():
             return TestResult.FAILED, {**details, "error": f"Backup source not found: {source_path}"}
 
         overall_result = TestResult.SUCCESS
         verified_files = 0
         failed_files = 0
+        bytes_restored = 0
+        restore_seconds = 0.0
         errors = []
 
         try:
-            # Determine files to test
-            if sample_files:
+            # Determine files to test (a deduplicated copy holds one file per recipe)
+            if store_root is not None:
+                files_to_test = [source_path]
+            elif sample_files:
                 # Use specified files
                 files_to_test = [source_path / f for f in sample_files if (source_path / f).exists()]
             else:
-                # Use random sample (up to 10 files)
+                # Use a stratified random sample sized for the target confidence
                 if source_path.is_dir():
                     all_files = [f for f in source_path.rglob("*") if f.is_file()]
-                    import random
-
-                    files_to_test = random.sample(all_files, min(10, len(all_files)))
+                    files_to_test, sampling = self._select_sample(source_path, all_files)
                 else:
                     files_to_test = [source_path]
 
-            # Restore and verify each file
-            for file_path in files_to_test:
-                try:
-                    if source_path.is_dir():
-                        relative_path = file_path.relative_to(source_path)
-                    else:
-                        relative_path = file_path.name
-
-                    target_file = restore_path / relative_path
-                    target_file.parent.mkdir(parents=True, exist_ok=True)
-
-                    # Restore file
-                    shutil.copy2(file_path, target_file)
+            if virtual:
+                if store_root is not None:
+                    restore = self._virtual_restore_recipe(store_root, job.id)
+                else:
+                    restore = self._virtual_restore(source_path, files_to_test)
+                verified_files = restore["files_verified"]
+                failed_files = len(files_to_test) - verified_files
+                bytes_restored = restore["bytes_restored"]
+                restore_seconds = restore["seconds"]
+                errors.extend(restore["errors"])
+                details["reference"] = restore["reference"]
+            else:
+                # Restore and verify each file
+                for file_path in files_to_test:
+                    try:
+                        if source_path.is_dir():
+                            relative_path = file_path.relative_to(source_path)
+                        else:
+                            relative_path = file_path.name
 
-                    # Verify
-                    verification_result = self._verify_restored_file(file_path, target_file, ChecksumAlgorithm.SHA256)
+                        target_file = restore_path / relative_path
+                        target_file.parent.mkdir(parents=True, exist_ok=True)
 
-                    if verification_result["status"] == VerificationStatus.SUCCESS:
-                        verified_files += 1
-                    else:
+                        # Restore file
+                        started = time.monotonic()
+                        reflink_or_copy(file_path, target_file)
+                        restore_seconds += time.monotonic() - started
+                        bytes_restored += target_file.stat().st_size
+
+                        # Verify
+                        verification_result = self._verify_restored_file(
+                            file_path, target_file, ChecksumAlgorithm.SHA256
+                        )
+
+                        if verification_result["status"] == VerificationStatus.SUCCESS:
+                            verified_files += 1
+                        else:
+                            failed_files += 1
+                            errors.append(f"Verification failed: {relative_path}")
+
+                    except Exception as e:
+                        logger.error(f"Error restoring {file_path}: {e}")
                         failed_files += 1
-                        errors.append(f"Verification failed: {relative_path}")
-
-                except Exception as e:
-                    logger.error(f"Error restoring {file_path}: {e}")
-                    failed_files += 1
-                    errors.append(f"Restore error for {file_path.name}: {str(e)}")
+                        errors.append(f"Restore error for {file_path.name}: {str(e)}")
 
             # Determine overall result
             if failed_files == 0:
@@ -425,9 +546,221 @@ class VerificationService:
         details["failed_files"] = failed_files
         details["errors"] = errors
         details["success_rate"] = (verified_files / len(files_to_test) * 100) if files_to_test else 0.0
+        details.update(self._restore_throughput(bytes_restored, restore_seconds))
+        if "sampling" in locals():
+            details["sampling"] = self._sampling_result(sampling, failed_files)
 
         return overall_result, details
 
+    def _select_sample(self, source_path: Path, files: List[Path]) -> Tuple[List[Path], Dict]:
+        """
+        Pick files to verify by stratified random sampling over size buckets and directories.
+
+        Args:
+            source_path: Backup root
+            files: All files of the backup
+
+        Returns:
+            Tuple of (sampled files, sampling parameters)
+        """
+        strata = stratify([(f, f.stat().st_size) for f in files], source_path)
+        sample_size = required_sample_size(len(files), self.sample_confidence, self.sample_error_rate)
+        sample = stratified_sample(strata, sample_size)
+
+        logger.debug(f"Sampled {len(sample)} of {len(files)} files from {len(strata)} strata in {source_path}")
+        return sample, {"population": len(files), "sample_size": len(sample), "strata": len(strata)}
+
+    def _sampling_result(self, sampling: Dict, failures: int) -> Dict:
+        """Sampling parameters plus the confidence achieved with the observed failures."""
+        confidence = achieved_confidence(
+            sampling["population"], sampling["sample_size"], failures, self.sample_error_rate
+        )
+        return {
+            **sampling,
+            "failures": failures,
+            "target_confidence": self.sample_confidence,
+            "tolerated_error_rate": self.sample_error_rate,
+            "achieved_confidence": round(confidence, 4),
+            "observed_error_rate": round(failures / sampling["sample_size"], 4) if sampling["sample_size"] else 0.0,
+        }
+
+    def _virtual_restore(self, source_path: Path, files: List[Path], check_missing: bool = False) -> Dict:
+        """
+        Restore files virtually: stream each one through the restore read path and hash it
+        in memory instead of writing it out, then compare it with its recorded reference.
+
+        Compressed containers are decoded and compared with the source checksum stored in
+        their footer. Plain files are compared with the copy's Merkle manifest, or else
+        with the source checksum recorded in the tree copy's run manifest. A file without
+        any reference is restored but not counted as verified. Reads are reported to the I/O
+        scheduler at restore priority, so they pre-empt backups writing to the same target.
+
+        Args:
+            source_path: Backup copy (file or directory)
+            files: Files of the copy to restore
+            check_missing: Report manifest entries that are not among ``files`` (full restores)
+
+        Returns:
+            {"files_restored", "files_verified", "bytes_restored", "seconds", "reference", "errors"}
+        """
+        manifest_path = merkle_path_for(source_path)
+        manifest = MerkleManifest(manifest_path) if os.path.exists(manifest_path) else None
+        checksums = self._recorded_checksums(source_path)
+        references = set()
+        result = {
+            "files_restored": 0,
+            "files_verified": 0,
+            "bytes_restored": 0,
+            "errors": [],
+        }
+        start = time.monotonic()
+
+        try:
+            block_size = manifest.block_size if manifest else self.merkle_block_size
+            algorithm = manifest.algorithm if manifest else ChecksumAlgorithm.SHA256
+            restored = set()
+
+            with get_io_scheduler().stream(str(source_path), PRIORITY_RESTORE) as io_stream:
+                for file_path in files:
+                    if source_path.is_file():
+                        relative_path = file_path.name
+                    else:
+                        relative_path = file_path.relative_to(source_path).as_posix()
+
+                    try:
+                        if is_compressed_container(str(file_path)):
+                            reference = "source_checksum"
+                            size, checksum, recorded = self._decode_container(file_path)
+                            io_stream.throttle(size)
+                            issue = None if checksum == recorded else "restored data does not match the source checksum"
+                        elif manifest and manifest.file_tree(relative_path):
+                            reference = "merkle_manifest"
+                            expected = manifest.file_tree(relative_path)
+                            tree = MerkleTree.from_file(file_path, block_size, algorithm, io_stream.throttle)
+                            size = tree.size
+                            issue = None if expected.root == tree.root else f"blocks {expected.diff(tree)[:10]}"
+                        elif relative_path in checksums:
+                            reference = "source_checksum"
+                            size, checksum = self._stream_checksum(file_path, io_stream.throttle)
+                            matches = checksum == checksums[relative_path]
+                            issue = None if matches else "does not match the source checksum"
+                        else:
+                            reference = None
+                            size, _ = self._stream_checksum(file_path, io_stream.throttle)
+                            issue = "not in Merkle manifest" if manifest else "no recorded checksum to compare with"
+                    except (OSError, CompressionError) as e:
+                        logger.error(f"Failed to restore {file_path}: {e}")
+                        result["errors"].append(f"Restore failed for {relative_path}: {str(e)}")
+                        continue
+
+                    restored.add(relative_path)
+                    result["files_restored"] += 1
+                    result["bytes_restored"] += size
+                    if reference:
+                        references.add(reference)
+
+                    if issue:
+                        result["errors"].append(f"Verification failed for {relative_path}: {issue}")
+                    else:
+                        result["files_verified"] += 1
+
+            if manifest and check_missing:
+                for relative_path in manifest.paths():
+                    if relative_path not in restored:
+                        result["errors"].append(f"Restore failed for {relative_path}: missing from backup")
+        finally:
+            if manifest:
+                manifest.close()
+
+        result["reference"] = "+".join(sorted(references)) or "none"
+        result["seconds"] = time.monotonic() - start
+        return result
+
+    def _virtual_restore_recipe(self, store_root: str, job_id: int) -> Dict:
+        """
+        Restore the job's newest recipe from a deduplicating chunk store in memory and
+        compare the rebuilt file with the source checksum recorded in the recipe.
+
+        Returns:
+            Same shape as _virtual_restore
+        """
+        result = {"files_restored": 0, "files_verified": 0, "bytes_restored": 0, "reference": "none", "errors": []}
+        start = time.monotonic()
+
+        if not os.path.exists(os.path.join(store_root, "index.db")):
+            result["errors"].append(f"Restore failed: deduplication store not found: {store_root}")
+        else:
+            with ChunkStore(store_root) as store:
+                recipes = store.list_recipes(job_recipe_prefix(job_id))
+                if not recipes:
+                    result["errors"].append(f"Restore failed: no recipe of job {job_id} in {store_root}")
+                else:
+                    recipe = recipes[-1]
+                    file_hash = hashlib.sha256()
+                    try:
+                        for chunk in store.iter_restore(recipe["name"]):
+                            file_hash.update(chunk)
+                            result["bytes_restored"] += len(chunk)
+                    except (OSError, ChunkIntegrityError) as e:
+                        logger.error(f"Failed to restore recipe {recipe['name']}: {e}")
+                        result["errors"].append(f"Restore failed for {recipe['name']}: {str(e)}")
+                    else:
+                        result["files_restored"] = 1
+                        result["reference"] = "source_checksum"
+                        if file_hash.hexdigest() == recipe["checksum"]:
+                            result["files_verified"] = 1
+                        else:
+                            result["errors"].append(
+                                f"Verification failed for {recipe['name']}: does not match the source checksum"
+                            )
+
+        result["seconds"] = time.monotonic() - start
+        return result
+
+    @staticmethod
+    def _recorded_checksums(source_path: Path) -> Dict[str, str]:
+        """Source checksums of the files stored in a tree copy's runs ({} without a run manifest)."""
+        path = manifest_path_for(str(source_path))
+        if source_path.is_file() or not os.path.exists(path):
+            return {}
+        with BackupManifest(path) as manifest:
+            return manifest.stored_checksums()
+
+    @staticmethod
+    def _decode_container(file_path: Path) -> Tuple[int, str, str]:
+        """Decode a compressed container; returns (raw size, SHA-256 of the decoded data, recorded SHA-256)."""
+        file_hash = hashlib.sha256()
+        size = 0
+        with CompressedFileReader(str(file_path)) as reader:
+            for block in reader.iter_blocks():
+                file_hash.update(block)
+                size += len(block)
+            return size, file_hash.hexdigest(), reader.sha256.hex()
+
+    @staticmethod
+    def _stream_checksum(
+        file_path: Path, progress_callback: Optional[Callable[[int], None]] = None, chunk_size: int = DEFAULT_BLOCK_SIZE
+    ) -> Tuple[int, str]:
+        """Read a file once; returns (size, SHA-256). progress_callback gets the byte count of every chunk."""
+        file_hash = hashlib.sha256()
+        size = 0
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                if progress_callback:
+                    progress_callback(len(chunk))
+                file_hash.update(chunk)
+                size += len(chunk)
+        return size, file_hash.hexdigest()
+
+    @staticmethod
+    def _restore_throughput(bytes_restored: int, seconds: float) -> Dict:
+        """Restore volume and rate (an RTO estimate: backup size / throughput)."""
+        return {
+            "bytes_restored": bytes_restored,
+            "restore_seconds": round(seconds, 3),
+            "restore_throughput_mb_s": round(bytes_restored / (1024 * 1024) / seconds, 2) if seconds > 0 else 0.0,
+        }
+
     def _execute_integrity_check(self, job: BackupJob, backup_copies: List[BackupCopy]) -> Tuple[TestResult, Dict]:
         """
         Execute integrity check (checksum validation without restoration).
@@ -450,6 +783,7 @@ class VerificationService:
         total_files_checked = 0
         total_files_valid = 0
         errors = []
+        manifests = []
 
         for copy in backup_copies:
             if not copy.storage_path:
@@ -468,12 +802,56 @@ class VerificationService:
                 "files_checked": 0,
                 "files_valid": 0,
             }
+            manifest_path = merkle_path_for(source_path)
 
             try:
-                # Calculate checksums for all files
-                if source_path.is_file():
+                if os.path.exists(manifest_path):
+                    # Block-level verification against the stored Merkle manifest
+                    with MerkleManifest(manifest_path) as manifest:
+                        outcome = manifest.verify(source_path)
+                        copy_details["merkle_root"] = manifest.root
+                        # Files rewritten by a backup since the scrubber last hashed the copy
+                        unhashed = self._check_unhashed_files(source_path, manifest.unhashed_files(source_path))
+
+                    outcome["files_checked"] += unhashed["files_checked"]
+                    outcome["files_valid"] += unhashed["files_valid"]
+                    copy_details["files_checked"] = outcome["files_checked"]
+                    copy_details["files_valid"] = outcome["files_valid"]
+                    total_files_checked += outcome["files_checked"]
+                    total_files_valid += outcome["files_valid"]
+
+                    if unhashed["mismatched"]:
+                        copy_details["mismatched_files"] = unhashed["mismatched"]
+                        errors.append(
+                            f"{len(unhashed['mismatched'])} files do not match their source checksum "
+                            f"in {copy.copy_type} copy"
+                        )
+                        overall_result = TestResult.FAILED
+                    if unhashed["unverified"]:
+                        # Read but not compared: never reported as a clean check
+                        copy_details["unverified_files"] = unhashed["unverified"]
+                        errors.append(
+                            f"{len(unhashed['unverified'])} files without a reference checksum "
+                            f"in {copy.copy_type} copy"
+                        )
+                    if outcome["corrupted"]:
+                        copy_details["corrupted_blocks"] = outcome["corrupted"]
+                        copy_details["block_size"] = outcome["block_size"]
+                        errors.append(
+                            f"{len(outcome['corrupted'])} files with corrupted blocks in {copy.copy_type} copy"
+                        )
+                        overall_result = TestResult.FAILED
+                    if outcome["missing"]:
+                        copy_details["missing_files"] = outcome["missing"]
+                        errors.append(f"{len(outcome['missing'])} files missing from {copy.copy_type} copy")
+                    manifests.append((copy, manifest_path))
+
+                # Calculate checksums for all files (always read: this is an integrity check of the copy)
+                elif source_path.is_file():
                     # Single file
-                    checksum = self.checksum_service.calculate_checksum(source_path, ChecksumAlgorithm.SHA256)
+                    checksum = self.checksum_service.calculate_checksum(
+                        source_path, ChecksumAlgorithm.SHA256, force_rehash=True
+                    )
                     copy_details["files_checked"] = 1
                     copy_details["files_valid"] = 1
                     copy_details["checksum"] = checksum
@@ -483,7 +861,9 @@ class VerificationService:
                 elif source_path.is_dir():
                     # Directory - check all files
                     files = [f for f in source_path.rglob("*") if f.is_file()]
-                    checksums = self.checksum_service.calculate_checksums_parallel(files, ChecksumAlgorithm.SHA256)
+                    checksums = self.checksum_service.calculate_checksums_parallel(
+                        files, ChecksumAlgorithm.SHA256, force_rehash=True
+                    )
 
                     copy_details["files_checked"] = len(files)
                     copy_details["files_valid"] = len(checksums)
@@ -495,6 +875,17 @@ class VerificationService:
                         errors.append(f"{missing} files failed checksum calculation in {copy.copy_type} copy")
                         overall_result = TestResult.WARNING
 
+                # The first complete check establishes the reference for block-level checks
+                if (
+                    self.create_merkle_manifests
+                    and "merkle_root" not in copy_details
+                    and copy_details["files_valid"] == copy_details["files_checked"]
+                ):
+                    with MerkleManifest.build(source_path, manifest_path, block_size=self.merkle_block_size) as manifest:
+                        copy_details["merkle_root"] = manifest.root
+                    copy_details["merkle_manifest_created"] = True
+                    manifests.append((copy, manifest_path))
+
             except Exception as e:
                 logger.error(f"Error checking integrity for copy {copy.id}: {e}", exc_info=True)
                 errors.append(f"Integrity check error for {copy.copy_type}: {str(e)}")
@@ -502,6 +893,8 @@ class VerificationService:
 
             details["copies_checked"].append(copy_details)
 
+        details["copy_comparison"] = self._compare_copy_manifests(manifests, errors)
+
         details["total_files_checked"] = total_files_checked
         details["total_files_valid"] = total_files_valid
         details["errors"] = errors
@@ -515,6 +908,74 @@ class VerificationService:
 
         return overall_result, details
 
+    def _check_unhashed_files(self, source_path: Path, paths: List[str]) -> Dict:
+        """
+        Check files of a copy that its Merkle manifest does not cover against the source
+        checksums recorded in the tree copy's run manifest.
+
+        Files without a recorded checksum are read (so unreadable files still fail) but
+        reported as unverified.
+
+        Returns:
+            {"files_checked", "files_valid", "mismatched": [path], "unverified": [path]}
+        """
+        checksums = self._recorded_checksums(source_path)
+        result = {"files_checked": 0, "files_valid": 0, "mismatched": [], "unverified": []}
+        for relative_path in paths:
+            file_path = source_path if source_path.is_file() else source_path / relative_path
+            _, checksum = self._stream_checksum(file_path)
+            result["files_checked"] += 1
+            if relative_path not in checksums:
+                result["unverified"].append(relative_path)
+            elif checksum == checksums[relative_path]:
+                result["files_valid"] += 1
+            else:
+                result["mismatched"].append(relative_path)
+        return result
+
+    def _compare_copy_manifests(self, manifests: List[Tuple[BackupCopy, str]], errors: List[str]) -> List[Dict]:
+        """
+        Compare the Merkle manifests of secondary/offsite copies with the primary copy.
+
+        Only plain copies are compared; compressed or encrypted copies legitimately
+        differ byte for byte. Equal backup-level roots are resolved without reading
+        any file tree.
+
+        Args:
+            manifests: (copy, manifest path) pairs of copies with manifests
+            errors: Error list that differing copies are reported to
+
+        Returns:
+            One entry per compared copy
+        """
+        plain = [(copy, path) for copy, path in manifests if not copy.is_compressed and not copy.is_encrypted]
+        primary = next(((copy, path) for copy, path in plain if copy.copy_type == "primary"), None)
+        if primary is None:
+            return []
+
+        comparisons = []
+        with MerkleManifest(primary[1]) as reference:
+            for copy, path in plain:
+                if copy is primary[0]:
+                    continue
+                with MerkleManifest(path) as manifest:
+                    diff = reference.diff(manifest)
+                comparisons.append(
+                    {
+                        "copy_type": copy.copy_type,
+                        "identical": diff["identical"],
+                        "added": diff["added"],
+                        "removed": diff["removed"],
+                        "changed_blocks": diff["changed"],
+                    }
+                )
+                if not diff["identical"]:
+                    errors.append(
+                        f"{copy.copy_type} copy differs from primary: {len(diff['changed'])} changed, "
+                        f"{len(diff['added'])} added, {len(diff['removed'])} removed files"
+                    )
+        return comparisons
+
     def _verify_restored_file(self, source_path: Path, restored_path: Path, algorithm: ChecksumAlgorithm) -> Dict:
         """
         Verify a restored file against the original.
@@ -528,7 +989,8 @@ class VerificationService:
             Verification result dictionary
         """
         try:
-            status, details = self.file_validator.verify_file(source_path, restored_path, algorithm)
+            # Both sides are local files: byte comparison stops at the first difference
+            status, details = self.file_validator.verify_file(source_path, restored_path, algorithm, mode="compare")
             return {"status": status, "details": details}
         except Exception as e:
             logger.error(f"Error verifying restored file: {e}")
@@ -735,5 +1197,17 @@ def get_verification_service() -> VerificationService:
     """
     global _verification_service_instance
     if _verification_service_instance is None:
-        _verification_service_instance = VerificationService()
+        cache = None
+        if has_app_context() and current_app.config.get("CHECKSUM_CACHE_PATH"):
+            cache = PersistentChecksumCache(
+                current_app.config["CHECKSUM_CACHE_PATH"],
+                max_entries=current_app.config.get("CHECKSUM_CACHE_MAX_ENTRIES", 1_000_000),
+            )
+        config = current_app.config if has_app_context() else {}
+        _verification_service_instance = VerificationService(
+            checksum_service=ChecksumService(default_algorithm=ChecksumAlgorithm.SHA256, cache=cache),
+            sample_confidence=config.get("RESTORE_SAMPLE_CONFIDENCE", DEFAULT_CONFIDENCE),
+            sample_error_rate=config.get("RESTORE_SAMPLE_ERROR_RATE", DEFAULT_TOLERATED_ERROR_RATE),
+            restore_mode=config.get("RESTORE_VERIFICATION_MODE", "virtual"),
+        )
     return _verification_service_instance
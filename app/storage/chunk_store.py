@@ -0,0 +1,585 @@
+"""
+Deduplicating Chunk Store
+コンテンツアドレス型の重複排除チャンクストア
+
+- FastCDCでソースをコンテンツ定義チャンクに分割し、SHA-256をキーとして1度だけ保存
+- チャンク本体は追記専用のパックファイル（packs/NNNNNN.pack）に格納し、小ファイルの大量生成を避ける
+- SQLiteインデックス: チャンク（パック位置・参照数）とバックアップごとのレシピ（チャンク順序）
+- リストアはレシピ順にチャンクをストリーミングし、チャンクごとにハッシュを検証
+
+インデックスはパックのfsync後に1トランザクションでコミットするため、
+書き込み途中で失敗してもパック末尾に未参照データが残るだけでインデックスは整合する。
+レシピ削除や失敗した書き込みで生じた未参照領域は compact() でパックを書き直して解放する。
+レシピのチャンク列はバッチごとにトランザクション内へ書き込み、ファイル全体をメモリに保持しない。
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.core.io_scheduler import PRIORITY_BACKGROUND, PRIORITY_RESTORE, get_io_scheduler
+from app.storage.chunking import FastCDC
+
+try:
+    import fcntl
+except ImportError:  # Windows（プロセス間ロックなし）
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# 送信先パスの接頭辞（例: "dedup:/mnt/backup/chunks"）
+DEDUP_PREFIX = "dedup:"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    hash BLOB PRIMARY KEY,
+    pack INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    refs INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS recipes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE,
+    size INTEGER NOT NULL,
+    checksum TEXT NOT NULL,
+    chunk_count INTEGER NOT NULL,
+    stored_bytes INTEGER NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS recipe_chunks (
+    recipe_id INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    hash BLOB NOT NULL,
+    PRIMARY KEY (recipe_id, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS chunks_pack ON chunks (pack, offset);
+"""
+
+# インデックス照会を1クエリにまとめるチャンク数（SQLiteの変数上限未満）
+_LOOKUP_BATCH = 500
+
+# ストアのルートごとのプロセス内ロック（同じルートを開くインスタンス間で共有）
+_root_locks: Dict[str, threading.Lock] = {}
+_root_locks_guard = threading.Lock()
+
+
+def _root_lock(root: Path) -> threading.Lock:
+    key = os.path.realpath(root)
+    with _root_locks_guard:
+        return _root_locks.setdefault(key, threading.Lock())
+
+
+def job_recipe_prefix(job_id: int) -> str:
+    """ジョブのバックアップのレシピ名の接頭辞（レシピ名は "<接頭辞><開始時刻>"）"""
+    return f"job-{job_id}/"
+
+
+def parse_dedup_destination(destination: str) -> Optional[str]:
+    """
+    送信先が重複排除ストア指定ならストアのルートパスを返す
+
+    Args:
+        destination: 送信先パス
+
+    Returns:
+        ストアのルートパス（通常の送信先ならNone）
+    """
+    if destination.startswith(DEDUP_PREFIX):
+        return destination[len(DEDUP_PREFIX) :]
+    return None
+
+
+class ChunkIntegrityError(Exception):
+    """チャンクまたはリストアデータのハッシュ不一致"""
+
+
+class _PackWriter:
+    """パックファイルへの追記（ストアの排他ロック保持中のみ使用）"""
+
+    def __init__(self, pack_dir: Path, pack_size: int, pack_id: int):
+        self.pack_dir = pack_dir
+        self.pack_size = pack_size
+        self._open(pack_id)
+
+    def _open(self, pack_id: int) -> None:
+        self.pack_id = pack_id
+        self.file = open(self.pack_dir / f"{pack_id:06d}.pack", "ab")
+        # 追記位置はロック取得後の実ファイルサイズ（他のライターが書いた末尾の後ろ）
+        self.offset = os.fstat(self.file.fileno()).st_size
+
+    def append(self, data: bytes) -> Tuple[int, int]:
+        """データを追記し (pack_id, offset) を返す（ローテーションサイズ超過なら次のパックへ）"""
+        if self.offset >= self.pack_size:
+            self.sync()
+            self.file.close()
+            self._open(self.pack_id + 1)
+
+        offset = self.offset
+        self.file.write(data)
+        self.offset += len(data)
+        return self.pack_id, offset
+
+    def sync(self) -> None:
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class ChunkStore:
+    """
+    重複排除チャンクストア
+
+    書き込み（write / delete_recipe）はルート単位のプロセス内ロックと <root>/lock のflockで直列化するため、
+    同じストアを開く複数のインスタンス・プロセスから同時に書き込める。
+    """
+
+    def __init__(
+        self,
+        root: str,
+        min_chunk_size: int = 16 * 1024,
+        avg_chunk_size: int = 64 * 1024,
+        max_chunk_size: int = 256 * 1024,
+        pack_size: int = 512 * 1024 * 1024,
+    ):
+        """
+        Args:
+            root: ストアのルートディレクトリ
+            min_chunk_size: 最小チャンクサイズ
+            avg_chunk_size: 平均チャンクサイズ（2の累乗）
+            max_chunk_size: 最大チャンクサイズ
+            pack_size: パックファイルのローテーションサイズ
+        """
+        self.root = Path(root)
+        self.pack_dir = self.root / "packs"
+        self.pack_dir.mkdir(parents=True, exist_ok=True)
+        self.pack_size = pack_size
+        self.chunker = FastCDC(min_size=min_chunk_size, avg_size=avg_chunk_size, max_size=max_chunk_size)
+
+        self._conn = sqlite3.connect(str(self.root / "index.db"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = _root_lock(self.root)
+        # リストアの読み取りはストアのターゲットで高優先度ストリームとして扱い、バックアップに割り込む
+        self.io_scheduler = get_io_scheduler()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "ChunkStore":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def write(self, source: str, name: str, progress_callback: Optional[Callable] = None) -> Dict[str, Any]:
+        """
+        ファイルを重複排除して格納
+
+        Args:
+            source: ソースファイルパス
+            name: レシピ名（バックアップ識別子、一意）
+            progress_callback: 進捗コールバック(bytes_processed, total_bytes)
+
+        Returns:
+            {"recipe_id": int, "name": str, "bytes_copied": 論理バイト数, "stored_bytes": 新規格納バイト数,
+             "chunks": int, "new_chunks": int, "dedup_ratio": 重複排除されたバイトの割合(0.0-1.0),
+             "checksum": ソース全体のSHA-256, "duration": float}
+
+        Raises:
+            IOError/OSError: 読み取り・書き込み失敗
+            ValueError: 同名のレシピが存在する
+        """
+        start = time.monotonic()
+        total = os.path.getsize(source)
+
+        file_hash = hashlib.sha256()
+        stored_bytes = 0
+        processed = 0
+        chunk_count = 0
+        new_count = 0
+
+        with self._exclusive():
+            if self._conn.execute("SELECT 1 FROM recipes WHERE name = ?", (name,)).fetchone():
+                raise ValueError(f"Recipe already exists: {name}")
+
+            # パックのfsync後にコミット（失敗時はロールバックし、パック末尾の未参照データのみ残る）
+            with self._conn:
+                recipe_id = self._conn.execute(
+                    "INSERT INTO recipes (name, size, checksum, chunk_count, stored_bytes, created_at) "
+                    "VALUES (?, 0, '', 0, 0, ?)",
+                    (name, datetime.utcnow().isoformat()),
+                ).lastrowid
+
+                batch: List[bytes] = []
+                batch_data: Dict[bytes, bytes] = {}
+                pack = self._open_pack()
+                try:
+                    with open(source, "rb", buffering=0) as src:
+                        for chunk in self.chunker.chunks(src):
+                            file_hash.update(chunk)
+                            digest = hashlib.sha256(chunk).digest()
+                            batch.append(digest)
+                            if digest not in batch_data:
+                                batch_data[digest] = bytes(chunk)
+                            processed += len(chunk)
+
+                            if len(batch) >= _LOOKUP_BATCH:
+                                written, new = self._store_batch(recipe_id, chunk_count, batch, batch_data, pack)
+                                stored_bytes += written
+                                new_count += new
+                                chunk_count += len(batch)
+                                batch = []
+                                batch_data = {}
+
+                            if progress_callback:
+                                progress_callback(processed, total)
+
+                    written, new = self._store_batch(recipe_id, chunk_count, batch, batch_data, pack)
+                    stored_bytes += written
+                    new_count += new
+                    chunk_count += len(batch)
+                    pack.sync()
+                finally:
+                    pack.close()
+
+                self._conn.execute(
+                    "UPDATE recipes SET size = ?, checksum = ?, chunk_count = ?, stored_bytes = ? WHERE id = ?",
+                    (processed, file_hash.hexdigest(), chunk_count, stored_bytes, recipe_id),
+                )
+
+        duration = time.monotonic() - start
+        dedup_ratio = round(1 - stored_bytes / processed, 4) if processed else 0.0
+
+        logger.info(
+            "Deduplicated write completed",
+            extra={
+                "store": str(self.root),
+                "recipe": name,
+                "bytes": processed,
+                "stored_bytes": stored_bytes,
+                "dedup_ratio": dedup_ratio,
+                "duration": duration,
+            },
+        )
+
+        return {
+            "recipe_id": recipe_id,
+            "name": name,
+            "bytes_copied": processed,
+            "stored_bytes": stored_bytes,
+            "chunks": chunk_count,
+            "new_chunks": new_count,
+            "dedup_ratio": dedup_ratio,
+            "checksum": file_hash.hexdigest(),
+            "duration": duration,
+        }
+
+    def iter_restore(self, name: str, priority: int = PRIORITY_RESTORE) -> Iterator[bytes]:
+        """
+        レシピ順にチャンクをストリーミング
+
+        Args:
+            name: レシピ名
+            priority: I/Oスケジューラーでの優先度（JobPriority、既定はバックアップに割り込むリストア優先度）
+
+        Yields:
+            チャンクデータ（ハッシュ検証済み）
+
+        Raises:
+            KeyError: レシピが存在しない
+            ChunkIntegrityError: チャンクのハッシュ不一致
+        """
+        recipe = self.get_recipe(name)
+        if recipe is None:
+            raise KeyError(name)
+
+        rows = self._conn.execute(
+            "SELECT rc.hash, c.pack, c.offset, c.length FROM recipe_chunks rc "
+            "JOIN chunks c ON c.hash = rc.hash WHERE rc.recipe_id = ? ORDER BY rc.seq",
+            (recipe["id"],),
+        )
+
+        handles: Dict[int, int] = {}
+        with self.io_scheduler.stream(str(self.root), priority) as io_stream:
+            try:
+                for digest, pack_id, offset, length in rows:
+                    fd = handles.get(pack_id)
+                    if fd is None:
+                        fd = handles[pack_id] = os.open(str(self._pack_path(pack_id)), os.O_RDONLY)
+
+                    io_stream.throttle(length)
+                    data = os.pread(fd, length, offset)
+                    if len(data) != length or hashlib.sha256(data).digest() != digest:
+                        raise ChunkIntegrityError(f"Chunk {digest.hex()} in pack {pack_id} is corrupt")
+                    yield data
+            finally:
+                for fd in handles.values():
+                    os.close(fd)
+
+    def restore(
+        self,
+        name: str,
+        destination: str,
+        progress_callback: Optional[Callable] = None,
+        priority: int = PRIORITY_RESTORE,
+    ) -> Dict[str, Any]:
+        """
+        レシピからファイルを復元
+
+        Args:
+            name: レシピ名
+            destination: 復元先ファイルパス
+            progress_callback: 進捗コールバック(bytes_restored, total_bytes)
+            priority: I/Oスケジューラーでの優先度（JobPriority）
+
+        Returns:
+            {"bytes_restored": int, "checksum": str, "duration": float}
+
+        Raises:
+            KeyError: レシピが存在しない
+            ChunkIntegrityError: チャンクまたは全体のハッシュ不一致
+        """
+        start = time.monotonic()
+        recipe = self.get_recipe(name)
+        if recipe is None:
+            raise KeyError(name)
+
+        file_hash = hashlib.sha256()
+        restored = 0
+
+        Path(destination).parent.mkdir(parents=True, exist_ok=True)
+        with open(destination, "wb") as dst:
+            for data in self.iter_restore(name, priority):
+                dst.write(data)
+                file_hash.update(data)
+                restored += len(data)
+                if progress_callback:
+                    progress_callback(restored, recipe["size"])
+
+        checksum = file_hash.hexdigest()
+        if checksum != recipe["checksum"]:
+            raise ChunkIntegrityError(f"Restored checksum mismatch for {name}: {checksum} != {recipe['checksum']}")
+
+        return {"bytes_restored": restored, "checksum": checksum, "duration": time.monotonic() - start}
+
+    def get_recipe(self, name: str) -> Optional[Dict[str, Any]]:
+        """レシピ情報を取得"""
+        row = self._conn.execute(
+            "SELECT id, name, size, checksum, chunk_count, stored_bytes, created_at FROM recipes WHERE name = ?",
+            (name,),
+        ).fetchone()
+        if row is None:
+            return None
+        keys = ("id", "name", "size", "checksum", "chunk_count", "stored_bytes", "created_at")
+        return dict(zip(keys, row))
+
+    def list_recipes(self, prefix: str = "") -> List[Dict[str, Any]]:
+        """名前が prefix で始まるレシピ情報の一覧（作成順）"""
+        rows = self._conn.execute(
+            "SELECT id, name, size, checksum, chunk_count, stored_bytes, created_at FROM recipes "
+            "WHERE substr(name, 1, ?) = ? ORDER BY created_at, id",
+            (len(prefix), prefix),
+        )
+        keys = ("id", "name", "size", "checksum", "chunk_count", "stored_bytes", "created_at")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def delete_recipe(self, name: str) -> bool:
+        """
+        レシピを削除しチャンクの参照数を減らす
+
+        参照数0のチャンクはインデックスから削除する（パック内の領域は compact() まで残る）。
+
+        Returns:
+            削除したならTrue
+        """
+        with self._exclusive(), self._conn:
+            recipe = self.get_recipe(name)
+            if recipe is None:
+                return False
+
+            self._conn.execute(
+                "UPDATE chunks SET refs = refs - (SELECT COUNT(*) FROM recipe_chunks rc "
+                "WHERE rc.recipe_id = ? AND rc.hash = chunks.hash) "
+                "WHERE hash IN (SELECT hash FROM recipe_chunks WHERE recipe_id = ?)",
+                (recipe["id"], recipe["id"]),
+            )
+            self._conn.execute("DELETE FROM chunks WHERE refs <= 0")
+            self._conn.execute("DELETE FROM recipe_chunks WHERE recipe_id = ?", (recipe["id"],))
+            self._conn.execute("DELETE FROM recipes WHERE id = ?", (recipe["id"],))
+            return True
+
+    def compact(self, min_garbage_ratio: float = 0.25, priority: int = PRIORITY_BACKGROUND) -> Dict[str, Any]:
+        """
+        未参照領域の多いパックを書き直してディスク領域を解放
+
+        未参照バイトの割合が min_garbage_ratio 以上のパックは、参照中のチャンクを新しいパックへ
+        コピーしてインデックスを付け替えた後に削除する（参照中のチャンクが無いパックはそのまま削除）。
+        旧パックはインデックスのコミット後に削除するため、途中で失敗しても未参照のパックが残るだけ。
+        実行中のリストアが旧パックを開く前に削除されると読めなくなるため、リストアと重ならない
+        保守処理（保持期間の適用後など）から呼ぶ。
+
+        Args:
+            min_garbage_ratio: 書き直すパックの未参照バイトの割合の下限
+            priority: I/Oスケジューラーでの優先度（JobPriority）
+
+        Returns:
+            {"packs_compacted", "bytes_reclaimed", "unreferenced_bytes"}
+            （unreferenced_bytes は割合が下限未満のため残した未参照バイト）
+
+        Raises:
+            ChunkIntegrityError: コピーするチャンクのハッシュ不一致（そのパックは書き直さない）
+        """
+        compacted = reclaimed = unreferenced = 0
+        with self._exclusive():
+            live = dict(self._conn.execute("SELECT pack, SUM(length) FROM chunks GROUP BY pack"))
+            packs = sorted(self.pack_dir.glob("*.pack"))
+            writer = None
+            with self.io_scheduler.stream(str(self.root), priority) as io_stream:
+                try:
+                    for path in packs:
+                        pack_id = int(path.stem)
+                        size = path.stat().st_size
+                        garbage = size - live.get(pack_id, 0)
+                        if garbage <= 0:
+                            continue
+                        if garbage < size * min_garbage_ratio:
+                            unreferenced += garbage
+                            continue
+
+                        if live.get(pack_id):
+                            if writer is None:
+                                # 書き直し先は既存のどのパックよりも後ろ（このループで再び対象にならない）
+                                writer = _PackWriter(self.pack_dir, self.pack_size, int(packs[-1].stem) + 1)
+                            with self._conn:
+                                self._move_chunks(pack_id, writer, io_stream)
+                                writer.sync()
+                        path.unlink()
+                        compacted += 1
+                        reclaimed += garbage
+                finally:
+                    if writer is not None:
+                        writer.close()
+
+        if compacted:
+            logger.info(f"Compacted {compacted} packs in {self.root}: {reclaimed} bytes reclaimed")
+        return {"packs_compacted": compacted, "bytes_reclaimed": reclaimed, "unreferenced_bytes": unreferenced}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        ストア全体の統計
+
+        Returns:
+            {"recipes", "logical_bytes", "unique_chunks", "unique_bytes", "dedup_ratio"}
+        """
+        recipes, logical = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM recipes").fetchone()
+        chunks, unique = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM chunks").fetchone()
+        return {
+            "recipes": recipes,
+            "logical_bytes": logical,
+            "unique_chunks": chunks,
+            "unique_bytes": unique,
+            "dedup_ratio": round(1 - unique / logical, 4) if logical else 0.0,
+        }
+
+    @contextmanager
+    def _exclusive(self):
+        """ストアへの書き込みを排他（プロセス内はルート単位のロック、プロセス間は <root>/lock のflock）"""
+        with self._lock:
+            with open(self.root / "lock", "ab") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                yield
+
+    def _store_batch(
+        self,
+        recipe_id: int,
+        seq_start: int,
+        digests: List[bytes],
+        data: Dict[bytes, bytes],
+        pack: _PackWriter,
+    ) -> Tuple[int, int]:
+        """
+        チャンク列の1バッチをインデックスへ書き込む（未知のチャンクのみパックへ追記）
+
+        Returns:
+            (パックへ追記したバイト数, 新規チャンク数)
+        """
+        if not digests:
+            return 0, 0
+
+        unique = list(data)
+        placeholders = ",".join("?" for _ in unique)
+        rows = self._conn.execute(f"SELECT hash FROM chunks WHERE hash IN ({placeholders})", unique)
+        known = {row[0] for row in rows}
+
+        new_rows = []
+        written = 0
+        for digest in unique:
+            if digest in known:
+                continue
+            pack_id, offset = pack.append(data[digest])
+            new_rows.append((digest, pack_id, offset, len(data[digest])))
+            written += len(data[digest])
+
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO chunks (hash, pack, offset, length, refs) VALUES (?, ?, ?, ?, 0)", new_rows
+        )
+        self._conn.executemany(
+            "UPDATE chunks SET refs = refs + ? WHERE hash = ?",
+            ((count, digest) for digest, count in Counter(digests).items()),
+        )
+        self._conn.executemany(
+            "INSERT INTO recipe_chunks (recipe_id, seq, hash) VALUES (?, ?, ?)",
+            ((recipe_id, seq_start + i, digest) for i, digest in enumerate(digests)),
+        )
+
+        return written, len(new_rows)
+
+    def _move_chunks(self, pack_id: int, writer: _PackWriter, io_stream) -> None:
+        """パック内の参照中のチャンクを writer へコピーしインデックスを付け替える（コミットは呼び出し側）"""
+        fd = os.open(str(self._pack_path(pack_id)), os.O_RDONLY)
+        try:
+            last = -1
+            while True:
+                # 付け替えた行はこのパックの検索から外れるため、オフセット順のキーセットで進める
+                rows = self._conn.execute(
+                    "SELECT hash, offset, length FROM chunks WHERE pack = ? AND offset > ? ORDER BY offset LIMIT ?",
+                    (pack_id, last, _LOOKUP_BATCH),
+                ).fetchall()
+                if not rows:
+                    return
+
+                moved = []
+                for digest, offset, length in rows:
+                    io_stream.throttle(length)
+                    data = os.pread(fd, length, offset)
+                    if len(data) != length or hashlib.sha256(data).digest() != digest:
+                        raise ChunkIntegrityError(f"Chunk {digest.hex()} in pack {pack_id} is corrupt")
+                    moved.append(writer.append(data) + (digest,))
+                self._conn.executemany("UPDATE chunks SET pack = ?, offset = ? WHERE hash = ?", moved)
+                last = rows[-1][1]
+        finally:
+            os.close(fd)
+
+    def _pack_path(self, pack_id: int) -> Path:
+        return self.pack_dir / f"{pack_id:06d}.pack"
+
+    def _open_pack(self) -> _PackWriter:
+        """最新のパックを追記用に開く（ローテーションサイズ超過なら新規パック）"""
+        existing = sorted(self.pack_dir.glob("*.pack"))
+        pack_id = int(existing[-1].stem) if existing else 1
+        if existing and existing[-1].stat().st_size >= self.pack_size:
+            pack_id += 1
+        return _PackWriter(self.pack_dir, self.pack_size, pack_id)
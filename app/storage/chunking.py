@@ -0,0 +1,225 @@
+"""
+Content-Defined Chunking
+FastCDC方式のコンテンツ定義チャンク分割（重複排除ストア用）
+
+Gearローリングハッシュ h = (h << 1) + GEAR[byte] (mod 2^32) で境界を決定する。
+- min_size 未満では境界を判定しない（最初の min_size バイトはハッシュ不要）
+- normal_size までは厳しいマスク、それ以降は緩いマスクで判定（正規化チャンキング）
+- max_size で強制的に切る
+
+32ビットのGearハッシュは直近32バイトのみに依存するため、numpyが利用可能な場合は
+バッファ全体のハッシュを倍々の移動加算（5回のベクトル演算）で一括計算する。
+numpyがない場合は同じ境界を返す純Python実装を使用する。
+"""
+
+import random
+from typing import BinaryIO, Iterator, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpyはpandas経由で通常インストール済み
+    np = None
+
+_HASH_BITS = 32
+_HASH_MASK = (1 << _HASH_BITS) - 1
+
+# 固定シードのGearテーブル（境界の再現性のため変更不可）
+_rng = random.Random(0x6A09E667)
+GEAR: List[int] = [_rng.getrandbits(_HASH_BITS) for _ in range(256)]
+del _rng
+
+_GEAR_NP = np.array(GEAR, dtype=np.uint32) if np is not None else None
+
+
+def _mask(bits: int) -> int:
+    """上位ビットを使う判定マスク（上位ビットほど多くの入力バイトの影響を受ける）"""
+    return ((1 << bits) - 1) << (_HASH_BITS - bits)
+
+
+class FastCDC:
+    """
+    FastCDCチャンカー
+
+    ストリームを平均 avg_size バイトのコンテンツ定義チャンクに分割する。
+    """
+
+    def __init__(
+        self,
+        min_size: int = 16 * 1024,
+        avg_size: int = 64 * 1024,
+        max_size: int = 256 * 1024,
+        buffer_size: int = 8 * 1024 * 1024,
+    ):
+        """
+        Args:
+            min_size: 最小チャンクサイズ（64バイト以上）
+            avg_size: 平均チャンクサイズ（2の累乗）
+            max_size: 最大チャンクサイズ
+            buffer_size: 読み取りバッファサイズ（max_size 以上）
+        """
+        if not 64 <= min_size <= avg_size <= max_size:
+            raise ValueError("Chunk sizes must satisfy 64 <= min_size <= avg_size <= max_size")
+        if avg_size & (avg_size - 1):
+            raise ValueError("avg_size must be a power of two")
+
+        self.min_size = min_size
+        self.avg_size = avg_size
+        self.max_size = max_size
+        self.buffer_size = max(buffer_size, max_size * 2)
+
+        bits = avg_size.bit_length() - 1
+        self.mask_strict = _mask(bits + 2)
+        self.mask_loose = _mask(bits - 2)
+        self._strict_limit = 1 << (_HASH_BITS - bits - 2)
+        self._loose_limit = 1 << (_HASH_BITS - bits + 2)
+        self._scratch = None
+
+    def chunks(self, stream: BinaryIO) -> Iterator[memoryview]:
+        """
+        ストリームをチャンクに分割
+
+        返されるmemoryviewは次のチャンクを要求するまでのみ有効（内部バッファを再利用するため）。
+
+        Args:
+            stream: バイナリストリーム（readinto対応）
+
+        Yields:
+            チャンクデータ（memoryview）
+        """
+        buffer = bytearray(self.buffer_size)
+        view = memoryview(buffer)
+        filled = 0
+        eof = False
+
+        while True:
+            while not eof and filled < self.buffer_size:
+                n = stream.readinto(view[filled:])
+                if not n:
+                    eof = True
+                    break
+                filled += n
+
+            if filled == 0:
+                return
+
+            cuts = self.find_cuts(view[:filled], eof)
+            start = 0
+            for end in cuts:
+                yield view[start:end]
+                start = end
+
+            # 未確定の末尾をバッファ先頭へ移動して補充
+            remaining = filled - start
+            if remaining:
+                buffer[:remaining] = buffer[start:filled]
+            filled = remaining
+
+            if eof and filled == 0:
+                return
+
+    def find_cuts(self, data, final: bool) -> List[int]:
+        """
+        バッファ内のチャンク境界（終端オフセット）を求める
+
+        Args:
+            data: チャンク先頭から始まるバッファ
+            final: ストリーム終端（末尾の半端なデータもチャンクとして確定する）
+
+        Returns:
+            確定したチャンクの終端オフセットのリスト
+        """
+        if np is not None:
+            return self._find_cuts_numpy(data, final)
+        return self._find_cuts_python(data, final)
+
+    def _find_cuts_numpy(self, data, final: bool) -> List[int]:
+        size = len(data)
+        if self._scratch is None or len(self._scratch[0]) < size:
+            self._scratch = (np.empty(self.buffer_size, dtype=np.uint32), np.empty(self.buffer_size, dtype=np.uint32))
+        hashes, shifted = self._scratch[0][:size], self._scratch[1][:size]
+
+        np.take(_GEAR_NP, np.frombuffer(data, dtype=np.uint8), out=hashes, mode="clip")
+
+        # h_i = Σ_{j<32} GEAR[b_{i-j}] << j を倍々の移動加算で計算（作業領域は再利用）
+        shift = 1
+        while shift < _HASH_BITS:
+            np.left_shift(hashes[:-shift], shift, out=shifted[shift:])
+            np.add(hashes[shift:], shifted[shift:], out=hashes[shift:])
+            shift <<= 1
+
+        # 上位ビット判定なので「マスク部分が0」は「閾値未満」と同値、厳しい候補は緩い候補の部分集合
+        loose_positions = np.flatnonzero(hashes < self._loose_limit)
+        strict_positions = loose_positions[hashes[loose_positions] < self._strict_limit]
+
+        # 境界位置 i はバイト i を含めてチャンクを閉じる（終端オフセット i + 1）
+        strict = strict_positions + 1
+        loose = loose_positions + 1
+
+        cuts = []
+        start = 0
+        while start < size:
+            end = self._select_cut(start, size, final, strict, loose)
+            if end is None:
+                break
+            cuts.append(end)
+            start = end
+        return cuts
+
+    def _select_cut(self, start: int, size: int, final: bool, strict, loose) -> Optional[int]:
+        """候補境界から正規化チャンキングの規則で次の終端を選ぶ"""
+        normal = start + self.avg_size
+        limit = start + self.max_size
+
+        index = np.searchsorted(strict, start + self.min_size + 1)
+        if index < len(strict) and strict[index] <= min(normal, size):
+            return int(strict[index])
+
+        if size >= normal:
+            index = np.searchsorted(loose, normal + 1)
+            if index < len(loose) and loose[index] <= min(limit, size):
+                return int(loose[index])
+
+        if size >= limit:
+            return limit
+        return size if final else None
+
+    def _find_cuts_python(self, data, final: bool) -> List[int]:
+        size = len(data)
+        cuts = []
+        start = 0
+
+        while start < size:
+            end = self._scan_python(data, start, size)
+            if end is None:
+                if final:
+                    cuts.append(size)
+                break
+            cuts.append(end)
+            start = end
+
+        return cuts
+
+    def _scan_python(self, data, start: int, size: int) -> Optional[int]:
+        gear = GEAR
+        mask_strict = self.mask_strict
+        mask_loose = self.mask_loose
+        normal = start + self.avg_size
+        limit = min(start + self.max_size, size)
+
+        # 最初の判定位置の直前32バイトからハッシュを立ち上げる（それ以前の寄与は消えている）
+        first = start + self.min_size
+        if first >= size:
+            return None
+
+        h = 0
+        for i in range(max(start, first - _HASH_BITS), first):
+            h = ((h << 1) + gear[data[i]]) & _HASH_MASK
+
+        for i in range(first, limit):
+            h = ((h << 1) + gear[data[i]]) & _HASH_MASK
+            if not h & (mask_strict if i + 1 <= normal else mask_loose):
+                return i + 1
+
+        if limit == start + self.max_size:
+            return limit
+        return None
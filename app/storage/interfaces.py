@@ -6,7 +6,8 @@ ISO 27001 A.12.3準拠のストレージプロバイダーインターフェー
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from enum import Enum
-from typing import Any, Callable, Dict, Optional
+from itertools import islice
+from typing import Any, Callable, Dict, Iterator, List, Optional
 
 
 class StorageType(Enum):
@@ -41,6 +42,11 @@ class CopyResult:
     checksum: str
     duration_seconds: float
     error_message: Optional[str] = None
+    stage_stats: Optional[Dict[str, Any]] = None  # パイプラインのステージ別スループット
+    strategy: Optional[str] = None  # reflink/copy_file_range/sendfile/buffered
+    throughput_mb_s: Optional[float] = None
+    logical_bytes: Optional[int] = None  # スパースファイル: ホールを含む論理サイズ
+    physical_bytes: Optional[int] = None  # スパースファイル: 実際に書き込んだバイト数
 
 
 @dataclass
@@ -53,6 +59,43 @@ class StorageInfo:
     usage_percent: float
 
 
+@dataclass
+class FileEntry:
+    """ファイル一覧の1エントリ"""
+
+    path: str  # プロバイダーのベースからの相対パス（区切りは "/"）
+    size: Optional[int] = None
+    mtime: Optional[float] = None  # UNIX時刻（秒）
+    is_dir: bool = False
+    error: Optional[str] = None  # 読み取れなかったサブディレクトリ（一覧はこの配下を含まない）
+
+    def to_dict(self) -> Dict[str, Any]:
+        entry = {"path": self.path, "size": self.size, "mtime": self.mtime, "is_dir": self.is_dir}
+        if self.error is not None:
+            entry["error"] = self.error
+        return entry
+
+
+@dataclass
+class ListPage:
+    """ファイル一覧の1ページ"""
+
+    entries: List[FileEntry]
+    next_cursor: Optional[str] = None  # 次ページの再開カーソル（最終ページはNone）
+
+
+@dataclass
+class StorageCapabilities:
+    """ストレージの機能（プロバイダー間のコピー戦略選択に使用）"""
+
+    posix_path: bool = False  # 送信先をローカルファイルシステムのパスとして直接書き込める
+    reflink: bool = False  # reflink（CoWクローン）に対応
+    sparse: bool = False  # ホールを保持できる
+    immutable: bool = False  # 書き込み後に変更・削除できない
+    ranged_reads: bool = False  # オフセット指定の部分読み取りに対応
+    max_parallel_streams: int = 1  # 推奨最大同時ストリーム数（接続プールの上限）
+
+
 class IStorageProvider(ABC):
     """
     ストレージプロバイダーインターフェース
@@ -200,3 +243,66 @@ class IStorageProvider(ABC):
             サポートするならTrue
         """
         return self.is_immutable
+
+    def iter_files(
+        self, path: str, pattern: str = "*", cursor: Optional[str] = None, recursive: bool = False
+    ) -> Iterator[FileEntry]:
+        """
+        ファイル一覧をパス順に逐次取得
+
+        Args:
+            path: ディレクトリパス
+            pattern: ファイル名パターン（glob）
+            cursor: 再開カーソル（このパスより後のエントリから返す）
+            recursive: サブディレクトリ配下のファイルも返す
+
+        Yields:
+            FileEntry（既定実装は list_files の結果でサイズ・更新時刻なし、プロバイダーが上書きする）
+        """
+        for name in sorted(self.list_files(path, pattern)):
+            if cursor is None or name > cursor:
+                yield FileEntry(path=name)
+
+    def list_page(
+        self, path: str, pattern: str = "*", cursor: Optional[str] = None, limit: int = 1000, recursive: bool = False
+    ) -> ListPage:
+        """
+        ファイル一覧を1ページ分取得
+
+        Args:
+            path: ディレクトリパス
+            pattern: ファイル名パターン（glob）
+            cursor: 前ページの next_cursor
+            limit: 1ページの最大件数
+            recursive: サブディレクトリ配下のファイルも返す
+
+        Returns:
+            ListPage
+        """
+        if limit <= 0:
+            raise ValueError("limit must be positive")
+        entries = list(islice(self.iter_files(path, pattern, cursor, recursive), limit + 1))
+        next_cursor = entries[limit - 1].path if len(entries) > limit else None
+        return ListPage(entries=entries[:limit], next_cursor=next_cursor)
+
+    def get_capabilities(self) -> StorageCapabilities:
+        """
+        ストレージの機能を取得
+
+        Returns:
+            StorageCapabilities（既定は機能なし、プロバイダーが対応する機能を上書きする）
+        """
+        return StorageCapabilities(immutable=self.is_immutable)
+
+    def health_check(self) -> bool:
+        """
+        接続が利用可能か確認（StorageRegistry の接続プールがチェックアウト時に使用）
+
+        Returns:
+            利用可能ならTrue
+        """
+        try:
+            self.get_storage_info()
+            return True
+        except Exception:
+            return False
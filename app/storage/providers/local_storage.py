@@ -3,15 +3,23 @@ Local Storage Provider Implementation
 ローカルディスク用ストレージプロバイダー
 """
 
+import fnmatch
 import hashlib
+import heapq
 import os
 import shutil
 from pathlib import Path
-from typing import Callable, Optional
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
 
+from app.core.copy_pipeline import PipelinedCopier
+from app.core.fast_copy import KernelCopier, probe_reflink
+from app.core.io_scheduler import PRIORITY_NORMAL, get_io_scheduler
+from app.core.sparse import SparseCopier, probe_sparse
 from app.storage.interfaces import (
     CopyResult,
+    FileEntry,
     IStorageProvider,
+    StorageCapabilities,
     StorageInfo,
     StorageLocation,
     StorageType,
@@ -21,17 +29,35 @@ from app.storage.interfaces import (
 class LocalStorageProvider(IStorageProvider):
     """ローカルストレージプロバイダー"""
 
-    def __init__(self, provider_id: str, base_path: str, location: StorageLocation = StorageLocation.ONSITE):
+    def __init__(
+        self,
+        provider_id: str,
+        base_path: str,
+        location: StorageLocation = StorageLocation.ONSITE,
+        max_parallel_streams: int = 4,
+    ):
         """
         Args:
             provider_id: プロバイダーID
             base_path: ベースパス
             location: ストレージ配置場所
+            max_parallel_streams: 推奨最大同時ストリーム数
         """
         self._provider_id = provider_id
         self.base_path = Path(base_path)
         self._location = location
         self._connected = False
+        self.max_parallel_streams = max_parallel_streams
+        self._capabilities: Optional[StorageCapabilities] = None
+        self.pipeline = PipelinedCopier(buffer_size=8 * 1024 * 1024, ring_size=4)
+        self.kernel_copier = KernelCopier(fallback=self.pipeline)
+        # スパースファイルはホールを保持、それ以外はカーネル内高速パス
+        self.sparse_copier = SparseCopier(fallback=self.kernel_copier)
+        # BackupEngine と共有する帯域・同時ストリーム数制御
+        self.io_scheduler = get_io_scheduler()
+        self.io_priority = PRIORITY_NORMAL
+        # 一覧でディレクトリ1つあたりに保持するエントリ数の上限（超えるディレクトリは件数ごとに再走査）
+        self.scan_batch = 10000
 
     @property
     def provider_id(self) -> str:
@@ -65,6 +91,24 @@ class LocalStorageProvider(IStorageProvider):
         """切断（ローカルストレージでは何もしない）"""
         self._connected = False
 
+    def get_capabilities(self) -> StorageCapabilities:
+        """ストレージの機能を取得（reflink・ホール保持はベースパスで一時ファイルを使って判定）"""
+        if self._capabilities is None:
+            self.base_path.mkdir(parents=True, exist_ok=True)
+            self._capabilities = StorageCapabilities(
+                posix_path=True,
+                reflink=probe_reflink(str(self.base_path)),
+                sparse=probe_sparse(str(self.base_path)),
+                immutable=self.is_immutable,
+                ranged_reads=True,
+                max_parallel_streams=self.max_parallel_streams,
+            )
+        return self._capabilities
+
+    def health_check(self) -> bool:
+        """ベースパスが存在し書き込み可能か"""
+        return self._connected and self.base_path.is_dir() and os.access(str(self.base_path), os.W_OK)
+
     def copy_file(self, source: str, destination: str, callback: Optional[Callable] = None) -> CopyResult:
         """ファイルをコピー"""
         from datetime import datetime
@@ -76,33 +120,30 @@ class LocalStorageProvider(IStorageProvider):
         # 送信先ディレクトリ作成
         dest_path.parent.mkdir(parents=True, exist_ok=True)
 
-        # チェックサム計算しながらコピー
-        sha256_hash = hashlib.sha256()
-        bytes_copied = 0
-        source_size = source_path.stat().st_size
-
+        # スパースファイルはホール保持コピー、それ以外はカーネル内高速パス、利用不可ならパイプラインでコピー
         try:
-            with open(source_path, "rb") as src:
-                with open(dest_path, "wb") as dst:
-                    while True:
-                        chunk = src.read(64 * 1024 * 1024)  # 64MB
-                        if not chunk:
-                            break
-                        dst.write(chunk)
-                        sha256_hash.update(chunk)
-                        bytes_copied += len(chunk)
-
-                        if callback:
-                            callback(bytes_copied, source_size)
-
+            with self.io_scheduler.stream(str(dest_path), self.io_priority) as io_stream:
+                result = self.sparse_copier.copy(str(source_path), str(dest_path), io_stream.wrap(callback))
             duration = (datetime.now() - start_time).total_seconds()
 
+            stage_stats = None
+            if "stages" in result:
+                stage_stats = {"stages": result["stages"], "bottleneck": result["bottleneck"]}
+
             return CopyResult(
-                success=True, bytes_copied=bytes_copied, checksum=sha256_hash.hexdigest(), duration_seconds=duration
+                success=True,
+                bytes_copied=result["bytes_copied"],
+                checksum=result["checksum"],
+                duration_seconds=duration,
+                stage_stats=stage_stats,
+                strategy=result["strategy"],
+                throughput_mb_s=result["throughput_mb_s"],
+                logical_bytes=result.get("logical_bytes"),
+                physical_bytes=result.get("physical_bytes"),
             )
 
         except Exception as e:
-            return CopyResult(success=False, bytes_copied=bytes_copied, checksum="", duration_seconds=0, error_message=str(e))
+            return CopyResult(success=False, bytes_copied=0, checksum="", duration_seconds=0, error_message=str(e))
 
     def delete_file(self, path: str) -> bool:
         """ファイルを削除"""
@@ -142,13 +183,117 @@ class LocalStorageProvider(IStorageProvider):
         return actual_checksum == expected_checksum
 
     def list_files(self, path: str, pattern: str = "*") -> list:
-        """ファイル一覧を取得"""
+        """ファイル一覧を取得（パス区切りを含むパターンは glob、それ以外は iter_files）"""
         dir_path = self.base_path / path
 
         if not dir_path.exists():
             return []
 
-        return [str(f.relative_to(self.base_path)) for f in dir_path.glob(pattern)]
+        if "/" in pattern or "**" in pattern:
+            return [str(f.relative_to(self.base_path)) for f in dir_path.glob(pattern)]
+        return [entry.path for entry in self.iter_files(path, pattern)]
+
+    def iter_files(
+        self, path: str, pattern: str = "*", cursor: Optional[str] = None, recursive: bool = False
+    ) -> Iterator[FileEntry]:
+        """
+        ファイル一覧を os.scandir で逐次取得
+
+        各ディレクトリ内は名前順に返し、cursor はパス成分単位で比較する
+        （再開時はカーソルより前のサブディレクトリを走査しない）。
+        ディレクトリ全体を読み込んで並べ替えず、scan_batch 件ずつ名前順の次の区間を選んで返すため、
+        メモリ使用量は走査中のディレクトリの階層ごとに scan_batch 件まで。scan_batch 件を超える
+        ディレクトリは区間ごとに scandir をやり直す（N件のディレクトリで ceil(N / scan_batch) 回）。
+
+        Raises:
+            OSError: path のディレクトリを読み取れない（読み取れないサブディレクトリは error 付きの
+                FileEntry として返し、一覧を中断しない）
+        """
+        dir_path = self.base_path / path
+        if not dir_path.is_dir():
+            return
+
+        parts = tuple(dir_path.relative_to(self.base_path).parts)
+        after = tuple(cursor.split("/")) if cursor else None
+        yield from self._scan(str(dir_path), parts, pattern, after, recursive)
+
+    def _scan(
+        self, directory: str, parts: Tuple[str, ...], pattern: str, after: Optional[Tuple[str, ...]], recursive: bool
+    ) -> Iterator[FileEntry]:
+        # カーソルがこのディレクトリ配下なら、カーソルの成分より前の名前は読み飛ばす
+        start = None
+        if after is not None and len(after) > len(parts) and after[: len(parts)] == parts:
+            start = after[len(parts)]
+
+        for entry in self._sorted_entries(directory, start):
+            entry_parts = parts + (entry.name,)
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except FileNotFoundError:
+                # 走査中に削除された
+                continue
+            except OSError as e:
+                if after is None or entry_parts > after:
+                    yield FileEntry(path="/".join(entry_parts), error=e.strerror or str(e))
+                continue
+
+            if is_dir and recursive:
+                # カーソルを含まない、カーソルより前のサブツリーは丸ごと飛ばす
+                if after is not None and entry_parts < after and after[: len(entry_parts)] != entry_parts:
+                    continue
+                try:
+                    yield from self._scan(entry.path, entry_parts, pattern, after, recursive)
+                except FileNotFoundError:
+                    continue
+                except OSError as e:
+                    # 一覧が完全に見えないよう、読み取れないサブディレクトリを報告する
+                    # （カーソルがこのエントリ以降なら報告済み）
+                    if after is None or entry_parts > after:
+                        yield FileEntry(path="/".join(entry_parts), is_dir=True, error=e.strerror or str(e))
+                continue
+
+            if after is not None and entry_parts <= after:
+                continue
+            if not fnmatch.fnmatch(entry.name, pattern):
+                continue
+            try:
+                st = entry.stat(follow_symlinks=False)
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                yield FileEntry(path="/".join(entry_parts), is_dir=is_dir, error=e.strerror or str(e))
+                continue
+            yield FileEntry(
+                path="/".join(entry_parts),
+                size=None if is_dir else st.st_size,
+                mtime=st.st_mtime,
+                is_dir=is_dir,
+            )
+
+    def _sorted_entries(self, directory: str, start: Optional[str]) -> Iterator[os.DirEntry]:
+        """
+        ディレクトリのエントリを名前順に返す（start 以降、保持するのは scan_batch 件まで）
+
+        Raises:
+            OSError: ディレクトリを読み取れない
+        """
+        last = None
+        while True:
+            with os.scandir(directory) as it:
+                if last is None:
+                    candidates = (entry for entry in it if start is None or entry.name >= start)
+                else:
+                    candidates = (entry for entry in it if entry.name > last)
+                batch = heapq.nsmallest(self.scan_batch, candidates, key=lambda entry: entry.name)
+
+            yield from batch
+            if len(batch) < self.scan_batch:
+                return
+            last = batch[-1].name
+
+    def get_pipeline_stats(self) -> Dict[str, Any]:
+        """コピーパイプラインの累積ステージ統計を取得"""
+        return self.pipeline.get_stats()
 
     def _calculate_checksum(self, file_path: str) -> str:
         """チェックサム計算"""
@@ -0,0 +1,551 @@
+"""
+Tape Storage Provider Implementation
+テープ等のシーケンシャルメディア用ストレージプロバイダー
+
+ボリュームのレイアウト:
+    [データブロック ...][インデックス(JSON)][フッター][データブロック ...][インデックス][フッター] ...
+
+- copy_files() に渡した小さいバックアップファイルはメモリ上で block_size の集約ブロックに
+  まとめてから1回で書き込む（copy_file() は1ファイルのバッチ）
+- バッチの終わりに、ファイル名 → (オフセット, サイズ, チェックサム) のインデックスとフッターを
+  データの後ろに追記して同期する。書き込みは常に直前のフッターより後ろに行い、
+  確定済みのインデックスを上書きしない（古いインデックスは未使用領域として残る）
+- 成功はデータとインデックスの同期後にのみ返す。同期前に中断したバッチは、マウント時に
+  最後の有効なフッターを探して切り捨てる
+- 削除はファイルを除いたインデックスとフッターを追記して確定する（データ領域はボリューム再利用まで残る）
+- 複数ファイルのリストアは位置の昇順に並べ替え、メディアを1回の順方向パスで読む
+
+FileTapeDevice はテスト・検証用のファイルベースの代替デバイスで、シーク回数を記録する。
+"""
+
+import fnmatch
+import hashlib
+import json
+import os
+import struct
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.core.io_scheduler import PRIORITY_RESTORE, get_io_scheduler
+from app.storage.interfaces import (
+    CopyResult,
+    FileEntry,
+    IStorageProvider,
+    StorageCapabilities,
+    StorageInfo,
+    StorageLocation,
+    StorageType,
+)
+
+_FOOTER = struct.Struct("<8sQQ")
+_FOOTER_MAGIC = b"BKTPIDX1"
+
+
+class FileTapeDevice:
+    """
+    ファイルベースのシーケンシャルメディア
+
+    位置を保持し、現在位置以外へのアクセスをシークとして数える（逆方向シークは別途記録）。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+        self.position = 0
+        self.seeks = 0
+        self.backward_seeks = 0
+        self.bytes_written = 0
+        self.bytes_read = 0
+        self.writes = 0
+
+    def open(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        mode = "r+b" if os.path.exists(self.path) else "w+b"
+        self._file = open(self.path, mode, buffering=0)
+        self.position = 0
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._file is not None
+
+    @property
+    def size(self) -> int:
+        return os.fstat(self._file.fileno()).st_size
+
+    def seek(self, position: int) -> None:
+        if position != self.position:
+            self.seeks += 1
+            if position < self.position:
+                self.backward_seeks += 1
+            self._file.seek(position)
+            self.position = position
+
+    def read(self, length: int) -> bytes:
+        data = self._file.read(length)
+        self.position += len(data)
+        self.bytes_read += len(data)
+        return data
+
+    def write(self, data) -> None:
+        view = memoryview(data)
+        while view:
+            n = self._file.write(view)
+            view = view[n:]
+            self.position += n
+            self.bytes_written += n
+        self.writes += 1
+
+    def truncate(self) -> None:
+        """現在位置以降を破棄（テープのEOD設定に相当）"""
+        self._file.truncate(self.position)
+
+    def sync(self) -> None:
+        os.fsync(self._file.fileno())
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "seeks": self.seeks,
+            "backward_seeks": self.backward_seeks,
+            "bytes_written": self.bytes_written,
+            "bytes_read": self.bytes_read,
+            "writes": self.writes,
+        }
+
+
+class TapeStorageProvider(IStorageProvider):
+    """シーケンシャルメディア（テープ）ストレージプロバイダー"""
+
+    def __init__(
+        self,
+        provider_id: str,
+        volume_path: str,
+        location: StorageLocation = StorageLocation.OFFLINE,
+        block_size: int = 64 * 1024 * 1024,
+        capacity_bytes: int = 12 * 1000**4,
+        device: Optional[FileTapeDevice] = None,
+    ):
+        """
+        Args:
+            provider_id: プロバイダーID
+            volume_path: ボリューム（テープ代替ファイル）のパス
+            location: ストレージ配置場所
+            block_size: 集約ブロックサイズ（この量がたまるまで書き込みを遅延）
+            capacity_bytes: ボリューム容量（既定は LTO-8 の非圧縮容量）
+            device: メディアデバイス（Noneは volume_path の FileTapeDevice）
+        """
+        if block_size <= 0:
+            raise ValueError("block_size must be positive")
+
+        self._provider_id = provider_id
+        self._location = location
+        self.block_size = block_size
+        self.capacity_bytes = capacity_bytes
+        self.device = device if device is not None else FileTapeDevice(volume_path)
+        self._index: Dict[str, Dict[str, Any]] = {}  # 確定済み（インデックスが同期済み）のファイル
+        self._pending: Dict[str, Dict[str, Any]] = {}  # 書き込み中のバッチのファイル
+        self._volume_end = 0  # 最後に確定したフッターの終端（次のバッチの書き込み開始位置）
+        self._write_pos = 0  # バッファの先頭を書き込む位置
+        self._buffer = bytearray()
+        self._lock = threading.RLock()
+        # リストアの書き込みは復元先ターゲットで高優先度ストリームとして扱う
+        self.io_scheduler = get_io_scheduler()
+        self.restore_priority = PRIORITY_RESTORE
+
+    @property
+    def provider_id(self) -> str:
+        return self._provider_id
+
+    @property
+    def storage_type(self) -> StorageType:
+        return StorageType.TAPE
+
+    @property
+    def storage_location(self) -> StorageLocation:
+        return self._location
+
+    @property
+    def is_immutable(self) -> bool:
+        return False
+
+    def connect(self) -> bool:
+        """ボリュームをマウントし、末尾のインデックスを読み込む"""
+        try:
+            with self._lock:
+                if not self.device.is_open:
+                    self.device.open()
+                    self._load_index()
+            return True
+        except Exception as e:
+            raise ConnectionError(f"Failed to mount tape volume: {e}")
+
+    def disconnect(self) -> None:
+        """アンマウント（書き込み中のバッチはないため確定済みの状態のまま閉じる）"""
+        with self._lock:
+            if self.device.is_open:
+                self.device.close()
+
+    def health_check(self) -> bool:
+        return self.device.is_open
+
+    def get_capabilities(self) -> StorageCapabilities:
+        """ストレージの機能を取得（単一ストリーム、ランダムアクセス非対応）"""
+        return StorageCapabilities(
+            posix_path=False,
+            reflink=False,
+            sparse=False,
+            immutable=self.is_immutable,
+            ranged_reads=False,
+            max_parallel_streams=1,
+        )
+
+    def copy_file(self, source: str, destination: str, callback: Optional[Callable] = None) -> CopyResult:
+        """ファイルを書き込み、データとインデックスの同期後に結果を返す（1ファイルのバッチ）"""
+        return self.copy_files([(source, destination)], callback)[destination]
+
+    def copy_files(
+        self, files: List[Tuple[str, str]], callback: Optional[Callable] = None
+    ) -> Dict[str, CopyResult]:
+        """
+        複数ファイルを集約ブロックにまとめて書き込み、最後にインデックスを1回だけ追記
+
+        Args:
+            files: (コピー元パス, ボリューム上のファイル名) のリスト
+            callback: 進捗コールバック(bytes_copied, total_bytes)
+
+        Returns:
+            {ファイル名: CopyResult}（success=True はデータとインデックスの同期後のみ）
+        """
+        results: Dict[str, CopyResult] = {}
+        started: Dict[str, float] = {}
+
+        with self._lock:
+            total = sum(os.path.getsize(source) for source, _ in files if os.path.isfile(source))
+            copied_total = 0
+            self._write_pos = self._volume_end
+
+            for source, destination in files:
+                started[destination] = time.monotonic()
+                offset = self._write_pos + len(self._buffer)
+                hash_obj = hashlib.sha256()
+                copied = 0
+                try:
+                    if offset + os.path.getsize(source) > self.capacity_bytes:
+                        raise IOError("Tape volume is full")
+
+                    with open(source, "rb") as f:
+                        while True:
+                            chunk = f.read(self.block_size)
+                            if not chunk:
+                                break
+                            hash_obj.update(chunk)
+                            self._buffer += chunk
+                            copied += len(chunk)
+                            if len(self._buffer) >= self.block_size:
+                                self._write_blocks()
+                            if callback:
+                                callback(copied_total + copied, total)
+                except Exception as e:
+                    # 途中まで書き込んだブロックは索引されない未使用領域になる
+                    if offset >= self._write_pos:
+                        del self._buffer[offset - self._write_pos :]
+                    else:
+                        self._buffer.clear()
+                    results[destination] = CopyResult(
+                        success=False, bytes_copied=0, checksum="", duration_seconds=0, error_message=str(e)
+                    )
+                    continue
+
+                copied_total += copied
+                self._pending[destination] = {
+                    "offset": offset,
+                    "size": copied,
+                    "checksum": hash_obj.hexdigest(),
+                    "written_at": datetime.utcnow().isoformat(),
+                }
+
+            try:
+                committed = self._commit()
+            except Exception as e:
+                for destination in self._pending:
+                    results[destination] = CopyResult(
+                        success=False, bytes_copied=0, checksum="", duration_seconds=0, error_message=str(e)
+                    )
+                self._pending.clear()
+                self._buffer.clear()
+                return results
+
+        for destination, entry in committed.items():
+            duration = time.monotonic() - started[destination]
+            results[destination] = CopyResult(
+                success=True,
+                bytes_copied=entry["size"],
+                checksum=entry["checksum"],
+                duration_seconds=duration,
+                strategy="tape_batched",
+                throughput_mb_s=round(entry["size"] / (1024 * 1024) / duration, 2) if duration > 0 else 0.0,
+            )
+        return results
+
+    def flush(self) -> None:
+        """書き込み中のバッチを確定（copy_files() が終了時に行うため通常は何もしない）"""
+        with self._lock:
+            self._commit()
+
+    def _commit(self, deleted: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        端数のデータ・インデックス・フッターを追記して同期し、確定したファイルを返す
+
+        Args:
+            deleted: 新しいインデックスから外すファイル（書き込み中のバッチが無くてもインデックスを追記する）
+        """
+        with self._lock:
+            if not self._pending and not self._buffer and deleted is None:
+                return {}
+
+            # 端数のデータとインデックスは1回の書き込みにまとめる
+            tail = bytes(self._buffer)
+            index_offset = self._write_pos + len(tail)
+            index = dict(self._index, **self._pending)
+            index.pop(deleted, None)
+            payload = json.dumps({"files": index}).encode("utf-8")
+            self.device.seek(self._write_pos)
+            self.device.write(tail + payload + _FOOTER.pack(_FOOTER_MAGIC, index_offset, len(payload)))
+            self.device.truncate()
+            self.device.sync()
+
+            self._index = index
+            committed, self._pending = self._pending, {}
+            self._volume_end = self._write_pos = self.device.position
+            self._buffer.clear()
+            return committed
+
+    def restore_files(
+        self, paths: List[str], destination_dir: str, callback: Optional[Callable] = None
+    ) -> Dict[str, CopyResult]:
+        """
+        複数ファイルを位置の昇順に1回の順方向パスでリストア
+
+        Args:
+            paths: ボリューム上のファイル名
+            destination_dir: 復元先ディレクトリ（ファイル名の相対パスで作成）
+            callback: 進捗コールバック(bytes_restored, total_bytes)
+
+        Returns:
+            {path: CopyResult}（インデックスにないファイルは success=False）
+        """
+        results: Dict[str, CopyResult] = {}
+        with self._lock:
+            entries = []
+            for path in paths:
+                entry = self._index.get(path)
+                if entry is None:
+                    results[path] = CopyResult(
+                        success=False, bytes_copied=0, checksum="", duration_seconds=0, error_message="Not on volume"
+                    )
+                else:
+                    entries.append((entry["offset"], path, entry))
+            entries.sort()
+
+            total = sum(entry["size"] for _, _, entry in entries)
+            restored = 0
+            with self.io_scheduler.stream(destination_dir, self.restore_priority) as io_stream:
+                for offset, path, entry in entries:
+                    start = time.monotonic()
+                    target = os.path.join(destination_dir, path)
+                    try:
+                        os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+                        with open(target, "wb") as out:
+
+                            def sink(data: bytes) -> None:
+                                io_stream.throttle(len(data))
+                                out.write(data)
+
+                            checksum = self._read_entry(entry, sink)
+                        if checksum != entry["checksum"]:
+                            raise IOError(f"Checksum mismatch for {path}")
+                        restored += entry["size"]
+                        duration = time.monotonic() - start
+                        results[path] = CopyResult(
+                            success=True,
+                            bytes_copied=entry["size"],
+                            checksum=checksum,
+                            duration_seconds=duration,
+                            strategy="tape_sequential",
+                        )
+                    except Exception as e:
+                        results[path] = CopyResult(
+                            success=False, bytes_copied=0, checksum="", duration_seconds=0, error_message=str(e)
+                        )
+                    if callback:
+                        callback(restored, total)
+        return results
+
+    def delete_file(self, path: str) -> bool:
+        """
+        ファイルを除いたインデックスを追記して削除を確定（再マウント後も削除されたまま）
+
+        シーケンシャルメディアのためデータ領域はボリューム再利用まで解放されず、削除ごとに
+        インデックス1つ分の容量を使う。
+        """
+        with self._lock:
+            if path not in self._index:
+                return False
+            self._commit(deleted=path)
+            return True
+
+    def get_available_space(self) -> int:
+        """利用可能容量を取得（バイト）"""
+        with self._lock:
+            return max(0, self.capacity_bytes - self._volume_end)
+
+    def get_storage_info(self) -> StorageInfo:
+        """ストレージ情報を取得"""
+        with self._lock:
+            used = self._volume_end
+        available = max(0, self.capacity_bytes - used)
+        usage_percent = (used / self.capacity_bytes * 100) if self.capacity_bytes > 0 else 0
+        return StorageInfo(
+            total_bytes=self.capacity_bytes, available_bytes=available, used_bytes=used, usage_percent=usage_percent
+        )
+
+    def verify_file(self, path: str, expected_checksum: str) -> bool:
+        """ファイル整合性を検証（メディアから読み直してチェックサムを照合）"""
+        with self._lock:
+            entry = self._index.get(path)
+            if entry is None:
+                return False
+            try:
+                return self._read_entry(entry, None) == expected_checksum
+            except Exception:
+                return False
+
+    def list_files(self, path: str, pattern: str = "*") -> list:
+        """ファイル一覧を取得（ボリューム上の位置順）"""
+        prefix = path.strip("/")
+        with self._lock:
+            entries = sorted(self._index.items(), key=lambda item: item[1]["offset"])
+        files = []
+        for name, _ in entries:
+            if prefix and not name.startswith(prefix + "/"):
+                continue
+            relative = name[len(prefix) + 1 :] if prefix else name
+            if fnmatch.fnmatch(relative, pattern):
+                files.append(name)
+        return files
+
+    def iter_files(
+        self, path: str, pattern: str = "*", cursor: Optional[str] = None, recursive: bool = False
+    ) -> Iterator[FileEntry]:
+        """インデックスからファイル一覧を名前順に逐次取得（メディアは読まない）"""
+        prefix = path.strip("/")
+        with self._lock:
+            names = sorted(name for name in self._index if cursor is None or name > cursor)
+        for name in names:
+            if prefix and not name.startswith(prefix + "/"):
+                continue
+            relative = name[len(prefix) + 1 :] if prefix else name
+            if not recursive and "/" in relative:
+                continue
+            if not fnmatch.fnmatch(relative.rsplit("/", 1)[-1], pattern):
+                continue
+            with self._lock:
+                entry = self._index.get(name)
+            if entry is not None:
+                written_at = datetime.fromisoformat(entry["written_at"]).replace(tzinfo=timezone.utc)
+                yield FileEntry(path=name, size=entry["size"], mtime=written_at.timestamp())
+
+    def get_device_stats(self) -> Dict[str, int]:
+        """デバイスのシーク・転送統計"""
+        return self.device.get_stats()
+
+    def _write_blocks(self) -> None:
+        """バッファから block_size 単位で書き込む（端数は次の書き込みまで保持）"""
+        length = len(self._buffer) // self.block_size * self.block_size
+        if length == 0:
+            return
+        self.device.seek(self._write_pos)
+        self.device.write(memoryview(self._buffer)[:length])
+        self._write_pos += length
+        del self._buffer[:length]
+
+    def _read_entry(self, entry: Dict[str, Any], sink: Optional[Callable]) -> str:
+        hash_obj = hashlib.sha256()
+        self.device.seek(entry["offset"])
+        remaining = entry["size"]
+        while remaining > 0:
+            data = self.device.read(min(self.block_size, remaining))
+            if not data:
+                raise IOError(f"Unexpected end of volume at offset {self.device.position}")
+            hash_obj.update(data)
+            if sink is not None:
+                sink(data)
+            remaining -= len(data)
+        return hash_obj.hexdigest()
+
+    def _load_index(self) -> None:
+        """最後の有効なフッターからインデックスを読み込み、その後ろ（中断したバッチ）を切り捨てる"""
+        size = self.device.size
+        if size == 0:
+            # 空のボリュームは空のインデックスで初期化し、常に有効なフッターがある状態にする
+            self._index = {}
+            payload = json.dumps({"files": {}}).encode("utf-8")
+            self.device.seek(0)
+            self.device.write(payload + _FOOTER.pack(_FOOTER_MAGIC, 0, len(payload)))
+            self.device.sync()
+            self._volume_end = self._write_pos = self.device.position
+            return
+
+        found = self._find_footer(size)
+        if found is None:
+            raise IOError("Volume has no index (unrecognized or incomplete volume)")
+
+        footer_end, index = found
+        self._index = index
+        self._volume_end = self._write_pos = footer_end
+        if footer_end < size:
+            self.device.seek(footer_end)
+            self.device.truncate()
+            self.device.sync()
+
+    def _find_footer(self, size: int) -> Optional[Tuple[int, Dict[str, Dict[str, Any]]]]:
+        """末尾から後ろ向きに有効なフッターを探す（通常は末尾の1回の読み込みで見つかる）"""
+        window = max(self.block_size, _FOOTER.size)
+        end = size
+        while end >= _FOOTER.size:
+            start = max(0, end - window)
+            self.device.seek(start)
+            data = self.device.read(end - start)
+            position = len(data)
+            while True:
+                position = data.rfind(_FOOTER_MAGIC, 0, position)
+                if position < 0:
+                    break
+                footer_end = start + position + _FOOTER.size
+                index = self._read_footer(start + position, footer_end, size)
+                if index is not None:
+                    return footer_end, index
+            if start == 0:
+                break
+            # フッターが窓の境界をまたぐ場合に備えて重ねて読む
+            end = start + _FOOTER.size - 1
+        return None
+
+    def _read_footer(self, position: int, footer_end: int, size: int) -> Optional[Dict[str, Dict[str, Any]]]:
+        if footer_end > size:
+            return None
+        self.device.seek(position)
+        _, index_offset, index_length = _FOOTER.unpack(self.device.read(_FOOTER.size))
+        if index_offset + index_length != position:
+            return None
+        self.device.seek(index_offset)
+        try:
+            return json.loads(self.device.read(index_length))["files"]
+        except (ValueError, KeyError, TypeError):
+            return None
@@ -0,0 +1,485 @@
+"""
+Storage Registry
+ストレージプロバイダーの登録・接続プール・機能に基づくコピー戦略選択
+
+- プロバイダーはファクトリで登録し、初回利用時に生成・接続してプールで使い回す
+  （プールの上限は capabilities.max_parallel_streams、登録時に上書き可能）
+- 一定時間使われていない接続はチェックアウト時にヘルスチェックし、失敗したら破棄して再接続する
+- パスのプレフィックスでプロバイダーを解決し、送信元・送信先の機能から最速のコピー戦略を選ぶ
+
+サービス・スケジューラーは get_storage_registry() の共有インスタンスを使用する。
+create_app() が設定 STORAGE_PROVIDERS のプロバイダーを register_configured_providers() で登録する。
+"""
+
+import importlib
+import inspect
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from app.storage.interfaces import IStorageProvider, StorageCapabilities, StorageLocation
+
+logger = logging.getLogger(__name__)
+
+# STORAGE_PROVIDERS の type とプロバイダークラス（S3の boto3 等を使う種類だけ読み込むよう遅延インポート）
+PROVIDER_TYPES = {
+    "local": "app.storage.providers.local_storage.LocalStorageProvider",
+    "s3": "app.storage.providers.s3_storage.S3StorageProvider",
+    "tape": "app.storage.providers.tape_storage.TapeStorageProvider",
+}
+
+
+@dataclass
+class StorageRoute:
+    """パスの解決結果"""
+
+    provider_id: str
+    relative_path: str  # プロバイダーのベースからの相対パス
+    capabilities: StorageCapabilities
+
+
+@dataclass
+class CopyPlan:
+    """プロバイダー間のコピー戦略"""
+
+    delegate: bool = False  # 送信先プロバイダーの copy_file に委譲する（パスで直接書き込めない）
+    reflink: bool = True  # reflink を試行する
+    sparse: bool = True  # ホール保持コピーを使う
+
+    @property
+    def strategy(self) -> str:
+        if self.delegate:
+            return "provider"
+        return "reflink" if self.reflink else "kernel"
+
+
+def plan_copy(
+    source: Optional[StorageCapabilities],
+    destination: Optional[StorageCapabilities],
+    same_device: bool = False,
+) -> CopyPlan:
+    """
+    送信元・送信先の機能から最速のコピー戦略を選ぶ
+
+    Args:
+        source: 送信元の機能（Noneはレジストリ外のローカルパス）
+        destination: 送信先の機能（Noneはレジストリ外のローカルパス）
+        same_device: 送信元と送信先が同じファイルシステム上にある
+
+    Returns:
+        CopyPlan
+    """
+    if destination is not None and not destination.posix_path:
+        return CopyPlan(delegate=True, reflink=False, sparse=False)
+
+    # reflink は同一ファイルシステム内でのみ成立する
+    reflink = same_device and (destination is None or destination.reflink)
+    if source is not None and not source.reflink:
+        reflink = False
+
+    sparse = destination is None or destination.sparse
+    return CopyPlan(delegate=False, reflink=reflink, sparse=sparse)
+
+
+class _ProviderPool:
+    """1プロバイダー分の接続プール"""
+
+    def __init__(self, factory: Callable[[], IStorageProvider], prefix: Optional[str], size: Optional[int]):
+        self.factory = factory
+        self.prefix = prefix
+        self.size = size  # None は初回生成時に capabilities から決定
+        self.capabilities: Optional[StorageCapabilities] = None
+        self.idle: Deque[Tuple[IStorageProvider, float]] = deque()
+        self.created = 0
+        self.in_use = 0
+        self.checkouts = 0
+        self.reconnects = 0
+        self.health_failures = 0
+        self.condition = threading.Condition()
+
+
+class StorageRegistry:
+    """
+    ストレージプロバイダーのレジストリ（スレッドセーフ）
+
+    使用例:
+        registry.register("nas", lambda: LocalStorageProvider("nas", "/mnt/nas"), prefix="/mnt/nas")
+        with registry.acquire("nas") as provider:
+            provider.copy_file(source, "daily/db.bak")
+    """
+
+    def __init__(self, health_check_interval: float = 30.0, acquire_timeout: float = 300.0):
+        """
+        Args:
+            health_check_interval: この秒数以上使われていない接続はチェックアウト時にヘルスチェックする
+            acquire_timeout: プールが空くまでの最大待機秒数
+        """
+        self.health_check_interval = health_check_interval
+        self.acquire_timeout = acquire_timeout
+        self._pools: Dict[str, _ProviderPool] = {}
+        self._lock = threading.Lock()
+
+    def register(
+        self,
+        provider_id: str,
+        factory: Callable[[], IStorageProvider],
+        prefix: Optional[str] = None,
+        pool_size: Optional[int] = None,
+    ) -> None:
+        """
+        プロバイダーを登録（接続は初回利用時）
+
+        Args:
+            provider_id: プロバイダーID
+            factory: 未接続のプロバイダーインスタンスを返す関数
+            prefix: このプロバイダーに解決するパスのプレフィックス（ローカルパスまたは s3:// 等のURI）
+            pool_size: 最大接続数（Noneは capabilities.max_parallel_streams）
+
+        Raises:
+            ValueError: 登録済み、または pool_size が正でない
+        """
+        if pool_size is not None and pool_size <= 0:
+            raise ValueError("pool_size must be positive")
+
+        with self._lock:
+            if provider_id in self._pools:
+                raise ValueError(f"Storage provider already registered: {provider_id}")
+            self._pools[provider_id] = _ProviderPool(factory, _normalize_prefix(prefix), pool_size)
+
+        logger.info("Storage provider registered", extra={"provider_id": provider_id, "prefix": prefix})
+
+    def unregister(self, provider_id: str) -> None:
+        """プロバイダーの登録を解除し、待機中の接続を切断（使用中の接続は返却時に切断）"""
+        with self._lock:
+            pool = self._pools.pop(provider_id, None)
+        if pool is None:
+            return
+        with pool.condition:
+            idle = list(pool.idle)
+            pool.idle.clear()
+        for provider, _ in idle:
+            _disconnect(provider)
+
+    @property
+    def provider_ids(self) -> List[str]:
+        with self._lock:
+            return list(self._pools)
+
+    @contextmanager
+    def acquire(self, provider_id: str) -> Iterator[IStorageProvider]:
+        """
+        接続済みのプロバイダーをプールから借りる
+
+        Raises:
+            KeyError: 未登録のプロバイダー
+            ConnectionError: 接続失敗、またはプールが空かない
+        """
+        pool = self._get_pool(provider_id)
+        provider = self._checkout(provider_id, pool)
+        healthy = True
+        try:
+            yield provider
+        except OSError:
+            # 接続エラーの可能性があるため、次のチェックアウト時にヘルスチェックする
+            healthy = False
+            raise
+        finally:
+            self._checkin(provider_id, pool, provider, healthy)
+
+    def capabilities(self, provider_id: str) -> StorageCapabilities:
+        """プロバイダーの機能（未取得なら接続して取得）"""
+        pool = self._get_pool(provider_id)
+        if pool.capabilities is None:
+            with self.acquire(provider_id):
+                pass
+        return pool.capabilities
+
+    def resolve(self, path: str) -> Optional[StorageRoute]:
+        """
+        パスを担当するプロバイダーを最長プレフィックス一致で解決
+
+        Returns:
+            StorageRoute（どのプレフィックスにも一致しなければNone）
+        """
+        normalized = path if "://" in path else os.path.abspath(path)
+        best_id, best_prefix = None, ""
+        with self._lock:
+            for provider_id, pool in self._pools.items():
+                prefix = pool.prefix
+                if prefix is None or len(prefix) <= len(best_prefix):
+                    continue
+                if normalized == prefix or normalized.startswith(prefix.rstrip("/") + "/"):
+                    best_id, best_prefix = provider_id, prefix
+
+        if best_id is None:
+            return None
+        relative = normalized[len(best_prefix) :].lstrip("/")
+        return StorageRoute(best_id, relative, self.capabilities(best_id))
+
+    def plan(self, source: str, destination: str) -> Tuple[CopyPlan, Optional[StorageRoute]]:
+        """
+        パスの組み合わせに対するコピー戦略
+
+        Returns:
+            (CopyPlan, 送信先の StorageRoute またはNone)
+        """
+        source_route = self.resolve(source)
+        dest_route = self.resolve(destination)
+        source_caps = source_route.capabilities if source_route else None
+        dest_caps = dest_route.capabilities if dest_route else None
+        return plan_copy(source_caps, dest_caps, _same_device(source, destination)), dest_route
+
+    def check_health(self) -> Dict[str, bool]:
+        """
+        待機中の全接続をヘルスチェックし、失敗した接続を破棄
+
+        Returns:
+            {provider_id: 待機中の接続がすべて正常か}
+        """
+        results = {}
+        with self._lock:
+            pools = list(self._pools.items())
+
+        for provider_id, pool in pools:
+            with pool.condition:
+                idle = list(pool.idle)
+                pool.idle.clear()
+
+            healthy = True
+            keep = []
+            for provider, _ in idle:
+                if _is_healthy(provider):
+                    keep.append((provider, time.monotonic()))
+                else:
+                    healthy = False
+                    self._discard(provider_id, pool, provider)
+
+            with pool.condition:
+                pool.idle.extend(keep)
+                pool.condition.notify_all()
+            results[provider_id] = healthy
+        return results
+
+    def close(self) -> None:
+        """待機中の全接続を切断"""
+        for provider_id in self.provider_ids:
+            pool = self._pools.get(provider_id)
+            if pool is None:
+                continue
+            with pool.condition:
+                idle = list(pool.idle)
+                pool.idle.clear()
+                pool.created -= len(idle)
+            for provider, _ in idle:
+                _disconnect(provider)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """プロバイダー別の接続プール統計"""
+        stats = {}
+        with self._lock:
+            pools = list(self._pools.items())
+        for provider_id, pool in pools:
+            with pool.condition:
+                caps = pool.capabilities
+                stats[provider_id] = {
+                    "prefix": pool.prefix,
+                    "pool_size": pool.size,
+                    "connections": pool.created,
+                    "idle": len(pool.idle),
+                    "in_use": pool.in_use,
+                    "checkouts": pool.checkouts,
+                    "reconnects": pool.reconnects,
+                    "health_failures": pool.health_failures,
+                    "capabilities": caps.__dict__.copy() if caps else None,
+                }
+        return stats
+
+    def _get_pool(self, provider_id: str) -> _ProviderPool:
+        with self._lock:
+            pool = self._pools.get(provider_id)
+        if pool is None:
+            raise KeyError(f"Storage provider not registered: {provider_id}")
+        return pool
+
+    def _checkout(self, provider_id: str, pool: _ProviderPool) -> IStorageProvider:
+        deadline = time.monotonic() + self.acquire_timeout
+        while True:
+            provider = None
+            with pool.condition:
+                while not pool.idle and pool.size is not None and pool.created >= pool.size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise ConnectionError(f"Timed out waiting for a {provider_id} connection")
+                    pool.condition.wait(remaining)
+
+                if pool.idle:
+                    provider, last_used = pool.idle.popleft()
+                else:
+                    # 接続の生成中も上限を超えないよう先に枠を確保する
+                    pool.created += 1
+                    last_used = None
+                pool.in_use += 1
+                pool.checkouts += 1
+
+            if provider is None:
+                try:
+                    return self._create(provider_id, pool)
+                except Exception:
+                    with pool.condition:
+                        pool.created -= 1
+                        pool.in_use -= 1
+                        pool.condition.notify()
+                    raise
+
+            if time.monotonic() - last_used < self.health_check_interval or _is_healthy(provider):
+                return provider
+
+            # 不健全な接続は破棄して再取得（空いた枠で再接続される）
+            with pool.condition:
+                pool.in_use -= 1
+            self._discard(provider_id, pool, provider)
+
+    def _create(self, provider_id: str, pool: _ProviderPool) -> IStorageProvider:
+        provider = pool.factory()
+        if not provider.connect():
+            raise ConnectionError(f"Failed to connect to storage provider: {provider_id}")
+
+        if pool.capabilities is None:
+            capabilities = provider.get_capabilities()
+            with pool.condition:
+                pool.capabilities = capabilities
+                if pool.size is None:
+                    pool.size = max(1, capabilities.max_parallel_streams)
+        logger.debug("Storage provider connected", extra={"provider_id": provider_id})
+        return provider
+
+    def _checkin(self, provider_id: str, pool: _ProviderPool, provider: IStorageProvider, healthy: bool) -> None:
+        with self._lock:
+            registered = self._pools.get(provider_id) is pool
+        if not registered:
+            _disconnect(provider)
+            return
+
+        with pool.condition:
+            pool.in_use -= 1
+            # 異常終了した接続は最終使用時刻を0にして次回チェックアウト時にヘルスチェックさせる
+            pool.idle.append((provider, time.monotonic() if healthy else 0.0))
+            pool.condition.notify()
+
+    def _discard(self, provider_id: str, pool: _ProviderPool, provider: IStorageProvider) -> None:
+        logger.warning("Storage provider failed health check, reconnecting", extra={"provider_id": provider_id})
+        _disconnect(provider)
+        with pool.condition:
+            pool.created -= 1
+            pool.reconnects += 1
+            pool.health_failures += 1
+            pool.condition.notify()
+
+
+_registry: Optional[StorageRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_storage_registry() -> StorageRegistry:
+    """プロセス共有のストレージレジストリを取得（プロバイダーは起動時に register する）"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = StorageRegistry()
+        return _registry
+
+
+def register_configured_providers(registry: StorageRegistry, providers: List[Dict[str, Any]]) -> List[str]:
+    """
+    設定のプロバイダー定義をレジストリに登録
+
+    各定義は {"id", "type"（PROVIDER_TYPES のキー）, "prefix", "pool_size", "options"（コンストラクタ引数）}。
+    options の "location" は StorageLocation の値で指定する。同じIDの登録済みプロバイダーは置き換える
+    （テスト等でアプリを作り直しても二重登録にならない）。接続は初回利用時。
+
+    使用例:
+        STORAGE_PROVIDERS = [
+            {"id": "nas", "type": "local", "prefix": "/mnt/nas", "options": {"base_path": "/mnt/nas"}},
+            {"id": "s3", "type": "s3", "prefix": "s3://backups", "options": {"bucket": "backups"}},
+        ]
+
+    Returns:
+        登録したプロバイダーIDのリスト
+
+    Raises:
+        ValueError: id の欠落、不明な type、またはコンストラクタに合わない options
+    """
+    registered = []
+    for spec in providers:
+        provider_id = spec.get("id")
+        if not provider_id:
+            raise ValueError(f"Storage provider definition without an id: {spec}")
+        if spec.get("type") not in PROVIDER_TYPES:
+            raise ValueError(f"Unknown storage provider type for {provider_id}: {spec.get('type')}")
+
+        module_name, class_name = PROVIDER_TYPES[spec["type"]].rsplit(".", 1)
+        provider_class = getattr(importlib.import_module(module_name), class_name)
+        options = dict(spec.get("options") or {})
+        if "location" in options:
+            options["location"] = StorageLocation(options["location"])
+        try:
+            # 接続は初回利用時のため、引数の誤りはここで検出する
+            inspect.signature(provider_class).bind(provider_id, **options)
+        except TypeError as e:
+            raise ValueError(f"Invalid options for storage provider {provider_id}: {e}") from e
+
+        registry.unregister(provider_id)
+        registry.register(
+            provider_id,
+            partial(provider_class, provider_id, **options),
+            prefix=spec.get("prefix"),
+            pool_size=spec.get("pool_size"),
+        )
+        registered.append(provider_id)
+    return registered
+
+
+def _normalize_prefix(prefix: Optional[str]) -> Optional[str]:
+    if prefix is None or "://" in prefix:
+        return prefix
+    return os.path.abspath(prefix)
+
+
+def _same_device(source: str, destination: str) -> bool:
+    """送信元と送信先（未作成なら存在する最も近い親ディレクトリ）が同じデバイス上か"""
+    if "://" in source or "://" in destination:
+        return False
+    try:
+        source_dev = os.stat(source).st_dev
+    except OSError:
+        return False
+
+    path = os.path.abspath(destination)
+    while True:
+        try:
+            return os.stat(path).st_dev == source_dev
+        except OSError:
+            parent = os.path.dirname(path)
+            if parent == path:
+                return False
+            path = parent
+
+
+def _is_healthy(provider: IStorageProvider) -> bool:
+    try:
+        return bool(provider.health_check())
+    except Exception:
+        return False
+
+
+def _disconnect(provider: IStorageProvider) -> None:
+    try:
+        provider.disconnect()
+    except Exception as e:
+        logger.debug("Storage provider disconnect failed", extra={"error": str(e)})
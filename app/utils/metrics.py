@@ -130,6 +130,43 @@ class BackupSystemMetrics:
             "Number of jobs waiting to run",
         )
 
+        # I/O Scheduler Metrics
+        self.io_target_bandwidth_limit = Gauge(
+            "io_target_bandwidth_limit_bytes",
+            "Configured bandwidth limit per storage target (0 = unlimited)",
+            ["target"],
+        )
+
+        self.io_target_max_streams = Gauge(
+            "io_target_max_streams",
+            "Configured max concurrent streams per storage target (0 = unlimited)",
+            ["target"],
+        )
+
+        self.io_target_streams = Gauge(
+            "io_target_streams",
+            "Streams per storage target by state",
+            ["target", "state"],  # active, suspended, waiting
+        )
+
+        self.io_target_bytes = Gauge(
+            "io_target_bytes_total",
+            "Bytes transferred through the I/O scheduler per storage target",
+            ["target"],
+        )
+
+        self.io_target_throttle_seconds = Gauge(
+            "io_target_throttle_seconds_total",
+            "Time streams spent waiting for bandwidth tokens per storage target",
+            ["target"],
+        )
+
+        self.io_target_preemptions = Gauge(
+            "io_target_preemptions_total",
+            "Lower priority streams suspended by higher priority streams per storage target",
+            ["target"],
+        )
+
         # Database Metrics
         self.db_connection_pool_size = Gauge(
             "db_connection_pool_size",
@@ -272,6 +309,23 @@ class BackupSystemMetrics:
         self.active_jobs.set(active)
         self.queued_jobs.set(queued)
 
+    def update_io_scheduler_metrics(self, stats: dict):
+        """
+        Update I/O scheduler metrics.
+
+        Args:
+            stats: Per-target statistics from IOScheduler.get_stats()
+        """
+        for target, target_stats in stats.items():
+            self.io_target_bandwidth_limit.labels(target=target).set(target_stats["bandwidth_bytes_per_sec"] or 0)
+            self.io_target_max_streams.labels(target=target).set(target_stats["max_streams"] or 0)
+            self.io_target_streams.labels(target=target, state="active").set(target_stats["active_streams"])
+            self.io_target_streams.labels(target=target, state="suspended").set(target_stats["suspended_streams"])
+            self.io_target_streams.labels(target=target, state="waiting").set(target_stats["waiting_streams"])
+            self.io_target_bytes.labels(target=target).set(target_stats["bytes_total"])
+            self.io_target_throttle_seconds.labels(target=target).set(target_stats["throttle_seconds"])
+            self.io_target_preemptions.labels(target=target).set(target_stats["preemptions"])
+
     def record_cache_hit(self, key_prefix: str):
         """
         Record cache hit.
@@ -315,6 +369,9 @@ def init_metrics(app: Flask):
     @app.route("/metrics")
     def metrics_endpoint():
         """Expose Prometheus metrics"""
+        from app.core.io_scheduler import get_io_scheduler
+
+        backup_metrics.update_io_scheduler_metrics(get_io_scheduler().get_stats())
         return generate_latest(REGISTRY)
 
     logger.info("Prometheus metrics initialized")
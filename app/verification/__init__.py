@@ -8,11 +8,14 @@ Features:
 - Multiple checksum algorithms (SHA-256, SHA-512, BLAKE2)
 - Streaming checksum calculation for large files
 - Parallel processing for multiple files
+- Persistent checksum cache keyed by file identity
 - File integrity validation
 - Metadata verification
 - Bit rot detection
+- Merkle-tree manifests for block-level verification and copy comparison
 - Full restore testing
 - Partial restore testing
+- Stratified restore test sampling with confidence reporting
 - Integrity-only verification
 """
 
@@ -20,13 +23,18 @@ from enum import Enum
 from typing import Dict
 
 from .checksum import ChecksumService
+from .checksum_cache import PersistentChecksumCache
 from .interfaces import ChecksumAlgorithm, IVerificationService, VerificationStatus
+from .merkle import MerkleManifest, MerkleTree
 from .validator import FileValidator
 
 __all__ = [
     "IVerificationService",
     "ChecksumService",
+    "PersistentChecksumCache",
     "FileValidator",
+    "MerkleTree",
+    "MerkleManifest",
     "ChecksumAlgorithm",
     "VerificationStatus",
     "VerificationType",
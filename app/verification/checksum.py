@@ -3,15 +3,18 @@ Checksum Calculation Service
 
 This module provides high-performance checksum calculation with support for
 multiple algorithms, streaming processing, and parallel execution.
+Digests of unchanged files can be served from a PersistentChecksumCache.
 """
 
 import hashlib
 import logging
+import threading
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional
 
+from .checksum_cache import PersistentChecksumCache, file_key
 from .interfaces import ChecksumAlgorithm, IVerificationService, VerificationStatus
 
 logger = logging.getLogger(__name__)
@@ -26,7 +29,9 @@ class ChecksumService:
     - BLAKE2b, BLAKE2s (fast and secure)
     - MD5 (legacy support only)
     - Streaming calculation for large files
+    - Several algorithms computed in one read of the file
     - Parallel processing for multiple files
+    - Optional persistent cache keyed by file identity (device, inode, size, mtime)
     """
 
     # Default chunk size for streaming (64KB)
@@ -41,29 +46,56 @@ class ChecksumService:
         ChecksumAlgorithm.MD5: hashlib.md5,
     }
 
-    def __init__(self, default_algorithm: ChecksumAlgorithm = ChecksumAlgorithm.SHA256):
+    def __init__(
+        self,
+        default_algorithm: ChecksumAlgorithm = ChecksumAlgorithm.SHA256,
+        cache: Optional[PersistentChecksumCache] = None,
+    ):
         """
         Initialize checksum service.
 
         Args:
             default_algorithm: Default checksum algorithm to use
+            cache: Persistent checksum cache (None disables caching)
         """
         self.default_algorithm = default_algorithm
-        self.stats = {"total_calculated": 0, "total_bytes_processed": 0, "total_time": 0.0, "errors": 0}
+        self.cache = cache
+        # Checksums are calculated from pool threads (calculate_checksums_parallel, FileValidator)
+        self._stats_lock = threading.Lock()
+        self.stats = self._empty_stats()
+
+    @staticmethod
+    def _empty_stats() -> Dict:
+        return {
+            "total_calculated": 0,
+            "total_bytes_processed": 0,
+            "total_time": 0.0,
+            "errors": 0,
+            "cache_hits": 0,
+            "cache_misses": 0,
+        }
 
     def calculate_checksum(
-        self, file_path: Path, algorithm: Optional[ChecksumAlgorithm] = None, chunk_size: int = DEFAULT_CHUNK_SIZE
+        self,
+        file_path: Path,
+        algorithm: Optional[ChecksumAlgorithm] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        force_rehash: bool = False,
     ) -> str:
         """
         Calculate checksum for a single file using streaming.
 
         This method reads the file in chunks to handle large files efficiently
-        without loading the entire file into memory.
+        without loading the entire file into memory. When a cache is configured
+        and the file's identity is unchanged, the cached digest is returned.
 
         Args:
             file_path: Path to the file
             algorithm: Checksum algorithm to use (defaults to instance default)
             chunk_size: Size of chunks for streaming calculation (bytes)
+            force_rehash: Always read the file and refresh the cached digest
+                (required for bit-rot scrubs, which must detect corruption that
+                leaves size and mtime untouched)
 
         Returns:
             Hexadecimal checksum string
@@ -75,9 +107,44 @@ class ChecksumService:
             ValueError: If algorithm is not supported
         """
         algorithm = algorithm or self.default_algorithm
+        return self.calculate_checksums(file_path, [algorithm], chunk_size, force_rehash)[algorithm]
+
+    def calculate_checksums(
+        self,
+        file_path: Path,
+        algorithms: Iterable[ChecksumAlgorithm],
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        force_rehash: bool = False,
+    ) -> Dict[ChecksumAlgorithm, str]:
+        """
+        Calculate several checksums of a file in a single streaming read.
+
+        Every chunk read from disk is fed to all requested hash objects, so
+        e.g. a BLAKE2b digest for deduplication and a SHA-256 digest for
+        compliance cost one pass of I/O. Algorithms whose digest is cached are
+        not recomputed; the file is not read at all if every digest is cached.
 
-        if algorithm not in self.ALGORITHM_MAP:
-            raise ValueError(f"Unsupported algorithm: {algorithm}")
+        Args:
+            file_path: Path to the file
+            algorithms: Checksum algorithms to compute
+            chunk_size: Size of chunks for streaming calculation (bytes)
+            force_rehash: Always read the file and refresh the cached digests
+
+        Returns:
+            Dictionary mapping each algorithm to its hexadecimal checksum
+
+        Raises:
+            FileNotFoundError: If file doesn't exist
+            PermissionError: If file cannot be read
+            IOError: If file read fails
+            ValueError: If an algorithm is not supported or none is given
+        """
+        algorithms = list(dict.fromkeys(algorithms))
+        if not algorithms:
+            raise ValueError("At least one algorithm is required")
+        for algorithm in algorithms:
+            if algorithm not in self.ALGORITHM_MAP:
+                raise ValueError(f"Unsupported algorithm: {algorithm}")
 
         file_path = Path(file_path)
 
@@ -87,49 +154,71 @@ class ChecksumService:
         if not file_path.is_file():
             raise ValueError(f"Not a file: {file_path}")
 
+        checksums: Dict[ChecksumAlgorithm, str] = {}
+        key = None
+        if self.cache is not None:
+            key = file_key(file_path.stat())
+            if not force_rehash:
+                for algorithm in algorithms:
+                    cached = self.cache.get(key, algorithm.value)
+                    if cached is not None:
+                        self._count(cache_hits=1)
+                        checksums[algorithm] = cached
+                    else:
+                        self._count(cache_misses=1)
+
+        pending = [algorithm for algorithm in algorithms if algorithm not in checksums]
+        if not pending:
+            return checksums
+
         start_time = time.time()
         bytes_processed = 0
 
         try:
-            # Create hash object
-            hash_obj = self.ALGORITHM_MAP[algorithm]()
+            # Create one hash object per algorithm still to compute
+            hash_objs = [self.ALGORITHM_MAP[algorithm]() for algorithm in pending]
 
-            # Stream file in chunks
+            # Stream file in chunks, feeding every hash object from the same buffer
             with open(file_path, "rb") as f:
                 while True:
                     chunk = f.read(chunk_size)
                     if not chunk:
                         break
-                    hash_obj.update(chunk)
+                    for hash_obj in hash_objs:
+                        hash_obj.update(chunk)
                     bytes_processed += len(chunk)
 
-            checksum = hash_obj.hexdigest()
+            computed = {algorithm: hash_obj.hexdigest() for algorithm, hash_obj in zip(pending, hash_objs)}
+            checksums.update(computed)
+
+            # Only cache when the file did not change while it was being read
+            if key is not None and file_key(file_path.stat()) == key:
+                for algorithm, checksum in computed.items():
+                    self.cache.put(key, algorithm.value, checksum)
 
             # Update statistics
             elapsed_time = time.time() - start_time
-            self.stats["total_calculated"] += 1
-            self.stats["total_bytes_processed"] += bytes_processed
-            self.stats["total_time"] += elapsed_time
+            self._count(total_calculated=len(pending), total_bytes_processed=bytes_processed, total_time=elapsed_time)
 
             logger.debug(
-                f"Calculated {algorithm.value} checksum for {file_path.name}: "
-                f"{checksum} ({bytes_processed} bytes in {elapsed_time:.2f}s)"
+                f"Calculated {', '.join(a.value for a in pending)} checksums for {file_path.name} "
+                f"({bytes_processed} bytes in {elapsed_time:.2f}s)"
             )
 
-            return checksum
+            return checksums
 
         except PermissionError as e:
-            self.stats["errors"] += 1
+            self._count(errors=1)
             logger.error(f"Permission denied reading {file_path}: {e}")
             raise
 
         except IOError as e:
-            self.stats["errors"] += 1
+            self._count(errors=1)
             logger.error(f"IO error reading {file_path}: {e}")
             raise
 
         except Exception as e:
-            self.stats["errors"] += 1
+            self._count(errors=1)
             logger.error(f"Unexpected error calculating checksum for {file_path}: {e}")
             raise
 
@@ -139,6 +228,7 @@ class ChecksumService:
         algorithm: Optional[ChecksumAlgorithm] = None,
         max_workers: Optional[int] = None,
         chunk_size: int = DEFAULT_CHUNK_SIZE,
+        force_rehash: bool = False,
     ) -> Dict[Path, str]:
         """
         Calculate checksums for multiple files in parallel.
@@ -151,6 +241,7 @@ class ChecksumService:
             algorithm: Checksum algorithm to use
             max_workers: Maximum number of parallel workers (defaults to CPU count)
             chunk_size: Size of chunks for streaming calculation
+            force_rehash: Bypass the checksum cache and refresh it
 
         Returns:
             Dictionary mapping file paths to checksums
@@ -171,7 +262,8 @@ class ChecksumService:
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
             # Submit all tasks
             future_to_path = {
-                executor.submit(self.calculate_checksum, path, algorithm, chunk_size): path for path in file_paths
+                executor.submit(self.calculate_checksum, path, algorithm, chunk_size, force_rehash): path
+                for path in file_paths
             }
 
             # Collect results as they complete
@@ -235,7 +327,13 @@ class ChecksumService:
 
         return self.calculate_checksums_parallel(files, algorithm=algorithm, max_workers=max_workers)
 
-    def verify_checksum(self, file_path: Path, expected_checksum: str, algorithm: Optional[ChecksumAlgorithm] = None) -> bool:
+    def verify_checksum(
+        self,
+        file_path: Path,
+        expected_checksum: str,
+        algorithm: Optional[ChecksumAlgorithm] = None,
+        force_rehash: bool = False,
+    ) -> bool:
         """
         Verify a file's checksum against an expected value.
 
@@ -243,12 +341,13 @@ class ChecksumService:
             file_path: Path to the file
             expected_checksum: Expected checksum value
             algorithm: Checksum algorithm to use
+            force_rehash: Read the file even if its digest is cached
 
         Returns:
             True if checksum matches, False otherwise
         """
         try:
-            actual_checksum = self.calculate_checksum(file_path, algorithm)
+            actual_checksum = self.calculate_checksum(file_path, algorithm, force_rehash=force_rehash)
             matches = actual_checksum.lower() == expected_checksum.lower()
 
             if not matches:
@@ -267,18 +366,31 @@ class ChecksumService:
         Returns:
             Dictionary containing statistics
         """
-        stats = self.stats.copy()
+        with self._stats_lock:
+            stats = self.stats.copy()
 
         if stats["total_time"] > 0:
             stats["avg_throughput_mb_s"] = stats["total_bytes_processed"] / (1024 * 1024) / stats["total_time"]
         else:
             stats["avg_throughput_mb_s"] = 0.0
 
+        lookups = stats["cache_hits"] + stats["cache_misses"]
+        stats["cache_hit_rate"] = stats["cache_hits"] / lookups if lookups else 0.0
+        if self.cache is not None:
+            stats["cache"] = self.cache.get_statistics()
+
         return stats
 
     def reset_statistics(self) -> None:
         """Reset service statistics."""
-        self.stats = {"total_calculated": 0, "total_bytes_processed": 0, "total_time": 0.0, "errors": 0}
+        with self._stats_lock:
+            self.stats = self._empty_stats()
+
+    def _count(self, **increments) -> None:
+        """Add to statistics counters."""
+        with self._stats_lock:
+            for name, value in increments.items():
+                self.stats[name] += value
 
     @staticmethod
     def get_supported_algorithms() -> List[ChecksumAlgorithm]:
@@ -0,0 +1,192 @@
+"""
+Persistent Checksum Cache
+
+Stores file digests keyed by file identity so unchanged files are not rehashed.
+
+- Key: (device, inode, size, mtime_ns, algorithm); any change to the file
+  (rewrite, truncate, touch, replace by rename) produces a different key
+- Backed by SQLite (WAL mode), shared safely between threads of one process
+- Least recently used entries are evicted once ``max_entries`` is exceeded
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+FileKey = Tuple[int, int, int, int]
+
+
+def file_key(stat_result: os.stat_result) -> FileKey:
+    """
+    Build the identity key of a file from its stat result.
+
+    Args:
+        stat_result: Result of os.stat()
+
+    Returns:
+        (device, inode, size, mtime_ns)
+    """
+    return (stat_result.st_dev, stat_result.st_ino, stat_result.st_size, stat_result.st_mtime_ns)
+
+
+class PersistentChecksumCache:
+    """
+    SQLite-backed checksum cache with LRU eviction.
+
+    The cache only remembers digests; it never decides whether a file is
+    intact. Bit-rot scrubs must bypass it (ChecksumService force_rehash=True),
+    because silent media corruption does not change size or mtime.
+    """
+
+    DEFAULT_MAX_ENTRIES = 1_000_000
+
+    # Fraction of max_entries kept after an eviction pass, so eviction runs
+    # once per many inserts instead of on every insert
+    EVICTION_LOW_WATERMARK = 0.9
+
+    def __init__(self, db_path: Union[str, Path] = ":memory:", max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        Open (or create) a checksum cache.
+
+        Args:
+            db_path: SQLite database file (":memory:" for a process-local cache)
+            max_entries: Maximum number of cached digests
+        """
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive")
+
+        self.db_path = str(db_path)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+        if self.db_path != ":memory:":
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        if self.db_path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS checksums (
+                dev INTEGER NOT NULL,
+                ino INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                algorithm TEXT NOT NULL,
+                checksum TEXT NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (dev, ino, size, mtime_ns, algorithm)
+            ) WITHOUT ROWID
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_checksums_last_used ON checksums (last_used)")
+        self._count = self._conn.execute("SELECT COUNT(*) FROM checksums").fetchone()[0]
+
+    def get(self, key: FileKey, algorithm: str) -> Optional[str]:
+        """
+        Look up a cached digest and mark it as recently used.
+
+        Args:
+            key: File identity from file_key()
+            algorithm: Algorithm name (ChecksumAlgorithm.value)
+
+        Returns:
+            Hexadecimal digest, or None when not cached
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT checksum FROM checksums WHERE dev=? AND ino=? AND size=? AND mtime_ns=? AND algorithm=?",
+                (*key, algorithm),
+            ).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE checksums SET last_used=? WHERE dev=? AND ino=? AND size=? AND mtime_ns=? AND algorithm=?",
+                (time.time(), *key, algorithm),
+            )
+            self.stats["hits"] += 1
+            return row[0]
+
+    def put(self, key: FileKey, algorithm: str, checksum: str) -> None:
+        """
+        Store a digest, evicting least recently used entries if the cache is full.
+
+        Args:
+            key: File identity from file_key()
+            algorithm: Algorithm name (ChecksumAlgorithm.value)
+            checksum: Hexadecimal digest
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO checksums VALUES (?, ?, ?, ?, ?, ?, ?)", (*key, algorithm, checksum, time.time())
+            )
+            if cursor.rowcount:
+                self._count += 1
+            else:
+                self._conn.execute(
+                    "UPDATE checksums SET checksum=?, last_used=? "
+                    "WHERE dev=? AND ino=? AND size=? AND mtime_ns=? AND algorithm=?",
+                    (checksum, time.time(), *key, algorithm),
+                )
+            self.stats["stores"] += 1
+
+            if self._count > self.max_entries:
+                self._evict()
+
+    def invalidate(self, key: FileKey) -> None:
+        """Drop all digests of a file identity (any algorithm)."""
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM checksums WHERE dev=? AND ino=? AND size=? AND mtime_ns=?", key)
+            self._count -= cursor.rowcount
+
+    def clear(self) -> None:
+        """Remove every cached digest."""
+        with self._lock:
+            self._conn.execute("DELETE FROM checksums")
+            self._count = 0
+
+    def _evict(self) -> None:
+        """Delete least recently used entries down to the low watermark (caller holds the lock)."""
+        excess = self._count - int(self.max_entries * self.EVICTION_LOW_WATERMARK)
+        cursor = self._conn.execute(
+            "DELETE FROM checksums WHERE (dev, ino, size, mtime_ns, algorithm) IN ("
+            "SELECT dev, ino, size, mtime_ns, algorithm FROM checksums ORDER BY last_used LIMIT ?)",
+            (excess,),
+        )
+        self._count -= cursor.rowcount
+        self.stats["evictions"] += cursor.rowcount
+        logger.debug(f"Evicted {cursor.rowcount} checksum cache entries")
+
+    def get_statistics(self) -> Dict:
+        """
+        Get cache statistics.
+
+        Returns:
+            {"entries", "max_entries", "hits", "misses", "stores", "evictions", "hit_rate"}
+        """
+        with self._lock:
+            stats = dict(self.stats, entries=self._count, max_entries=self.max_entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __repr__(self) -> str:
+        return f"PersistentChecksumCache(path={self.db_path}, entries={self._count}/{self.max_entries})"
@@ -0,0 +1,686 @@
+"""
+Merkle Tree Manifests
+
+Block-level hash trees for backup copies.
+
+- Each file is split into fixed-size blocks; the leaves of its tree are the
+  block hashes and the root summarises the whole file
+- A backup-level tree is built over (relative path, file root) pairs
+- Trees are stored next to the backup copy in <storage_path>.merkle.db together
+  with the size and mtime each file had when it was hashed; after every copy the
+  backup engine drops the entries of rewritten files (a metadata-only check) and
+  the scrubber hashes new and rewritten files on its paced pass
+
+This allows:
+- Verifying any byte range by reading only the blocks that cover it
+- Comparing two copies in O(changed blocks) by descending only into
+  subtrees whose hashes differ
+- Localising corruption to individual blocks instead of whole files
+
+Leaves and inner nodes use different prefixes (0x00 / 0x01) so that a leaf
+hash can never be mistaken for an inner node (second-preimage protection).
+"""
+
+import logging
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from .checksum import ChecksumService
+from .interfaces import ChecksumAlgorithm
+
+logger = logging.getLogger(__name__)
+
+MERKLE_SUFFIX = ".merkle.db"
+
+# 1MB blocks: 32 bytes of SHA-256 per MB keeps a 1TB file's leaves at 32MB
+DEFAULT_BLOCK_SIZE = 1024 * 1024
+
+_LEAF_PREFIX = b"\x00"
+_NODE_PREFIX = b"\x01"
+_FILE_PREFIX = b"\x02"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    root BLOB NOT NULL,
+    leaves BLOB NOT NULL,
+    mtime_ns INTEGER
+) WITHOUT ROWID;
+"""
+
+
+def merkle_path_for(storage_path: Union[str, Path]) -> str:
+    """Path of the Merkle manifest stored next to a backup copy."""
+    return os.path.normpath(str(storage_path)) + MERKLE_SUFFIX
+
+
+def _hash_factory(algorithm: ChecksumAlgorithm):
+    if algorithm not in ChecksumService.ALGORITHM_MAP:
+        raise ValueError(f"Unsupported algorithm: {algorithm}")
+    return ChecksumService.ALGORITHM_MAP[algorithm]
+
+
+def _parent_level(nodes: List[bytes], new_hash) -> List[bytes]:
+    """Hash pairs of nodes; an odd last node is promoted unchanged."""
+    parents = []
+    for i in range(0, len(nodes) - 1, 2):
+        parents.append(new_hash(_NODE_PREFIX + nodes[i] + nodes[i + 1]).digest())
+    if len(nodes) % 2:
+        parents.append(nodes[-1])
+    return parents
+
+
+def _root_of(leaves: List[bytes], new_hash) -> bytes:
+    level = leaves
+    while len(level) > 1:
+        level = _parent_level(level, new_hash)
+    return level[0]
+
+
+class MerkleTree:
+    """
+    Merkle tree over the fixed-size blocks of one file.
+
+    Only the leaves are kept; inner levels are computed on demand for diffs.
+    """
+
+    def __init__(
+        self,
+        leaves: List[bytes],
+        size: int,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        algorithm: ChecksumAlgorithm = ChecksumAlgorithm.SHA256,
+    ):
+        """
+        Initialize a tree from its leaf hashes.
+
+        Args:
+            leaves: Block hashes in file order (at least one; an empty file has one empty block)
+            size: File size in bytes
+            block_size: Block size in bytes
+            algorithm: Hash algorithm of the leaves and nodes
+        """
+        if not leaves:
+            raise ValueError("A Merkle tree needs at least one leaf")
+        if block_size <= 0:
+            raise ValueError("block_size must be positive")
+
+        self.leaves = leaves
+        self.size = size
+        self.block_size = block_size
+        self.algorithm = algorithm
+        self._new_hash = _hash_factory(algorithm)
+        self._root: Optional[bytes] = None
+
+    @classmethod
+    def from_file(
+        cls,
+        file_path: Union[str, Path],
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        algorithm: ChecksumAlgorithm = ChecksumAlgorithm.SHA256,
+        progress_callback: Optional[Callable[[int], None]] = None,
+    ) -> "MerkleTree":
+        """
+        Build the tree of a file in one streaming read.
+
+        Args:
+            file_path: Path to the file
+            block_size: Block size in bytes
+            algorithm: Hash algorithm
+            progress_callback: Called with the byte count of every block read;
+                an exception raised from it aborts the read
+
+        Returns:
+            MerkleTree of the file
+        """
+        new_hash = _hash_factory(algorithm)
+        leaves = []
+        size = 0
+        with open(file_path, "rb") as f:
+            while True:
+                block = f.read(block_size)
+                if not block and leaves:
+                    break
+                leaves.append(new_hash(_LEAF_PREFIX + block).digest())
+                size += len(block)
+                if progress_callback and block:
+                    progress_callback(len(block))
+                if len(block) < block_size:
+                    break
+        return cls(leaves, size, block_size, algorithm)
+
+    @property
+    def root(self) -> bytes:
+        """Root hash (raw bytes)."""
+        if self._root is None:
+            self._root = _root_of(self.leaves, self._new_hash)
+        return self._root
+
+    @property
+    def root_hex(self) -> str:
+        """Root hash as a hexadecimal string."""
+        return self.root.hex()
+
+    @property
+    def block_count(self) -> int:
+        return len(self.leaves)
+
+    def levels(self) -> List[List[bytes]]:
+        """All levels of the tree, leaves first and the root last."""
+        levels = [self.leaves]
+        while len(levels[-1]) > 1:
+            levels.append(_parent_level(levels[-1], self._new_hash))
+        return levels
+
+    def block_range(self, offset: int, length: int) -> range:
+        """
+        Indices of the blocks covering a byte range.
+
+        Args:
+            offset: First byte of the range
+            length: Number of bytes
+
+        Returns:
+            range of block indices (empty when length is 0)
+        """
+        if offset < 0 or length < 0:
+            raise ValueError("offset and length must not be negative")
+        if length == 0:
+            return range(0)
+        if offset + length > self.size:
+            raise ValueError(f"Range {offset}+{length} exceeds file size {self.size}")
+        return range(offset // self.block_size, (offset + length - 1) // self.block_size + 1)
+
+    def diff(self, other: "MerkleTree") -> List[int]:
+        """
+        Indices of blocks that differ from another tree of the same file layout.
+
+        Equal subtrees are skipped, so the cost is O(changed blocks * log n)
+        hash comparisons once both trees' levels are available.
+
+        Args:
+            other: Tree of the other copy
+
+        Returns:
+            Sorted list of differing block indices
+        """
+        if self.block_size != other.block_size or self.algorithm != other.algorithm:
+            raise ValueError("Trees with different block sizes or algorithms cannot be compared")
+        if self.root == other.root and self.size == other.size:
+            return []
+
+        if len(self.leaves) != len(other.leaves):
+            # Different shapes: compare the common prefix leaf by leaf, the tail differs by definition
+            common = min(len(self.leaves), len(other.leaves))
+            changed = [i for i in range(common) if self.leaves[i] != other.leaves[i]]
+            return changed + list(range(common, max(len(self.leaves), len(other.leaves))))
+
+        ours, theirs = self.levels(), other.levels()
+        pending = [0]
+        for depth in range(len(ours) - 2, -1, -1):
+            level_a, level_b = ours[depth], theirs[depth]
+            children = []
+            for index in pending:
+                for child in (2 * index, 2 * index + 1):
+                    if child < len(level_a) and level_a[child] != level_b[child]:
+                        children.append(child)
+            pending = children
+        return pending
+
+    def verify_range(self, file_path: Union[str, Path], offset: int = 0, length: Optional[int] = None) -> List[int]:
+        """
+        Verify a byte range of a file against this tree, reading only the covering blocks.
+
+        Args:
+            file_path: Path to the file
+            offset: First byte of the range
+            length: Number of bytes (default: to the end of the file)
+
+        Returns:
+            Sorted list of corrupted block indices (empty when the range is intact)
+        """
+        if length is None:
+            length = self.size - offset
+        blocks = self.block_range(offset, length)
+        if not blocks:
+            return []
+
+        corrupted = []
+        with open(file_path, "rb") as f:
+            f.seek(blocks.start * self.block_size)
+            for index in blocks:
+                block = f.read(self.block_size)
+                expected = min(self.block_size, self.size - index * self.block_size)
+                if len(block) != expected or self._new_hash(_LEAF_PREFIX + block).digest() != self.leaves[index]:
+                    corrupted.append(index)
+        return corrupted
+
+    def to_bytes(self) -> bytes:
+        """Concatenated leaf hashes (storage format)."""
+        return b"".join(self.leaves)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, size: int, block_size: int, algorithm: ChecksumAlgorithm) -> "MerkleTree":
+        """Rebuild a tree from to_bytes() output."""
+        digest_size = _hash_factory(algorithm)().digest_size
+        leaves = [data[i : i + digest_size] for i in range(0, len(data), digest_size)]
+        return cls(leaves, size, block_size, algorithm)
+
+    def __repr__(self) -> str:
+        return f"MerkleTree(root={self.root_hex[:16]}..., blocks={self.block_count}, size={self.size})"
+
+
+class MerkleManifest:
+    """
+    SQLite store of the per-file Merkle trees of one backup copy, plus the backup-level root.
+
+    A directory copy stores one tree per file keyed by its relative path
+    (POSIX separators); a single-file copy stores one tree keyed by the file name.
+    """
+
+    def __init__(self, db_path: Union[str, Path]):
+        """
+        Open (or create) a manifest.
+
+        Args:
+            db_path: Manifest file path (see merkle_path_for)
+        """
+        self.db_path = str(db_path)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        # Manifests written before file identities were recorded
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(files)")}
+        if "mtime_ns" not in columns:
+            with self._conn:
+                self._conn.execute("ALTER TABLE files ADD COLUMN mtime_ns INTEGER")
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "MerkleManifest":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    @classmethod
+    def build(
+        cls,
+        source: Union[str, Path],
+        db_path: Optional[Union[str, Path]] = None,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        algorithm: ChecksumAlgorithm = ChecksumAlgorithm.SHA256,
+        max_workers: Optional[int] = None,
+    ) -> "MerkleManifest":
+        """
+        Hash a backup copy and write its manifest, replacing any previous one.
+
+        Args:
+            source: Backup copy (file or directory)
+            db_path: Manifest path (default: merkle_path_for(source))
+            block_size: Block size in bytes
+            algorithm: Hash algorithm
+            max_workers: Files hashed in parallel
+
+        Returns:
+            The open manifest
+        """
+        manifest = cls(db_path or merkle_path_for(source))
+        manifest._update(Path(source), block_size, algorithm, max_workers, reuse=False)
+        return manifest
+
+    @classmethod
+    def refresh(
+        cls,
+        source: Union[str, Path],
+        db_path: Optional[Union[str, Path]] = None,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        algorithm: ChecksumAlgorithm = ChecksumAlgorithm.SHA256,
+        max_workers: Optional[int] = None,
+        progress_callback: Optional[Callable[[int], None]] = None,
+    ) -> "MerkleManifest":
+        """
+        Bring the manifest of a backup copy up to date after the copy was written.
+
+        Files whose size and mtime match the stored row keep their tree, so their
+        reference is never replaced by a re-read of data that may have rotted since;
+        new and rewritten files are hashed and vanished files are dropped. A manifest
+        with a different block size or algorithm is rebuilt.
+
+        Args:
+            source: Backup copy (file or directory)
+            db_path: Manifest path (default: merkle_path_for(source))
+            block_size: Block size in bytes
+            algorithm: Hash algorithm
+            max_workers: Files hashed in parallel
+            progress_callback: Called with the byte count of every block hashed
+
+        Returns:
+            The open manifest
+        """
+        manifest = cls(db_path or merkle_path_for(source))
+        reuse = manifest._meta("block_size") == str(block_size) and manifest._meta("algorithm") == algorithm.value
+        manifest._update(Path(source), block_size, algorithm, max_workers, reuse, progress_callback)
+        return manifest
+
+    def _update(
+        self,
+        source: Path,
+        block_size: int,
+        algorithm: ChecksumAlgorithm,
+        max_workers: Optional[int],
+        reuse: bool,
+        progress_callback: Optional[Callable[[int], None]] = None,
+    ) -> None:
+        files = _list_files(source)
+        known = {}
+        if reuse:
+            known = {row[0]: (row[1], row[2]) for row in self._conn.execute("SELECT path, size, mtime_ns FROM files")}
+
+        def identity(rel):
+            st = _resolve(source, rel).stat()
+            return st.st_size, st.st_mtime_ns
+
+        # The identity is taken before hashing: a file changed meanwhile is hashed again next time
+        identities = {rel: identity(rel) for rel in files}
+        stale = [rel for rel in files if known.get(rel) != identities[rel]]
+
+        def hash_file(rel):
+            return MerkleTree.from_file(_resolve(source, rel), block_size, algorithm, progress_callback)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            rows = [
+                (rel, tree.size, tree.root, tree.to_bytes(), identities[rel][1])
+                for rel, tree in zip(stale, pool.map(hash_file, stale))
+            ]
+
+        with self._conn:
+            if reuse:
+                vanished = [(rel,) for rel in known.keys() - set(files)]
+                self._conn.executemany("DELETE FROM files WHERE path = ?", vanished)
+            else:
+                self._conn.execute("DELETE FROM files")
+            self._conn.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)", rows)
+            meta = {"algorithm": algorithm.value, "block_size": str(block_size)}
+            self._conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", meta.items())
+            self.update_root()
+
+        logger.info(
+            f"{'Refreshed' if reuse else 'Built'} Merkle manifest for {source}: "
+            f"{len(rows)} of {len(files)} files hashed, root {(self.root or '')[:16]}..."
+        )
+
+    def add_file(
+        self,
+        source: Union[str, Path],
+        path: str,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        algorithm: ChecksumAlgorithm = ChecksumAlgorithm.SHA256,
+        progress_callback: Optional[Callable[[int], None]] = None,
+    ) -> MerkleTree:
+        """
+        Hash one file of a backup copy into the manifest, for building a manifest a file at a time.
+
+        The backup root is not updated; call update_root() once every file was added.
+
+        Args:
+            source: Backup copy (file or directory)
+            path: Relative path of the file
+            block_size: Block size in bytes (must match the files already added)
+            algorithm: Hash algorithm (must match the files already added)
+            progress_callback: Called with the byte count of every block hashed
+
+        Returns:
+            The file's tree
+        """
+        file_path = _resolve(Path(source), path)
+        mtime_ns = file_path.stat().st_mtime_ns
+        tree = MerkleTree.from_file(file_path, block_size, algorithm, progress_callback)
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)",
+                (path, tree.size, tree.root, tree.to_bytes(), mtime_ns),
+            )
+            meta = {"algorithm": algorithm.value, "block_size": str(block_size)}
+            self._conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", meta.items())
+        return tree
+
+    def unhashed_files(self, source: Union[str, Path]) -> List[str]:
+        """Relative paths of the files of a backup copy that the manifest does not cover yet, sorted."""
+        known = set(self.paths())
+        return [path for path in _list_files(Path(source)) if path not in known]
+
+    def discard_changed(self, source: Union[str, Path]) -> int:
+        """
+        Drop the files whose size or mtime changed since they were hashed, or that no longer exist.
+
+        Only file metadata is read; dropped files show up in unhashed_files() again.
+
+        Args:
+            source: Backup copy (file or directory)
+
+        Returns:
+            Number of files dropped
+        """
+        source = Path(source)
+        changed = []
+        for path, size, mtime_ns in self._conn.execute("SELECT path, size, mtime_ns FROM files").fetchall():
+            try:
+                st = _resolve(source, path).stat()
+            except FileNotFoundError:
+                changed.append((path,))
+                continue
+            # Manifests written before mtimes were recorded can only be checked by size
+            if st.st_size != size or (mtime_ns is not None and st.st_mtime_ns != mtime_ns):
+                changed.append((path,))
+
+        if changed:
+            with self._conn:
+                self._conn.executemany("DELETE FROM files WHERE path = ?", changed)
+                self.update_root()
+        return len(changed)
+
+    def discard(self, path: str) -> bool:
+        """
+        Drop one file so that it shows up in unhashed_files() again (e.g. rewritten after it was hashed).
+
+        Args:
+            path: Relative file path
+
+        Returns:
+            Whether the file was in the manifest
+        """
+        with self._conn:
+            cursor = self._conn.execute("DELETE FROM files WHERE path = ?", (path,))
+            self.update_root()
+        return cursor.rowcount > 0
+
+    def update_root(self) -> str:
+        """Recompute and store the backup root over the files in the manifest."""
+        file_roots = list(self._conn.execute("SELECT path, root FROM files"))
+        root = _backup_root(file_roots, _hash_factory(self.algorithm)).hex()
+        with self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('root', ?)", (root,))
+        return root
+
+    def remove(self, prefix: str) -> int:
+        """
+        Drop the files below a directory of the copy (e.g. a run deleted by retention).
+
+        Args:
+            prefix: Relative directory path
+
+        Returns:
+            Number of files removed
+        """
+        pattern = prefix.rstrip("/") + "/"
+        with self._conn:
+            cursor = self._conn.execute("DELETE FROM files WHERE substr(path, 1, ?) = ?", (len(pattern), pattern))
+            self.update_root()
+        return cursor.rowcount
+
+    def _meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    @property
+    def algorithm(self) -> ChecksumAlgorithm:
+        return ChecksumAlgorithm(self._meta("algorithm") or ChecksumAlgorithm.SHA256.value)
+
+    @property
+    def block_size(self) -> int:
+        return int(self._meta("block_size") or DEFAULT_BLOCK_SIZE)
+
+    @property
+    def root(self) -> Optional[str]:
+        """Backup-level root hash (hex), or None for an empty manifest."""
+        return self._meta("root")
+
+    def paths(self) -> List[str]:
+        """Relative paths of all files in the manifest, sorted."""
+        return [row[0] for row in self._conn.execute("SELECT path FROM files ORDER BY path")]
+
+    def total_size(self) -> int:
+        """Sum of the sizes of all files in the manifest, in bytes."""
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM files").fetchone()[0]
+
+    def file_roots(self) -> Dict[str, bytes]:
+        """Map of relative path to file root hash."""
+        return dict(self._conn.execute("SELECT path, root FROM files"))
+
+    def file_identity(self, path: str) -> Optional[Tuple[int, Optional[int]]]:
+        """(size, mtime_ns) the file had when it was hashed (mtime_ns is None for older manifests)."""
+        row = self._conn.execute("SELECT size, mtime_ns FROM files WHERE path = ?", (path,)).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def file_tree(self, path: str) -> Optional[MerkleTree]:
+        """Stored tree of one file, or None when the path is not in the manifest."""
+        row = self._conn.execute("SELECT size, leaves FROM files WHERE path = ?", (path,)).fetchone()
+        if row is None:
+            return None
+        return MerkleTree.from_bytes(row[1], row[0], self.block_size, self.algorithm)
+
+    def verify(
+        self,
+        source: Union[str, Path],
+        paths: Optional[Iterable[str]] = None,
+        max_workers: Optional[int] = None,
+    ) -> Dict:
+        """
+        Verify files of a backup copy block by block against the manifest.
+
+        Args:
+            source: Backup copy (file or directory) the manifest was built from
+            paths: Relative paths to verify (default: all)
+            max_workers: Files verified in parallel
+
+        Returns:
+            {"files_checked", "files_valid", "missing": [path],
+             "corrupted": {path: [block indices]}, "block_size"}
+        """
+        source = Path(source)
+        paths = list(paths) if paths is not None else self.paths()
+        trees = {path: self.file_tree(path) for path in paths}
+
+        def check(path):
+            tree = trees[path]
+            target = _resolve(source, path)
+            if tree is None or not target.is_file():
+                return path, None
+            corrupted = tree.verify_range(target, 0, tree.size) if tree.size else []
+            if target.stat().st_size != tree.size:
+                corrupted = sorted(set(corrupted) | {tree.block_count - 1})
+            return path, corrupted
+
+        result = {"files_checked": 0, "files_valid": 0, "missing": [], "corrupted": {}, "block_size": self.block_size}
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for path, corrupted in pool.map(check, paths):
+                result["files_checked"] += 1
+                if corrupted is None:
+                    result["missing"].append(path)
+                elif corrupted:
+                    result["corrupted"][path] = corrupted
+                else:
+                    result["files_valid"] += 1
+        return result
+
+    def verify_range(self, source: Union[str, Path], path: str, offset: int, length: int) -> List[int]:
+        """
+        Verify a byte range of one file, reading only the blocks that cover it.
+
+        Args:
+            source: Backup copy the manifest was built from
+            path: Relative path of the file
+            offset: First byte of the range
+            length: Number of bytes
+
+        Returns:
+            Corrupted block indices within the range
+        """
+        tree = self.file_tree(path)
+        if tree is None:
+            raise KeyError(f"{path} is not in the Merkle manifest")
+        return tree.verify_range(_resolve(Path(source), path), offset, length)
+
+    def diff(self, other: "MerkleManifest") -> Dict:
+        """
+        Compare two copies of a backup (e.g. primary and offsite).
+
+        Files with equal roots are skipped without loading their leaves;
+        changed files are descended into to find the differing blocks.
+
+        Args:
+            other: Manifest of the other copy
+
+        Returns:
+            {"identical", "added": [path], "removed": [path], "changed": {path: [block indices]}}
+        """
+        if self.root is not None and self.root == other.root:
+            return {"identical": True, "added": [], "removed": [], "changed": {}}
+
+        ours, theirs = self.file_roots(), other.file_roots()
+        changed = {}
+        for path in sorted(ours.keys() & theirs.keys()):
+            if ours[path] != theirs[path]:
+                changed[path] = self.file_tree(path).diff(other.file_tree(path))
+
+        added = sorted(theirs.keys() - ours.keys())
+        removed = sorted(ours.keys() - theirs.keys())
+        return {"identical": not (added or removed or changed), "added": added, "removed": removed, "changed": changed}
+
+    def __repr__(self) -> str:
+        return f"MerkleManifest(path={self.db_path}, root={(self.root or '')[:16]})"
+
+
+def _list_files(source: Path) -> List[str]:
+    """Relative POSIX paths of the files of a backup copy, sorted."""
+    if source.is_file():
+        return [source.name]
+    files = []
+    for dirpath, _, filenames in os.walk(source):
+        for name in filenames:
+            files.append(Path(dirpath, name).relative_to(source).as_posix())
+    return sorted(files)
+
+
+def _resolve(source: Path, relative_path: str) -> Path:
+    """File of a backup copy addressed by its manifest path."""
+    return source if source.is_file() else source / relative_path
+
+
+def _backup_root(file_roots: List[tuple], new_hash) -> bytes:
+    """Root over (relative path, file root) pairs sorted by path."""
+    if not file_roots:
+        return new_hash(_FILE_PREFIX).digest()
+    leaves = [
+        new_hash(_FILE_PREFIX + path.encode("utf-8") + b"\x00" + root).digest() for path, root in sorted(file_roots)
+    ]
+    return _root_of(leaves, new_hash)
@@ -0,0 +1,187 @@
+"""
+Restore Test Sampling
+
+Statistical file sampling for restore tests.
+
+- The sample size is the smallest one that detects a tolerated error rate
+  with the requested confidence (zero-failure acceptance sampling over the
+  hypergeometric distribution, so small backups need fewer files)
+- Files are drawn by stratified random sampling over size buckets and
+  top-level directories, so a sample spreads over small and large files and
+  every part of the tree instead of whatever the directory walk returns first.
+  Allocation is proportional, so every file is drawn with probability n/N as
+  in simple random sampling and the sample size and confidence above hold
+- After the test, the achieved confidence is computed from the observed
+  failures
+
+Example: 95% confidence that at most 1% of the files are bad needs 299 files
+for a large backup, whether it holds ten thousand files or ten million.
+"""
+
+import math
+import random
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+DEFAULT_CONFIDENCE = 0.95
+DEFAULT_TOLERATED_ERROR_RATE = 0.01
+
+
+def _validate(confidence: float, tolerated_error_rate: float) -> None:
+    if not 0 < confidence < 1:
+        raise ValueError(f"confidence must be between 0 and 1: {confidence}")
+    if not 0 < tolerated_error_rate < 1:
+        raise ValueError(f"tolerated_error_rate must be between 0 and 1: {tolerated_error_rate}")
+
+
+def _defects_to_detect(population: int, tolerated_error_rate: float) -> int:
+    """Smallest number of bad files that exceeds the tolerated error rate."""
+    return math.floor(population * tolerated_error_rate) + 1
+
+
+def _log_comb(n: int, k: int) -> float:
+    return math.lgamma(n + 1) - math.lgamma(k + 1) - math.lgamma(n - k + 1)
+
+
+def required_sample_size(
+    population: int,
+    confidence: float = DEFAULT_CONFIDENCE,
+    tolerated_error_rate: float = DEFAULT_TOLERATED_ERROR_RATE,
+) -> int:
+    """
+    Number of files to verify so that, if no sampled file fails, the share of
+    bad files is at most ``tolerated_error_rate`` with ``confidence``.
+
+    Args:
+        population: Number of files in the backup
+        confidence: Target confidence level (e.g. 0.95)
+        tolerated_error_rate: Largest acceptable share of bad files (e.g. 0.01)
+
+    Returns:
+        Sample size (population when every file has to be checked)
+    """
+    _validate(confidence, tolerated_error_rate)
+    defects = _defects_to_detect(population, tolerated_error_rate)
+    if population <= 0 or defects > population:
+        return max(population, 0)
+
+    # P(no bad file in n draws) = prod (N - D - i) / (N - i); stop once it drops below 1 - confidence
+    miss_probability = 1.0
+    for n in range(population - defects + 1):
+        if miss_probability <= 1 - confidence:
+            return n
+        miss_probability *= (population - defects - n) / (population - n)
+    return population - defects + 1
+
+
+def achieved_confidence(
+    population: int,
+    sample_size: int,
+    failures: int = 0,
+    tolerated_error_rate: float = DEFAULT_TOLERATED_ERROR_RATE,
+) -> float:
+    """
+    Confidence that the share of bad files is at most ``tolerated_error_rate``,
+    given ``failures`` bad files in a random sample of ``sample_size``.
+
+    Args:
+        population: Number of files in the backup
+        sample_size: Number of files verified
+        failures: Number of sampled files that failed verification
+        tolerated_error_rate: Largest acceptable share of bad files
+
+    Returns:
+        Confidence between 0 and 1
+    """
+    _validate(0.5, tolerated_error_rate)
+    defects = _defects_to_detect(population, tolerated_error_rate)
+    if population <= 0 or defects > population:
+        return 1.0
+    sample_size = min(sample_size, population)
+
+    # 1 - P(X <= failures) for X ~ Hypergeometric(N, D, n) at the smallest unacceptable D
+    log_total = _log_comb(population, sample_size)
+    cumulative = 0.0
+    for x in range(max(0, sample_size - (population - defects)), min(failures, defects, sample_size) + 1):
+        cumulative += math.exp(_log_comb(defects, x) + _log_comb(population - defects, sample_size - x) - log_total)
+    return max(0.0, min(1.0, 1.0 - cumulative))
+
+
+def size_bucket(size: int) -> int:
+    """Power-of-four size class (0 for empty files, then <4B, <16B, ... <1KB, <4KB, ...)."""
+    return (size.bit_length() + 1) // 2
+
+
+def stratify(files: Sequence[Tuple[Path, int]], root: Optional[Path] = None) -> Dict[Hashable, List[Path]]:
+    """
+    Group files by (top-level directory, size bucket).
+
+    Args:
+        files: (path, size) pairs
+        root: Backup root the top-level directory is taken relative to
+
+    Returns:
+        Stratum key -> files
+    """
+    strata: Dict[Hashable, List[Path]] = defaultdict(list)
+    for path, size in files:
+        relative = Path(path).relative_to(root) if root else Path(path)
+        top = relative.parts[0] if len(relative.parts) > 1 else ""
+        strata[(top, size_bucket(size))].append(path)
+    return dict(strata)
+
+
+def stratified_sample(
+    strata: Dict[Hashable, List[Path]], sample_size: int, rng: Optional[random.Random] = None
+) -> List[Path]:
+    """
+    Draw ``sample_size`` files across strata with proportional allocation.
+
+    Each stratum gets the integer part of its proportional quota; the remaining
+    files go to strata chosen with probability equal to their fractional part
+    (systematic sampling over the remainders). Every stratum's expected share is
+    then exactly its quota, so every file is drawn with probability n/N. Small
+    strata are not guaranteed a file: forcing one would over-sample them and
+    invalidate the confidence computed for the sample.
+
+    Args:
+        strata: Stratum key -> files (see stratify)
+        sample_size: Total number of files to draw
+        rng: Random source (default: a new random.Random)
+
+    Returns:
+        Sampled files
+    """
+    rng = rng or random.Random()
+    population = sum(len(members) for members in strata.values())
+    if sample_size >= population:
+        return [path for members in strata.values() for path in members]
+    if sample_size <= 0:
+        return []
+
+    keys = sorted(strata, key=lambda key: (-len(strata[key]), str(key)))
+    quotas = {key: sample_size * len(strata[key]) / population for key in keys}
+    allocation = {key: int(quotas[key]) for key in keys}
+
+    # Points u, u+1, u+2, ... over the concatenated remainders; each remainder is < 1,
+    # so a stratum gets at most one extra file, with probability equal to its remainder
+    leftover = sample_size - sum(allocation.values())
+    point = rng.random()
+    cumulative = 0.0
+    for key in keys:
+        cumulative += quotas[key] - allocation[key]
+        if leftover and point < cumulative:
+            allocation[key] += 1
+            leftover -= 1
+            point += 1
+    # Floating-point residue can leave the last point unplaced
+    for key in keys:
+        if leftover and allocation[key] < len(strata[key]):
+            allocation[key] += 1
+            leftover -= 1
+
+    sample = []
+    for key in keys:
+        sample.extend(rng.sample(strata[key], allocation[key]))
+    return sample
@@ -8,12 +8,16 @@ metadata comparison, and corruption detection.
 import logging
 import os
 import stat
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 
 from .checksum import ChecksumService
 from .interfaces import ChecksumAlgorithm, IVerificationService, VerificationStatus
+from .merkle import DEFAULT_BLOCK_SIZE, MerkleTree
 
 logger = logging.getLogger(__name__)
 
@@ -27,14 +31,32 @@ class FileValidator(IVerificationService):
     - File size comparison
     - Metadata verification (timestamps, permissions)
     - Bit rot detection
+    - Block-level corruption localisation with Merkle trees
+    - Early-exit byte comparison of source and target (compare mode)
     - Batch validation
     """
 
+    # Mismatched block indices listed in verification details (the count is always reported)
+    MAX_REPORTED_BLOCKS = 100
+
+    # "checksum": hash both files and compare digests
+    # "compare": read both files concurrently block by block and stop at the first difference
+    VERIFY_MODES = ("checksum", "compare")
+
+    # Upper bound of files verified concurrently by the parallel verify_backup
+    MAX_PARALLEL_FILES = 32
+
+    # Threads reading the second file of a pair (shared by all concurrent verify_file calls,
+    # one per file that can be verified in parallel)
+    READER_THREADS = MAX_PARALLEL_FILES
+
     def __init__(
         self,
         checksum_service: Optional[ChecksumService] = None,
         verify_metadata: bool = True,
         verify_permissions: bool = False,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        mode: str = "checksum",
     ):
         """
         Initialize file validator.
@@ -43,11 +65,22 @@ class FileValidator(IVerificationService):
             checksum_service: Checksum service instance (creates new if None)
             verify_metadata: Whether to verify metadata by default
             verify_permissions: Whether to verify file permissions
+            block_size: Merkle block size used to localise mismatches (and compare-mode read size)
+            mode: Default verify_file mode ("checksum" or "compare")
         """
+        if mode not in self.VERIFY_MODES:
+            raise ValueError(f"Unknown verification mode: {mode}")
+
         self.checksum_service = checksum_service or ChecksumService()
         self.verify_metadata_default = verify_metadata
         self.verify_permissions = verify_permissions
+        self.block_size = block_size
+        self.mode = mode
+        self._reader_pool: Optional[ThreadPoolExecutor] = None
+        self._reader_pool_lock = threading.Lock()
 
+        # verify_file runs on pool threads (verify_backup, batch_detect_corruption)
+        self._stats_lock = threading.Lock()
         self.validation_stats = {"total_validations": 0, "successful": 0, "failed": 0, "errors": 0, "last_validation": None}
 
     def calculate_checksum(
@@ -86,21 +119,48 @@ class FileValidator(IVerificationService):
         return self.checksum_service.calculate_checksums_parallel(file_paths, algorithm, max_workers)
 
     def verify_file(
-        self, source_path: Path, target_path: Path, algorithm: ChecksumAlgorithm = ChecksumAlgorithm.SHA256
+        self,
+        source_path: Path,
+        target_path: Path,
+        algorithm: ChecksumAlgorithm = ChecksumAlgorithm.SHA256,
+        reference_tree: Optional[MerkleTree] = None,
+        mode: Optional[str] = None,
+        source_checksum: Optional[str] = None,
+        target_checksum: Optional[str] = None,
     ) -> Tuple[VerificationStatus, Dict]:
         """
         Verify file integrity by comparing checksums and metadata.
 
+        In checksum mode both files are hashed concurrently; a known checksum for
+        one side means only the other side is read. On a mismatch the differing
+        blocks are located with Merkle trees and reported in details
+        ("mismatched_blocks", "first_mismatch_offset").
+
+        In compare mode both files are read concurrently in matching blocks and
+        the comparison stops at the first differing block, so mismatches cost
+        almost nothing and no digest is computed. A known checksum takes
+        precedence, since it saves reading one file entirely.
+
         Args:
             source_path: Original file path
             target_path: Copied/backup file path
             algorithm: Checksum algorithm to use
+            reference_tree: Stored Merkle tree of the source; when given, the target is
+                verified block by block against it and the source is not read
+            mode: "checksum" or "compare" (defaults to the validator's mode)
+            source_checksum: Known checksum of the source (not re-read when given)
+            target_checksum: Known checksum of the target (not re-read when given)
 
         Returns:
             Tuple of (status, details_dict)
         """
-        self.validation_stats["total_validations"] += 1
-        self.validation_stats["last_validation"] = datetime.utcnow().isoformat()
+        mode = mode or self.mode
+        if mode not in self.VERIFY_MODES:
+            raise ValueError(f"Unknown verification mode: {mode}")
+
+        with self._stats_lock:
+            self.validation_stats["total_validations"] += 1
+            self.validation_stats["last_validation"] = datetime.utcnow().isoformat()
 
         details = {
             "source": str(source_path),
@@ -112,12 +172,12 @@ class FileValidator(IVerificationService):
         try:
             # Check if both files exist
             if not source_path.exists():
-                self.validation_stats["failed"] += 1
+                self._count("failed")
                 details["error"] = "Source file not found"
                 return VerificationStatus.FILE_NOT_FOUND, details
 
             if not target_path.exists():
-                self.validation_stats["failed"] += 1
+                self._count("failed")
                 details["error"] = "Target file not found"
                 return VerificationStatus.FILE_NOT_FOUND, details
 
@@ -129,53 +189,160 @@ class FileValidator(IVerificationService):
             details["target_size"] = target_size
 
             if source_size != target_size:
-                self.validation_stats["failed"] += 1
+                self._count("failed")
                 details["error"] = f"Size mismatch: {source_size} != {target_size}"
                 logger.warning(f"Size mismatch for {source_path.name}: {details['error']}")
                 return VerificationStatus.SIZE_MISMATCH, details
 
-            # Calculate checksums
+            if reference_tree is not None:
+                mismatched = reference_tree.verify_range(target_path, 0, reference_tree.size)
+                details["merkle_root"] = reference_tree.root_hex
+                if mismatched:
+                    self._count("failed")
+                    self._add_mismatched_blocks(details, mismatched, reference_tree.block_size)
+                    details["error"] = "Checksum mismatch"
+                    logger.error(f"Block mismatch for {target_path.name}: {len(mismatched)} corrupted blocks")
+                    return VerificationStatus.CHECKSUM_MISMATCH, details
+                return self._finish_verification(source_path, target_path, details)
+
+            if mode == "compare" and source_checksum is None and target_checksum is None:
+                details["mode"] = "compare"
+                mismatch_offset, bytes_compared = self.compare_files(source_path, target_path)
+                details["bytes_compared"] = bytes_compared
+                if mismatch_offset is not None:
+                    self._count("failed")
+                    details["error"] = "Content mismatch"
+                    details["block_size"] = self.block_size
+                    details["mismatched_blocks"] = [mismatch_offset // self.block_size]
+                    details["first_mismatch_offset"] = mismatch_offset
+                    logger.error(f"Content mismatch for {source_path.name} at offset {mismatch_offset}")
+                    return VerificationStatus.CHECKSUM_MISMATCH, details
+                return self._finish_verification(source_path, target_path, details)
+
+            # Calculate checksums (only for sides without a known checksum). The source may come
+            # from the checksum cache; the target is always read, or bit rot would go unnoticed
             logger.debug(f"Calculating checksums for {source_path.name}")
-
-            source_checksum = self.checksum_service.calculate_checksum(source_path, algorithm)
-            target_checksum = self.checksum_service.calculate_checksum(target_path, algorithm)
+            details["mode"] = "checksum"
+            known = source_checksum is not None or target_checksum is not None
+
+            if not known:
+                pending_source = self._readers().submit(self.checksum_service.calculate_checksum, source_path, algorithm)
+                target_checksum = self.checksum_service.calculate_checksum(target_path, algorithm, force_rehash=True)
+                source_checksum = pending_source.result()
+            elif source_checksum is None:
+                source_checksum = self.checksum_service.calculate_checksum(source_path, algorithm)
+            elif target_checksum is None:
+                target_checksum = self.checksum_service.calculate_checksum(target_path, algorithm, force_rehash=True)
 
             details["source_checksum"] = source_checksum
             details["target_checksum"] = target_checksum
 
             # Compare checksums
-            if source_checksum != target_checksum:
-                self.validation_stats["failed"] += 1
+            if source_checksum.lower() != target_checksum.lower():
+                self._count("failed")
                 details["error"] = "Checksum mismatch"
                 logger.error(f"Checksum mismatch for {source_path.name}: " f"{source_checksum} != {target_checksum}")
+                if not known:
+                    blocks = self.locate_mismatched_blocks(source_path, target_path, algorithm)
+                    self._add_mismatched_blocks(details, blocks, self.block_size)
                 return VerificationStatus.CHECKSUM_MISMATCH, details
 
-            # Verify metadata if enabled
-            if self.verify_metadata_default:
-                metadata_status, metadata_details = self.verify_metadata(source_path, target_path)
-                details["metadata"] = metadata_details
-
-                if metadata_status != VerificationStatus.SUCCESS:
-                    self.validation_stats["failed"] += 1
-                    logger.warning(
-                        f"Metadata mismatch for {source_path.name}: " f"{metadata_details.get('error', 'Unknown error')}"
-                    )
-                    return metadata_status, details
-
-            # All checks passed
-            self.validation_stats["successful"] += 1
-            logger.info(f"Verification successful for {source_path.name}")
-            return VerificationStatus.SUCCESS, details
+            return self._finish_verification(source_path, target_path, details)
 
         except Exception as e:
-            self.validation_stats["errors"] += 1
+            self._count("errors")
             details["error"] = str(e)
             details["exception_type"] = type(e).__name__
             logger.error(f"Error verifying {source_path.name}: {e}", exc_info=True)
             return VerificationStatus.FAILED, details
 
+    def _finish_verification(self, source_path: Path, target_path: Path, details: Dict) -> Tuple[VerificationStatus, Dict]:
+        """Verify metadata (if enabled) after the content matched and record the outcome."""
+        if self.verify_metadata_default:
+            metadata_status, metadata_details = self.verify_metadata(source_path, target_path)
+            details["metadata"] = metadata_details
+
+            if metadata_status != VerificationStatus.SUCCESS:
+                self._count("failed")
+                logger.warning(
+                    f"Metadata mismatch for {source_path.name}: " f"{metadata_details.get('error', 'Unknown error')}"
+                )
+                return metadata_status, details
+
+        # All checks passed
+        self._count("successful")
+        logger.info(f"Verification successful for {source_path.name}")
+        return VerificationStatus.SUCCESS, details
+
+    def locate_mismatched_blocks(
+        self, source_path: Path, target_path: Path, algorithm: ChecksumAlgorithm = ChecksumAlgorithm.SHA256
+    ) -> List[int]:
+        """
+        Locate the blocks in which two files differ by comparing their Merkle trees.
+
+        Args:
+            source_path: Original file path
+            target_path: Copied/backup file path
+            algorithm: Hash algorithm of the trees
+
+        Returns:
+            Sorted list of differing block indices
+        """
+        source_tree = MerkleTree.from_file(source_path, self.block_size, algorithm)
+        target_tree = MerkleTree.from_file(target_path, self.block_size, algorithm)
+        return source_tree.diff(target_tree)
+
+    def compare_files(self, source_path: Path, target_path: Path) -> Tuple[Optional[int], int]:
+        """
+        Compare two files byte for byte, reading both concurrently in matching blocks.
+
+        The source block is read on a reader thread while the target block is
+        read on the calling thread; reading stops at the first differing block.
+
+        Args:
+            source_path: Original file path
+            target_path: Copied/backup file path
+
+        Returns:
+            (offset of the first differing byte or None when identical, bytes compared)
+        """
+        offset = 0
+        readers = self._readers()
+        with open(source_path, "rb") as source, open(target_path, "rb") as target:
+            while True:
+                pending = readers.submit(source.read, self.block_size)
+                target_block = target.read(self.block_size)
+                source_block = pending.result()
+
+                if source_block != target_block:
+                    return offset + _first_difference(source_block, target_block), offset + len(source_block)
+                if not source_block:
+                    return None, offset
+                offset += len(source_block)
+
+    def _readers(self) -> ThreadPoolExecutor:
+        with self._reader_pool_lock:
+            if self._reader_pool is None:
+                self._reader_pool = ThreadPoolExecutor(
+                    max_workers=self.READER_THREADS, thread_name_prefix="verify-reader"
+                )
+            return self._reader_pool
+
+    def _add_mismatched_blocks(self, details: Dict, blocks: List[int], block_size: int) -> None:
+        details["block_size"] = block_size
+        details["mismatched_block_count"] = len(blocks)
+        details["mismatched_blocks"] = blocks[: self.MAX_REPORTED_BLOCKS]
+        if blocks:
+            details["first_mismatch_offset"] = blocks[0] * block_size
+
     def verify_backup(
-        self, source_files: List[Path], target_files: List[Path], algorithm: ChecksumAlgorithm = ChecksumAlgorithm.SHA256
+        self,
+        source_files: List[Path],
+        target_files: List[Path],
+        algorithm: ChecksumAlgorithm = ChecksumAlgorithm.SHA256,
+        parallel: bool = False,
+        max_workers: Optional[int] = None,
+        on_result: Optional[Callable[[Dict], None]] = None,
     ) -> Dict:
         """
         Verify entire backup by comparing multiple files.
@@ -184,9 +351,12 @@ class FileValidator(IVerificationService):
             source_files: List of original file paths
             target_files: List of backup file paths
             algorithm: Checksum algorithm to use
+            parallel: Verify files concurrently (see iter_verify_backup)
+            max_workers: Upper bound of concurrent files in parallel mode
+            on_result: Called with each result entry as soon as its file is verified
 
         Returns:
-            Dictionary containing verification results
+            Dictionary containing verification results (details in input order)
         """
         if len(source_files) != len(target_files):
             raise ValueError(f"File count mismatch: {len(source_files)} source files, " f"{len(target_files)} target files")
@@ -203,21 +373,32 @@ class FileValidator(IVerificationService):
             "details": [],
         }
 
-        for source_path, target_path in zip(source_files, target_files):
-            status, details = self.verify_file(source_path, target_path, algorithm)
-
-            result_entry = {"source": str(source_path), "target": str(target_path), "status": status.value, "details": details}
+        if parallel:
+            tuner = _ConcurrencyTuner(maximum=max_workers or self.MAX_PARALLEL_FILES)
+            entries = self.iter_verify_backup(source_files, target_files, algorithm, tuner=tuner)
+        else:
+            tuner = None
+            entries = self._iter_sequential(source_files, target_files, algorithm)
 
-            results["details"].append(result_entry)
+        ordered = [None] * len(source_files)
+        for result_entry in entries:
+            index = result_entry.pop("index")
+            ordered[index] = result_entry
+            if on_result is not None:
+                on_result(result_entry)
 
-            if status == VerificationStatus.SUCCESS:
+            if result_entry["status"] == VerificationStatus.SUCCESS.value:
                 results["successful"] += 1
-            elif status in [VerificationStatus.FILE_NOT_FOUND, VerificationStatus.FAILED]:
+            elif result_entry["status"] in [VerificationStatus.FILE_NOT_FOUND.value, VerificationStatus.FAILED.value]:
                 results["errors"] += 1
             else:
                 results["failed"] += 1
 
+        results["details"] = ordered
         results["success_rate"] = results["successful"] / results["total_files"] * 100 if results["total_files"] > 0 else 0.0
+        if tuner is not None:
+            results["workers"] = tuner.limit
+            results["throughput_mb_s"] = round(tuner.best_rate / (1024 * 1024), 2)
 
         logger.info(
             f"Backup verification complete: {results['successful']}/{results['total_files']} "
@@ -226,6 +407,87 @@ class FileValidator(IVerificationService):
 
         return results
 
+    def iter_verify_backup(
+        self,
+        source_files: List[Path],
+        target_files: List[Path],
+        algorithm: ChecksumAlgorithm = ChecksumAlgorithm.SHA256,
+        max_workers: Optional[int] = None,
+        tuner: Optional["_ConcurrencyTuner"] = None,
+    ) -> Iterator[Dict]:
+        """
+        Verify file pairs concurrently and yield each result as soon as it is done.
+
+        The number of files in flight is not derived from the CPU count: it starts
+        small and doubles while the measured aggregate read throughput keeps
+        improving, then stays at the best level found. Only that many pairs are
+        submitted at a time, so memory stays flat for very large backups.
+
+        Args:
+            source_files: List of original file paths
+            target_files: List of backup file paths
+            algorithm: Checksum algorithm to use
+            max_workers: Upper bound of concurrent files (default MAX_PARALLEL_FILES)
+            tuner: Concurrency tuner to use (exposes the chosen limit and measured throughput)
+
+        Yields:
+            {"index", "source", "target", "status", "details"} in completion order
+        """
+        if len(source_files) != len(target_files):
+            raise ValueError(f"File count mismatch: {len(source_files)} source files, " f"{len(target_files)} target files")
+
+        tuner = tuner or _ConcurrencyTuner(maximum=max_workers or self.MAX_PARALLEL_FILES)
+        pairs = iter(enumerate(zip(source_files, target_files)))
+        in_flight = {}
+
+        def verify(index, source_path, target_path):
+            status, details = self.verify_file(source_path, target_path, algorithm)
+            return self._result_entry(index, source_path, target_path, status, details)
+
+        pool = ThreadPoolExecutor(max_workers=tuner.maximum, thread_name_prefix="verify")
+        try:
+            exhausted = False
+            while True:
+                while not exhausted and len(in_flight) < tuner.limit:
+                    pair = next(pairs, None)
+                    if pair is None:
+                        exhausted = True
+                        break
+                    index, (source_path, target_path) = pair
+                    in_flight[pool.submit(verify, index, source_path, target_path)] = index
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    del in_flight[future]
+                    result_entry = future.result()
+                    details = result_entry["details"]
+                    tuner.record(details.get("source_size", 0) + details.get("target_size", 0))
+                    yield result_entry
+        finally:
+            # Stop promptly when the consumer abandons the iterator
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _iter_sequential(
+        self, source_files: List[Path], target_files: List[Path], algorithm: ChecksumAlgorithm
+    ) -> Iterator[Dict]:
+        for index, (source_path, target_path) in enumerate(zip(source_files, target_files)):
+            status, details = self.verify_file(source_path, target_path, algorithm)
+            yield self._result_entry(index, source_path, target_path, status, details)
+
+    @staticmethod
+    def _result_entry(
+        index: int, source_path: Path, target_path: Path, status: VerificationStatus, details: Dict
+    ) -> Dict:
+        return {
+            "index": index,
+            "source": str(source_path),
+            "target": str(target_path),
+            "status": status.value,
+            "details": details,
+        }
+
     def verify_metadata(self, source_path: Path, target_path: Path) -> Tuple[VerificationStatus, Dict]:
         """
         Verify file metadata (size, timestamps, permissions).
@@ -293,6 +555,9 @@ class FileValidator(IVerificationService):
         """
         Detect file corruption by comparing with expected checksum.
 
+        The file is always read; a cached digest would hide corruption that
+        left size and mtime unchanged.
+
         Args:
             file_path: Path to file to check
             expected_checksum: Expected checksum value
@@ -306,7 +571,7 @@ class FileValidator(IVerificationService):
                 logger.error(f"File not found for corruption check: {file_path}")
                 return True
 
-            actual_checksum = self.checksum_service.calculate_checksum(file_path, algorithm)
+            actual_checksum = self.checksum_service.calculate_checksum(file_path, algorithm, force_rehash=True)
 
             is_corrupted = actual_checksum.lower() != expected_checksum.lower()
 
@@ -373,7 +638,8 @@ class FileValidator(IVerificationService):
         Returns:
             Dictionary containing validation statistics
         """
-        stats = self.validation_stats.copy()
+        with self._stats_lock:
+            stats = self.validation_stats.copy()
 
         if stats["total_validations"] > 0:
             stats["success_rate"] = stats["successful"] / stats["total_validations"] * 100
@@ -388,7 +654,19 @@ class FileValidator(IVerificationService):
 
     def reset_validation_statistics(self) -> None:
         """Reset validation statistics."""
-        self.validation_stats = {"total_validations": 0, "successful": 0, "failed": 0, "errors": 0, "last_validation": None}
+        with self._stats_lock:
+            self.validation_stats = {
+                "total_validations": 0,
+                "successful": 0,
+                "failed": 0,
+                "errors": 0,
+                "last_validation": None,
+            }
+
+    def _count(self, outcome: str) -> None:
+        """Increment an outcome counter of validation_stats."""
+        with self._stats_lock:
+            self.validation_stats[outcome] += 1
 
     def __repr__(self) -> str:
         return (
@@ -397,3 +675,66 @@ class FileValidator(IVerificationService):
             f"successful={self.validation_stats['successful']}, "
             f"failed={self.validation_stats['failed']})"
         )
+
+
+class _ConcurrencyTuner:
+    """
+    Chooses how many files to verify at once from measured throughput.
+
+    Concurrency starts at ``initial`` and doubles after every measurement
+    window whose aggregate throughput beat the best so far by ``min_gain``;
+    the first window without such a gain settles on the best level seen.
+    Disks that are saturated by a few streams (HDD, tape-backed NAS) therefore
+    stay at low concurrency, while SSD and network storage scale up.
+    """
+
+    def __init__(self, maximum: int, initial: int = 2, window_seconds: float = 1.0, min_gain: float = 0.1):
+        self.maximum = max(1, maximum)
+        self.limit = min(initial, self.maximum)
+        self.window_seconds = window_seconds
+        self.min_gain = min_gain
+        self.best_rate = 0.0
+        self.best_limit = self.limit
+        self.settled = self.limit >= self.maximum
+        self._window_start = time.monotonic()
+        self._window_bytes = 0
+
+    def record(self, nbytes: int) -> None:
+        """Account bytes read for one finished file and adjust the limit at window boundaries."""
+        self._window_bytes += nbytes
+        elapsed = time.monotonic() - self._window_start
+        if elapsed < self.window_seconds:
+            return
+
+        rate = self._window_bytes / elapsed
+        self._window_start = time.monotonic()
+        self._window_bytes = 0
+
+        if rate > self.best_rate * (1 + self.min_gain):
+            self.best_rate = rate
+            self.best_limit = self.limit
+            if not self.settled:
+                self.limit = min(self.maximum, self.limit * 2)
+                self.settled = self.limit == self.best_limit
+        elif not self.settled:
+            self.limit = self.best_limit
+            self.settled = True
+            logger.debug(f"Verification concurrency settled at {self.limit} ({self.best_rate / 1048576:.1f} MB/s)")
+        else:
+            self.best_rate = max(self.best_rate, rate)
+
+
+def _first_difference(a: bytes, b: bytes) -> int:
+    """Index of the first differing byte of two blocks (binary search over memcmp'd prefixes)."""
+    a, b = memoryview(a), memoryview(b)
+    low, high = 0, min(len(a), len(b))
+    if a[:high] == b[:high]:
+        return high
+    # Invariant: a[:low] == b[:low] and a[:high] != b[:high]
+    while high - low > 1:
+        middle = (low + high) // 2
+        if a[:middle] == b[:middle]:
+            low = middle
+        else:
+            high = middle
+    return low
@@ -0,0 +1,31 @@
+"""Add compression statistics to backup copies
+
+Revision ID: add_compression_stats_columns
+Revises: add_dedup_ratio_columns
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "add_compression_stats_columns"
+down_revision = "add_dedup_ratio_columns"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Upgrade database schema"""
+
+    with op.batch_alter_table("backup_copies") as batch_op:
+        batch_op.add_column(sa.Column("compression_ratio", sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column("compression_cpu_seconds", sa.Float(), nullable=True))
+
+
+def downgrade():
+    """Downgrade database schema"""
+
+    with op.batch_alter_table("backup_copies") as batch_op:
+        batch_op.drop_column("compression_cpu_seconds")
+        batch_op.drop_column("compression_ratio")
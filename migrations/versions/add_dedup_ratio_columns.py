@@ -0,0 +1,35 @@
+"""Add deduplication ratio to backup copies and executions
+
+Revision ID: add_dedup_ratio_columns
+Revises: add_incremental_backup_columns
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "add_dedup_ratio_columns"
+down_revision = "add_incremental_backup_columns"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Upgrade database schema"""
+
+    with op.batch_alter_table("backup_copies") as batch_op:
+        batch_op.add_column(sa.Column("dedup_ratio", sa.Float(), nullable=True))
+
+    with op.batch_alter_table("backup_executions") as batch_op:
+        batch_op.add_column(sa.Column("dedup_ratio", sa.Float(), nullable=True))
+
+
+def downgrade():
+    """Downgrade database schema"""
+
+    with op.batch_alter_table("backup_executions") as batch_op:
+        batch_op.drop_column("dedup_ratio")
+
+    with op.batch_alter_table("backup_copies") as batch_op:
+        batch_op.drop_column("dedup_ratio")
@@ -0,0 +1,39 @@
+"""Add incremental backup mode and file counters
+
+Revision ID: add_incremental_backup_columns
+Revises: add_api_key_tables
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "add_incremental_backup_columns"
+down_revision = "add_api_key_tables"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Upgrade database schema"""
+
+    # Backup mode per job (full/incremental/differential)
+    with op.batch_alter_table("backup_jobs") as batch_op:
+        batch_op.add_column(sa.Column("backup_mode", sa.String(length=20), nullable=False, server_default="full"))
+
+    # Files copied vs carried forward per execution
+    with op.batch_alter_table("backup_executions") as batch_op:
+        batch_op.add_column(sa.Column("files_copied", sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column("files_skipped", sa.Integer(), nullable=True))
+
+
+def downgrade():
+    """Downgrade database schema"""
+
+    with op.batch_alter_table("backup_executions") as batch_op:
+        batch_op.drop_column("files_skipped")
+        batch_op.drop_column("files_copied")
+
+    with op.batch_alter_table("backup_jobs") as batch_op:
+        batch_op.drop_column("backup_mode")
@@ -0,0 +1,30 @@
+"""Add per-job I/O mode
+
+Revision ID: add_job_io_mode_column
+Revises: add_compression_stats_columns
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "add_job_io_mode_column"
+down_revision = "add_compression_stats_columns"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Upgrade database schema"""
+
+    # I/O mode per job (auto/buffered/cache_friendly/direct)
+    with op.batch_alter_table("backup_jobs") as batch_op:
+        batch_op.add_column(sa.Column("io_mode", sa.String(length=20), nullable=False, server_default="auto"))
+
+
+def downgrade():
+    """Downgrade database schema"""
+
+    with op.batch_alter_table("backup_jobs") as batch_op:
+        batch_op.drop_column("io_mode")
@@ -0,0 +1,60 @@
+"""Add verification runs table
+
+Revision ID: add_verification_runs_table
+Revises: add_job_io_mode_column
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "add_verification_runs_table"
+down_revision = "add_job_io_mode_column"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Upgrade database schema"""
+
+    # Persistent queue and progress of API-requested verifications
+    op.create_table(
+        "verification_runs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("backup_copy_id", sa.Integer(), nullable=False),
+        sa.Column("test_type", sa.String(length=20), nullable=False),
+        sa.Column("scope", sa.String(length=20), nullable=False),
+        sa.Column("status", sa.String(length=20), nullable=False),
+        sa.Column("cancel_requested", sa.Boolean(), nullable=False),
+        sa.Column("requested_by", sa.Integer(), nullable=False),
+        sa.Column("files_total", sa.Integer(), nullable=False),
+        sa.Column("files_done", sa.Integer(), nullable=False),
+        sa.Column("files_failed", sa.Integer(), nullable=False),
+        sa.Column("bytes_total", sa.BigInteger(), nullable=False),
+        sa.Column("bytes_done", sa.BigInteger(), nullable=False),
+        sa.Column("current_file", sa.String(length=500), nullable=True),
+        sa.Column("result", sa.String(length=20), nullable=True),
+        sa.Column("error_message", sa.Text(), nullable=True),
+        sa.Column("verification_test_id", sa.Integer(), nullable=True),
+        sa.Column("owner", sa.String(length=100), nullable=True),
+        sa.Column("heartbeat_at", sa.DateTime(), nullable=True),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("completed_at", sa.DateTime(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["backup_copy_id"], ["backup_copies.id"]),
+        sa.ForeignKeyConstraint(["requested_by"], ["users.id"]),
+        sa.ForeignKeyConstraint(["verification_test_id"], ["verification_tests.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_verification_runs_backup_copy_id", "verification_runs", ["backup_copy_id"])
+    op.create_index("ix_verification_runs_status_created", "verification_runs", ["status", "created_at"])
+
+
+def downgrade():
+    """Downgrade database schema"""
+
+    op.drop_index("ix_verification_runs_status_created", table_name="verification_runs")
+    op.drop_index("ix_verification_runs_backup_copy_id", table_name="verification_runs")
+    op.drop_table("verification_runs")
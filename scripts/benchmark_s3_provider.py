@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+S3プロバイダーベンチマーク - マルチパートアップロード・レンジGETのスループットをローカルストレージと比較
+MinIO や moto server 等のローカルS3互換サーバーに対して、同じファイルを
+LocalStorageProvider と S3StorageProvider（同時パート数ごと）でコピー・検証・リストアします
+
+使用例:
+    moto_server -p 5000 &
+    python scripts/benchmark_s3_provider.py --endpoint-url http://localhost:5000 --bucket bench --size-mb 1024
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.storage.providers.local_storage import LocalStorageProvider  # noqa: E402
+from app.storage.providers.s3_storage import S3StorageProvider  # noqa: E402
+
+
+def create_source(path: str, size_mb: int) -> None:
+    """ランダムデータのソースファイルを作成"""
+    chunk = os.urandom(1024 * 1024)
+    with open(path, "wb") as f:
+        for _ in range(size_mb):
+            f.write(chunk)
+
+
+def timed(func, *args) -> tuple:
+    start = time.monotonic()
+    result = func(*args)
+    return result, time.monotonic() - start
+
+
+def report(name: str, size_mb: int, copy_seconds: float, verify_seconds: float, restore_seconds: float) -> None:
+    def rate(seconds):
+        return size_mb / seconds if seconds > 0 else 0.0
+
+    print(f"{name:<24}{rate(copy_seconds):>12.1f}{rate(verify_seconds):>12.1f}{rate(restore_seconds):>12.1f}")
+
+
+def run(args, work_dir: str) -> None:
+    source = os.path.join(work_dir, "bench_source.bin")
+    print(f"Creating {args.size_mb} MB source file in {work_dir} ...")
+    create_source(source, args.size_mb)
+
+    print(f"{'provider':<24}{'copy MB/s':>12}{'verify MB/s':>12}{'restore MB/s':>12}")
+    try:
+        local = LocalStorageProvider("bench-local", os.path.join(work_dir, "local"))
+        local.connect()
+        result, copy_seconds = timed(local.copy_file, source, "bench.bin")
+        _, verify_seconds = timed(local.verify_file, "bench.bin", result.checksum)
+        restored = os.path.join(work_dir, "restore_local.bin")
+        _, restore_seconds = timed(local.copy_file, str(local.base_path / "bench.bin"), restored)
+        report("local", args.size_mb, copy_seconds, verify_seconds, restore_seconds)
+
+        for concurrency in args.concurrency:
+            s3 = S3StorageProvider(
+                "bench-s3",
+                args.bucket,
+                prefix="benchmark",
+                endpoint_url=args.endpoint_url,
+                region_name=args.region,
+                access_key_id=args.access_key,
+                secret_access_key=args.secret_key,
+                max_concurrency=concurrency,
+            )
+            s3.connect()
+            result, copy_seconds = timed(s3.copy_file, source, "bench.bin")
+            if not result.success:
+                raise SystemExit(f"S3 upload failed: {result.error_message}")
+            ok, verify_seconds = timed(s3.verify_file, "bench.bin", result.checksum)
+            if not ok:
+                raise SystemExit("S3 verification failed")
+            restored = os.path.join(work_dir, f"restore_s3_{concurrency}.bin")
+            _, restore_seconds = timed(s3.download_file, "bench.bin", restored)
+            report(f"s3 (x{concurrency} parts)", args.size_mb, copy_seconds, verify_seconds, restore_seconds)
+            s3.delete_file("bench.bin")
+            os.remove(restored)
+    finally:
+        os.remove(source)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare S3 multipart throughput with local storage")
+    parser.add_argument("--endpoint-url", default="http://localhost:9000", help="S3-compatible endpoint URL")
+    parser.add_argument("--bucket", required=True, help="existing bucket to write benchmark objects to")
+    parser.add_argument("--region", default="us-east-1")
+    parser.add_argument("--access-key", default=os.environ.get("AWS_ACCESS_KEY_ID"))
+    parser.add_argument("--secret-key", default=os.environ.get("AWS_SECRET_ACCESS_KEY"))
+    parser.add_argument("--size-mb", type=int, default=512, help="source file size in MB (default: 512)")
+    parser.add_argument(
+        "--concurrency", type=int, nargs="+", default=[1, 4, 8, 16], help="concurrent parts to compare"
+    )
+    parser.add_argument("--dir", default=None, help="working directory for the source file (default: temp dir)")
+    args = parser.parse_args()
+
+    if args.dir:
+        os.makedirs(args.dir, exist_ok=True)
+        run(args, args.dir)
+    else:
+        with tempfile.TemporaryDirectory() as work_dir:
+            run(args, work_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,7 @@ Tests all 43+ API endpoints across:
 """
 import json
 from datetime import datetime, timedelta
+from unittest.mock import patch
 
 import pytest
 
@@ -172,6 +173,19 @@ class TestJobsAPI:
                 updated_job = db.session.get(BackupJob, job.id)
                 assert updated_job.job_name == "Updated Job Name" or updated_job.retention_days == 60
 
+    def test_update_job_backup_mode(self, authenticated_client, backup_job, app):
+        """Test PUT /api/jobs/<id> - backup_mode is validated, stored and returned."""
+        with app.app_context():
+            response = authenticated_client.put(f"/api/jobs/{backup_job.id}", json={"backup_mode": "weekly"})
+            assert response.status_code == 400
+
+            response = authenticated_client.put(f"/api/jobs/{backup_job.id}", json={"backup_mode": "incremental"})
+            assert response.status_code == 200
+            assert db.session.get(BackupJob, backup_job.id).backup_mode == "incremental"
+
+            data = json.loads(authenticated_client.get(f"/api/jobs/{backup_job.id}").data)
+            assert data["backup_mode"] == "incremental"
+
     def test_delete_job(self, authenticated_client, app):
         """Test DELETE /api/jobs/<id> - delete job."""
         with app.app_context():
@@ -407,6 +421,66 @@ class TestDashboardAPI:
             assert response.status_code in [200, 404]
 
 
+class TestStorageBackupsAPI:
+    """Test cases for GET /api/v1/storage/{id}/backups."""
+
+    @pytest.fixture
+    def storage_copy(self, app, backup_job, tmp_path):
+        """Backup copy stored in a directory with a few files, plus a second copy at the same location."""
+        for name in ("a.bak", "b.bak", "c.bak"):
+            (tmp_path / name).write_bytes(b"x" * 10)
+        with app.app_context():
+            copies = [
+                BackupCopy(job_id=backup_job.id, copy_type=copy_type, media_type="disk", storage_path=str(tmp_path))
+                for copy_type in ("primary", "secondary")
+            ]
+            db.session.add_all(copies)
+            db.session.commit()
+            return copies[0].id
+
+    def test_default_is_json_page_of_copies(self, client, jwt_token, storage_copy, app):
+        """Test the default response keeps the paginated BackupCopy contract."""
+        headers = {"Authorization": f"Bearer {jwt_token}"}
+
+        response = client.get(f"/api/v1/storage/{storage_copy}/backups", headers=headers)
+
+        assert response.status_code == 200
+        assert response.mimetype == "application/json"
+        body = response.get_json()
+        assert body["total"] == 2
+        assert body["page"] == 1
+        assert {copy["copy_type"] for copy in body["data"]} == {"primary", "secondary"}
+
+    def test_ndjson_listing_is_opt_in(self, client, jwt_token, storage_copy, app):
+        """Test Accept: application/x-ndjson streams the files on the storage."""
+        headers = {"Authorization": f"Bearer {jwt_token}", "Accept": "application/x-ndjson"}
+
+        response = client.get(f"/api/v1/storage/{storage_copy}/backups", headers=headers)
+
+        assert response.status_code == 200
+        assert response.mimetype == "application/x-ndjson"
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert [line["path"] for line in lines] == ["a.bak", "b.bak", "c.bak"]
+
+    def test_stream_error_aborts_response(self, client, jwt_token, storage_copy, app):
+        """Test a storage error mid-stream aborts the body instead of ending it like a complete listing."""
+        from app.storage.providers.local_storage import LocalStorageProvider
+
+        real_iter_files = LocalStorageProvider.iter_files
+
+        def failing_iter_files(self, *args, **kwargs):
+            for i, entry in enumerate(real_iter_files(self, *args, **kwargs)):
+                if i == 1:
+                    raise OSError("storage went away")
+                yield entry
+
+        headers = {"Authorization": f"Bearer {jwt_token}", "Accept": "application/x-ndjson"}
+        with patch.object(LocalStorageProvider, "iter_files", failing_iter_files):
+            response = client.get(f"/api/v1/storage/{storage_copy}/backups", headers=headers, buffered=False)
+            with pytest.raises(OSError):
+                response.get_data()
+
+
 class TestMediaAPI:
     """Test /api/media/* endpoints."""
 
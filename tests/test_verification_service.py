@@ -25,6 +25,10 @@ from app.services.verification_service import (
     VerificationType,
 )
 from app.verification import ChecksumAlgorithm
+from app.core.backup_engine import BackupEngine
+from app.core.compression import BlockCompressor
+from app.storage.chunk_store import ChunkStore, job_recipe_prefix
+from app.verification.merkle import MerkleManifest, merkle_path_for
 
 
 class TestVerificationService:
@@ -100,6 +104,7 @@ class TestVerificationService:
             # Remove temporary directories
             shutil.rmtree(self.test_source_dir, ignore_errors=True)
             shutil.rmtree(self.test_backup_dir, ignore_errors=True)
+            Path(merkle_path_for(self.test_backup_dir)).unlink(missing_ok=True)
 
     def test_verification_service_initialization(self, app):
         """Test verification service initialization"""
@@ -132,9 +137,15 @@ class TestVerificationService:
             assert test_record.test_type == "integrity"
             assert test_record.test_result == "success"
 
+    def use_primary_path(self, storage_path):
+        """Point the job's primary copy at another storage path."""
+        BackupCopy.query.filter_by(job_id=self.job_id, copy_type="primary").update({"storage_path": storage_path})
+        db.session.commit()
+
     def test_partial_restore_test(self, app):
         """Test partial restore test"""
         with app.app_context():
+            MerkleManifest.build(self.test_backup_dir).close()
             service = VerificationService()
 
             result, details = service.execute_verification_test(
@@ -146,9 +157,29 @@ class TestVerificationService:
             assert details["files_tested"] > 0
             assert details["verified_files"] >= 0
 
+    def test_partial_restore_reports_sampling_confidence(self, app):
+        """Test the partial restore sample is sized and scored by confidence"""
+        with app.app_context():
+            for i in range(5, 300):
+                (self.test_backup_dir / f"extra_{i}.txt").write_text("x" * i)
+            MerkleManifest.build(self.test_backup_dir).close()
+            service = VerificationService(sample_confidence=0.9, sample_error_rate=0.05)
+
+            result, details = service.execute_verification_test(
+                job_id=self.job_id, test_type=VerificationType.PARTIAL, tester_id=self.user_id
+            )
+
+            sampling = details["sampling"]
+            assert result == TestResult.SUCCESS
+            assert sampling["population"] == 300
+            assert details["files_tested"] == sampling["sample_size"] < 300
+            assert sampling["failures"] == 0
+            assert sampling["achieved_confidence"] >= 0.9
+
     def test_full_restore_test(self, app):
         """Test full restore test"""
         with app.app_context():
+            MerkleManifest.build(self.test_backup_dir).close()
             service = VerificationService()
 
             result, details = service.execute_verification_test(
@@ -159,6 +190,144 @@ class TestVerificationService:
             assert details["test_type"] == "full_restore"
             assert details["total_files_restored"] > 0
 
+    def test_virtual_full_restore_writes_nothing(self, app):
+        """Test virtual restores stream-hash the backup and report throughput"""
+        with app.app_context():
+            MerkleManifest.build(self.test_backup_dir).close()
+            service = VerificationService()
+            before = set(service.test_root_dir.iterdir())
+
+            result, details = service.execute_verification_test(
+                job_id=self.job_id, test_type=VerificationType.FULL_RESTORE, tester_id=self.user_id
+            )
+
+            assert result == TestResult.SUCCESS
+            assert details["restore_mode"] == "virtual"
+            assert details["reference"] == "merkle_manifest"
+            assert details["total_files_verified"] == 5
+            assert details["bytes_restored"] == sum(f.stat().st_size for f in self.test_backup_dir.iterdir())
+            assert details["restore_throughput_mb_s"] >= 0
+            assert set(service.test_root_dir.iterdir()) == before
+
+    def test_virtual_restore_detects_corruption_against_manifest(self, app):
+        """Test virtual restores compare each file with the copy's Merkle manifest"""
+        with app.app_context():
+            service = VerificationService(merkle_block_size=64)
+            service.execute_verification_test(
+                job_id=self.job_id, test_type=VerificationType.INTEGRITY, tester_id=self.user_id
+            )
+            with open(self.test_backup_dir / "test_file_1.txt", "r+b") as f:
+                f.seek(200)
+                f.write(b"#")
+            (self.test_backup_dir / "test_file_3.txt").unlink()
+
+            result, details = service.execute_verification_test(
+                job_id=self.job_id, test_type=VerificationType.FULL_RESTORE, tester_id=self.user_id
+            )
+
+            assert result == TestResult.WARNING
+            assert details["reference"] == "merkle_manifest"
+            assert details["total_files_verified"] == 3
+            assert any("test_file_1.txt: blocks [3]" in error for error in details["errors"])
+            assert any("test_file_3.txt: missing" in error for error in details["errors"])
+
+    def test_virtual_restore_without_reference_verifies_nothing(self, app):
+        """Test files that only read back are restored but not counted as verified"""
+        with app.app_context():
+            result, details = VerificationService().execute_verification_test(
+                job_id=self.job_id, test_type=VerificationType.FULL_RESTORE, tester_id=self.user_id
+            )
+
+            assert result == TestResult.FAILED
+            assert details["reference"] == "none"
+            assert details["total_files_restored"] == 5
+            assert details["total_files_verified"] == 0
+            assert all("no recorded checksum" in error for error in details["errors"])
+
+    def test_virtual_restore_decodes_compressed_container(self, app):
+        """Test compressed copies are decoded and compared with the source checksum in their footer"""
+        with app.app_context():
+            source = self.test_source_dir / "test_file_0.txt"
+            container = self.test_backup_dir / "archive.bkcz"
+            BlockCompressor(block_size=256).copy(str(source), str(container))
+            self.use_primary_path(str(container))
+            service = VerificationService()
+
+            result, details = service.execute_verification_test(
+                job_id=self.job_id, test_type=VerificationType.FULL_RESTORE, tester_id=self.user_id
+            )
+
+            assert result == TestResult.SUCCESS
+            assert details["reference"] == "source_checksum"
+            assert details["bytes_restored"] == source.stat().st_size
+
+            with open(container, "r+b") as f:
+                f.seek(40)
+                byte = f.read(1)
+                f.seek(40)
+                f.write(bytes([byte[0] ^ 0xFF]))
+            result, details = service.execute_verification_test(
+                job_id=self.job_id, test_type=VerificationType.FULL_RESTORE, tester_id=self.user_id
+            )
+
+            assert result == TestResult.FAILED
+            assert details["total_files_verified"] == 0
+
+    def test_virtual_restore_rebuilds_dedup_recipe(self, app):
+        """Test deduplicated copies are rebuilt from the job's newest recipe and checked against its checksum"""
+        with app.app_context():
+            store_root = self.test_backup_dir / "store"
+            with ChunkStore(str(store_root)) as store:
+                store.write(str(self.test_source_dir / "test_file_0.txt"), f"{job_recipe_prefix(self.job_id)}1")
+                store.write(str(self.test_source_dir / "test_file_1.txt"), f"{job_recipe_prefix(self.job_id)}2")
+            self.use_primary_path(f"dedup:{store_root}")
+
+            for test_type in (VerificationType.FULL_RESTORE, VerificationType.PARTIAL):
+                result, details = VerificationService().execute_verification_test(
+                    job_id=self.job_id, test_type=test_type, tester_id=self.user_id
+                )
+
+                assert result == TestResult.SUCCESS
+                assert details["reference"] == "source_checksum"
+                assert details["bytes_restored"] == (self.test_source_dir / "test_file_1.txt").stat().st_size
+
+    def test_virtual_restore_uses_run_manifest_checksums(self, app):
+        """Test tree copies without a Merkle manifest are compared with the checksums recorded per run"""
+        with app.app_context():
+            destination = self.test_backup_dir / "tree"
+            BackupEngine().copy_tree(str(self.test_source_dir), str(destination), mode="full")
+            self.use_primary_path(str(destination))
+            with open(destination / "run-000001" / "test_file_2.txt", "r+b") as f:
+                f.write(b"#")
+
+            result, details = VerificationService().execute_verification_test(
+                job_id=self.job_id, test_type=VerificationType.FULL_RESTORE, tester_id=self.user_id
+            )
+
+            assert result == TestResult.WARNING
+            assert details["reference"] == "source_checksum"
+            assert details["total_files_verified"] == 4
+            assert details["errors"] == [
+                "Verification failed for run-000001/test_file_2.txt: does not match the source checksum"
+            ]
+
+    def test_copy_mode_restores_physical_files(self, app):
+        """Test copy mode restores through reflink or copy and reports the strategies"""
+        with app.app_context():
+            service = VerificationService(restore_mode="copy")
+
+            result, details = service.execute_verification_test(
+                job_id=self.job_id, test_type=VerificationType.FULL_RESTORE, tester_id=self.user_id
+            )
+
+            assert result == TestResult.SUCCESS
+            assert details["restore_mode"] == "copy"
+            assert sum(details["restore_strategies"].values()) == 5
+            assert details["sampling"]["sample_size"] == 5
+            assert details["bytes_restored"] > 0
+            with pytest.raises(ValueError):
+                VerificationService(restore_mode="tape")
+
     def test_verification_scheduling(self, app):
         """Test verification test scheduling"""
         with app.app_context():
@@ -210,6 +379,131 @@ class TestVerificationService:
             assert result in [TestResult.SUCCESS, TestResult.WARNING, TestResult.FAILED]
             assert "errors" in details or details["validity_rate"] < 100.0
 
+    def test_integrity_check_localises_corruption_with_manifest(self, app):
+        """Test the first integrity check stores a Merkle manifest and later checks find corrupted blocks"""
+        with app.app_context():
+            service = VerificationService()
+
+            result, details = service.execute_verification_test(
+                job_id=self.job_id, test_type=VerificationType.INTEGRITY, tester_id=self.user_id
+            )
+            assert result == TestResult.SUCCESS
+            assert details["copies_checked"][0]["merkle_manifest_created"]
+
+            with open(self.test_backup_dir / "test_file_2.txt", "r+b") as f:
+                f.seek(10)
+                f.write(b"X")
+
+            result, details = service.execute_verification_test(
+                job_id=self.job_id, test_type=VerificationType.INTEGRITY, tester_id=self.user_id
+            )
+
+            assert result == TestResult.FAILED
+            assert details["copies_checked"][0]["corrupted_blocks"] == {"test_file_2.txt": [0]}
+            assert details["validity_rate"] == 80.0
+
+    def _rewrite_copy(self, engine, source, destination, content, tree=False):
+        """Write new source content and back it up again as execute_backup does (stale Merkle rows dropped)."""
+        Path(source).write_bytes(content)
+        if tree:
+            engine.copy_tree(str(self.test_source_dir), destination, mode="incremental")
+        else:
+            engine.copy_file(str(source), destination)
+        engine._discard_stale_merkle_entries(destination)
+
+    def test_integrity_check_flags_rewritten_copy_without_reference(self, app):
+        """Test a single-file copy rewritten by a backup and then corrupted is not reported as clean"""
+        with app.app_context():
+            engine = BackupEngine()
+            source = self.test_source_dir / "test_file_0.txt"
+            destination = str(self.test_backup_dir / "single.bak")
+            engine.copy_file(str(source), destination)
+            copy = BackupCopy.query.filter_by(job_id=self.job_id).first()
+            copy.storage_path = destination
+            db.session.commit()
+            service = VerificationService()
+            try:
+                result, _ = service.execute_verification_test(
+                    job_id=self.job_id, test_type=VerificationType.INTEGRITY, tester_id=self.user_id
+                )
+                assert result == TestResult.SUCCESS
+
+                self._rewrite_copy(engine, source, destination, b"second backup" * 100)
+                with open(destination, "r+b") as f:
+                    f.write(b"X")
+
+                result, details = service.execute_verification_test(
+                    job_id=self.job_id, test_type=VerificationType.INTEGRITY, tester_id=self.user_id
+                )
+
+                assert result != TestResult.SUCCESS
+                assert details["copies_checked"][0]["files_checked"] == 1
+                assert details["copies_checked"][0]["unverified_files"] == ["single.bak"]
+            finally:
+                Path(merkle_path_for(destination)).unlink(missing_ok=True)
+
+    def test_integrity_check_compares_rewritten_tree_files_with_source_checksum(self, app):
+        """Test files a tree backup rewrote after the manifest was built are checked against the run manifest"""
+        with app.app_context():
+            engine = BackupEngine()
+            destination = str(self.test_backup_dir / "tree")
+            engine.copy_tree(str(self.test_source_dir), destination, mode="full")
+            copy = BackupCopy.query.filter_by(job_id=self.job_id).first()
+            copy.storage_path = destination
+            db.session.commit()
+            service = VerificationService()
+            try:
+                service.execute_verification_test(
+                    job_id=self.job_id, test_type=VerificationType.INTEGRITY, tester_id=self.user_id
+                )
+                source = self.test_source_dir / "test_file_1.txt"
+                self._rewrite_copy(engine, source, destination, b"changed" * 100, tree=True)
+                rewritten = next(Path(destination).glob("run-000002/test_file_1.txt"))
+                with open(rewritten, "r+b") as f:
+                    f.write(b"X")
+
+                result, details = service.execute_verification_test(
+                    job_id=self.job_id, test_type=VerificationType.INTEGRITY, tester_id=self.user_id
+                )
+
+                assert result == TestResult.FAILED
+                assert details["copies_checked"][0]["mismatched_files"] == ["run-000002/test_file_1.txt"]
+                assert "unverified_files" not in details["copies_checked"][0]
+            finally:
+                Path(merkle_path_for(destination)).unlink(missing_ok=True)
+
+    def test_integrity_check_compares_copies(self, app):
+        """Test secondary copies are compared with the primary copy by Merkle root"""
+        with app.app_context():
+            secondary_dir = Path(tempfile.mkdtemp(prefix="test_secondary_"))
+            try:
+                for file in self.test_backup_dir.glob("*.txt"):
+                    shutil.copy2(file, secondary_dir / file.name)
+                (secondary_dir / "test_file_0.txt").write_text("diverged")
+                db.session.add(
+                    BackupCopy(
+                        job_id=self.job_id,
+                        copy_type="secondary",
+                        media_type="disk",
+                        storage_path=str(secondary_dir),
+                        status="success",
+                    )
+                )
+                db.session.commit()
+
+                result, details = VerificationService().execute_verification_test(
+                    job_id=self.job_id, test_type=VerificationType.INTEGRITY, tester_id=self.user_id
+                )
+
+                comparison = details["copy_comparison"][0]
+                assert result == TestResult.WARNING
+                assert comparison["copy_type"] == "secondary"
+                assert not comparison["identical"]
+                assert list(comparison["changed_blocks"]) == ["test_file_0.txt"]
+            finally:
+                shutil.rmtree(secondary_dir, ignore_errors=True)
+                Path(merkle_path_for(secondary_dir)).unlink(missing_ok=True)
+
     def test_verification_statistics(self, app):
         """Test verification statistics"""
         with app.app_context():
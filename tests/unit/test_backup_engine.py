@@ -0,0 +1,917 @@
+"""
+Unit tests for the core backup engine.
+
+Tests cover:
+- Single and multi-destination copies
+- Fan-out copy behaviour and fallback
+- Pipelined reader/hasher/writer copies
+- Kernel fast-path strategy selection
+- Directory tree copies and manifests
+- Incremental and differential tree backups
+- Merkle manifests refreshed after each copy
+- Deduplicated copies into the chunk store
+- Block-parallel compression and seekable containers
+- Resumable checkpointed copies
+- Page-cache-friendly and O_DIRECT copies
+- Sparse-file aware copies
+- Checksum correctness
+"""
+import hashlib
+import os
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.core import cache_io, resumable
+from app.core.backup_engine import BackupEngine
+from app.core.cache_io import CacheFriendlyCopier
+from app.core.compression import BlockCompressor, CompressedFileReader, CompressionError
+from app.core.copy_pipeline import PipelinedCopier
+from app.core.exceptions import CopyOperationError
+from app.core.fanout import FanoutCopier
+from app.core.fast_copy import CopyStrategy, KernelCopier, _StrategyUnsupported, mmap_checksum, reflink_or_copy
+from app.core.manifest import BackupManifest
+from app.core.resumable import CHECKPOINT_SUFFIX, PARTIAL_SUFFIX, ResumableCopier, checkpoint_state
+from app.core.sparse import SparseCopier, is_sparse
+from app.core.tree_copy import TreeCopier, iter_tree
+from app.verification.merkle import MerkleManifest, MerkleTree, merkle_path_for
+
+
+def _sha256(path):
+    return hashlib.sha256(open(path, "rb").read()).hexdigest()
+
+
+@pytest.fixture
+def source_file(tmp_path):
+    """Create a source file spanning several small chunks."""
+    path = tmp_path / "source.img"
+    path.write_bytes(os.urandom(256 * 1024 + 123))
+    return path
+
+
+@pytest.fixture
+def source_tree(tmp_path):
+    """Create a small directory tree with files of different sizes."""
+    root = tmp_path / "tree"
+    (root / "a" / "b").mkdir(parents=True)
+    (root / "empty_dir").mkdir()
+    (root / "top.txt").write_bytes(b"top")
+    (root / "a" / "mid.bin").write_bytes(os.urandom(50 * 1024))
+    (root / "a" / "b" / "deep.bin").write_bytes(os.urandom(200 * 1024))
+    (root / "a" / "b" / "empty").write_bytes(b"")
+    return root
+
+
+@pytest.fixture
+def engine():
+    """Backup engine with small buffers so tests exercise multiple chunks."""
+    engine = BackupEngine()
+    engine.buffer_size = 64 * 1024
+    engine.retry_intervals = [0, 0, 0]
+    return engine
+
+
+class TestFanoutCopier:
+    """Test cases for single-read multi-destination copies."""
+
+    def test_copies_to_all_destinations(self, tmp_path, source_file):
+        """Test every destination receives identical content."""
+        destinations = [str(tmp_path / f"dest_{i}.img") for i in range(3)]
+        copier = FanoutCopier(chunk_size=32 * 1024, max_lag_bytes=64 * 1024)
+
+        result = copier.copy(str(source_file), destinations)
+
+        expected = _sha256(source_file)
+        assert result["checksum"] == expected
+        assert result["bytes_read"] == source_file.stat().st_size
+        for dest in destinations:
+            assert result["destinations"][dest]["error"] is None
+            assert result["destinations"][dest]["checksum"] == expected
+            assert _sha256(dest) == expected
+
+    def test_failed_destination_does_not_block_others(self, tmp_path, source_file):
+        """Test a destination that cannot be opened is reported without stalling the copy."""
+        good = str(tmp_path / "good.img")
+        bad = str(tmp_path / "missing_dir" / "bad.img")
+        copier = FanoutCopier(chunk_size=16 * 1024, max_lag_bytes=16 * 1024)
+
+        result = copier.copy(str(source_file), [good, bad])
+
+        assert result["destinations"][good]["error"] is None
+        assert result["destinations"][bad]["error"] is not None
+        assert _sha256(good) == result["checksum"]
+
+    def test_unexpected_writer_error_does_not_stall_copy(self, tmp_path, source_file, monkeypatch):
+        """Test a writer failing with a non-OSError is reported while its queue keeps draining."""
+        good = str(tmp_path / "good.img")
+        bad = str(tmp_path / "bad.img")
+        copier = FanoutCopier(chunk_size=16 * 1024, max_lag_bytes=16 * 1024)
+        checkpoint_writer = copier.resumable.checkpoint_writer
+
+        def open_writer(source, destination, **kwargs):
+            writer = checkpoint_writer(source, destination, **kwargs)
+            if destination == bad:
+                writer.write = MagicMock(side_effect=ValueError("writer state lost"))
+            return writer
+
+        monkeypatch.setattr(copier.resumable, "checkpoint_writer", open_writer)
+        result = copier.copy(str(source_file), [good, bad])
+
+        assert result["destinations"][bad]["error"] == "writer state lost"
+        assert result["destinations"][good]["error"] is None
+        assert _sha256(good) == result["checksum"]
+        assert not os.path.exists(bad)
+
+    def test_interrupted_fanout_is_resumable(self, tmp_path, source_file):
+        """Test an interrupted fan-out leaves no file under the real name and resumes from its checkpoint."""
+        destinations = [str(tmp_path / "a.img"), str(tmp_path / "b.img")]
+        resumable = ResumableCopier(block_size=16 * 1024, checkpoint_interval=16 * 1024)
+        copier = FanoutCopier(chunk_size=32 * 1024, resumable=resumable)
+
+        def fail_after_three_chunks(done, total):
+            if done >= 3 * 32 * 1024:
+                raise OSError("source went away")
+
+        with pytest.raises(OSError):
+            copier.copy(str(source_file), destinations, fail_after_three_chunks)
+
+        for dest in destinations:
+            assert not os.path.exists(dest)
+            assert checkpoint_state(dest)[0] == 3 * 32 * 1024
+
+        result = resumable.copy(str(source_file), destinations[0])
+        assert result["resumed_from"] == 3 * 32 * 1024
+        assert _sha256(destinations[0]) == _sha256(source_file)
+
+    def test_completed_fanout_leaves_no_partial_files(self, tmp_path, source_file):
+        """Test destinations are renamed into place and their checkpoints removed."""
+        destinations = [str(tmp_path / "a.img"), str(tmp_path / "b.img")]
+
+        FanoutCopier(chunk_size=32 * 1024).copy(str(source_file), destinations)
+
+        assert sorted(os.listdir(tmp_path)) == ["a.img", "b.img", "source.img"]
+
+    def test_progress_reports_source_reads(self, tmp_path, source_file):
+        """Test progress is reported once per source chunk."""
+        calls = []
+        copier = FanoutCopier(chunk_size=64 * 1024)
+
+        copier.copy(str(source_file), [str(tmp_path / "a"), str(tmp_path / "b")], lambda done, total: calls.append(done))
+
+        assert calls[-1] == source_file.stat().st_size
+        assert len(calls) == 5
+
+
+class TestPipelinedCopier:
+    """Test cases for the pipelined copy engine."""
+
+    def test_pipelined_copy_matches_source(self, tmp_path, source_file):
+        """Test a multi-buffer copy produces identical bytes and checksum."""
+        dest = tmp_path / "dest.img"
+        copier = PipelinedCopier(buffer_size=16 * 1024, ring_size=3)
+
+        result = copier.copy(str(source_file), str(dest))
+
+        assert result["bytes_copied"] == source_file.stat().st_size
+        assert result["checksum"] == _sha256(source_file)
+        assert dest.read_bytes() == source_file.read_bytes()
+
+    def test_stage_counters_reported(self, tmp_path, source_file):
+        """Test per-stage byte counters and bottleneck are exposed."""
+        copier = PipelinedCopier(buffer_size=16 * 1024, ring_size=2)
+
+        result = copier.copy(str(source_file), str(tmp_path / "dest.img"))
+
+        size = source_file.stat().st_size
+        assert set(result["stages"]) == {"reader", "hasher", "writer"}
+        assert all(stage["bytes"] == size for stage in result["stages"].values())
+        assert result["bottleneck"] in result["stages"]
+        assert copier.get_stats()["copies"] == 1
+
+    def test_small_file_copied_inline(self, tmp_path):
+        """Test files smaller than one buffer are copied without pipeline threads."""
+        source = tmp_path / "small.txt"
+        source.write_bytes(b"hello world")
+        copier = PipelinedCopier(buffer_size=1024 * 1024)
+
+        with patch("app.core.copy_pipeline.threading.Thread") as thread:
+            result = copier.copy(str(source), str(tmp_path / "copy.txt"))
+
+        thread.assert_not_called()
+        assert result["checksum"] == hashlib.sha256(b"hello world").hexdigest()
+
+    def test_write_error_propagates(self, tmp_path, source_file):
+        """Test a writer failure is raised to the caller without deadlocking."""
+        copier = PipelinedCopier(buffer_size=16 * 1024, ring_size=2)
+
+        with patch("app.core.copy_pipeline._write_full", side_effect=OSError("disk full")):
+            with pytest.raises(OSError, match="disk full"):
+                copier.copy(str(source_file), str(tmp_path / "dest.img"))
+
+
+class TestKernelCopier:
+    """Test cases for the kernel-side fast copy path."""
+
+    def test_copy_records_strategy_and_checksum(self, tmp_path, source_file):
+        """Test the first working strategy is recorded with the source checksum."""
+        copier = KernelCopier(fallback=PipelinedCopier(buffer_size=16 * 1024))
+        dest = tmp_path / "dest.img"
+
+        result = copier.copy(str(source_file), str(dest))
+
+        assert result["strategy"] in copier.available_strategies
+        assert result["checksum"] == _sha256(source_file)
+        assert result["throughput_mb_s"] >= 0
+        assert dest.read_bytes() == source_file.read_bytes()
+
+    def test_falls_back_through_chain(self, tmp_path, source_file):
+        """Test unsupported strategies fall through to the buffered pipeline."""
+
+        def unsupported(*args):
+            raise _StrategyUnsupported("not here")
+
+        copier = KernelCopier(fallback=PipelinedCopier(buffer_size=16 * 1024))
+        copier._kernel_strategies = [(CopyStrategy.REFLINK, unsupported), (CopyStrategy.SENDFILE, unsupported)]
+        dest = tmp_path / "dest.img"
+
+        result = copier.copy(str(source_file), str(dest))
+
+        assert result["strategy"] == "buffered"
+        assert "stages" in result
+        assert dest.read_bytes() == source_file.read_bytes()
+
+    def test_unchanged_source_uses_checksum_cache(self, tmp_path, source_file):
+        """Test a second copy of an unchanged source reuses the cached checksum."""
+        copier = KernelCopier(fallback=PipelinedCopier())
+        if not copier._kernel_strategies:
+            pytest.skip("No kernel copy strategies on this platform")
+
+        first = copier.copy(str(source_file), str(tmp_path / "a.img"))
+        second = copier.copy(str(source_file), str(tmp_path / "b.img"))
+
+        assert first["checksum"] == second["checksum"]
+        if first["strategy"] != "buffered":
+            assert second["checksum_source"] == "cache"
+
+    def test_mmap_checksum_handles_empty_file(self, tmp_path):
+        """Test mmap hashing of an empty file."""
+        empty = tmp_path / "empty"
+        empty.write_bytes(b"")
+
+        assert mmap_checksum(str(empty)) == hashlib.sha256(b"").hexdigest()
+
+    def test_reflink_or_copy_preserves_content_and_mtime(self, tmp_path, source_file):
+        """Test files are cloned where supported and copied otherwise, with metadata kept."""
+        os.utime(source_file, (1_600_000_000, 1_600_000_000))
+        dest = tmp_path / "clone.img"
+
+        strategy = reflink_or_copy(str(source_file), str(dest))
+
+        assert strategy in ("reflink", "buffered")
+        assert dest.read_bytes() == source_file.read_bytes()
+        assert dest.stat().st_mtime == source_file.stat().st_mtime
+
+
+class TestTreeCopier:
+    """Test cases for directory tree copies."""
+
+    def test_iter_tree_streams_regular_files(self, source_tree):
+        """Test the walker yields every regular file with relative paths."""
+        (source_tree / "link").symlink_to(source_tree / "top.txt")
+
+        entries = {entry.rel_path: entry for entry in iter_tree(str(source_tree))}
+
+        assert set(entries) == {
+            "top.txt",
+            os.path.join("a", "mid.bin"),
+            os.path.join("a", "b", "deep.bin"),
+            os.path.join("a", "b", "empty"),
+        }
+        assert entries["top.txt"].size == 3
+
+    def test_copy_tree_builds_manifest(self, tmp_path, source_tree):
+        """Test every file is copied and recorded in the manifest."""
+        dest = tmp_path / "dest"
+        calls = []
+        copier = TreeCopier(PipelinedCopier(buffer_size=16 * 1024), max_workers=3)
+
+        result = copier.copy(str(source_tree), str(dest), lambda done, total: calls.append((done, total)))
+
+        assert result["files_copied"] == 4
+        assert result["errors"] == []
+        for item in result["manifest"]:
+            assert _sha256(dest / item["path"]) == item["checksum"]
+            assert item["size"] == (source_tree / item["path"]).stat().st_size
+            assert item["mtime"] == (source_tree / item["path"]).stat().st_mtime
+        assert calls[-1] == (result["bytes_copied"], result["bytes_copied"])
+
+    def test_large_files_scheduled_first(self, tmp_path, source_tree):
+        """Test files inside the read-ahead window are dispatched largest first."""
+        order = []
+        pipeline = PipelinedCopier()
+
+        class RecordingCopier:
+            def copy(self, source, destination, progress_callback=None):
+                order.append(os.path.basename(source))
+                return pipeline.copy(source, destination)
+
+        TreeCopier(RecordingCopier(), max_workers=1).copy(str(source_tree), str(tmp_path / "dest"))
+
+        assert order[:2] == ["deep.bin", "mid.bin"]
+
+    def test_file_errors_are_collected(self, tmp_path, source_tree):
+        """Test a failing file is reported without aborting the tree."""
+        pipeline = PipelinedCopier()
+
+        class FlakyCopier:
+            def copy(self, source, destination, progress_callback=None):
+                if source.endswith("mid.bin"):
+                    raise OSError("read error")
+                return pipeline.copy(source, destination)
+
+        result = TreeCopier(FlakyCopier()).copy(str(source_tree), str(tmp_path / "dest"))
+
+        assert result["files_copied"] == 3
+        assert result["errors"] == [{"path": os.path.join("a", "mid.bin"), "error": "read error"}]
+
+    def test_copier_exceptions_are_collected(self, tmp_path, source_tree):
+        """Test a non-OSError from the file copier (e.g. CompressionError) is reported per file."""
+        pipeline = PipelinedCopier()
+
+        class FailingCompressor:
+            def copy(self, source, destination, progress_callback=None):
+                if source.endswith("mid.bin"):
+                    raise CompressionError("codec failed")
+                return pipeline.copy(source, destination)
+
+        result = TreeCopier(FailingCompressor()).copy(str(source_tree), str(tmp_path / "dest"))
+
+        assert result["files_copied"] == 3
+        assert result["errors"] == [{"path": os.path.join("a", "mid.bin"), "error": "codec failed"}]
+
+    def test_execute_backup_handles_directory_source(self, tmp_path, source_tree, engine):
+        """Test execute_backup copies directory sources with a manifest per destination."""
+        destinations = [str(tmp_path / "copy_1"), str(tmp_path / "copy_2")]
+        job = MagicMock(source_path=str(source_tree), destination_paths=",".join(destinations), backup_mode="full", io_mode="auto")
+
+        with patch("app.models.BackupJob") as job_model:
+            job_model.query.get.return_value = job
+            result = engine.execute_backup(1)
+
+        assert result["status"] == "success"
+        assert len(result["copies_created"]) == 2
+        assert result["copies_created"][0]["checksum"] == result["copies_created"][1]["checksum"]
+        assert all(copy["files_copied"] == 4 for copy in result["copies_created"])
+
+
+def _touch(path, content):
+    """Rewrite a file and move its mtime forward so the change is detected."""
+    path.write_bytes(content)
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+class TestIncrementalBackup:
+    """Test cases for manifest-driven incremental and differential tree backups."""
+
+    def test_unchanged_tree_is_carried_forward(self, tmp_path, source_tree, engine):
+        """Test an incremental run over an unchanged tree copies nothing."""
+        dest = str(tmp_path / "dest")
+        full = engine.copy_tree(str(source_tree), dest, mode="full")
+
+        with patch.object(engine.kernel_copier, "copy", wraps=engine.kernel_copier.copy) as copy:
+            incremental = engine.copy_tree(str(source_tree), dest, mode="incremental")
+
+        copy.assert_not_called()
+        assert incremental["files_copied"] == 0
+        assert incremental["files_skipped"] == 4
+        assert incremental["base_run_id"] == full["run_id"]
+        assert incremental["checksum"] == full["checksum"]
+
+    def test_only_changed_files_are_copied(self, tmp_path, source_tree, engine):
+        """Test modified and missing destination files are copied again."""
+        dest = tmp_path / "dest"
+        full = engine.copy_tree(str(source_tree), str(dest), mode="full")
+        _touch(source_tree / "top.txt", b"changed")
+        os.remove(os.path.join(full["run_path"], "a", "mid.bin"))
+
+        result = engine.copy_tree(str(source_tree), str(dest), mode="incremental")
+
+        assert result["files_copied"] == 2
+        assert result["files_skipped"] == 2
+        assert sorted(os.listdir(result["run_path"])) == ["a", "top.txt"]
+        assert open(os.path.join(result["run_path"], "top.txt"), "rb").read() == b"changed"
+        assert {item["path"] for item in result["manifest"] if not item["carried"]} == {
+            "top.txt",
+            os.path.join("a", "mid.bin"),
+        }
+
+    def test_differential_compares_against_last_full(self, tmp_path, source_tree, engine):
+        """Test differential runs keep copying everything changed since the last full run."""
+        dest = str(tmp_path / "dest")
+        full = engine.copy_tree(str(source_tree), dest, mode="full")
+        _touch(source_tree / "top.txt", b"changed")
+        engine.copy_tree(str(source_tree), dest, mode="incremental")
+
+        incremental = engine.copy_tree(str(source_tree), dest, mode="incremental")
+
+        assert incremental["files_copied"] == 0
+        differential = engine.copy_tree(str(source_tree), dest, mode="differential")
+
+        assert differential["base_run_id"] == full["run_id"]
+        assert differential["files_copied"] == 1
+
+    def test_every_run_stays_restorable(self, tmp_path, source_tree, engine):
+        """Test each run keeps its manifest and resolves to the data of that point in time."""
+        dest = str(tmp_path / "dest")
+        full = engine.copy_tree(str(source_tree), dest, mode="full")
+        _touch(source_tree / "top.txt", b"changed")
+        first = engine.copy_tree(str(source_tree), dest, mode="incremental")
+        second = engine.copy_tree(str(source_tree), dest, mode="incremental")
+
+        with BackupManifest(second["manifest_path"]) as manifest:
+            at_full = {item["path"]: item for item in manifest.locate(dest, full["run_id"])}
+            at_second = {item["path"]: item for item in manifest.locate(dest, second["run_id"])}
+
+        assert len(at_full) == len(at_second) == 4
+        assert open(at_full["top.txt"]["stored_path"], "rb").read() != b"changed"
+        assert open(at_second["top.txt"]["stored_path"], "rb").read() == b"changed"
+        assert at_second["top.txt"]["stored_run_id"] == first["run_id"]
+        assert {item["stored_run_id"] for path, item in at_second.items() if path != "top.txt"} == {full["run_id"]}
+        assert os.listdir(second["run_path"]) == []
+
+    def test_failed_run_is_not_used_as_baseline(self, tmp_path, source_tree, engine):
+        """Test a run that fails is removed so the next incremental compares against the last good run."""
+        dest = str(tmp_path / "dest")
+        full = engine.copy_tree(str(source_tree), dest, mode="full")
+
+        with patch("app.core.backup_engine.TreeCopier.copy", side_effect=OSError("disk gone")):
+            with pytest.raises(CopyOperationError):
+                engine.copy_tree(str(source_tree), dest, mode="incremental")
+
+        assert engine.copy_tree(str(source_tree), dest, mode="incremental")["base_run_id"] == full["run_id"]
+
+    def test_execute_backup_reports_skipped_files(self, tmp_path, source_tree, engine):
+        """Test execute_backup totals files copied and skipped across destinations."""
+        destinations = [str(tmp_path / "copy_1"), str(tmp_path / "copy_2")]
+        job = MagicMock(source_path=str(source_tree), destination_paths=",".join(destinations), backup_mode="incremental", io_mode="auto")
+
+        with patch("app.models.BackupJob") as job_model:
+            job_model.query.get.return_value = job
+            first = engine.execute_backup(1)
+            second = engine.execute_backup(1)
+
+        assert first["files_copied"] == 8
+        assert second["files_copied"] == 0
+        assert second["files_skipped"] == 8
+        assert second["mode"] == "incremental"
+
+    def test_execute_backup_discards_rewritten_merkle_entries(self, tmp_path, source_file, engine):
+        """Test a completed copy drops its rewritten file from the Merkle manifest without re-reading it."""
+        dest = tmp_path / "copy" / "source.img"
+        job = MagicMock(source_path=str(source_file), destination_paths=str(dest), backup_mode="full", io_mode="auto")
+
+        with patch("app.models.BackupJob") as job_model:
+            job_model.query.get.return_value = job
+            engine.execute_backup(1)
+            MerkleManifest.build(dest).close()
+            _touch(source_file, os.urandom(1024))
+            with patch.object(MerkleTree, "from_file", wraps=MerkleTree.from_file) as from_file:
+                result = engine.execute_backup(1)
+
+        assert from_file.call_count == 0
+        assert "merkle_root" not in result["copies_created"][0]
+        with MerkleManifest(merkle_path_for(dest)) as manifest:
+            assert manifest.paths() == []
+            assert manifest.unhashed_files(dest) == ["source.img"]
+
+
+class TestDeduplicatedBackup:
+    """Test cases for dedup: destinations."""
+
+    def test_execute_backup_reports_dedup_ratio(self, tmp_path, source_file, engine):
+        """Test repeated backups into a chunk store report a high dedup ratio."""
+        store = str(tmp_path / "store")
+        regular = str(tmp_path / "plain" / "source.img")
+        job = MagicMock(source_path=str(source_file), destination_paths=f"{regular},dedup:{store}", backup_mode="full", io_mode="auto")
+
+        with patch("app.models.BackupJob") as job_model:
+            job_model.query.get.return_value = job
+            first = engine.execute_backup(1)
+            second = engine.execute_backup(1)
+
+        assert first["status"] == "success"
+        assert first["dedup_ratio"] == 0.0
+        assert second["dedup_ratio"] == 1.0
+        dedup_copy = second["copies_created"][1]
+        assert dedup_copy["stored_bytes"] == 0
+        assert dedup_copy["checksum"] == _sha256(source_file)
+        assert _sha256(regular) == dedup_copy["checksum"]
+
+    def test_directory_source_rejected_for_dedup(self, tmp_path, source_tree, engine):
+        """Test dedup destinations require a single-file source."""
+        with pytest.raises(CopyOperationError):
+            engine.copy_file_deduplicated(str(source_tree), str(tmp_path / "store"), "job-1/a")
+
+
+@pytest.fixture
+def compressible_file(tmp_path):
+    """Create a file with compressible and incompressible regions."""
+    path = tmp_path / "data.log"
+    path.write_bytes(b"backup log line 0123456789\n" * 20000 + os.urandom(50 * 1024))
+    return path
+
+
+class TestBlockCompressor:
+    """Test cases for the block compression stage."""
+
+    @pytest.mark.parametrize("codec", ["zlib", "lzma"])
+    def test_round_trip(self, tmp_path, compressible_file, codec):
+        """Test compressed containers restore to the original bytes."""
+        container = tmp_path / "data.bkz"
+        compressor = BlockCompressor(codec=codec, block_size=64 * 1024, workers=3)
+
+        result = compressor.copy(str(compressible_file), str(container))
+
+        assert result["checksum"] == _sha256(compressible_file)
+        assert result["compression_ratio"] > 2
+        assert result["cpu_seconds"] > 0
+        assert result["compressed_bytes"] == container.stat().st_size
+        with CompressedFileReader(str(container)) as reader:
+            reader.decompress_to(str(tmp_path / "restored"))
+        assert (tmp_path / "restored").read_bytes() == compressible_file.read_bytes()
+
+    def test_random_access_reads_only_needed_blocks(self, tmp_path, compressible_file):
+        """Test a range read spanning blocks returns the right bytes."""
+        container = tmp_path / "data.bkz"
+        BlockCompressor(block_size=32 * 1024).copy(str(compressible_file), str(container))
+        original = compressible_file.read_bytes()
+
+        with CompressedFileReader(str(container)) as reader, patch.object(
+            reader, "read_block", wraps=reader.read_block
+        ) as read_block:
+            data = reader.read(100_000, 40_000)
+
+        assert data == original[100_000:140_000]
+        assert read_block.call_count == 2
+
+    def test_incompressible_blocks_are_stored(self, tmp_path, source_file):
+        """Test random data does not grow beyond the container overhead."""
+        container = tmp_path / "random.bkz"
+
+        result = BlockCompressor(block_size=64 * 1024).copy(str(source_file), str(container))
+
+        assert result["compressed_bytes"] < source_file.stat().st_size + 1024
+
+    def test_corrupt_block_detected(self, tmp_path, compressible_file):
+        """Test a damaged block fails decompression."""
+        container = tmp_path / "data.bkz"
+        BlockCompressor(block_size=64 * 1024).copy(str(compressible_file), str(container))
+        with open(container, "r+b") as f:
+            f.seek(40)
+            f.write(b"\x00\x00\x00\x00")
+
+        with CompressedFileReader(str(container)) as reader:
+            with pytest.raises(CompressionError):
+                reader.read_block(0)
+
+    def test_execute_backup_compresses_flagged_copies(self, tmp_path, compressible_file, engine):
+        """Test destinations whose BackupCopy is_compressed get a compressed container."""
+        plain = str(tmp_path / "plain" / "data.log")
+        packed = str(tmp_path / "packed" / "data.log")
+        job = MagicMock(
+            source_path=str(compressible_file),
+            destination_paths=f"{plain},{packed}",
+            backup_mode="full", io_mode="auto",
+            job_type="file",
+            copies=[MagicMock(storage_path=packed, is_compressed=True)],
+        )
+        engine.compression_profiles["file"] = ("lzma", 1)
+
+        with patch("app.models.BackupJob") as job_model:
+            job_model.query.get.return_value = job
+            result = engine.execute_backup(1)
+
+        plain_copy, packed_copy = result["copies_created"]
+        assert "compression_ratio" not in plain_copy
+        assert packed_copy["compression_ratio"] > 2
+        assert packed_copy["checksum"] == _sha256(compressible_file)
+        with CompressedFileReader(packed) as reader:
+            assert reader.codec.name == "lzma"
+
+
+def _interrupt_after(blocks):
+    """Patch pwrite so the copy fails once after writing the given number of blocks."""
+    real = resumable._pwrite_full
+    calls = {"n": 0}
+
+    def pwrite(fd, data, offset):
+        calls["n"] += 1
+        if calls["n"] == blocks + 1:
+            raise OSError("simulated NAS disconnect")
+        real(fd, data, offset)
+
+    return patch.object(resumable, "_pwrite_full", side_effect=pwrite)
+
+
+class TestResumableCopier:
+    """Test cases for checkpointed copies that resume after failures."""
+
+    def test_fresh_copy_renames_into_place(self, tmp_path, source_file):
+        """Test a completed copy leaves no partial or checkpoint files."""
+        dest = str(tmp_path / "dest.img")
+
+        result = ResumableCopier(block_size=16 * 1024, checkpoint_interval=32 * 1024).copy(str(source_file), dest)
+
+        assert result["checksum"] == _sha256(source_file)
+        assert result["resumed_from"] == 0
+        assert _sha256(dest) == result["checksum"]
+        assert not os.path.exists(dest + PARTIAL_SUFFIX)
+        assert not os.path.exists(dest + CHECKPOINT_SUFFIX)
+
+    def test_interrupted_copy_resumes_from_checkpoint(self, tmp_path, source_file):
+        """Test a retry continues from the last checkpointed block."""
+        dest = str(tmp_path / "dest.img")
+        copier = ResumableCopier(block_size=16 * 1024, checkpoint_interval=32 * 1024)
+
+        with _interrupt_after(7), pytest.raises(OSError):
+            copier.copy(str(source_file), dest)
+
+        assert not os.path.exists(dest)
+        assert checkpoint_state(dest)[0] == 6 * 16 * 1024
+
+        result = copier.copy(str(source_file), dest)
+
+        assert result["resumed_from"] == 6 * 16 * 1024
+        assert result["checksum"] == _sha256(source_file)
+        assert _sha256(dest) == result["checksum"]
+
+    def test_modified_source_restarts_from_zero(self, tmp_path, source_file):
+        """Test a checkpoint for a different source version is discarded."""
+        dest = str(tmp_path / "dest.img")
+        copier = ResumableCopier(block_size=16 * 1024, checkpoint_interval=16 * 1024)
+        with _interrupt_after(4), pytest.raises(OSError):
+            copier.copy(str(source_file), dest)
+
+        source_file.write_bytes(os.urandom(100 * 1024))
+        result = copier.copy(str(source_file), dest)
+
+        assert result["resumed_from"] == 0
+        assert _sha256(dest) == _sha256(source_file)
+
+    def test_corrupt_partial_block_is_recopied(self, tmp_path, source_file):
+        """Test a damaged last block in the partial file is detected and rewritten."""
+        dest = str(tmp_path / "dest.img")
+        copier = ResumableCopier(block_size=16 * 1024, checkpoint_interval=16 * 1024)
+        with _interrupt_after(6), pytest.raises(OSError):
+            copier.copy(str(source_file), dest)
+        with open(dest + PARTIAL_SUFFIX, "r+b") as f:
+            f.seek(5 * 16 * 1024 + 5)
+            f.write(b"corrupt")
+
+        result = copier.copy(str(source_file), dest)
+
+        assert result["resumed_from"] == 5 * 16 * 1024
+        assert _sha256(dest) == _sha256(source_file)
+
+    def test_engine_retry_resumes_large_copy(self, tmp_path, source_file, engine):
+        """Test copy_file resumes instead of restarting when a large copy fails."""
+        dest = str(tmp_path / "dest.img")
+        engine.resumable_threshold = 0
+        engine.resumable = ResumableCopier(block_size=16 * 1024, checkpoint_interval=16 * 1024)
+
+        with _interrupt_after(5):
+            result = engine.copy_file(str(source_file), dest)
+
+        assert result["strategy"] == "resumable"
+        assert result["resumed_from"] == 5 * 16 * 1024
+        assert result["checksum"] == _sha256(source_file)
+
+    def test_failed_plain_copy_leaves_no_destination(self, tmp_path, source_file, engine):
+        """Test a failed non-resumable copy does not leave a truncated file behind."""
+        dest = str(tmp_path / "dest.img")
+
+        with patch.object(engine.kernel_copier, "copy", side_effect=OSError("disk gone")), pytest.raises(
+            CopyOperationError
+        ):
+            engine.copy_file(str(source_file), dest)
+
+        assert not os.path.exists(dest)
+        assert not os.path.exists(dest + PARTIAL_SUFFIX)
+
+
+class TestCacheFriendlyCopier:
+    """Test cases for fadvise/O_DIRECT copies that bypass the page cache."""
+
+    @pytest.mark.parametrize("direct", [False, True])
+    def test_copy_matches_source(self, tmp_path, source_file, direct):
+        """Test both modes copy an unaligned file exactly."""
+        dest = str(tmp_path / "dest.img")
+
+        result = CacheFriendlyCopier(direct=direct, block_size=64 * 1024, sync_interval=128 * 1024).copy(
+            str(source_file), dest
+        )
+
+        assert result["checksum"] == _sha256(source_file)
+        assert _sha256(dest) == result["checksum"]
+        assert result["bytes_copied"] == source_file.stat().st_size
+
+    def test_written_ranges_are_dropped_after_sync(self, tmp_path, source_file):
+        """Test DONTNEED is issued for each synced range of source and destination."""
+        dest = str(tmp_path / "dest.img")
+        dropped = []
+
+        with patch.object(cache_io, "drop_cache", side_effect=lambda fd, off, length: dropped.append((off, length))):
+            CacheFriendlyCopier(block_size=64 * 1024, sync_interval=128 * 1024).copy(str(source_file), dest)
+
+        size = source_file.stat().st_size
+        assert dropped[:2] == [(0, 128 * 1024)] * 2
+        assert sum(length for _, length in dropped) == 2 * size
+
+    def test_direct_falls_back_when_unsupported(self, tmp_path, source_file):
+        """Test filesystems rejecting O_DIRECT still get a cache-friendly copy."""
+        dest = str(tmp_path / "dest.img")
+        real_open = os.open
+
+        def no_direct(path, flags, mode=0o777):
+            if flags & getattr(os, "O_DIRECT", 0):
+                raise OSError(22, "Invalid argument")
+            return real_open(path, flags, mode)
+
+        with patch.object(cache_io.os, "open", side_effect=no_direct):
+            result = CacheFriendlyCopier(direct=True).copy(str(source_file), dest)
+
+        assert result["strategy"] == "cache_friendly"
+        assert _sha256(dest) == _sha256(source_file)
+
+    def test_engine_auto_mode_uses_threshold(self, tmp_path, source_file, engine):
+        """Test io_mode=auto only bypasses the cache above the size threshold."""
+        small = engine.copy_file(str(source_file), str(tmp_path / "small.img"))
+        engine.cache_friendly_threshold = 0
+        large = engine.copy_file(str(source_file), str(tmp_path / "large.img"))
+        forced = engine.copy_file(str(source_file), str(tmp_path / "buffered.img"), io_mode="buffered")
+
+        assert small["strategy"] != "cache_friendly"
+        assert large["strategy"] == "cache_friendly"
+        assert forced["strategy"] != "cache_friendly"
+        assert large["checksum"] == _sha256(source_file)
+
+    def test_cache_friendly_job_keeps_fanout(self, tmp_path, source_file, engine):
+        """Test cache-bypassing copies still read the source once and drop cache in the fan-out."""
+        destinations = [str(tmp_path / "a.img"), str(tmp_path / "b.img")]
+
+        with patch.object(engine, "copy_file", wraps=engine.copy_file) as copy_file, patch(
+            "app.core.fanout.drop_page_cache"
+        ) as read_drop, patch("app.core.resumable.drop_page_cache") as write_drop:
+            results = engine._copy_to_destinations(str(source_file), destinations, io_mode="cache_friendly")
+
+        copy_file.assert_not_called()
+        assert {r["strategy"] for r in results.values()} == {"cache_friendly"}
+        assert sum(call.args[2] for call in read_drop.call_args_list) == source_file.stat().st_size
+        assert write_drop.call_count >= 2
+        assert all(_sha256(dest) == _sha256(source_file) for dest in destinations)
+
+
+@pytest.fixture
+def sparse_file(tmp_path):
+    """Create a thin-provisioned image: 8MB logical with two small data islands."""
+    path = tmp_path / "disk.img"
+    with open(path, "wb") as f:
+        f.truncate(8 * 1024 * 1024)
+        f.seek(1024 * 1024)
+        f.write(os.urandom(100 * 1024))
+        f.seek(6 * 1024 * 1024 + 17)
+        f.write(os.urandom(5000))
+    if not is_sparse(str(path)):
+        pytest.skip("filesystem does not create sparse files")
+    return path
+
+
+class TestSparseCopier:
+    """Test cases for SEEK_DATA/SEEK_HOLE aware copies."""
+
+    def test_holes_are_preserved(self, tmp_path, sparse_file):
+        """Test only data extents are written and the checksum matches a dense read."""
+        dest = tmp_path / "copy.img"
+
+        result = SparseCopier(block_size=64 * 1024).copy(str(sparse_file), str(dest))
+
+        assert result["strategy"] == "sparse"
+        assert result["logical_bytes"] == 8 * 1024 * 1024
+        assert result["physical_bytes"] < 1024 * 1024
+        assert result["checksum"] == _sha256(sparse_file)
+        assert dest.read_bytes() == sparse_file.read_bytes()
+        assert dest.stat().st_blocks * 512 < 1024 * 1024
+
+    def test_zero_blocks_become_holes(self, tmp_path):
+        """Test allocated all-zero blocks are not written to the destination."""
+        source = tmp_path / "zeros.img"
+        source.write_bytes(b"\0" * (256 * 1024) + b"data")
+        dest = tmp_path / "copy.img"
+
+        result = SparseCopier(block_size=64 * 1024).copy(str(source), str(dest))
+
+        assert result["physical_bytes"] == 4
+        assert dest.read_bytes() == source.read_bytes()
+
+    def test_dense_file_uses_fallback(self, tmp_path, source_file):
+        """Test files without holes go through the fallback copier."""
+        fallback = MagicMock()
+        fallback.copy.return_value = {"strategy": "copy_file_range"}
+
+        result = SparseCopier(fallback=fallback).copy(str(source_file), str(tmp_path / "copy.img"))
+
+        assert result["strategy"] == "copy_file_range"
+        fallback.copy.assert_called_once()
+
+    def test_engine_prefers_sparse_over_resumable(self, tmp_path, sparse_file, engine):
+        """Test large sparse images skip the dense resumable path."""
+        engine.resumable_threshold = 0
+
+        result = engine.copy_file(str(sparse_file), str(tmp_path / "out" / "disk.img"))
+
+        assert result["strategy"] == "sparse"
+        assert result["checksum"] == _sha256(sparse_file)
+
+    def test_execute_backup_reports_physical_bytes(self, tmp_path, sparse_file, engine):
+        """Test copy entries carry logical and physical sizes for sparse sources."""
+        destinations = [str(tmp_path / "a" / "disk.img"), str(tmp_path / "b" / "disk.img")]
+        job = MagicMock(
+            source_path=str(sparse_file),
+            destination_paths=",".join(destinations),
+            backup_mode="full",
+            io_mode="auto",
+            copies=[],
+        )
+
+        with patch("app.models.BackupJob") as job_model:
+            job_model.query.get.return_value = job
+            result = engine.execute_backup(1)
+
+        for copy in result["copies_created"]:
+            assert copy["logical_bytes"] == 8 * 1024 * 1024
+            assert copy["physical_bytes"] < 1024 * 1024
+
+
+class TestBackupEngineDestinations:
+    """Test cases for BackupEngine multi-destination execution."""
+
+    def test_execute_backup_uses_single_read(self, tmp_path, source_file, engine):
+        """Test execute_backup reads the source once for several destinations."""
+        destinations = [str(tmp_path / f"copy_{i}" / "source.img") for i in range(3)]
+        job = MagicMock(source_path=str(source_file), destination_paths=",".join(destinations), backup_mode="full", io_mode="auto")
+
+        with patch("app.models.BackupJob") as job_model, patch.object(
+            engine, "copy_file", wraps=engine.copy_file
+        ) as copy_file:
+            job_model.query.get.return_value = job
+            result = engine.execute_backup(1)
+
+        assert result["status"] == "success"
+        assert len(result["copies_created"]) == 3
+        assert result["total_bytes"] == 3 * source_file.stat().st_size
+        assert {c["checksum"] for c in result["copies_created"]} == {_sha256(source_file)}
+        copy_file.assert_not_called()
+
+    def test_failed_fanout_destination_falls_back_to_copy_file(self, tmp_path, source_file, engine):
+        """Test destinations that fail during fan-out are retried individually."""
+        destinations = [str(tmp_path / "a.img"), str(tmp_path / "b.img")]
+
+        with patch.object(
+            FanoutCopier,
+            "copy",
+            return_value={
+                "destinations": {
+                    destinations[0]: {"bytes_copied": 0, "checksum": "", "duration": 0.0, "error": "boom"},
+                    destinations[1]: {"bytes_copied": 10, "checksum": "abc", "duration": 0.0, "error": None},
+                }
+            },
+        ):
+            results = engine._copy_to_destinations(str(source_file), destinations)
+
+        assert results[destinations[0]]["checksum"] == _sha256(source_file)
+        assert results[destinations[1]]["checksum"] == "abc"
+
+    def test_checkpointed_destination_resumes_instead_of_fanout(self, tmp_path, source_file, engine):
+        """Test a destination left with a checkpoint is resumed individually, the others fan out."""
+        destinations = [str(tmp_path / f"{name}.img") for name in ("a", "b", "c")]
+        engine.resumable = ResumableCopier(block_size=16 * 1024, checkpoint_interval=16 * 1024)
+        with _interrupt_after(4), pytest.raises(OSError):
+            engine.resumable.copy(str(source_file), destinations[0])
+
+        with patch.object(engine, "copy_file_fanout", wraps=engine.copy_file_fanout) as fanout:
+            results = engine._copy_to_destinations(str(source_file), destinations)
+
+        assert fanout.call_args[0][1] == destinations[1:]
+        assert results[destinations[0]]["resumed_from"] > 0
+        assert all(_sha256(dest) == _sha256(source_file) for dest in destinations)
+
+    def test_single_destination_skips_fanout(self, tmp_path, source_file, engine):
+        """Test a single destination uses the regular copy path."""
+        dest = str(tmp_path / "only.img")
+
+        with patch.object(engine, "copy_file_fanout") as fanout:
+            results = engine._copy_to_destinations(str(source_file), [dest])
+
+        fanout.assert_not_called()
+        assert results[dest]["checksum"] == _sha256(source_file)
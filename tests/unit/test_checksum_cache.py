@@ -0,0 +1,210 @@
+"""
+Unit tests for the persistent checksum cache.
+
+Tests cover:
+- Cache hits for unchanged files and misses after modification
+- Forced rehash for bit-rot scrubs
+- Integrity and corruption checks that never trust a cached digest of the copy
+- LRU eviction and persistence across instances
+- Hit/miss counters in ChecksumService statistics
+"""
+import hashlib
+import os
+from unittest.mock import patch
+
+import pytest
+
+from app.core.backup_engine import BackupEngine
+from app.verification import ChecksumAlgorithm, ChecksumService, FileValidator, PersistentChecksumCache
+from app.verification.checksum_cache import file_key
+from app.verification.interfaces import VerificationStatus
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = PersistentChecksumCache(tmp_path / "cache" / "checksums.db", max_entries=100)
+    yield cache
+    cache.close()
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    path = tmp_path / "data.bin"
+    path.write_bytes(os.urandom(256 * 1024))
+    return path
+
+
+def rot(path, offset=1000):
+    """Flip a byte in place and restore the mtime, as bit rot would leave the file."""
+    st = path.stat()
+    with open(path, "r+b") as f:
+        f.seek(offset)
+        byte = f.read(1)
+        f.seek(offset)
+        f.write(bytes([byte[0] ^ 0xFF]))
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+
+class TestChecksumServiceCache:
+    """Test cases for cached checksum calculation."""
+
+    def test_unchanged_file_served_from_cache(self, cache, data_file):
+        """Test the second calculation does not read the file."""
+        service = ChecksumService(cache=cache)
+
+        first = service.calculate_checksum(data_file)
+        second = service.calculate_checksum(data_file)
+
+        assert first == second == hashlib.sha256(data_file.read_bytes()).hexdigest()
+        stats = service.get_statistics()
+        assert stats["total_calculated"] == 1
+        assert stats["cache_hits"] == 1
+        assert stats["cache_misses"] == 1
+        assert stats["cache_hit_rate"] == 0.5
+
+    def test_modified_file_rehashed(self, cache, data_file):
+        """Test a changed size or mtime invalidates the cached digest."""
+        service = ChecksumService(cache=cache)
+        service.calculate_checksum(data_file)
+
+        data_file.write_bytes(b"changed")
+        checksum = service.calculate_checksum(data_file)
+
+        assert checksum == hashlib.sha256(b"changed").hexdigest()
+        assert service.get_statistics()["cache_hits"] == 0
+
+    def test_algorithms_cached_separately(self, cache, data_file):
+        """Test digests of different algorithms do not collide."""
+        service = ChecksumService(cache=cache)
+
+        sha256 = service.calculate_checksum(data_file, ChecksumAlgorithm.SHA256)
+        blake2b = service.calculate_checksum(data_file, ChecksumAlgorithm.BLAKE2B)
+
+        assert sha256 != blake2b
+        assert service.calculate_checksum(data_file, ChecksumAlgorithm.BLAKE2B) == blake2b
+        assert service.get_statistics()["cache_hits"] == 1
+
+    def test_force_rehash_detects_silent_corruption(self, cache, data_file):
+        """Test force_rehash reads the file even when size and mtime are unchanged."""
+        service = ChecksumService(cache=cache)
+        original = service.calculate_checksum(data_file)
+
+        rot(data_file)
+
+        assert service.calculate_checksum(data_file) == original
+        assert not service.verify_checksum(data_file, original, force_rehash=True)
+        # The refreshed digest replaces the stale one
+        assert service.calculate_checksum(data_file) != original
+
+    def test_reset_statistics_clears_counters(self, cache, data_file):
+        """Test cache counters are reset with the other statistics."""
+        service = ChecksumService(cache=cache)
+        service.calculate_checksum(data_file)
+        service.calculate_checksum(data_file)
+
+        service.reset_statistics()
+
+        stats = service.get_statistics()
+        assert stats["cache_hits"] == 0
+        assert stats["cache_misses"] == 0
+        assert stats["cache"]["entries"] == 1
+
+    def test_without_cache_counters_stay_zero(self, data_file):
+        """Test the service works unchanged when no cache is configured."""
+        service = ChecksumService()
+
+        service.calculate_checksum(data_file)
+        service.calculate_checksum(data_file)
+
+        stats = service.get_statistics()
+        assert stats["total_calculated"] == 2
+        assert stats["cache_hits"] == stats["cache_misses"] == 0
+        assert "cache" not in stats
+
+
+class TestIntegrityChecksBypassCache:
+    """Test cases for integrity paths that must re-read the copy despite a warm cache."""
+
+    def test_detect_corruption_rehashes(self, cache, data_file):
+        """Test corruption is detected although the cached digest still matches size and mtime."""
+        validator = FileValidator(checksum_service=ChecksumService(cache=cache))
+        expected = validator.calculate_checksum(data_file)
+
+        rot(data_file)
+
+        assert validator.detect_corruption(data_file, expected) is True
+
+    def test_verify_file_rehashes_target(self, cache, tmp_path, data_file):
+        """Test a rotted backup copy fails verification after its digest was cached."""
+        target = tmp_path / "copy.bin"
+        target.write_bytes(data_file.read_bytes())
+        service = ChecksumService(cache=cache)
+        validator = FileValidator(checksum_service=service, verify_metadata=False)
+        assert validator.verify_file(data_file, target)[0] == VerificationStatus.SUCCESS
+
+        rot(target)
+
+        assert validator.verify_file(data_file, target)[0] == VerificationStatus.CHECKSUM_MISMATCH
+        assert service.get_statistics()["cache_hits"] == 1  # only the unchanged source
+
+    def test_verify_copy_reuses_source_checksum(self, tmp_path, data_file):
+        """Test BackupEngine.verify_copy takes the source digest from the copy and reads only the copy."""
+        engine = BackupEngine()
+        target = tmp_path / "copy" / "data.bin"
+        engine.copy_file(str(data_file), str(target))
+
+        with patch.object(engine, "_calculate_checksum", wraps=engine._calculate_checksum) as calculate:
+            assert engine.verify_copy(str(data_file), str(target)) is True
+
+        calculate.assert_called_once_with(str(target))
+
+
+class TestPersistentChecksumCache:
+    """Test cases for the SQLite cache itself."""
+
+    def test_persists_across_instances(self, tmp_path, data_file):
+        """Test digests survive reopening the database."""
+        db_path = tmp_path / "checksums.db"
+        first = PersistentChecksumCache(db_path)
+        checksum = ChecksumService(cache=first).calculate_checksum(data_file)
+        first.close()
+
+        second = PersistentChecksumCache(db_path)
+        service = ChecksumService(cache=second)
+
+        assert len(second) == 1
+        assert service.calculate_checksum(data_file) == checksum
+        assert service.get_statistics()["total_calculated"] == 0
+        second.close()
+
+    def test_lru_eviction(self, tmp_path):
+        """Test the least recently used entries are evicted first."""
+        cache = PersistentChecksumCache(tmp_path / "checksums.db", max_entries=10)
+        for i in range(10):
+            cache.put((1, i, 100, 0), "sha256", f"digest-{i}")
+        # Touch the oldest entry so it becomes the most recently used
+        assert cache.get((1, 0, 100, 0), "sha256") == "digest-0"
+
+        cache.put((1, 10, 100, 0), "sha256", "digest-10")
+
+        assert len(cache) == 9
+        assert cache.get((1, 0, 100, 0), "sha256") == "digest-0"
+        assert cache.get((1, 1, 100, 0), "sha256") is None
+        assert cache.get_statistics()["evictions"] == 2
+        cache.close()
+
+    def test_invalidate_drops_all_algorithms(self, cache, data_file):
+        """Test invalidate removes every digest of a file."""
+        key = file_key(data_file.stat())
+        cache.put(key, "sha256", "a")
+        cache.put(key, "blake2b", "b")
+
+        cache.invalidate(key)
+
+        assert len(cache) == 0
+        assert cache.get(key, "sha256") is None
+
+    def test_rejects_invalid_size(self, tmp_path):
+        """Test max_entries must be positive."""
+        with pytest.raises(ValueError):
+            PersistentChecksumCache(tmp_path / "checksums.db", max_entries=0)
@@ -0,0 +1,113 @@
+"""
+Unit tests for ChecksumService multi-algorithm hashing.
+
+Tests cover:
+- Several digests computed from one streaming read
+- Interaction with the persistent checksum cache
+- Argument validation
+"""
+import builtins
+import hashlib
+import os
+
+import pytest
+
+from app.verification import ChecksumAlgorithm, ChecksumService, PersistentChecksumCache
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    path = tmp_path / "data.bin"
+    path.write_bytes(os.urandom(300 * 1024))
+    return path
+
+
+@pytest.fixture
+def count_opens(monkeypatch):
+    """Count how often the file is opened for reading."""
+    opened = []
+    real_open = builtins.open
+
+    def counting_open(file, mode="r", *args, **kwargs):
+        if "rb" in mode:
+            opened.append(file)
+        return real_open(file, mode, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "open", counting_open)
+    return opened
+
+
+class TestCalculateChecksums:
+    """Test cases for calculate_checksums."""
+
+    def test_single_pass_for_all_algorithms(self, data_file, count_opens):
+        """Test every requested digest comes from one read of the file."""
+        data = data_file.read_bytes()
+        service = ChecksumService()
+        count_opens.clear()
+
+        checksums = service.calculate_checksums(
+            data_file, [ChecksumAlgorithm.SHA256, ChecksumAlgorithm.BLAKE2B, ChecksumAlgorithm.MD5]
+        )
+
+        assert len(count_opens) == 1
+        assert checksums == {
+            ChecksumAlgorithm.SHA256: hashlib.sha256(data).hexdigest(),
+            ChecksumAlgorithm.BLAKE2B: hashlib.blake2b(data).hexdigest(),
+            ChecksumAlgorithm.MD5: hashlib.md5(data).hexdigest(),
+        }
+        assert service.get_statistics()["total_bytes_processed"] == len(data)
+
+    def test_matches_single_algorithm_results(self, data_file):
+        """Test calculate_checksum returns the same digest as the multi-algorithm call."""
+        service = ChecksumService()
+
+        checksums = service.calculate_checksums(data_file, [ChecksumAlgorithm.SHA512, ChecksumAlgorithm.BLAKE2S])
+
+        assert checksums[ChecksumAlgorithm.SHA512] == service.calculate_checksum(data_file, ChecksumAlgorithm.SHA512)
+        assert checksums[ChecksumAlgorithm.BLAKE2S] == service.calculate_checksum(data_file, ChecksumAlgorithm.BLAKE2S)
+
+    def test_only_uncached_algorithms_are_computed(self, tmp_path, data_file):
+        """Test cached digests are reused and only the missing ones are hashed."""
+        cache = PersistentChecksumCache(tmp_path / "checksums.db")
+        service = ChecksumService(cache=cache)
+        sha256 = service.calculate_checksum(data_file, ChecksumAlgorithm.SHA256)
+
+        checksums = service.calculate_checksums(data_file, [ChecksumAlgorithm.SHA256, ChecksumAlgorithm.BLAKE2B])
+
+        stats = service.get_statistics()
+        assert checksums[ChecksumAlgorithm.SHA256] == sha256
+        assert stats["cache_hits"] == 1
+        assert stats["total_calculated"] == 2
+        assert stats["total_bytes_processed"] == 2 * data_file.stat().st_size
+        cache.close()
+
+    def test_fully_cached_file_not_read(self, tmp_path, data_file, count_opens):
+        """Test the file is not opened when all digests are cached."""
+        cache = PersistentChecksumCache(tmp_path / "checksums.db")
+        service = ChecksumService(cache=cache)
+        algorithms = [ChecksumAlgorithm.SHA256, ChecksumAlgorithm.BLAKE2B]
+        first = service.calculate_checksums(data_file, algorithms)
+        count_opens.clear()
+
+        assert service.calculate_checksums(data_file, algorithms) == first
+        assert count_opens == []
+        cache.close()
+
+    def test_duplicate_algorithms_collapsed(self, data_file):
+        """Test repeated algorithms are hashed once."""
+        service = ChecksumService()
+
+        checksums = service.calculate_checksums(data_file, [ChecksumAlgorithm.SHA256, ChecksumAlgorithm.SHA256])
+
+        assert list(checksums) == [ChecksumAlgorithm.SHA256]
+        assert service.get_statistics()["total_calculated"] == 1
+
+    def test_invalid_arguments(self, tmp_path, data_file):
+        """Test empty algorithm lists and missing files are rejected."""
+        service = ChecksumService()
+
+        with pytest.raises(ValueError):
+            service.calculate_checksums(data_file, [])
+        with pytest.raises(FileNotFoundError):
+            service.calculate_checksums(tmp_path / "missing.bin", [ChecksumAlgorithm.SHA256])
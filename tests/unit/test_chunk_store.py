@@ -0,0 +1,196 @@
+"""
+Unit tests for the deduplicating chunk store.
+
+Tests cover:
+- FastCDC boundary stability and the numpy/pure-Python equivalence
+- Deduplicated writes, dedup ratio and reference counting
+- Streaming restores and corruption detection
+- Pack compaction after recipes are deleted
+"""
+import hashlib
+import io
+import os
+import threading
+
+import pytest
+
+from app.storage import chunking
+from app.storage.chunk_store import ChunkIntegrityError, ChunkStore, parse_dedup_destination
+from app.storage.chunking import FastCDC
+
+
+def _small_chunker():
+    return FastCDC(min_size=1024, avg_size=4096, max_size=16384, buffer_size=64 * 1024)
+
+
+@pytest.fixture
+def store(tmp_path):
+    """Chunk store with small chunks so tests produce many boundaries."""
+    with ChunkStore(str(tmp_path / "store"), min_chunk_size=1024, avg_chunk_size=4096, max_chunk_size=16384) as store:
+        yield store
+
+
+class TestFastCDC:
+    """Test cases for content-defined chunking."""
+
+    def test_chunks_reassemble_within_bounds(self):
+        """Test chunks cover the input exactly and respect size limits."""
+        data = os.urandom(500 * 1024 + 17)
+
+        chunks = [bytes(c) for c in _small_chunker().chunks(io.BytesIO(data))]
+
+        assert b"".join(chunks) == data
+        assert all(len(c) <= 16384 for c in chunks)
+        assert all(len(c) >= 1024 for c in chunks[:-1])
+
+    def test_pure_python_matches_numpy(self, monkeypatch):
+        """Test the fallback chunker yields the same boundaries as the vectorised one."""
+        if chunking.np is None:
+            pytest.skip("numpy not installed")
+        data = os.urandom(300 * 1024)
+        expected = [len(c) for c in _small_chunker().chunks(io.BytesIO(data))]
+
+        monkeypatch.setattr(chunking, "np", None)
+        actual = [len(c) for c in _small_chunker().chunks(io.BytesIO(data))]
+
+        assert actual == expected
+
+    def test_boundaries_survive_insertion(self):
+        """Test inserting bytes at the front only changes the first chunks."""
+        data = os.urandom(400 * 1024)
+
+        original = {bytes(c) for c in _small_chunker().chunks(io.BytesIO(data))}
+        shifted = [bytes(c) for c in _small_chunker().chunks(io.BytesIO(b"inserted" + data))]
+
+        assert sum(1 for c in shifted if c in original) >= len(shifted) - 2
+
+
+class TestChunkStore:
+    """Test cases for ChunkStore writes and restores."""
+
+    def test_second_write_is_deduplicated(self, tmp_path, store):
+        """Test writing a near-identical file stores only the changed chunks."""
+        data = bytearray(os.urandom(512 * 1024))
+        first = tmp_path / "image_1.bin"
+        first.write_bytes(data)
+        data[200_000:200_010] = b"0123456789"
+        second = tmp_path / "image_2.bin"
+        second.write_bytes(data)
+
+        result_1 = store.write(str(first), "job-1/a")
+        result_2 = store.write(str(second), "job-1/b")
+
+        assert result_1["stored_bytes"] == len(data)
+        assert result_2["checksum"] == hashlib.sha256(data).hexdigest()
+        assert result_2["stored_bytes"] < len(data) // 10
+        assert result_2["dedup_ratio"] > 0.9
+        assert store.get_stats()["recipes"] == 2
+
+    def test_restore_streams_chunks_in_order(self, tmp_path, store):
+        """Test a restore reproduces the original bytes."""
+        source = tmp_path / "image.bin"
+        source.write_bytes(os.urandom(300 * 1024) * 2)
+        store.write(str(source), "job-1/a")
+
+        result = store.restore("job-1/a", str(tmp_path / "restored.bin"))
+
+        assert (tmp_path / "restored.bin").read_bytes() == source.read_bytes()
+        assert result["bytes_restored"] == source.stat().st_size
+
+    def test_corrupt_pack_detected_on_restore(self, tmp_path, store):
+        """Test a flipped byte in a pack fails the restore."""
+        source = tmp_path / "image.bin"
+        source.write_bytes(os.urandom(64 * 1024))
+        store.write(str(source), "job-1/a")
+        pack = next((tmp_path / "store" / "packs").glob("*.pack"))
+        with open(pack, "r+b") as f:
+            f.seek(100)
+            byte = f.read(1)
+            f.seek(100)
+            f.write(bytes([byte[0] ^ 0xFF]))
+
+        with pytest.raises(ChunkIntegrityError):
+            list(store.iter_restore("job-1/a"))
+
+    def test_delete_recipe_releases_unshared_chunks(self, tmp_path, store):
+        """Test deleting a recipe keeps chunks still referenced by others."""
+        shared = os.urandom(128 * 1024)
+        (tmp_path / "a.bin").write_bytes(shared)
+        (tmp_path / "b.bin").write_bytes(shared + os.urandom(64 * 1024))
+        store.write(str(tmp_path / "a.bin"), "a")
+        store.write(str(tmp_path / "b.bin"), "b")
+
+        assert store.delete_recipe("b") is True
+
+        assert store.get_stats()["unique_bytes"] == len(shared)
+        assert b"".join(store.iter_restore("a")) == shared
+
+    def test_compact_frees_unreferenced_pack_space(self, tmp_path, store):
+        """Test compaction shrinks packs to the referenced chunks and restores still verify."""
+        shared = os.urandom(128 * 1024)
+        (tmp_path / "a.bin").write_bytes(shared)
+        (tmp_path / "b.bin").write_bytes(shared + os.urandom(256 * 1024))
+        store.write(str(tmp_path / "a.bin"), "a")
+        store.write(str(tmp_path / "b.bin"), "b")
+        store.delete_recipe("b")
+        packs = tmp_path / "store" / "packs"
+        before = sum(path.stat().st_size for path in packs.glob("*.pack"))
+
+        # Below the ratio the garbage is only reported
+        assert store.compact(min_garbage_ratio=0.9) == {
+            "packs_compacted": 0,
+            "bytes_reclaimed": 0,
+            "unreferenced_bytes": before - len(shared),
+        }
+        result = store.compact(min_garbage_ratio=0.5)
+
+        assert result["packs_compacted"] == 1
+        assert result["bytes_reclaimed"] == before - len(shared)
+        assert sum(path.stat().st_size for path in packs.glob("*.pack")) == len(shared)
+        assert b"".join(store.iter_restore("a")) == shared
+        # New writes append to the compacted pack and still deduplicate against it
+        (tmp_path / "c.bin").write_bytes(shared + b"tail")
+        assert store.write(str(tmp_path / "c.bin"), "c")["stored_bytes"] < len(shared)
+        assert b"".join(store.iter_restore("c")) == shared + b"tail"
+
+    def test_duplicate_recipe_name_rejected(self, tmp_path, store):
+        """Test recipe names are unique."""
+        (tmp_path / "a.bin").write_bytes(b"data")
+        store.write(str(tmp_path / "a.bin"), "a")
+
+        with pytest.raises(ValueError):
+            store.write(str(tmp_path / "a.bin"), "a")
+
+    def test_concurrent_writers_on_one_root(self, tmp_path):
+        """Test separate store instances writing at once keep every recipe restorable."""
+        root = str(tmp_path / "store")
+        shared = os.urandom(64 * 1024)
+        sources = []
+        for i in range(4):
+            path = tmp_path / f"src_{i}.bin"
+            path.write_bytes(shared + os.urandom(128 * 1024))
+            sources.append(path)
+        errors = []
+
+        def write(i):
+            try:
+                with ChunkStore(root, min_chunk_size=1024, avg_chunk_size=4096, max_chunk_size=16384) as store:
+                    store.write(str(sources[i]), f"job-{i}/a")
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=write, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        with ChunkStore(root) as store:
+            for i, source in enumerate(sources):
+                assert b"".join(store.iter_restore(f"job-{i}/a")) == source.read_bytes()
+
+    def test_parse_dedup_destination(self):
+        """Test the dedup: destination prefix is recognised."""
+        assert parse_dedup_destination("dedup:/mnt/chunks") == "/mnt/chunks"
+        assert parse_dedup_destination("/mnt/backup") is None
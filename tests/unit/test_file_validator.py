@@ -0,0 +1,251 @@
+"""
+Unit tests for FileValidator.verify_file comparison modes.
+
+Tests cover:
+- Compare mode with early exit at the first differing block
+- Checksum mode reading only the side without a known checksum
+- Parallel streaming verify_backup and throughput-based concurrency
+"""
+import os
+import sys
+import threading
+
+import pytest
+
+from app.verification import ChecksumService, FileValidator, VerificationStatus
+from app.verification.validator import _ConcurrencyTuner
+
+BLOCK = 64 * 1024
+
+
+@pytest.fixture
+def pair(tmp_path):
+    source = tmp_path / "source.bin"
+    target = tmp_path / "target.bin"
+    data = os.urandom(40 * BLOCK + 17)
+    source.write_bytes(data)
+    target.write_bytes(data)
+    return source, target
+
+
+@pytest.fixture
+def validator():
+    return FileValidator(verify_metadata=False, block_size=BLOCK)
+
+
+def corrupt(path, offset):
+    with open(path, "r+b") as f:
+        f.seek(offset)
+        byte = f.read(1)
+        f.seek(offset)
+        f.write(bytes([byte[0] ^ 0x01]))
+
+
+class TestCompareMode:
+    """Test cases for concurrent block comparison."""
+
+    def test_identical_files(self, pair, validator):
+        """Test identical files pass after comparing every byte."""
+        source, target = pair
+
+        status, details = validator.verify_file(source, target, mode="compare")
+
+        assert status == VerificationStatus.SUCCESS
+        assert details["mode"] == "compare"
+        assert details["bytes_compared"] == source.stat().st_size
+        assert "source_checksum" not in details
+
+    def test_stops_at_first_difference(self, pair, validator):
+        """Test reading stops at the block containing the first difference."""
+        source, target = pair
+        offset = 3 * BLOCK + 1234
+        corrupt(target, offset)
+        corrupt(target, 30 * BLOCK)
+
+        status, details = validator.verify_file(source, target, mode="compare")
+
+        assert status == VerificationStatus.CHECKSUM_MISMATCH
+        assert details["first_mismatch_offset"] == offset
+        assert details["mismatched_blocks"] == [3]
+        assert details["bytes_compared"] == 4 * BLOCK
+
+    def test_difference_in_last_byte(self, pair, validator):
+        """Test a difference in the final partial block is located exactly."""
+        source, target = pair
+        last = source.stat().st_size - 1
+        corrupt(target, last)
+
+        status, details = validator.verify_file(source, target, mode="compare")
+
+        assert status == VerificationStatus.CHECKSUM_MISMATCH
+        assert details["first_mismatch_offset"] == last
+
+    def test_default_mode_from_constructor(self, pair):
+        """Test the validator-wide mode applies when verify_file gets none."""
+        source, target = pair
+        validator = FileValidator(verify_metadata=False, block_size=BLOCK, mode="compare")
+
+        _, details = validator.verify_file(source, target)
+
+        assert details["mode"] == "compare"
+        with pytest.raises(ValueError):
+            FileValidator(mode="fastest")
+
+
+class TestKnownChecksums:
+    """Test cases for skipping the side whose checksum is known."""
+
+    def test_only_target_read_with_known_source(self, pair):
+        """Test a stored source checksum means only the target is hashed."""
+        source, target = pair
+        checksum = ChecksumService().calculate_checksum(source)
+        service = ChecksumService()
+        validator = FileValidator(checksum_service=service, verify_metadata=False)
+
+        status, details = validator.verify_file(source, target, source_checksum=checksum, mode="compare")
+
+        assert status == VerificationStatus.SUCCESS
+        assert details["mode"] == "checksum"
+        assert service.get_statistics()["total_bytes_processed"] == target.stat().st_size
+
+    def test_known_target_mismatch(self, pair, validator):
+        """Test a stale stored checksum is reported as a mismatch without localisation."""
+        source, target = pair
+
+        status, details = validator.verify_file(source, target, target_checksum="0" * 64)
+
+        assert status == VerificationStatus.CHECKSUM_MISMATCH
+        assert "mismatched_blocks" not in details
+
+    def test_both_sides_hashed_concurrently(self, pair, validator):
+        """Test checksum mode without known checksums still hashes both files."""
+        source, target = pair
+
+        status, details = validator.verify_file(source, target)
+
+        assert status == VerificationStatus.SUCCESS
+        assert details["source_checksum"] == details["target_checksum"]
+        assert validator.checksum_service.get_statistics()["total_calculated"] == 2
+
+
+@pytest.fixture
+def backup_pairs(tmp_path):
+    source_dir = tmp_path / "source"
+    target_dir = tmp_path / "target"
+    source_dir.mkdir()
+    target_dir.mkdir()
+    sources, targets = [], []
+    for i in range(40):
+        data = os.urandom(1024 + i)
+        (source_dir / f"f{i}.bin").write_bytes(data)
+        (target_dir / f"f{i}.bin").write_bytes(data)
+        sources.append(source_dir / f"f{i}.bin")
+        targets.append(target_dir / f"f{i}.bin")
+    return sources, targets
+
+
+class TestParallelVerifyBackup:
+    """Test cases for the parallel streaming backup verification."""
+
+    def test_parallel_result_matches_sequential(self, backup_pairs, validator):
+        """Test the parallel mode keeps the result shape and input order."""
+        sources, targets = backup_pairs
+        corrupt(targets[7], 0)
+        targets[12].unlink()
+
+        sequential = validator.verify_backup(sources, targets)
+        parallel = validator.verify_backup(sources, targets, parallel=True, max_workers=4)
+
+        for key in ("total_files", "successful", "failed", "errors", "success_rate"):
+            assert parallel[key] == sequential[key]
+        assert [d["target"] for d in parallel["details"]] == [str(t) for t in targets]
+        assert [d["status"] for d in parallel["details"]] == [d["status"] for d in sequential["details"]]
+        assert parallel["failed"] == 1 and parallel["errors"] == 1
+        assert 1 <= parallel["workers"] <= 4
+
+    def test_results_streamed_as_they_finish(self, backup_pairs, validator):
+        """Test on_result sees every entry and iter_verify_backup yields indexed entries."""
+        sources, targets = backup_pairs
+        seen = []
+
+        validator.verify_backup(sources, targets, parallel=True, on_result=seen.append)
+        indices = sorted(entry["index"] for entry in validator.iter_verify_backup(sources, targets))
+
+        assert len(seen) == len(sources)
+        assert indices == list(range(len(sources)))
+
+    def test_in_flight_bounded_by_limit(self, backup_pairs, validator, monkeypatch):
+        """Test no more files than the tuner's limit are verified at once."""
+        sources, targets = backup_pairs
+        active, peak = [0], [0]
+        lock = threading.Lock()
+        original = FileValidator.verify_file
+
+        def tracking_verify(self, *args, **kwargs):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            try:
+                return original(self, *args, **kwargs)
+            finally:
+                with lock:
+                    active[0] -= 1
+
+        monkeypatch.setattr(FileValidator, "verify_file", tracking_verify)
+        tuner = _ConcurrencyTuner(maximum=3, window_seconds=3600)
+
+        list(validator.iter_verify_backup(sources, targets, tuner=tuner))
+
+        assert peak[0] <= 2
+
+    def test_statistics_exact_under_parallel_verification(self, backup_pairs, validator):
+        """Test outcome counters updated from pool threads lose no increments."""
+        sources, targets = backup_pairs
+        corrupt(targets[3], 0)
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            for _ in range(5):
+                validator.verify_backup(sources, targets, parallel=True, max_workers=8)
+        finally:
+            sys.setswitchinterval(interval)
+
+        stats = validator.get_validation_statistics()
+        assert stats["total_validations"] == 5 * len(sources)
+        assert (stats["successful"], stats["failed"], stats["errors"]) == (5 * (len(sources) - 1), 5, 0)
+        assert validator.checksum_service.get_statistics()["total_calculated"] == 2 * stats["total_validations"]
+
+    def test_abandoned_iterator_stops(self, backup_pairs, validator):
+        """Test closing the iterator early does not verify the remaining files."""
+        sources, targets = backup_pairs
+        entries = validator.iter_verify_backup(sources, targets, max_workers=2)
+
+        next(entries)
+        entries.close()
+
+        assert validator.validation_stats["total_validations"] < len(sources)
+
+
+class TestConcurrencyTuner:
+    """Test cases for throughput-driven concurrency."""
+
+    def test_scales_up_while_throughput_improves(self):
+        """Test the limit doubles while each window is faster than the last."""
+        tuner = _ConcurrencyTuner(maximum=16, window_seconds=0)
+
+        for rate in (100, 200, 400):
+            tuner._window_start -= 1
+            tuner.record(rate)
+
+        assert tuner.limit == 16
+
+    def test_settles_on_best_level(self):
+        """Test a window without gain reverts to the best concurrency and stops probing."""
+        tuner = _ConcurrencyTuner(maximum=32, window_seconds=0)
+
+        for rate in (100, 300, 305, 1000):
+            tuner._window_start -= 1
+            tuner.record(rate)
+
+        assert tuner.settled
+        assert tuner.limit == 4
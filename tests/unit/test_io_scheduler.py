@@ -0,0 +1,211 @@
+"""
+Unit tests for the shared I/O scheduler.
+
+Tests cover:
+- Token-bucket bandwidth limits per target
+- Max concurrent streams and priority pre-emption
+- Target resolution and live reconfiguration
+- BackupEngine integration
+- Restore paths pre-empting backups
+"""
+import os
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.core.backup_engine import BackupEngine
+from app.core.io_scheduler import PRIORITY_NORMAL, IOScheduler, ThrottledCopier
+from app.storage.chunk_store import ChunkStore
+
+# JobPriority values (the scheduler package needs psutil, so plain ints are used here)
+CRITICAL, HIGH, BACKGROUND = 1, 2, 5
+
+
+@pytest.fixture
+def scheduler():
+    return IOScheduler()
+
+
+class TestBandwidthLimits:
+    """Test cases for token-bucket throttling."""
+
+    def test_throttle_limits_rate(self, tmp_path, scheduler):
+        """Test transfers beyond the burst wait for tokens."""
+        scheduler.configure_target(str(tmp_path), bandwidth_bytes_per_sec=1024 * 1024, burst_bytes=64 * 1024)
+
+        start = time.monotonic()
+        with scheduler.stream(str(tmp_path / "file")) as io_stream:
+            for _ in range(5):
+                io_stream.throttle(64 * 1024)
+        elapsed = time.monotonic() - start
+
+        assert elapsed >= 0.25
+        stats = scheduler.get_stats()[str(tmp_path)]
+        assert stats["bytes_total"] == 5 * 64 * 1024
+        assert stats["throttle_seconds"] > 0
+
+    def test_unconfigured_target_is_unlimited(self, tmp_path, scheduler):
+        """Test paths without limits are only accounted."""
+        with scheduler.stream(str(tmp_path / "file")) as io_stream:
+            assert io_stream.throttle(100 * 1024 * 1024) < 0.05
+
+        target = scheduler.target_for(str(tmp_path / "file"))
+        assert os.path.ismount(target)
+        assert scheduler.get_stats()[target]["bytes_total"] == 100 * 1024 * 1024
+
+    def test_live_reconfiguration_releases_waiters(self, tmp_path, scheduler):
+        """Test lifting a limit wakes streams already waiting for tokens."""
+        scheduler.configure_target(str(tmp_path), bandwidth_bytes_per_sec=1024, burst_bytes=1024)
+        done = threading.Event()
+
+        def transfer():
+            with scheduler.stream(str(tmp_path / "file")) as io_stream:
+                io_stream.throttle(1024)
+                io_stream.throttle(1024 * 1024)
+            done.set()
+
+        threading.Thread(target=transfer, daemon=True).start()
+        time.sleep(0.1)
+        assert not done.is_set()
+
+        scheduler.configure_target(str(tmp_path), bandwidth_bytes_per_sec=None)
+
+        assert done.wait(2)
+
+
+class TestStreamLimits:
+    """Test cases for per-target concurrency and priorities."""
+
+    def test_max_streams_blocks_equal_priority(self, tmp_path, scheduler):
+        """Test a stream waits for a free slot when the target is full."""
+        scheduler.configure_target(str(tmp_path), max_streams=1)
+        admitted = threading.Event()
+
+        def second():
+            with scheduler.stream(str(tmp_path / "b")):
+                admitted.set()
+
+        with scheduler.stream(str(tmp_path / "a")):
+            threading.Thread(target=second, daemon=True).start()
+            assert not admitted.wait(0.2)
+            assert scheduler.get_stats()[str(tmp_path)]["waiting_streams"] == 1
+
+        assert admitted.wait(2)
+
+    def test_high_priority_preempts_bulk_copy(self, tmp_path, scheduler):
+        """Test a restore suspends a lower priority stream until it finishes."""
+        scheduler.configure_target(str(tmp_path), max_streams=1)
+        bulk_resumed = threading.Event()
+
+        with scheduler.stream(str(tmp_path / "bulk"), BACKGROUND) as bulk:
+            with scheduler.stream(str(tmp_path / "restore"), CRITICAL) as restore:
+                assert bulk.suspended
+                assert not restore.suspended
+
+                def bulk_chunk():
+                    bulk.throttle(4096)
+                    bulk_resumed.set()
+
+                threading.Thread(target=bulk_chunk, daemon=True).start()
+                assert not bulk_resumed.wait(0.2)
+                assert scheduler.get_stats()[str(tmp_path)]["preemptions"] == 1
+
+            assert bulk_resumed.wait(2)
+            assert not bulk.suspended
+
+    def test_target_resolution_uses_longest_prefix(self, tmp_path, scheduler):
+        """Test nested targets take precedence over their parents."""
+        scheduler.configure_target(str(tmp_path), max_streams=4)
+        scheduler.configure_target(str(tmp_path / "nas"), max_streams=1)
+
+        assert scheduler.target_for(str(tmp_path / "nas" / "x.img")) == str(tmp_path / "nas")
+        assert scheduler.target_for(str(tmp_path / "nasx" / "x.img")) == str(tmp_path)
+
+    def test_invalid_limits_rejected(self, tmp_path, scheduler):
+        """Test non-positive limits raise ValueError."""
+        with pytest.raises(ValueError):
+            scheduler.configure_target(str(tmp_path), max_streams=0)
+        with pytest.raises(ValueError):
+            scheduler.configure_target(str(tmp_path), bandwidth_bytes_per_sec=0)
+
+
+class TestEngineIntegration:
+    """Test cases for BackupEngine copies through the scheduler."""
+
+    def test_copy_file_accounts_destination_target(self, tmp_path, scheduler):
+        """Test engine copies report bytes against the destination target."""
+        source = tmp_path / "source.img"
+        source.write_bytes(os.urandom(300 * 1024))
+        engine = BackupEngine()
+        engine.io_scheduler = scheduler
+        scheduler.configure_target(str(tmp_path / "nas"), bandwidth_bytes_per_sec=100 * 1024 * 1024)
+
+        engine.copy_file(str(source), str(tmp_path / "nas" / "copy.img"))
+
+        stats = engine.get_backup_stats()["io_targets"][str(tmp_path / "nas")]
+        assert stats["bytes_total"] == 300 * 1024
+        assert stats["streams_total"] == 1
+
+    def test_throttled_copier_wraps_progress(self, tmp_path, scheduler):
+        """Test the adapter forwards progress to the caller's callback."""
+        progress = []
+
+        class FakeCopier:
+            def copy(self, source, destination, progress_callback=None):
+                progress_callback(10, 20)
+                progress_callback(20, 20)
+                return {"bytes_copied": 20}
+
+        copier = ThrottledCopier(FakeCopier(), scheduler, HIGH)
+        copier.copy("src", str(tmp_path / "dst"), lambda done, total: progress.append(done))
+
+        assert progress == [10, 20]
+        assert scheduler.get_stats()[scheduler.target_for(str(tmp_path / "dst"))]["bytes_total"] == 20
+
+
+class TestRestorePriority:
+    """Test cases for restores and job priorities reaching the scheduler."""
+
+    def test_chunk_store_restore_preempts_backup(self, tmp_path, scheduler):
+        """Test a restore from a dedup store suspends a backup stream writing to the same target."""
+        source = tmp_path / "image.bin"
+        source.write_bytes(os.urandom(256 * 1024))
+        store = ChunkStore(str(tmp_path / "store"))
+        store.write(str(source), "job-1/a")
+        store.io_scheduler = scheduler
+        scheduler.configure_target(str(tmp_path / "store"), max_streams=1)
+
+        with scheduler.stream(str(tmp_path / "store" / "packs"), PRIORITY_NORMAL) as backup:
+            restored = []
+
+            def restore():
+                restored.append(b"".join(store.iter_restore("job-1/a")))
+
+            thread = threading.Thread(target=restore, daemon=True)
+            thread.start()
+            thread.join(2)
+
+            assert restored == [source.read_bytes()]
+            assert scheduler.get_stats()[str(tmp_path / "store")]["preemptions"] == 1
+            assert not backup.suspended
+        store.close()
+
+    def test_executor_passes_queued_priority(self):
+        """Test a queued job's JobPriority reaches the callback as its I/O priority."""
+        pytest.importorskip("psutil")
+        from app.scheduler.executor import JobExecutor
+        from app.scheduler.job_queue import JobPriority, JobQueue
+
+        queue = JobQueue()
+        queue.add_job(job_id=7, priority=JobPriority.HIGH, job_data={"mode": "full"})
+        executor = JobExecutor(max_workers=1, resource_manager=MagicMock())
+        try:
+            result = executor.execute_queued(
+                queue.get_next_job(), lambda job_id, mode, priority: (job_id, mode, priority), wait=True
+            )
+        finally:
+            executor.shutdown()
+
+        assert result.return_value == (7, "full", HIGH)
@@ -0,0 +1,260 @@
+"""
+Unit tests for Merkle-tree manifests.
+
+Tests cover:
+- Tree construction, roots and range verification
+- O(changed blocks) comparison of trees and manifests
+- Incremental manifest refresh and stale-entry removal keyed on file size and mtime
+- Corruption localisation in FileValidator.verify_file
+"""
+import os
+from unittest.mock import patch
+
+import pytest
+
+from app.verification import ChecksumAlgorithm, FileValidator, MerkleManifest, MerkleTree, VerificationStatus
+from app.verification.merkle import merkle_path_for
+
+BLOCK = 4096
+
+
+def flip_byte(path, offset):
+    with open(path, "r+b") as f:
+        f.seek(offset)
+        byte = f.read(1)
+        f.seek(offset)
+        f.write(bytes([byte[0] ^ 0xFF]))
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    path = tmp_path / "data.bin"
+    path.write_bytes(os.urandom(10 * BLOCK + 123))
+    return path
+
+
+@pytest.fixture
+def backup_dir(tmp_path):
+    root = tmp_path / "backup"
+    (root / "sub").mkdir(parents=True)
+    (root / "a.bin").write_bytes(os.urandom(5 * BLOCK))
+    (root / "sub" / "b.bin").write_bytes(os.urandom(3 * BLOCK + 7))
+    (root / "empty.txt").write_bytes(b"")
+    return root
+
+
+class TestMerkleTree:
+    """Test cases for per-file trees."""
+
+    def test_block_layout(self, data_file):
+        """Test leaves cover the file in fixed-size blocks."""
+        tree = MerkleTree.from_file(data_file, BLOCK)
+
+        assert tree.block_count == 11
+        assert tree.size == data_file.stat().st_size
+        assert tree.block_range(BLOCK - 1, 2) == range(0, 2)
+        assert MerkleTree.from_file(data_file, BLOCK).root == tree.root
+
+    def test_empty_file_has_one_leaf(self, tmp_path):
+        """Test empty files still have a root."""
+        empty = tmp_path / "empty"
+        empty.write_bytes(b"")
+
+        tree = MerkleTree.from_file(empty, BLOCK)
+
+        assert tree.block_count == 1
+        assert tree.size == 0
+
+    def test_diff_finds_changed_blocks(self, tmp_path, data_file):
+        """Test diff descends only to the blocks that differ."""
+        copy = tmp_path / "copy.bin"
+        copy.write_bytes(data_file.read_bytes())
+        flip_byte(copy, 3 * BLOCK + 10)
+        flip_byte(copy, 10 * BLOCK + 5)
+
+        original = MerkleTree.from_file(data_file, BLOCK)
+        changed = MerkleTree.from_file(copy, BLOCK)
+
+        assert original.diff(changed) == [3, 10]
+        assert original.diff(original) == []
+
+    def test_diff_of_different_lengths(self, tmp_path, data_file):
+        """Test appended blocks are reported as changed."""
+        longer = tmp_path / "longer.bin"
+        longer.write_bytes(data_file.read_bytes() + os.urandom(2 * BLOCK))
+
+        diff = MerkleTree.from_file(data_file, BLOCK).diff(MerkleTree.from_file(longer, BLOCK))
+
+        assert diff == [10, 11, 12]
+
+    def test_verify_range_reads_only_covering_blocks(self, data_file):
+        """Test range verification localises corruption within the range."""
+        tree = MerkleTree.from_file(data_file, BLOCK)
+        flip_byte(data_file, 7 * BLOCK)
+
+        assert tree.verify_range(data_file, 0, 7 * BLOCK) == []
+        assert tree.verify_range(data_file, 6 * BLOCK, 2 * BLOCK) == [7]
+        assert tree.verify_range(data_file) == [7]
+
+    def test_serialisation_round_trip(self, data_file):
+        """Test trees survive to_bytes/from_bytes."""
+        tree = MerkleTree.from_file(data_file, BLOCK, ChecksumAlgorithm.BLAKE2B)
+
+        restored = MerkleTree.from_bytes(tree.to_bytes(), tree.size, BLOCK, ChecksumAlgorithm.BLAKE2B)
+
+        assert restored.root == tree.root
+        assert restored.block_count == tree.block_count
+
+
+class TestMerkleManifest:
+    """Test cases for backup-level manifests."""
+
+    def test_build_and_verify(self, backup_dir):
+        """Test an untouched copy verifies and its manifest sits next to it."""
+        with MerkleManifest.build(backup_dir, block_size=BLOCK) as manifest:
+            result = manifest.verify(backup_dir)
+
+            assert manifest.paths() == ["a.bin", "empty.txt", "sub/b.bin"]
+            assert os.path.exists(merkle_path_for(backup_dir))
+            assert result["files_valid"] == 3
+            assert result["corrupted"] == {}
+
+    def test_verify_localises_corruption(self, backup_dir):
+        """Test corrupted blocks and missing files are reported per file."""
+        manifest = MerkleManifest.build(backup_dir, block_size=BLOCK)
+        flip_byte(backup_dir / "sub" / "b.bin", 2 * BLOCK + 1)
+        (backup_dir / "a.bin").unlink()
+
+        result = manifest.verify(backup_dir)
+
+        assert result["corrupted"] == {"sub/b.bin": [2]}
+        assert result["missing"] == ["a.bin"]
+        assert manifest.verify_range(backup_dir, "sub/b.bin", 0, 2 * BLOCK) == []
+        manifest.close()
+
+    def test_diff_between_copies(self, tmp_path, backup_dir):
+        """Test two copies are compared by root, then by changed blocks."""
+        import shutil
+
+        secondary = tmp_path / "secondary"
+        shutil.copytree(backup_dir, secondary)
+        primary = MerkleManifest.build(backup_dir, block_size=BLOCK)
+        same = MerkleManifest.build(secondary, block_size=BLOCK)
+
+        assert same.root == primary.root
+        assert primary.diff(same)["identical"]
+
+        flip_byte(secondary / "a.bin", 4 * BLOCK)
+        (secondary / "new.txt").write_text("new")
+        (secondary / "empty.txt").unlink()
+        changed = MerkleManifest.build(secondary, block_size=BLOCK)
+        diff = primary.diff(changed)
+
+        assert not diff["identical"]
+        assert diff["changed"] == {"a.bin": [4]}
+        assert diff["added"] == ["new.txt"]
+        assert diff["removed"] == ["empty.txt"]
+        for manifest in (primary, same, changed):
+            manifest.close()
+
+    def test_refresh_hashes_only_new_and_changed_files(self, backup_dir):
+        """Test a refresh reuses unchanged files and drops vanished ones."""
+        MerkleManifest.build(backup_dir, block_size=BLOCK).close()
+        (backup_dir / "sub" / "b.bin").write_bytes(os.urandom(2 * BLOCK))
+        (backup_dir / "new.bin").write_bytes(os.urandom(BLOCK))
+        (backup_dir / "empty.txt").unlink()
+
+        with patch.object(MerkleTree, "from_file", wraps=MerkleTree.from_file) as from_file:
+            manifest = MerkleManifest.refresh(backup_dir, block_size=BLOCK)
+
+        assert sorted(call.args[0].name for call in from_file.call_args_list) == ["b.bin", "new.bin"]
+        assert manifest.paths() == ["a.bin", "new.bin", "sub/b.bin"]
+        assert manifest.verify(backup_dir)["files_valid"] == 3
+        with MerkleManifest.build(backup_dir, str(backup_dir) + ".rebuilt.db", block_size=BLOCK) as rebuilt:
+            assert manifest.root == rebuilt.root
+        manifest.close()
+
+    def test_refresh_keeps_reference_of_rotted_file(self, backup_dir):
+        """Test silent corruption (same size and mtime) is not absorbed into the manifest by a refresh."""
+        MerkleManifest.build(backup_dir, block_size=BLOCK).close()
+        stat = os.stat(backup_dir / "a.bin")
+        flip_byte(backup_dir / "a.bin", BLOCK)
+        os.utime(backup_dir / "a.bin", ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+        with MerkleManifest.refresh(backup_dir, block_size=BLOCK) as manifest:
+            assert manifest.file_identity("a.bin") == (stat.st_size, stat.st_mtime_ns)
+            assert manifest.verify(backup_dir)["corrupted"] == {"a.bin": [1]}
+
+    def test_refresh_rebuilds_on_block_size_change(self, backup_dir):
+        """Test a manifest with another block size is rebuilt rather than mixed."""
+        MerkleManifest.build(backup_dir, block_size=BLOCK).close()
+
+        with MerkleManifest.refresh(backup_dir, block_size=2 * BLOCK) as manifest:
+            assert manifest.block_size == 2 * BLOCK
+            assert manifest.file_tree("a.bin").block_count == 3
+            assert manifest.verify(backup_dir)["files_valid"] == 3
+
+    def test_discard_changed_reads_no_data(self, backup_dir):
+        """Test rewritten and vanished files leave the manifest on metadata alone, rotted ones stay."""
+        MerkleManifest.build(backup_dir, block_size=BLOCK).close()
+        stat = os.stat(backup_dir / "a.bin")
+        flip_byte(backup_dir / "a.bin", BLOCK)
+        os.utime(backup_dir / "a.bin", ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        (backup_dir / "sub" / "b.bin").write_bytes(os.urandom(2 * BLOCK))
+        (backup_dir / "empty.txt").unlink()
+
+        with MerkleManifest(merkle_path_for(backup_dir)) as manifest:
+            with patch.object(MerkleTree, "from_file") as from_file:
+                assert manifest.discard_changed(backup_dir) == 2
+
+            assert from_file.call_count == 0
+            assert manifest.paths() == ["a.bin"]
+            assert manifest.unhashed_files(backup_dir) == ["sub/b.bin"]
+
+    def test_remove_drops_directory_and_updates_root(self, backup_dir):
+        """Test files below a removed directory leave the manifest and its root."""
+        with MerkleManifest.build(backup_dir, block_size=BLOCK) as manifest:
+            before = manifest.root
+            assert manifest.remove("sub") == 1
+            assert manifest.paths() == ["a.bin", "empty.txt"]
+            assert manifest.root != before
+
+    def test_single_file_copy(self, data_file):
+        """Test single-file copies are keyed by their file name."""
+        with MerkleManifest.build(data_file, block_size=BLOCK) as manifest:
+            assert manifest.paths() == ["data.bin"]
+            assert manifest.verify(data_file)["files_valid"] == 1
+
+
+class TestValidatorIntegration:
+    """Test cases for Merkle trees in FileValidator.verify_file."""
+
+    def test_mismatch_reports_blocks(self, tmp_path, data_file):
+        """Test a checksum mismatch is localised to the differing block."""
+        copy = tmp_path / "copy.bin"
+        copy.write_bytes(data_file.read_bytes())
+        flip_byte(copy, 5 * BLOCK + 100)
+        validator = FileValidator(verify_metadata=False, block_size=BLOCK)
+
+        status, details = validator.verify_file(data_file, copy)
+
+        assert status == VerificationStatus.CHECKSUM_MISMATCH
+        assert details["mismatched_blocks"] == [5]
+        assert details["first_mismatch_offset"] == 5 * BLOCK
+
+    def test_reference_tree_skips_source(self, tmp_path, data_file):
+        """Test a stored tree verifies the target without reading the source."""
+        tree = MerkleTree.from_file(data_file, BLOCK)
+        copy = tmp_path / "copy.bin"
+        copy.write_bytes(data_file.read_bytes())
+        validator = FileValidator(verify_metadata=False, block_size=BLOCK)
+
+        status, details = validator.verify_file(data_file, copy, reference_tree=tree)
+        assert status == VerificationStatus.SUCCESS
+        assert details["merkle_root"] == tree.root_hex
+        assert validator.checksum_service.get_statistics()["total_calculated"] == 0
+
+        flip_byte(copy, 0)
+        status, details = validator.verify_file(data_file, copy, reference_tree=tree)
+        assert status == VerificationStatus.CHECKSUM_MISMATCH
+        assert details["mismatched_blocks"] == [0]
@@ -0,0 +1,118 @@
+"""
+Unit tests for restore test sampling.
+
+Tests cover:
+- Sample sizes from confidence level and tolerated error rate
+- Achieved confidence from observed failures
+- Stratified allocation over size buckets and directories
+"""
+import random
+from pathlib import Path
+
+import pytest
+
+from app.verification.sampling import (
+    achieved_confidence,
+    required_sample_size,
+    size_bucket,
+    stratified_sample,
+    stratify,
+)
+
+
+class TestSampleSize:
+    """Test cases for required_sample_size and achieved_confidence."""
+
+    def test_large_population_matches_binomial_bound(self):
+        """Test huge backups need about ln(1 - c) / ln(1 - p) files."""
+        assert required_sample_size(10_000_000, 0.95, 0.01) == 299
+        assert required_sample_size(10_000_000, 0.99, 0.01) == 459
+
+    def test_small_population_needs_fewer_files(self):
+        """Test the finite population correction shrinks the sample."""
+        assert required_sample_size(1000, 0.95, 0.01) < 299
+        assert required_sample_size(10, 0.95, 0.01) == 10
+        assert required_sample_size(0) == 0
+
+    def test_sample_size_reaches_target_confidence(self):
+        """Test a clean sample of the required size achieves the target confidence."""
+        for population in (50, 500, 5000):
+            n = required_sample_size(population, 0.9, 0.02)
+            assert achieved_confidence(population, n, 0, 0.02) >= 0.9
+            assert achieved_confidence(population, n - 1, 0, 0.02) < 0.9
+
+    def test_failures_lower_confidence(self):
+        """Test observed failures reduce the achieved confidence."""
+        clean = achieved_confidence(10_000, 299, 0, 0.01)
+        one = achieved_confidence(10_000, 299, 1, 0.01)
+
+        assert clean > 0.95 > one > 0
+        assert achieved_confidence(100, 100, 0, 0.01) == 1.0
+
+    def test_invalid_parameters(self):
+        """Test confidence and error rate must lie strictly between 0 and 1."""
+        with pytest.raises(ValueError):
+            required_sample_size(100, confidence=1.0)
+        with pytest.raises(ValueError):
+            achieved_confidence(100, 10, tolerated_error_rate=0)
+
+
+class TestStratifiedSample:
+    """Test cases for stratify and stratified_sample."""
+
+    @pytest.fixture
+    def files(self):
+        root = Path("/backup")
+        files = [(root / "docs" / f"{i}.txt", 100) for i in range(900)]
+        files += [(root / "media" / f"{i}.mkv", 10**9) for i in range(90)]
+        files += [(root / "db" / "big.dump", 10**11), (root / "top.cfg", 10)]
+        return root, files
+
+    def test_strata_by_directory_and_size(self, files):
+        """Test files are grouped by top-level directory and size bucket."""
+        root, entries = files
+
+        strata = stratify(entries, root)
+
+        expected = {
+            ("docs", size_bucket(100)),
+            ("media", size_bucket(10**9)),
+            ("db", size_bucket(10**11)),
+            ("", size_bucket(10)),
+        }
+        assert set(strata) == expected
+        assert size_bucket(0) == 0 < size_bucket(1) < size_bucket(4096) < size_bucket(4097 * 4)
+
+    def test_allocation_is_proportional(self, files):
+        """Test each stratum gets its proportional share, rounded up or down."""
+        root, entries = files
+        strata = stratify(entries, root)
+
+        sample = stratified_sample(strata, 50, random.Random(7))
+
+        assert len(sample) == len(set(sample)) == 50
+        assert sum(path.parent.name == "docs" for path in sample) in (45, 46)
+        assert sum(path.parent.name == "media" for path in sample) in (4, 5)
+
+    def test_inclusion_probability_matches_simple_random_sampling(self, files):
+        """Test every file, including those of tiny strata, is drawn with probability n/N."""
+        root, entries = files
+        strata = stratify(entries, root)
+        rng = random.Random(11)
+        draws = 4000
+
+        counts = {key: 0 for key in strata}
+        for _ in range(draws):
+            sampled = set(stratified_sample(strata, 50, rng))
+            for key, members in strata.items():
+                counts[key] += len(sampled.intersection(members))
+
+        for key, members in strata.items():
+            expected = 50 * len(members) / len(entries)
+            assert counts[key] / draws == pytest.approx(expected, abs=0.02)
+
+    def test_sample_larger_than_population(self, files):
+        """Test asking for more files than exist returns them all."""
+        root, entries = files
+
+        assert len(stratified_sample(stratify(entries, root), 5000)) == len(entries)
@@ -5,7 +5,13 @@ Tests core services:
 - ComplianceChecker: 3-2-1-1-0 rule validation
 - AlertManager: Alert creation and management
 - ReportGenerator: Report generation
+- RetentionService: Expiry of tree runs and dedup recipes inside copies
+- ScrubService: Incremental bit-rot scrubbing
+- VerificationRunner: Queued verifications requested through the API
 """
+import os
+import sqlite3
+import time
 from datetime import datetime, timedelta
 from unittest.mock import MagicMock, Mock, patch
 
@@ -19,11 +25,22 @@ from app.models import (
     ComplianceStatus,
     OfflineMedia,
     Report,
+    VerificationRun,
+    VerificationTest,
     db,
 )
+from app.core.backup_engine import BackupEngine
+from app.core.manifest import BackupManifest, manifest_path_for, run_path
 from app.services.alert_manager import AlertManager
 from app.services.compliance_checker import ComplianceChecker
 from app.services.report_generator import ReportGenerator
+from app.services.retention_service import RetentionService
+from app.services.scrub_service import ScrubService
+from app.services.verification_runner import VerificationRunner
+from app.storage.chunk_store import ChunkStore, job_recipe_prefix
+from app.storage.providers.tape_storage import TapeStorageProvider
+from app.storage.registry import StorageRegistry
+from app.verification.merkle import MerkleManifest, MerkleTree, merkle_path_for
 
 
 class TestComplianceChecker:
@@ -517,3 +534,626 @@ class TestReportGenerator:
 
             assert reports_list is not None
             assert isinstance(reports_list, list)
+
+
+class TestRetentionService:
+    """Test cases for RetentionService."""
+
+    @staticmethod
+    def age_runs(destination, ages):
+        """Age the runs of a tree copy: {run_id: days since completion}."""
+        conn = sqlite3.connect(manifest_path_for(destination))
+        with conn:
+            for run_id, age in ages.items():
+                stamp = (datetime.utcnow() - timedelta(days=age)).isoformat()
+                conn.execute("UPDATE runs SET started_at = ?, completed_at = ? WHERE id = ?", (stamp, stamp, run_id))
+        conn.close()
+
+    @pytest.fixture
+    def tree_copy(self, app, backup_job, tmp_path):
+        """Tree copy of a 30-day job with a full run (60 days old) and incremental runs aged 40 and 5 days."""
+        source = tmp_path / "source"
+        source.mkdir()
+        (source / "static.txt").write_bytes(b"s" * 1000)
+        (source / "changing.txt").write_bytes(b"v1" * 500)
+        destination = str(tmp_path / "target")
+
+        engine = BackupEngine()
+        runs = [engine.copy_tree(str(source), destination, mode="full")["run_id"]]
+        for version in (b"v2", b"v3"):
+            (source / "changing.txt").write_bytes(version * 500)
+            os.utime(source / "changing.txt", ns=(time.time_ns() + 10**9, time.time_ns() + 10**9))
+            runs.append(engine.copy_tree(str(source), destination, mode="incremental")["run_id"])
+        self.age_runs(destination, dict(zip(runs, (60, 40, 5))))
+
+        with app.app_context():
+            copy = BackupCopy(
+                job_id=backup_job.id, copy_type="primary", media_type="disk", storage_path=destination, status="success"
+            )
+            db.session.add(copy)
+            db.session.commit()
+            yield {"copy_id": copy.id, "source": str(source), "destination": destination, "runs": runs}
+
+    def test_dry_run_reports_reclaimable_bytes(self, app, tree_copy):
+        """Test dry run reports expired runs per target without deleting."""
+        with app.app_context():
+            report = RetentionService(deletes_per_second=None).prune(dry_run=True)
+
+            assert report["copies_checked"] == 1
+            assert report["expired_backups"] == 1
+            assert report["reclaimable_bytes"] == 1000
+            assert sum(target["bytes"] for target in report["targets"].values()) == 1000
+            assert report["deleted_backups"] == 0
+            assert os.path.isdir(run_path(tree_copy["destination"], tree_copy["runs"][1]))
+
+    def test_prune_expires_runs_inside_the_copy(self, app, tree_copy):
+        """Test expired runs are deleted while the target, its row and referenced runs stay."""
+        destination = tree_copy["destination"]
+        full, middle, latest = tree_copy["runs"]
+        with app.app_context():
+            report = RetentionService(deletes_per_second=None).prune()
+
+            assert report["deleted_backups"] == 1
+            assert report["deleted_bytes"] == 1000
+            assert not os.path.exists(run_path(destination, middle))
+            # The full run still holds static.txt for the newest run
+            assert os.path.isdir(run_path(destination, full))
+            assert BackupCopy.query.count() == 1
+            with BackupManifest(manifest_path_for(destination)) as manifest:
+                files = {entry["path"]: entry["stored_path"] for entry in manifest.locate(destination, latest)}
+            assert all(os.path.exists(path) for path in files.values())
+            assert open(files["changing.txt"], "rb").read() == b"v3" * 500
+
+    def test_prune_drops_expired_runs_from_merkle_manifest(self, app, tree_copy):
+        """Test the copy's Merkle manifest still verifies after a run directory is deleted."""
+        destination = tree_copy["destination"]
+        MerkleManifest.build(destination).close()
+        with app.app_context():
+            RetentionService(deletes_per_second=None).prune()
+
+        with MerkleManifest(merkle_path_for(destination)) as manifest:
+            result = manifest.verify(destination)
+        assert result["missing"] == []
+        assert result["files_valid"] == 3
+
+    def test_newest_restore_point_is_kept(self, app, tree_copy):
+        """Test a copy whose backups stopped keeps its last run."""
+        with app.app_context():
+            self.age_runs(tree_copy["destination"], {tree_copy["runs"][2]: 365})
+
+            report = RetentionService(deletes_per_second=None).prune()
+
+            assert report["deleted_backups"] == 1
+            assert os.path.isdir(run_path(tree_copy["destination"], tree_copy["runs"][2]))
+            assert BackupCopy.query.count() == 1
+
+    def test_dedup_recipes_expire_through_chunk_store(self, app, backup_job, tmp_path):
+        """Test deduplicated copies expire the job's old recipes and keep the newest."""
+        root = tmp_path / "store"
+        source = tmp_path / "db.bak"
+        with ChunkStore(str(root)) as store:
+            for i in range(3):
+                source.write_bytes(os.urandom(4096))
+                store.write(str(source), f"{job_recipe_prefix(backup_job.id)}{i}")
+            store.write(str(source), f"{job_recipe_prefix(backup_job.id + 1)}0")
+            aged = (datetime.utcnow() - timedelta(days=90)).isoformat()
+            store._conn.execute("UPDATE recipes SET created_at = ?", (aged,))
+            store._conn.commit()
+
+        with app.app_context():
+            db.session.add(
+                BackupCopy(job_id=backup_job.id, copy_type="offsite", media_type="disk", storage_path=f"dedup:{root}")
+            )
+            db.session.commit()
+
+            report = RetentionService(deletes_per_second=None).prune()
+
+            assert report["deleted_backups"] == 2
+            assert report["failed"] == []
+            # Expired recipes are freed by compacting their pack, not by the recipe deletes themselves
+            assert report["deleted_bytes"] == 2 * 4096
+            assert report["unreferenced_bytes"] == 0
+            with ChunkStore(str(root)) as store:
+                names = [recipe["name"] for recipe in store.list_recipes()]
+                assert store.get_stats()["unique_bytes"] == 4096
+            assert names == [f"{job_recipe_prefix(backup_job.id)}2", f"{job_recipe_prefix(backup_job.id + 1)}0"]
+            # The kept recipes share one chunk
+            assert sum(path.stat().st_size for path in (root / "packs").glob("*.pack")) == 4096
+
+    def test_unresolvable_path_is_reported_as_failed(self, app, backup_job):
+        """Test a provider path without a registered provider fails instead of being treated as missing."""
+        with app.app_context():
+            db.session.add(
+                BackupCopy(job_id=backup_job.id, copy_type="offsite", media_type="cloud", storage_path="s3://bucket/db")
+            )
+            db.session.commit()
+
+            report = RetentionService(deletes_per_second=None).prune()
+
+            assert [failure["storage_path"] for failure in report["failed"]] == ["s3://bucket/db"]
+            assert report["deleted_backups"] == 0
+            assert BackupCopy.query.count() == 1
+
+    def test_provider_copies_resolve_through_registry(self, app, backup_job, tmp_path):
+        """Test copies held by a registered provider are recognised and left in place."""
+        registry = StorageRegistry()
+        vault = str(tmp_path / "vault.tape")
+        registry.register("vault", lambda: TapeStorageProvider("vault", vault), prefix="tape://vault")
+        with app.app_context():
+            db.session.add(
+                BackupCopy(job_id=backup_job.id, copy_type="offline", media_type="tape", storage_path="tape://vault/db")
+            )
+            db.session.commit()
+
+            report = RetentionService(storage_registry=registry, deletes_per_second=None).prune()
+
+            assert report["failed"] == []
+            assert report["targets"] == {"vault": {"backups": 0, "bytes": 0}}
+            assert BackupCopy.query.count() == 1
+        registry.close()
+
+    def test_api_honours_retention_dry_run_setting(self, app, authenticated_client, tree_copy):
+        """Test RETENTION_DRY_RUN forces the API prune into a dry run."""
+        app.config["RETENTION_DRY_RUN"] = True
+
+        response = authenticated_client.post("/api/backup/retention/prune", json={"dry_run": False})
+
+        assert response.status_code == 200
+        assert response.get_json()["dry_run"] is True
+        assert os.path.isdir(run_path(tree_copy["destination"], tree_copy["runs"][1]))
+
+    def test_failed_deletion_is_reported(self, app, tree_copy):
+        """Test runs whose directory cannot be deleted are reported as failed."""
+        with app.app_context():
+            with patch("app.core.manifest.shutil.rmtree", side_effect=PermissionError("denied")):
+                report = RetentionService(deletes_per_second=None).prune()
+
+            assert report["deleted_backups"] == 0
+            assert [failure["backup"] for failure in report["failed"]] == [f"run {tree_copy['runs'][1]}"]
+
+    def test_rate_limit_spaces_deletions(self, app, tree_copy):
+        """Test deletions are throttled to the configured rate."""
+        changing = os.path.join(tree_copy["source"], "changing.txt")
+        with open(changing, "wb") as f:
+            f.write(b"v4" * 500)
+        os.utime(changing, ns=(time.time_ns() + 2 * 10**9, time.time_ns() + 2 * 10**9))
+        BackupEngine().copy_tree(tree_copy["source"], tree_copy["destination"], mode="incremental")
+        self.age_runs(tree_copy["destination"], {tree_copy["runs"][2]: 35})
+
+        with app.app_context():
+            start = time.monotonic()
+            report = RetentionService(deletes_per_second=10).prune()
+
+            assert report["deleted_backups"] == 2
+            assert time.monotonic() - start >= 0.1
+
+
+class TestScrubService:
+    """Test cases for ScrubService."""
+
+    BLOCK = 4096
+
+    @pytest.fixture
+    def scrub_copies(self, app, backup_job, tmp_path):
+        """A directory copy and a single-file copy, both with Merkle manifests."""
+        with app.app_context():
+            directory = tmp_path / "primary"
+            directory.mkdir()
+            (directory / "a.bin").write_bytes(os.urandom(4 * self.BLOCK))
+            (directory / "b.bin").write_bytes(os.urandom(2 * self.BLOCK + 10))
+            single = tmp_path / "secondary.bak"
+            single.write_bytes(os.urandom(3 * self.BLOCK))
+
+            copies = []
+            for copy_type, path in (("primary", directory), ("secondary", single)):
+                MerkleManifest.build(path, block_size=self.BLOCK).close()
+                copy = BackupCopy(job_id=backup_job.id, copy_type=copy_type, media_type="disk", storage_path=str(path))
+                db.session.add(copy)
+                copies.append(copy)
+            db.session.commit()
+            yield {"directory": directory, "single": single, "total": 9 * self.BLOCK + 10}
+
+    def make_service(self, tmp_path, **kwargs):
+        kwargs.setdefault("bytes_per_second", None)
+        return ScrubService(tmp_path / "scrub_state.json", step_bytes=self.BLOCK, **kwargs)
+
+    def test_quota_spreads_pass_over_period(self, app, scrub_copies, tmp_path):
+        """Test each run scrubs only the bytes due since the pass started."""
+        with app.app_context():
+            start = datetime(2026, 1, 1)
+            service = self.make_service(tmp_path, period_days=30)
+
+            assert service.run(now=start)["bytes_scrubbed"] == 0
+
+            halfway = service.run(now=start + timedelta(days=15))
+            assert 0.5 <= halfway["pass_progress"] < 0.5 + 2 * self.BLOCK / scrub_copies["total"]
+            assert not halfway["pass_completed"]
+
+            rest = service.run(now=start + timedelta(days=30))
+            assert halfway["bytes_scrubbed"] + rest["bytes_scrubbed"] == scrub_copies["total"]
+            assert rest["pass_completed"]
+            assert service.load_state()["passes"] == 1
+
+    def test_cursor_resumes_after_restart(self, app, scrub_copies, tmp_path):
+        """Test a new service instance continues from the persisted cursor."""
+        with app.app_context():
+            self.make_service(tmp_path).run(max_bytes=3 * self.BLOCK)
+            state = self.make_service(tmp_path).load_state()
+            assert (state["path"], state["offset"]) == ("a.bin", 3 * self.BLOCK)
+
+            scrubbed, runs = 3 * self.BLOCK, 0
+            while True:
+                report = self.make_service(tmp_path).run(max_bytes=self.BLOCK)
+                scrubbed += report["bytes_scrubbed"]
+                runs += 1
+                if report["pass_completed"]:
+                    break
+
+            assert scrubbed == scrub_copies["total"]
+            assert runs == 6
+
+    def test_corruption_raises_media_error(self, app, scrub_copies, tmp_path):
+        """Test blocks differing from the manifest raise a MEDIA_ERROR alert."""
+        with app.app_context():
+            rotted = scrub_copies["directory"] / "b.bin"
+            stat = os.stat(rotted)
+            with open(rotted, "r+b") as f:
+                f.seek(self.BLOCK + 1)
+                f.write(b"\x00\xff")
+            # Bit rot leaves size and mtime alone
+            os.utime(rotted, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+            (scrub_copies["single"]).unlink()
+
+            report = self.make_service(tmp_path).run(max_bytes=scrub_copies["total"])
+
+            assert len(report["media_errors"]) == 1
+            assert report["media_errors"][0]["path"] == "b.bin"
+            assert report["media_errors"][0]["blocks"] == [1]
+            assert report["media_errors"][0]["offsets"] == [self.BLOCK]
+            assert report["missing"][0]["path"] == str(scrub_copies["single"])
+            alerts = Alert.query.filter_by(alert_type="media_error").all()
+            assert len(alerts) == 2
+            assert {alert.severity for alert in alerts} == {"critical"}
+
+    def test_copy_without_manifest_gets_reference(self, app, backup_job, tmp_path):
+        """Test the first scrub of an unmanifested copy builds its manifest."""
+        with app.app_context():
+            path = tmp_path / "tertiary.bak"
+            path.write_bytes(os.urandom(self.BLOCK))
+            copy = BackupCopy(job_id=backup_job.id, copy_type="offsite", media_type="disk", storage_path=str(path))
+            db.session.add(copy)
+            db.session.commit()
+
+            report = self.make_service(tmp_path).run(max_bytes=self.BLOCK)
+
+            assert report["manifests_created"] == 1
+            assert os.path.exists(f"{path}.merkle.db")
+
+    def test_rewritten_file_is_stale_not_media_error(self, app, scrub_copies, tmp_path):
+        """Test a file rewritten after its manifest entry (new mtime) raises no MEDIA_ERROR."""
+        with app.app_context():
+            rewritten = scrub_copies["directory"] / "b.bin"
+            rewritten.write_bytes(os.urandom(2 * self.BLOCK + 10))
+            os.utime(rewritten, ns=(time.time_ns() + 10**9, time.time_ns() + 10**9))
+
+            report = self.make_service(tmp_path).run(max_bytes=scrub_copies["total"])
+
+            assert report["media_errors"] == []
+            assert report["stale"] == [{"copy_id": report["stale"][0]["copy_id"], "path": "b.bin"}]
+            assert report["pass_completed"]
+            assert Alert.query.filter_by(alert_type="media_error").count() == 0
+
+    def test_stale_file_is_rehashed_on_next_pass(self, app, scrub_copies, tmp_path):
+        """Test a stale file's entry is dropped so the next pass makes it the reference and verifies it again."""
+        with app.app_context():
+            rewritten = scrub_copies["directory"] / "b.bin"
+            rewritten.write_bytes(os.urandom(2 * self.BLOCK + 10))
+            os.utime(rewritten, ns=(time.time_ns() + 10**9, time.time_ns() + 10**9))
+            service = self.make_service(tmp_path)
+
+            assert len(service.run(max_bytes=scrub_copies["total"])["stale"]) == 1
+            with MerkleManifest(merkle_path_for(scrub_copies["directory"])) as manifest:
+                assert manifest.unhashed_files(scrub_copies["directory"]) == ["b.bin"]
+
+            second = service.run(max_bytes=4 * scrub_copies["total"])
+            assert second["stale"] == []
+            with MerkleManifest(merkle_path_for(scrub_copies["directory"])) as manifest:
+                assert manifest.verify(scrub_copies["directory"])["files_valid"] == len(manifest.paths())
+
+            stat = os.stat(rewritten)
+            with open(rewritten, "r+b") as f:
+                f.seek(1)
+                f.write(b"\x00\xff")
+            os.utime(rewritten, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+            third = service.run(max_bytes=4 * scrub_copies["total"])
+            assert [error["path"] for error in third["media_errors"]] == ["b.bin"]
+
+    def test_file_rewritten_by_backup_is_rehashed(self, app, scrub_copies, tmp_path):
+        """Test a file whose manifest entry the backup engine dropped becomes the reference again."""
+        with app.app_context():
+            single = scrub_copies["single"]
+            single.write_bytes(os.urandom(3 * self.BLOCK))
+            os.utime(single, ns=(time.time_ns() + 10**9, time.time_ns() + 10**9))
+            with MerkleManifest(merkle_path_for(single)) as manifest:
+                assert manifest.discard_changed(single) == 1
+
+            report = self.make_service(tmp_path).run(max_bytes=scrub_copies["total"])
+
+            assert report["stale"] == []
+            assert report["media_errors"] == []
+            assert report["bytes_scrubbed"] == scrub_copies["total"]
+            assert report["pass_completed"]
+            with MerkleManifest(merkle_path_for(single)) as manifest:
+                assert manifest.block_size == self.BLOCK
+                assert manifest.verify(single)["files_valid"] == 1
+
+    def test_missing_manifest_is_built_under_budget(self, app, backup_job, tmp_path):
+        """Test the first scrub of an unmanifested directory hashes it a file at a time within each run's budget."""
+        with app.app_context():
+            directory = tmp_path / "unmanifested"
+            directory.mkdir()
+            for name in ("a.bin", "b.bin", "c.bin"):
+                (directory / name).write_bytes(os.urandom(self.BLOCK))
+            db.session.add(
+                BackupCopy(job_id=backup_job.id, copy_type="offsite", media_type="disk", storage_path=str(directory))
+            )
+            db.session.commit()
+            service = self.make_service(tmp_path)
+
+            with patch("app.services.scrub_service.get_io_scheduler") as get_scheduler:
+                first = service.run(max_bytes=self.BLOCK)
+            throttled = [call.args[0] for call in get_scheduler().stream().__enter__().throttle.call_args_list]
+
+            assert first["bytes_scrubbed"] == self.BLOCK
+            assert sum(throttled) == self.BLOCK
+            assert first["manifests_created"] == 0
+            assert not os.path.exists(merkle_path_for(directory))
+            assert service.load_state()["path"] == "a.bin"
+
+            second = service.run(max_bytes=2 * self.BLOCK)
+
+            assert second["bytes_scrubbed"] == 2 * self.BLOCK
+            assert second["manifests_created"] == 1
+            with MerkleManifest(merkle_path_for(directory)) as manifest:
+                assert manifest.paths() == ["a.bin", "b.bin", "c.bin"]
+                assert manifest.verify(directory)["files_valid"] == 3
+
+
+class TestVerificationRunner:
+    """Test cases for VerificationRunner."""
+
+    BLOCK = 4096
+
+    @pytest.fixture
+    def verified_copy(self, app, backup_job, tmp_path):
+        """A directory copy of three files with a Merkle manifest."""
+        with app.app_context():
+            directory = tmp_path / "copy"
+            (directory / "docs").mkdir(parents=True)
+            (directory / "a.bin").write_bytes(os.urandom(3 * self.BLOCK))
+            (directory / "docs" / "b.txt").write_bytes(os.urandom(self.BLOCK + 7))
+            (directory / "docs" / "c.txt").write_bytes(b"")
+            MerkleManifest.build(directory, block_size=self.BLOCK).close()
+
+            copy = BackupCopy(job_id=backup_job.id, copy_type="primary", media_type="disk", storage_path=str(directory))
+            db.session.add(copy)
+            db.session.commit()
+            yield copy
+
+    def queue(self, copy, **kwargs):
+        kwargs.setdefault("test_type", "checksum")
+        run = VerificationRun(backup_copy_id=copy.id, requested_by=copy.job.owner_id, **kwargs)
+        db.session.add(run)
+        db.session.commit()
+        return run
+
+    def test_run_completes_and_records_test(self, app, verified_copy):
+        """Test a queued run is verified, its progress filled in and a VerificationTest recorded."""
+        with app.app_context():
+            run = self.queue(verified_copy)
+
+            assert VerificationRunner(app, progress_interval=0).run_pending() == 1
+
+            run = db.session.get(VerificationRun, run.id)
+            assert run.status == "completed"
+            assert run.result == "success"
+            assert (run.files_total, run.files_done, run.files_failed) == (3, 3, 0)
+            assert run.bytes_done == run.bytes_total == 4 * self.BLOCK + 7
+            assert run.percent_complete == 100.0
+            assert run.current_file is None
+
+            test = db.session.get(VerificationTest, run.verification_test_id)
+            assert test.job_id == verified_copy.job_id
+            assert test.test_type == "integrity"
+            assert test.test_result == "success"
+
+    def test_corruption_fails_run(self, app, verified_copy):
+        """Test blocks that no longer match the manifest fail the run."""
+        with app.app_context():
+            path = os.path.join(verified_copy.storage_path, "a.bin")
+            with open(path, "r+b") as f:
+                f.seek(self.BLOCK)
+                f.write(b"\x00" * 16)
+            run = self.queue(verified_copy)
+
+            VerificationRunner(app).run_pending()
+
+            run = db.session.get(VerificationRun, run.id)
+            assert run.status == "completed"
+            assert run.result == "failed"
+            assert run.files_failed == 1
+            assert "a.bin: blocks [1] differ" in run.error_message
+
+    def test_file_without_reference_is_unverified(self, app, verified_copy):
+        """Test a file written after the Merkle manifest is reported as unverified, not failed."""
+        with app.app_context():
+            with open(os.path.join(verified_copy.storage_path, "new.bin"), "wb") as f:
+                f.write(os.urandom(self.BLOCK))
+            run = self.queue(verified_copy)
+
+            VerificationRunner(app).run_pending()
+
+            run = db.session.get(VerificationRun, run.id)
+            assert run.result == "warning"
+            assert run.files_failed == 0
+            assert run.error_message == "new.bin: no reference checksum (not verified)"
+            assert db.session.get(VerificationTest, run.verification_test_id).test_result == "warning"
+
+    def test_checksum_run_without_manifest_is_not_success(self, app, verified_copy):
+        """Test a checksum run with nothing to compare against does not report success."""
+        with app.app_context():
+            os.remove(merkle_path_for(verified_copy.storage_path))
+            run = self.queue(verified_copy)
+
+            VerificationRunner(app).run_pending()
+
+            run = db.session.get(VerificationRun, run.id)
+            assert run.result == "warning"
+            assert run.files_failed == 0
+            assert len(run.error_message.splitlines()) == 3
+
+    def test_rewritten_tree_file_uses_run_manifest_checksum(self, app, backup_job, tmp_path):
+        """Test files rewritten since the Merkle manifest are compared with the recorded source checksum."""
+        with app.app_context():
+            source = tmp_path / "source"
+            source.mkdir()
+            (source / "static.txt").write_bytes(b"static" * 100)
+            (source / "changing.txt").write_bytes(b"v1" * 500)
+            destination = str(tmp_path / "tree")
+            engine = BackupEngine()
+            engine.copy_tree(str(source), destination, mode="full")
+            MerkleManifest.build(destination).close()
+            (source / "changing.txt").write_bytes(b"v2" * 600)
+            engine.copy_tree(str(source), destination, mode="incremental")
+            copy = BackupCopy(job_id=backup_job.id, copy_type="primary", media_type="disk", storage_path=destination)
+            db.session.add(copy)
+            db.session.commit()
+
+            intact = self.queue(copy)
+            VerificationRunner(app).run_pending()
+            assert db.session.get(VerificationRun, intact.id).result == "success"
+
+            rewritten = sorted((tmp_path / "tree").glob("run-*/changing.txt"))[-1]
+            with open(rewritten, "r+b") as f:
+                f.write(b"XX")
+            corrupted = self.queue(copy)
+            VerificationRunner(app).run_pending()
+
+            run = db.session.get(VerificationRun, corrupted.id)
+            assert run.result == "failed"
+            assert run.files_failed == 1
+            relative = rewritten.relative_to(tmp_path / "tree").as_posix()
+            assert run.error_message == f"{relative}: does not match the source checksum"
+
+    def test_quick_scope_reads_nothing(self, app, verified_copy):
+        """Test quick scope checks presence and size only."""
+        with app.app_context():
+            os.remove(os.path.join(verified_copy.storage_path, "docs", "c.txt"))
+            run = self.queue(verified_copy, scope="quick")
+
+            with patch("app.services.verification_runner.MerkleTree.from_file") as from_file:
+                VerificationRunner(app).run_pending()
+
+            from_file.assert_not_called()
+            run = db.session.get(VerificationRun, run.id)
+            assert run.result == "failed"
+            assert run.error_message == "docs/c.txt: missing from backup"
+
+    def test_cancel_stops_mid_file(self, app, verified_copy):
+        """Test a cancel requested while a file is hashed stops the run at the next progress check."""
+        with app.app_context():
+            run = self.queue(verified_copy)
+            run_id = run.id
+            real_from_file = MerkleTree.from_file
+
+            def cancel_then_hash(path, block_size, algorithm, progress_callback=None):
+                VerificationRun.query.filter_by(id=run_id).update({"cancel_requested": True})
+                return real_from_file(path, block_size, algorithm, progress_callback=progress_callback)
+
+            with patch("app.services.verification_runner.MerkleTree.from_file", side_effect=cancel_then_hash):
+                VerificationRunner(app, progress_interval=0).run_pending()
+
+            run = db.session.get(VerificationRun, run_id)
+            assert run.status == "cancelled"
+            assert run.files_done == 0
+            assert run.verification_test_id is None
+
+    def test_requeue_interrupted_runs(self, app, verified_copy):
+        """Test only runs whose runner stopped sending heartbeats are queued again."""
+        with app.app_context():
+            now = datetime.utcnow()
+            stale = self.queue(
+                verified_copy, status="running", owner="dead", heartbeat_at=now - timedelta(minutes=5), files_done=2
+            )
+            alive = self.queue(verified_copy, status="running", owner="other", heartbeat_at=now, files_done=1)
+
+            assert VerificationRunner(app, heartbeat_timeout=60).requeue_interrupted() == 1
+
+            stale = db.session.get(VerificationRun, stale.id)
+            assert (stale.status, stale.owner, stale.started_at, stale.files_done) == ("pending", None, None, 0)
+            alive = db.session.get(VerificationRun, alive.id)
+            assert (alive.status, alive.owner, alive.files_done) == ("running", "other", 1)
+
+    def test_beat_keeps_owned_runs_alive(self, app, verified_copy):
+        """Test a runner's heartbeat refreshes its own runs so they are never requeued."""
+        with app.app_context():
+            runner = VerificationRunner(app, heartbeat_timeout=60)
+            old = datetime.utcnow() - timedelta(minutes=5)
+            run = self.queue(verified_copy, status="running", owner=runner.owner, heartbeat_at=old)
+
+            runner.beat()
+
+            run = db.session.get(VerificationRun, run.id)
+            assert run.status == "running"
+            assert run.heartbeat_at > old
+
+    def test_requeued_run_is_abandoned_by_old_owner(self, app, verified_copy):
+        """Test a worker stops without writing once its run was claimed by another runner."""
+        with app.app_context():
+            run_id = self.queue(verified_copy).id
+            real_from_file = MerkleTree.from_file
+
+            def reclaim_then_hash(path, block_size, algorithm, progress_callback=None):
+                VerificationRun.query.filter_by(id=run_id).update({"owner": "other"})
+                db.session.commit()
+                return real_from_file(path, block_size, algorithm, progress_callback=progress_callback)
+
+            with patch("app.services.verification_runner.MerkleTree.from_file", side_effect=reclaim_then_hash):
+                VerificationRunner(app, progress_interval=0).run_pending()
+
+            run = db.session.get(VerificationRun, run_id)
+            assert (run.status, run.owner) == ("running", "other")
+            assert run.completed_at is None
+            assert run.verification_test_id is None
+
+    def test_api_queues_and_reports_progress(self, app, client, jwt_token, verified_copy):
+        """Test the v1 verify endpoints queue a run, report its progress and cancel it."""
+        headers = {"Authorization": f"Bearer {jwt_token}"}
+        copy_id = verified_copy.id
+
+        response = client.post(f"/api/v1/verify/{copy_id}", json={"test_type": "checksum"}, headers=headers)
+        assert response.status_code == 202
+        run_id = response.get_json()["data"]["verification_id"]
+
+        response = client.post(f"/api/v1/verify/{copy_id}", json={"test_type": "checksum"}, headers=headers)
+        assert response.status_code == 409
+
+        with app.app_context():
+            VerificationRunner(app).run_pending()
+
+        status = client.get(f"/api/v1/verify/{copy_id}/status", headers=headers).get_json()["data"]
+        assert status["id"] == run_id
+        assert status["test_status"] == "completed"
+        assert status["files_done"] == 3
+        assert status["percent_complete"] == 100.0
+
+        result = client.get(f"/api/v1/verify/{copy_id}/result", headers=headers).get_json()["data"]
+        assert result["test_result"] == "success"
+        assert result["passed_files"] == 3
+
+        response = client.post(f"/api/v1/verify/{copy_id}", json={"test_type": "read"}, headers=headers)
+        queued_id = response.get_json()["data"]["verification_id"]
+        response = client.post(f"/api/v1/verify/{queued_id}/cancel", headers=headers)
+        assert response.status_code == 200
+        assert response.get_json()["data"]["test_status"] == "cancelled"
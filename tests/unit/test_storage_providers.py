@@ -0,0 +1,492 @@
+"""
+Unit tests for storage providers.
+
+Tests cover:
+- LocalStorageProvider copy, verify and listing operations
+- S3StorageProvider multipart upload, ranged verify/restore (against moto)
+- TapeStorageProvider write batching, volume index and single-pass restores
+- Streaming listings with resume cursors and pages
+"""
+import hashlib
+import os
+
+import pytest
+
+from app.storage.providers.local_storage import LocalStorageProvider
+from app.storage.providers.s3_storage import MANIFEST_SUFFIX, S3StorageProvider, composite_checksum, part_size_for
+from app.storage.providers.tape_storage import TapeStorageProvider
+
+
+@pytest.fixture
+def provider(tmp_path):
+    """Connected local storage provider rooted in a temporary directory."""
+    provider = LocalStorageProvider("local-test", str(tmp_path / "storage"))
+    provider.connect()
+    return provider
+
+
+class TestLocalStorageProvider:
+    """Test cases for LocalStorageProvider."""
+
+    def test_copy_file_reports_checksum_and_strategy(self, tmp_path, provider):
+        """Test copy_file returns the source checksum and the copy strategy used."""
+        source = tmp_path / "source.bin"
+        data = os.urandom(100 * 1024)
+        source.write_bytes(data)
+
+        result = provider.copy_file(str(source), "backups/source.bin")
+
+        assert result.success is True
+        assert result.bytes_copied == len(data)
+        assert result.checksum == hashlib.sha256(data).hexdigest()
+        assert result.strategy in provider.kernel_copier.available_strategies
+        assert result.throughput_mb_s is not None
+        assert provider.verify_file("backups/source.bin", result.checksum) is True
+
+    def test_buffered_copy_reports_stages(self, tmp_path, provider):
+        """Test the buffered fallback reports pipeline stage statistics."""
+        source = tmp_path / "source.bin"
+        source.write_bytes(os.urandom(4096))
+        provider.kernel_copier._kernel_strategies = []
+
+        result = provider.copy_file(str(source), "backups/source.bin")
+
+        assert result.strategy == "buffered"
+        assert set(result.stage_stats["stages"]) == {"reader", "hasher", "writer"}
+
+    def test_sparse_image_keeps_holes(self, tmp_path, provider):
+        """Test sparse sources are copied with holes and report physical bytes."""
+        source = tmp_path / "disk.img"
+        data = os.urandom(64 * 1024)
+        with open(source, "wb") as f:
+            f.truncate(16 * 1024 * 1024)
+            f.seek(4 * 1024 * 1024)
+            f.write(data)
+
+        result = provider.copy_file(str(source), "backups/disk.img")
+
+        assert result.strategy == "sparse"
+        assert result.logical_bytes == 16 * 1024 * 1024
+        assert result.physical_bytes == len(data)
+        assert result.checksum == hashlib.sha256(source.read_bytes()).hexdigest()
+
+    def test_copy_missing_source_fails(self, tmp_path, provider):
+        """Test copying a missing source returns an unsuccessful result."""
+        result = provider.copy_file(str(tmp_path / "missing.bin"), "backups/missing.bin")
+
+        assert result.success is False
+        assert result.error_message
+
+
+class TestStreamingListing:
+    """Test cases for generator-based, resumable file listings."""
+
+    @pytest.fixture
+    def tree(self, provider):
+        """Nested backup tree: 3 top-level files and 2 subdirectories with 2 files each."""
+        root = provider.base_path / "backups"
+        for name in ("a.bak", "c.bak", "e.bak", "b/1.bak", "b/2.bak", "d/1.bak", "d/2.log"):
+            (root / name).parent.mkdir(parents=True, exist_ok=True)
+            (root / name).write_bytes(b"x" * len(name))
+        return root
+
+    def test_iter_files_yields_metadata(self, provider, tree):
+        """Test entries carry size and mtime and directories are flagged when not recursing."""
+        entries = {entry.path: entry for entry in provider.iter_files("backups")}
+
+        assert sorted(entries) == ["backups/a.bak", "backups/b", "backups/c.bak", "backups/d", "backups/e.bak"]
+        assert entries["backups/a.bak"].size == len("a.bak")
+        assert entries["backups/a.bak"].mtime == pytest.approx((tree / "a.bak").stat().st_mtime)
+        assert entries["backups/b"].is_dir is True
+
+    def test_recursive_listing_resumes_after_cursor(self, provider, tree):
+        """Test a cursor inside a subdirectory resumes with the next file in walk order."""
+        paths = [entry.path for entry in provider.iter_files("backups", "*.bak", recursive=True)]
+        resumed = [entry.path for entry in provider.iter_files("backups", "*.bak", "backups/b/1.bak", True)]
+
+        assert paths == [
+            "backups/a.bak",
+            "backups/b/1.bak",
+            "backups/b/2.bak",
+            "backups/c.bak",
+            "backups/d/1.bak",
+            "backups/e.bak",
+        ]
+        assert resumed == paths[2:]
+
+    def test_pages_cover_listing_once(self, provider, tree):
+        """Test following next_cursor returns every file exactly once."""
+        seen, cursor = [], None
+        while True:
+            page = provider.list_page("backups", cursor=cursor, limit=2, recursive=True)
+            seen.extend(entry.path for entry in page.entries)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+
+        assert seen == [entry.path for entry in provider.iter_files("backups", recursive=True)]
+        assert len(seen) == 7
+
+    def test_list_files_keeps_names(self, provider, tree):
+        """Test list_files still returns relative names."""
+        assert provider.list_files("backups/d") == ["backups/d/1.bak", "backups/d/2.log"]
+        assert provider.list_files("missing") == []
+
+    def test_unreadable_subdirectory_is_reported(self, provider, tree, monkeypatch):
+        """Test an unreadable subdirectory is listed with its error and the walk carries on."""
+        scandir = os.scandir
+
+        def failing_scandir(path):
+            if os.path.basename(path) == "b":
+                raise PermissionError(13, "Permission denied", path)
+            return scandir(path)
+
+        monkeypatch.setattr(os, "scandir", failing_scandir)
+        entries = list(provider.iter_files("backups", "*.bak", recursive=True))
+
+        assert [entry.path for entry in entries] == [
+            "backups/a.bak",
+            "backups/b",
+            "backups/c.bak",
+            "backups/d/1.bak",
+            "backups/e.bak",
+        ]
+        assert entries[1].is_dir is True
+        assert entries[1].to_dict()["error"] == "Permission denied"
+        assert "error" not in entries[0].to_dict()
+        # Resuming at the reported directory does not report it again
+        resumed = [entry.path for entry in provider.iter_files("backups", "*.bak", "backups/b", True)]
+        assert resumed == ["backups/c.bak", "backups/d/1.bak", "backups/e.bak"]
+
+    def test_unreadable_listing_root_raises(self, provider, tree, monkeypatch):
+        """Test an unreadable top-level directory raises instead of looking empty."""
+        def failing_scandir(path):
+            raise PermissionError(13, "Permission denied", path)
+
+        monkeypatch.setattr(os, "scandir", failing_scandir)
+        with pytest.raises(PermissionError):
+            list(provider.iter_files("backups"))
+
+    def test_large_directory_is_scanned_in_batches(self, provider, tree):
+        """Test directories larger than scan_batch keep name order and resume from a cursor."""
+        for i in range(7):
+            (tree / f"f{i}.bak").write_bytes(b"x")
+        expected = [entry.path for entry in provider.iter_files("backups", recursive=True)]
+
+        provider.scan_batch = 2
+        paths = [entry.path for entry in provider.iter_files("backups", recursive=True)]
+        resumed = [entry.path for entry in provider.iter_files("backups", cursor="backups/f2.bak", recursive=True)]
+
+        assert paths == expected
+        assert len(paths) == 14
+        assert resumed == expected[expected.index("backups/f2.bak") + 1:]
+
+
+@pytest.fixture
+def s3_client():
+    """Client for a bucket on moto's in-process S3 server (skipped without moto/boto3)."""
+    moto = pytest.importorskip("moto")
+    boto3 = pytest.importorskip("boto3")
+    with moto.mock_aws():
+        client = boto3.client(
+            "s3", region_name="us-east-1", aws_access_key_id="testing", aws_secret_access_key="testing"
+        )
+        client.create_bucket(Bucket="backups")
+        yield client
+
+
+@pytest.fixture
+def s3_provider(s3_client):
+    """S3 provider that switches to multipart at 1 MiB with 8 MiB parts."""
+    return S3StorageProvider(
+        "s3-test", "backups", prefix="offsite", multipart_threshold=1024 * 1024, max_concurrency=4, client=s3_client
+    )
+
+
+def s3_read(client, key):
+    return client.get_object(Bucket="backups", Key=key)["Body"].read()
+
+
+def s3_keys(client):
+    return [obj["Key"] for obj in client.list_objects_v2(Bucket="backups").get("Contents", [])]
+
+
+class TestS3StorageProvider:
+    """Test cases for S3StorageProvider."""
+
+    def test_part_size_adapts_to_file_size(self):
+        """Test part sizes grow with the file, stay capped at 64 MiB and only exceed it to fit 10000 parts."""
+        assert part_size_for(100 * 1024 * 1024) == 8 * 1024 * 1024
+        assert part_size_for(500 * 1000**3) == 64 * 1024 * 1024
+        assert part_size_for(1024**4) // (1024 * 1024) == 105
+        assert -(-(5 * 1024**4) // part_size_for(5 * 1024**4)) <= 10000
+
+    def test_buffered_parts_stay_within_memory_budget(self, s3_client):
+        """Test concurrency shrinks so in-flight parts never exceed max_buffer_bytes."""
+        provider = S3StorageProvider(
+            "s3", "backups", max_concurrency=8, max_buffer_bytes=256 * 1024 * 1024, client=s3_client
+        )
+
+        assert provider._window(8 * 1024 * 1024) == 8
+        assert provider._window(105 * 1024 * 1024) == 2
+        assert provider._window(1024**3) == 1
+
+    def test_multipart_upload_records_part_manifest(self, tmp_path, s3_client, s3_provider):
+        """Test large files are uploaded in parts with per-part checksums."""
+        data = os.urandom(12 * 1024 * 1024)
+        source = tmp_path / "db.bak"
+        source.write_bytes(data)
+        progress = []
+
+        result = s3_provider.copy_file(str(source), "daily/db.bak", lambda done, total: progress.append(done))
+
+        assert result.success is True
+        assert result.strategy == "s3_multipart"
+        assert result.checksum == hashlib.sha256(data).hexdigest()
+        assert s3_read(s3_client, "offsite/daily/db.bak") == data
+        assert progress[-1] == len(data)
+
+        manifest = s3_provider.get_manifest("daily/db.bak")
+        assert [p["size"] for p in manifest["parts"]] == [8 * 1024 * 1024, 4 * 1024 * 1024]
+        assert manifest["parts"][1]["sha256"] == hashlib.sha256(data[8 * 1024 * 1024 :]).hexdigest()
+        assert manifest["composite_sha256"] == composite_checksum([p["sha256"] for p in manifest["parts"]])
+
+    def test_failed_part_aborts_upload(self, tmp_path, s3_client, s3_provider, monkeypatch):
+        """Test a failing part aborts the multipart upload and reports failure."""
+        source = tmp_path / "db.bak"
+        source.write_bytes(os.urandom(12 * 1024 * 1024))
+        upload_part = s3_client.upload_part
+
+        def fail_second_part(**kwargs):
+            if kwargs["PartNumber"] == 2:
+                raise IOError("injected part failure")
+            return upload_part(**kwargs)
+
+        monkeypatch.setattr(s3_client, "upload_part", fail_second_part)
+
+        result = s3_provider.copy_file(str(source), "daily/db.bak")
+
+        assert result.success is False
+        assert s3_client.list_multipart_uploads(Bucket="backups").get("Uploads", []) == []
+        assert "offsite/daily/db.bak" not in s3_keys(s3_client)
+
+    def test_verify_uses_ranged_reads_and_detects_corruption(self, tmp_path, s3_client, s3_provider, monkeypatch):
+        """Test verification reads parts by range and fails on a corrupted part."""
+        data = os.urandom(12 * 1024 * 1024)
+        source = tmp_path / "db.bak"
+        source.write_bytes(data)
+        result = s3_provider.copy_file(str(source), "daily/db.bak")
+        ranges = []
+        get_object = s3_client.get_object
+
+        def recording_get(**kwargs):
+            if "Range" in kwargs:
+                ranges.append(kwargs["Range"])
+            return get_object(**kwargs)
+
+        monkeypatch.setattr(s3_client, "get_object", recording_get)
+
+        assert s3_provider.verify_file("daily/db.bak", result.checksum) is True
+        assert sorted(ranges) == ["bytes=0-8388607", "bytes=8388608-12582911"]
+
+        corrupted = bytearray(data)
+        corrupted[-1] ^= 0xFF
+        s3_client.put_object(Bucket="backups", Key="offsite/daily/db.bak", Body=bytes(corrupted))
+        assert s3_provider.verify_file("daily/db.bak", result.checksum) is False
+
+    def test_download_restores_file(self, tmp_path, s3_provider):
+        """Test ranged parallel GETs restore the original bytes."""
+        data = os.urandom(12 * 1024 * 1024 + 17)
+        source = tmp_path / "db.bak"
+        source.write_bytes(data)
+        s3_provider.copy_file(str(source), "daily/db.bak")
+
+        result = s3_provider.download_file("daily/db.bak", str(tmp_path / "restore" / "db.bak"))
+
+        assert result.success is True
+        assert result.checksum == hashlib.sha256(data).hexdigest()
+        assert (tmp_path / "restore" / "db.bak").read_bytes() == data
+
+    def test_small_file_single_put_and_listing(self, tmp_path, s3_client, s3_provider):
+        """Test small files use one PUT and manifests are hidden from listings."""
+        small = tmp_path / "small.txt"
+        small.write_bytes(b"hello")
+        large = tmp_path / "large.bin"
+        large.write_bytes(os.urandom(2 * 1024 * 1024))
+
+        assert s3_provider.copy_file(str(small), "daily/small.txt").strategy == "s3_put"
+        s3_provider.copy_file(str(large), "daily/large.bin")
+
+        assert sorted(s3_provider.list_files("daily")) == ["daily/large.bin", "daily/small.txt"]
+        assert "offsite/daily/large.bin" + MANIFEST_SUFFIX in s3_keys(s3_client)
+        assert s3_provider.delete_file("daily/large.bin") is True
+        assert "offsite/daily/large.bin" + MANIFEST_SUFFIX not in s3_keys(s3_client)
+
+    def test_capabilities_require_provider_copies(self, s3_provider):
+        """Test S3 is reported as a non-POSIX destination with ranged reads."""
+        capabilities = s3_provider.get_capabilities()
+
+        assert capabilities.posix_path is False
+        assert capabilities.ranged_reads is True
+
+
+@pytest.fixture
+def tape(tmp_path):
+    """Mounted tape stand-in with 64 KiB aggregated blocks."""
+    provider = TapeStorageProvider("tape-test", str(tmp_path / "volume.tape"), block_size=64 * 1024)
+    provider.connect()
+    yield provider
+    provider.disconnect()
+
+
+def write_small_files(tmp_path, provider, count, size=4096):
+    """Back up ``count`` small random files and return their contents by name."""
+    contents = {}
+    for i in range(count):
+        data = os.urandom(size)
+        source = tmp_path / f"src_{i}.bin"
+        source.write_bytes(data)
+        name = f"daily/file_{i:03d}.bin"
+        assert provider.copy_file(str(source), name).success is True
+        contents[name] = data
+    return contents
+
+
+class TestTapeStorageProvider:
+    """Test cases for TapeStorageProvider."""
+
+    def test_small_files_are_batched_into_blocks(self, tmp_path, tape):
+        """Test many small files copied as one batch produce a few block-sized writes."""
+        files = []
+        for i in range(40):
+            source = tmp_path / f"src_{i}.bin"
+            source.write_bytes(os.urandom(4096))
+            files.append((str(source), f"daily/file_{i:03d}.bin"))
+        writes_before = tape.get_device_stats()["writes"]
+
+        results = tape.copy_files(files)
+
+        assert all(result.success for result in results.values())
+        stats = tape.get_device_stats()
+        # 160 KiB of data: two full 64 KiB blocks, then the tail with the index
+        assert stats["writes"] - writes_before == 3
+        assert stats["bytes_written"] > 40 * 4096
+
+    def test_copied_file_is_durable_without_unmount(self, tmp_path, tape):
+        """Test a successful copy is already on the volume with its index before disconnect."""
+        contents = write_small_files(tmp_path, tape, 2)
+
+        other = TapeStorageProvider("tape", str(tmp_path / "volume.tape"), block_size=64 * 1024)
+        other.connect()
+
+        assert other.list_files("daily") == sorted(contents)
+        for name, data in contents.items():
+            assert other.verify_file(name, hashlib.sha256(data).hexdigest()) is True
+        other.disconnect()
+
+    def test_interrupted_batch_keeps_committed_index(self, tmp_path, tape, monkeypatch):
+        """Test blocks written by a batch that never commits leave earlier files readable."""
+        contents = write_small_files(tmp_path, tape, 3)
+        big = tmp_path / "big.bin"
+        big.write_bytes(os.urandom(200 * 1024))
+
+        def crash():
+            raise IOError("power lost")
+
+        monkeypatch.setattr(tape, "_commit", crash)
+        result = tape.copy_file(str(big), "daily/big.bin")
+
+        assert result.success is False
+        assert os.path.getsize(tmp_path / "volume.tape") > 200 * 1024
+
+        remounted = TapeStorageProvider("tape", str(tmp_path / "volume.tape"), block_size=64 * 1024)
+        remounted.connect()
+        assert remounted.list_files("daily") == sorted(contents)
+        for name, data in contents.items():
+            assert remounted.verify_file(name, hashlib.sha256(data).hexdigest()) is True
+        assert os.path.getsize(tmp_path / "volume.tape") < 200 * 1024
+        remounted.disconnect()
+
+    def test_delete_survives_remount(self, tmp_path, tape):
+        """Test a deleted file stays deleted after the volume is mounted again."""
+        contents = write_small_files(tmp_path, tape, 3)
+        deleted = sorted(contents)[0]
+
+        assert tape.delete_file(deleted) is True
+        assert tape.delete_file(deleted) is False
+
+        remounted = TapeStorageProvider("tape", str(tmp_path / "volume.tape"), block_size=64 * 1024)
+        remounted.connect()
+        assert remounted.list_files("daily") == sorted(contents)[1:]
+        for name in sorted(contents)[1:]:
+            assert remounted.verify_file(name, hashlib.sha256(contents[name]).hexdigest()) is True
+        remounted.disconnect()
+
+    def test_index_survives_remount(self, tmp_path):
+        """Test the end-of-volume index is reloaded and appends continue after the data."""
+        volume = str(tmp_path / "volume.tape")
+        first = TapeStorageProvider("tape", volume, block_size=64 * 1024)
+        first.connect()
+        contents = write_small_files(tmp_path, first, 3)
+        first.disconnect()
+
+        second = TapeStorageProvider("tape", volume, block_size=64 * 1024)
+        second.connect()
+        extra = tmp_path / "extra.bin"
+        extra.write_bytes(b"appended")
+        result = second.copy_file(str(extra), "daily/extra.bin")
+
+        assert second.list_files("daily") == sorted(contents) + ["daily/extra.bin"]
+        for name, data in contents.items():
+            assert second.verify_file(name, hashlib.sha256(data).hexdigest()) is True
+        assert second.verify_file("daily/extra.bin", result.checksum) is True
+        second.disconnect()
+
+    def test_restore_reads_in_position_order(self, tmp_path, tape):
+        """Test restoring files in random order makes one forward pass over the media."""
+        contents = write_small_files(tmp_path, tape, 30)
+        tape.flush()
+        requested = sorted(contents, reverse=True)
+
+        results = tape.restore_files(requested, str(tmp_path / "restore"))
+
+        assert all(result.success for result in results.values())
+        for name, data in contents.items():
+            assert (tmp_path / "restore" / name).read_bytes() == data
+        stats = tape.get_device_stats()
+        assert stats["backward_seeks"] == 1  # rewind to the first file only
+
+    def test_restore_reports_missing_files(self, tmp_path, tape):
+        """Test files not on the volume are reported without aborting the pass."""
+        contents = write_small_files(tmp_path, tape, 2)
+
+        results = tape.restore_files(list(contents) + ["daily/missing.bin"], str(tmp_path / "restore"))
+
+        assert results["daily/missing.bin"].success is False
+        assert all(results[name].success for name in contents)
+
+    def test_capacity_is_enforced(self, tmp_path):
+        """Test writes beyond the volume capacity fail."""
+        provider = TapeStorageProvider("tape", str(tmp_path / "small.tape"), capacity_bytes=1024)
+        provider.connect()
+        source = tmp_path / "big.bin"
+        source.write_bytes(os.urandom(2048))
+
+        result = provider.copy_file(str(source), "big.bin")
+
+        assert result.success is False
+        assert "full" in result.error_message
+        provider.disconnect()
+
+    def test_iter_files_reads_index_only(self, tmp_path, tape):
+        """Test listings come from the index with sizes and never touch the media."""
+        contents = write_small_files(tmp_path, tape, 5)
+        tape.flush()
+        reads_before = tape.get_device_stats()["bytes_read"]
+
+        entries = list(tape.iter_files("daily", cursor="daily/file_001.bin"))
+
+        assert [entry.path for entry in entries] == sorted(contents)[2:]
+        assert all(entry.size == 4096 for entry in entries)
+        assert tape.get_device_stats()["bytes_read"] == reads_before
+
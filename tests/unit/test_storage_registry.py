@@ -0,0 +1,270 @@
+"""
+Unit tests for the storage provider registry.
+
+Tests cover:
+- Connection pooling and reuse
+- Health checks and reconnection
+- Path resolution and capability-based copy plans
+- Providers registered from the STORAGE_PROVIDERS setting
+- BackupEngine integration
+"""
+import os
+import threading
+
+import pytest
+
+from app.core.backup_engine import BackupEngine
+from app.storage.interfaces import StorageCapabilities, StorageLocation, StorageType
+from app.storage.providers.local_storage import LocalStorageProvider
+from app.storage.registry import StorageRegistry, get_storage_registry, plan_copy, register_configured_providers
+
+
+class ObjectStoreProvider(LocalStorageProvider):
+    """Local provider that pretends not to expose POSIX paths (like an object store)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.healthy = True
+
+    @property
+    def storage_type(self) -> StorageType:
+        return StorageType.CLOUD_S3
+
+    def get_capabilities(self) -> StorageCapabilities:
+        return StorageCapabilities(ranged_reads=True, max_parallel_streams=2)
+
+    def health_check(self) -> bool:
+        return self.healthy
+
+
+@pytest.fixture
+def registry():
+    registry = StorageRegistry(health_check_interval=0)
+    yield registry
+    registry.close()
+
+
+class TestConnectionPool:
+    """Test cases for pooled provider connections."""
+
+    def test_connection_reused_across_checkouts(self, tmp_path, registry):
+        """Test sequential checkouts share one connected provider."""
+        registry.register("nas", lambda: LocalStorageProvider("nas", str(tmp_path)))
+
+        with registry.acquire("nas") as first:
+            pass
+        with registry.acquire("nas") as second:
+            pass
+
+        assert first is second
+        stats = registry.get_stats()["nas"]
+        assert stats["connections"] == 1
+        assert stats["checkouts"] == 2
+
+    def test_pool_size_from_capabilities(self, tmp_path, registry):
+        """Test the pool never exceeds max_parallel_streams connections."""
+        registry.register("s3", lambda: ObjectStoreProvider("s3", str(tmp_path)))
+        registry.acquire_timeout = 0.2
+
+        with registry.acquire("s3"), registry.acquire("s3"):
+            with pytest.raises(ConnectionError):
+                with registry.acquire("s3"):
+                    pass
+
+        assert registry.get_stats()["s3"]["pool_size"] == 2
+
+    def test_waiter_gets_released_connection(self, tmp_path, registry):
+        """Test a checkout blocks until another caller returns a connection."""
+        registry.register("nas", lambda: LocalStorageProvider("nas", str(tmp_path)), pool_size=1)
+        acquired = threading.Event()
+
+        def second():
+            with registry.acquire("nas"):
+                acquired.set()
+
+        with registry.acquire("nas"):
+            threading.Thread(target=second, daemon=True).start()
+            assert not acquired.wait(0.2)
+
+        assert acquired.wait(2)
+
+    def test_unhealthy_connection_replaced(self, tmp_path, registry):
+        """Test a connection failing its health check is discarded and reconnected."""
+        registry.register("s3", lambda: ObjectStoreProvider("s3", str(tmp_path)))
+
+        with registry.acquire("s3") as first:
+            first.healthy = False
+        with registry.acquire("s3") as second:
+            pass
+
+        assert second is not first
+        assert registry.get_stats()["s3"]["health_failures"] == 1
+
+    def test_check_health_reports_failures(self, tmp_path, registry):
+        """Test check_health evicts idle connections that fail."""
+        registry.register("s3", lambda: ObjectStoreProvider("s3", str(tmp_path)))
+        with registry.acquire("s3") as provider:
+            provider.healthy = False
+
+        assert registry.check_health() == {"s3": False}
+        assert registry.get_stats()["s3"]["idle"] == 0
+
+    def test_unknown_provider_rejected(self, registry):
+        """Test acquiring an unregistered provider raises KeyError."""
+        with pytest.raises(KeyError):
+            with registry.acquire("missing"):
+                pass
+
+
+class TestCopyPlan:
+    """Test cases for capability-based strategy selection."""
+
+    def test_resolve_uses_longest_prefix(self, tmp_path, registry):
+        """Test nested prefixes win and relative paths are returned."""
+        registry.register("root", lambda: LocalStorageProvider("root", str(tmp_path)), prefix=str(tmp_path))
+        registry.register(
+            "nas", lambda: LocalStorageProvider("nas", str(tmp_path / "nas")), prefix=str(tmp_path / "nas")
+        )
+
+        route = registry.resolve(str(tmp_path / "nas" / "daily" / "db.bak"))
+
+        assert route.provider_id == "nas"
+        assert route.relative_path == os.path.join("daily", "db.bak")
+        assert route.capabilities.posix_path
+        assert registry.resolve("/elsewhere/file") is None
+
+    def test_non_posix_destination_delegates(self):
+        """Test object-store destinations are copied by the provider."""
+        plan = plan_copy(None, StorageCapabilities(), same_device=False)
+
+        assert plan.delegate
+        assert plan.strategy == "provider"
+
+    def test_reflink_requires_same_device_and_support(self):
+        """Test reflink is only attempted where it can succeed."""
+        cow = StorageCapabilities(posix_path=True, reflink=True, sparse=True)
+        plain = StorageCapabilities(posix_path=True, sparse=False)
+
+        assert plan_copy(cow, cow, same_device=True).reflink
+        assert not plan_copy(cow, cow, same_device=False).reflink
+        assert not plan_copy(None, plain, same_device=True).reflink
+        assert not plan_copy(None, plain, same_device=True).sparse
+
+    def test_local_provider_probes_capabilities(self, tmp_path):
+        """Test local capabilities are probed once and cached."""
+        provider = LocalStorageProvider("local", str(tmp_path), StorageLocation.ONSITE, max_parallel_streams=3)
+
+        capabilities = provider.get_capabilities()
+
+        assert capabilities.posix_path
+        assert capabilities.ranged_reads
+        assert capabilities.max_parallel_streams == 3
+        assert provider.get_capabilities() is capabilities
+        assert os.listdir(tmp_path) == []
+
+
+class TestConfiguredProviders:
+    """Test cases for providers registered from configuration."""
+
+    def test_providers_are_registered_from_definitions(self, tmp_path, registry):
+        """Test definitions become pooled providers resolved by prefix, replacing earlier registrations."""
+        nas = tmp_path / "nas"
+        definitions = [
+            {"id": "nas", "type": "local", "prefix": str(nas), "pool_size": 2, "options": {"base_path": str(nas)}},
+            {
+                "id": "vault",
+                "type": "tape",
+                "options": {"volume_path": str(tmp_path / "vault.tape"), "location": "offline"},
+            },
+        ]
+
+        assert register_configured_providers(registry, definitions) == ["nas", "vault"]
+        assert register_configured_providers(registry, definitions) == ["nas", "vault"]
+
+        route = registry.resolve(str(nas / "daily" / "db.bak"))
+        assert route.provider_id == "nas"
+        assert route.relative_path == "daily/db.bak"
+        with registry.acquire("vault") as vault:
+            assert vault.storage_location == StorageLocation.OFFLINE
+        assert registry.get_stats()["nas"]["pool_size"] == 2
+
+    @pytest.mark.parametrize(
+        "definition",
+        [
+            {"type": "local", "options": {"base_path": "/tmp"}},
+            {"id": "nfs", "type": "nfs"},
+            {"id": "nas", "type": "local", "options": {"base_dir": "/tmp"}},
+        ],
+    )
+    def test_invalid_definitions_are_rejected(self, registry, definition):
+        """Test a missing id, unknown type or wrong constructor options fail at registration."""
+        with pytest.raises(ValueError):
+            register_configured_providers(registry, [definition])
+        assert registry.provider_ids == []
+
+    def test_create_app_registers_storage_providers(self, tmp_path, monkeypatch):
+        """Test the application factory fills the shared registry used by retention."""
+        from app import create_app
+        from app.config import TestingConfig
+
+        definitions = [{"id": "nas", "type": "local", "prefix": str(tmp_path), "options": {"base_path": str(tmp_path)}}]
+        monkeypatch.setattr(TestingConfig, "STORAGE_PROVIDERS", definitions)
+        try:
+            create_app("testing")
+            assert get_storage_registry().resolve(str(tmp_path / "db.bak")).provider_id == "nas"
+        finally:
+            get_storage_registry().unregister("nas")
+
+
+class TestEngineIntegration:
+    """Test cases for BackupEngine copies routed through the registry."""
+
+    def test_copy_file_delegates_to_provider(self, tmp_path, registry):
+        """Test copies to non-POSIX providers go through the pooled provider."""
+        source = tmp_path / "source.bin"
+        source.write_bytes(os.urandom(128 * 1024))
+        bucket = tmp_path / "bucket"
+        registry.register("s3", lambda: ObjectStoreProvider("s3", str(bucket)), prefix="s3://backups")
+        engine = BackupEngine(storage_registry=registry)
+
+        result = engine.copy_file(str(source), "s3://backups/daily/source.bin")
+
+        assert result["provider_id"] == "s3"
+        assert result["bytes_copied"] == 128 * 1024
+        assert (bucket / "daily" / "source.bin").read_bytes() == source.read_bytes()
+        assert engine.get_backup_stats()["storage_providers"]["s3"]["connections"] == 1
+
+    def test_fanout_excludes_delegated_destinations(self, tmp_path, registry, monkeypatch):
+        """Test multi-destination copies upload to providers instead of writing their URIs as local paths."""
+        monkeypatch.chdir(tmp_path)
+        source = tmp_path / "source.bin"
+        source.write_bytes(os.urandom(128 * 1024))
+        bucket = tmp_path / "bucket"
+        registry.register("s3", lambda: ObjectStoreProvider("s3", str(bucket)), prefix="s3://backups")
+        engine = BackupEngine(storage_registry=registry)
+        destinations = [str(tmp_path / "local_a.bin"), str(tmp_path / "local_b.bin"), "s3://backups/a.bin"]
+
+        results = engine._copy_to_destinations(str(source), destinations)
+
+        assert results["s3://backups/a.bin"]["provider_id"] == "s3"
+        assert (bucket / "a.bin").read_bytes() == source.read_bytes()
+        assert results[destinations[0]]["strategy"] == "fanout"
+        assert not (tmp_path / "s3:").exists()
+
+    def test_copy_file_skips_unsupported_reflink(self, tmp_path, registry, monkeypatch):
+        """Test destinations without reflink use the copier that never tries it."""
+        source = tmp_path / "source.bin"
+        source.write_bytes(os.urandom(64 * 1024))
+        dest_root = tmp_path / "dest"
+        registry.register("dest", lambda: LocalStorageProvider("dest", str(dest_root)), prefix=str(dest_root))
+        monkeypatch.setattr(
+            LocalStorageProvider, "get_capabilities", lambda self: StorageCapabilities(posix_path=True)
+        )
+        engine = BackupEngine(storage_registry=registry)
+
+        result = engine.copy_file(str(source), str(dest_root / "copy.bin"))
+
+        assert result["strategy"] != "reflink"
+        assert "reflink" not in engine.kernel_copier_no_reflink.available_strategies
+        assert sum(engine.kernel_copier_no_reflink.strategy_counts.values()) == 1
+        assert (dest_root / "copy.bin").read_bytes() == source.read_bytes()